@@ -19,11 +19,11 @@ COMPLETE V2 ENDPOINTS:
 This replaces the entire v1 API with a cleaner, more consistent v2 design.
 """
 from contextlib import asynccontextmanager
-from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, Depends, Query, Path, Body
+from typing import List, Dict, Any, Optional, Tuple, Union
+from fastapi import FastAPI, HTTPException, Depends, Query, Path, Body, Request, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from pathlib import Path as PathLib
 import sys
 import time
@@ -37,15 +37,30 @@ sys.path.insert(0, str(PathLib(__file__).parent / "src"))
 
 # Import configuration and services
 from src.core.config import settings
-from src.services.llm_service import create_llm_service
+from src.services.llm_service import create_llm_service, preload_ollama_models, retry_scope, RetryPolicy
 
 # Import database models and operations
-from src.models.database_models import CharacterDB, init_database, get_db, CustomContent, UnifiedItem
+from src.models.database_models import (
+    CharacterDB, init_database, get_db, Character, CustomContent, UnifiedItem,
+    CharacterCommit, CharacterRepositoryManager, CharacterVersioningAPI
+)
 from src.models.character_models import CharacterCore
 
 # Import factory-based creation system
 from src.services.creation_factory import CreationFactory
+from src.services.creation import CharacterCreator
+from src.services.prompt_serializer import compact_context
+from src.services.theme_rules import theme_rule_cache
+from src.services.content_pool import ContentPoolService
+from src.services.speculative_creation import speculative_upgrades
+from src.services.idempotency import idempotency_ledger, IdempotencyConflict
+from src.services.unified_catalog_migration import sync_official_catalog
+from src.services.list_projections import LIST_PROJECTIONS, ListProjection
+from src.services.version_projections import repository_etag
+from src.models import database_models
+from src.models.compressed_json import codec as compression_codec, compress_all_existing_rows
 from src.core.enums import CreationOptions
+from src.api.unified_catalog_api import unified_catalog_router
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -60,7 +75,7 @@ performance_metrics = {
     'error_count': 0
 }
 
-def track_request_metrics(endpoint: str, processing_time: float, success: bool):
+def track_request_metrics(endpoint: str, processing_time: float, success: bool, llm_retries: int = 0):
     """Track metrics for a request"""
     performance_metrics['total_requests'] += 1
     performance_metrics['total_processing_time'] += processing_time
@@ -69,12 +84,14 @@ def track_request_metrics(endpoint: str, processing_time: float, success: bool):
         performance_metrics['endpoint_metrics'][endpoint] = {
             'requests': 0,
             'total_time': 0.0,
-            'errors': 0
+            'errors': 0,
+            'llm_retries': 0
         }
     
     metrics = performance_metrics['endpoint_metrics'][endpoint]
     metrics['requests'] += 1
     metrics['total_time'] += processing_time
+    metrics['llm_retries'] += llm_retries
     
     if not success:
         metrics['errors'] += 1
@@ -93,16 +110,51 @@ async def lifespan(app: FastAPI):
         init_database(database_url)
         logger.info("Database initialized successfully")
         
+        if settings.catalog_sync_on_startup:
+            await asyncio.to_thread(sync_official_catalog)
+        
+        # Rewrite pre-compression rows in small batches while the API serves requests
+        if settings.compression_backfill_on_startup:
+            app.state.compression_backfill = asyncio.create_task(asyncio.to_thread(
+                compress_all_existing_rows, database_models.engine, database_models.Base.metadata,
+                batch_size=settings.compression_backfill_batch_size
+            ))
+        
         # Initialize LLM service
         llm_service = create_llm_service()
         app.state.llm_service = llm_service
         logger.info("LLM service initialized successfully")
         
+        # Load local models now rather than on the first request that needs them
+        app.state.ollama_preload = asyncio.create_task(preload_ollama_models(llm_service))
+        
         # Initialize creation factory
         creation_factory = CreationFactory(llm_service)
         app.state.creation_factory = creation_factory
+        speculative_upgrades.ttl_seconds = settings.fast_mode_upgrade_ttl_seconds
+        idempotency_ledger.ttl_hours = settings.idempotency_ttl_hours
+        idempotency_ledger.lock_seconds = settings.idempotency_lock_seconds
+        idempotency_ledger.purge_expired()
         logger.info("Creation factory initialized successfully")
         
+        # Keep pools of common NPCs and monsters warm for instant factory delivery
+        if settings.content_pool_enabled:
+            content_pool = ContentPoolService(
+                creation_factory,
+                ContentPoolService.specs_from_settings(settings),
+                target_size=settings.content_pool_target_size,
+                low_watermark=settings.content_pool_low_watermark,
+                personalize_with_llm=settings.content_pool_personalize_with_llm
+            )
+            creation_factory.content_pool = content_pool
+            app.state.content_pool_task = asyncio.create_task(content_pool.run())
+        
+        # Load persisted theme rules and compile missing top themes in the background
+        theme_rule_cache.load()
+        app.state.theme_rule_warmup = asyncio.create_task(
+            theme_rule_cache.warm(settings.theme_rule_warm_themes_list, creation_factory.character_creator)
+        )
+        
         logger.info("🚀 D&D Character Creator API v2 started successfully!")
         yield
         
@@ -131,6 +183,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Unified item catalog: ranked search, item lookup and character access (/api/v2/catalog)
+app.include_router(unified_catalog_router)
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """Give each request one LLM retry budget and record its retries with the request metrics."""
+    start_time = time.time()
+    with retry_scope(RetryPolicy.from_env()) as retry_policy:
+        response = await call_next(request)
+    trace = retry_policy.get_trace()
+    response.headers["X-LLM-Retries"] = str(trace["retries"])
+    if trace["retries"]:
+        logger.info(f"{request.method} {request.url.path} LLM retries: {trace['attempts']}")
+    # Key by the route template so /characters/{character_id} is one entry, not one per ID
+    route = request.scope.get("route")
+    track_request_metrics(
+        f"{request.method} {getattr(route, 'path', 'unmatched')}", time.time() - start_time,
+        response.status_code < 500, trace["retries"]
+    )
+    return response
+
 # ============================================================================
 # PYDANTIC MODELS
 # ============================================================================
@@ -145,6 +218,9 @@ class DirectEditRequest(BaseModel):
 
 class CharacterResponse(BaseModel):
     """Character response model."""
+    # The list endpoint's fields= adds columns beyond these
+    model_config = ConfigDict(extra="allow")
+    
     id: str
     name: str
     species: str
@@ -155,6 +231,11 @@ class CharacterResponse(BaseModel):
     created_at: str
     user_modified: Optional[bool] = False
 
+class CharacterPage(BaseModel):
+    """Cursor-paginated character list."""
+    items: List[CharacterResponse]
+    next_cursor: Optional[str] = None
+
 class JournalEntryResponse(BaseModel):
     """Response model for journal entries."""
     id: str
@@ -184,29 +265,92 @@ async def health_check():
         "message": "D&D Character Creator API v2 - Complete"
     }
 
+@app.get("/api/v2/metrics", tags=["health"])
+async def get_metrics():
+    """Request, LLM and JSON-parsing metrics for performance monitoring."""
+    from src.services.json_repair import json_repair_stats
+    from src.services.llm_schemas import structured_output_stats
+    from src.services.prompt_serializer import prompt_compaction_stats
+    from src.services.llm_service import (
+        token_usage_stats, coalescing_stats, get_provider_health_stats, get_stage_routing_stats,
+        ollama_context_store, retry_stats
+    )
+
+    uptime = (datetime.now() - performance_metrics['startup_time']).total_seconds()
+    factory = getattr(app.state, "creation_factory", None)
+    pool = factory.content_pool if factory else None
+    return {
+        "uptime_seconds": round(uptime, 1),
+        "total_requests": performance_metrics['total_requests'],
+        "total_processing_time": round(performance_metrics['total_processing_time'], 3),
+        "error_count": performance_metrics['error_count'],
+        "endpoint_metrics": performance_metrics['endpoint_metrics'],
+        "json_repair": json_repair_stats.get_stats(),
+        "structured_output": structured_output_stats.get_stats(),
+        "prompt_compaction": prompt_compaction_stats.get_stats(),
+        "token_usage": token_usage_stats.get_stats(),
+        "theme_rules": theme_rule_cache.get_stats(),
+        "llm_coalescing": coalescing_stats.get_stats(),
+        "llm_providers": get_provider_health_stats(),
+        "stage_routing": get_stage_routing_stats(),
+        "ollama": ollama_context_store.get_stats(),
+        "llm_retries": retry_stats.get_stats(),
+        "content_pools": pool.get_stats() if pool else None,
+        "fast_mode": speculative_upgrades.get_stats(),
+        "idempotency": idempotency_ledger.get_stats(),
+        "compression": compression_codec.get_stats(),
+        "creator_reuse": factory.get_creator_stats() if factory else None
+    }
+
 # ============================================================================
 # BASIC CRUD ENDPOINTS
 # ============================================================================
 
-@app.get("/api/v2/characters", response_model=List[CharacterResponse], tags=["characters"])
+def resolve_list_fields(projection: ListProjection, fields: Optional[str]) -> List[str]:
+    """Columns for a list endpoint; 400 for unknown fields= entries."""
+    try:
+        return projection.resolve_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def list_page(projection: ListProjection, query, response: Response, limit: int, offset: int,
+              cursor: Optional[str]):
+    """
+    One page of a list endpoint in (created_at, id) order.
+    
+    With cursor= (empty for the first page) the response is an envelope,
+    {"items": [...], "next_cursor": ...}; without it the bare list is returned
+    as before, with the cursor for the next page in the X-Next-Cursor header.
+    """
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+    try:
+        rows, next_cursor = projection.page(query, limit, cursor=cursor, offset=offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if cursor is not None:
+        return {"items": rows, "next_cursor": next_cursor}
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+@app.get("/api/v2/characters", response_model=Union[List[CharacterResponse], CharacterPage], tags=["characters"])
 async def list_characters(
+    response: Response,
     db = Depends(get_db),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of characters to return"),
-    offset: int = Query(0, ge=0, description="Number of characters to skip")
+    offset: int = Query(0, ge=0, description="Number of characters to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from next_cursor; pass empty for the first page of a cursor walk"),
+    fields: Optional[str] = Query(None, description="Extra comma-separated fields (e.g. equipment,spells), or * for all")
 ):
-    """List all characters with pagination."""
-    characters = CharacterDB.list_characters(db, limit=limit, offset=offset)
-    return [CharacterResponse(
-        id=char.id,
-        name=char.name,
-        species=char.species,
-        background=char.background,
-        level=char.level,
-        character_classes=char.character_classes,
-        backstory=char.backstory,
-        created_at=char.created_at.isoformat(),
-        user_modified=getattr(char, 'user_modified', False)
-    ) for char in characters]
+    """List all characters with pagination (extra fields on request)."""
+    projection = LIST_PROJECTIONS["characters"]
+    query = projection.query(db, resolve_list_fields(projection, fields)).filter(Character.is_active == True)
+    result = list_page(projection, query, response, limit, offset, cursor)
+    for char in (result["items"] if cursor is not None else result):
+        char.setdefault("user_modified", False)
+    return result
 
 @app.get("/api/v2/characters/{character_id}", response_model=CharacterResponse, tags=["characters"])
 async def get_character(
@@ -245,13 +389,17 @@ async def get_character_journal(
 
 @app.get("/api/v2/npcs", tags=["npcs"])
 async def list_npcs(
+    response: Response,
     db = Depends(get_db),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of NPCs to return"),
-    offset: int = Query(0, ge=0, description="Number of NPCs to skip")
+    offset: int = Query(0, ge=0, description="Number of NPCs to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from next_cursor; pass empty for the first page of a cursor walk"),
+    fields: Optional[str] = Query(None, description="Extra comma-separated fields (e.g. created_at,is_public), or * for all")
 ):
-    """List all NPCs with pagination."""
-    npcs = db.query(CustomContent).filter(CustomContent.content_type == "npc").offset(offset).limit(limit).all()
-    return [{"id": npc.id, "name": npc.name, "description": npc.description, "content_data": npc.content_data} for npc in npcs]
+    """List all NPCs with pagination (extra fields on request)."""
+    projection = LIST_PROJECTIONS["npcs"]
+    query = projection.query(db, resolve_list_fields(projection, fields)).filter(CustomContent.content_type == "npc")
+    return list_page(projection, query, response, limit, offset, cursor)
 
 @app.get("/api/v2/npcs/{npc_id}", tags=["npcs"])
 async def get_npc(
@@ -266,13 +414,17 @@ async def get_npc(
 
 @app.get("/api/v2/monsters", tags=["monsters"])
 async def list_monsters(
+    response: Response,
     db = Depends(get_db),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of monsters to return"),
-    offset: int = Query(0, ge=0, description="Number of monsters to skip")
+    offset: int = Query(0, ge=0, description="Number of monsters to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from next_cursor; pass empty for the first page of a cursor walk"),
+    fields: Optional[str] = Query(None, description="Extra comma-separated fields (e.g. created_at,is_public), or * for all")
 ):
-    """List all monsters with pagination."""
-    monsters = db.query(CustomContent).filter(CustomContent.content_type == "monster").offset(offset).limit(limit).all()
-    return [{"id": monster.id, "name": monster.name, "description": monster.description, "content_data": monster.content_data} for monster in monsters]
+    """List all monsters with pagination (extra fields on request)."""
+    projection = LIST_PROJECTIONS["monsters"]
+    query = projection.query(db, resolve_list_fields(projection, fields)).filter(CustomContent.content_type == "monster")
+    return list_page(projection, query, response, limit, offset, cursor)
 
 @app.get("/api/v2/monsters/{monster_id}", tags=["monsters"])
 async def get_monster(
@@ -287,13 +439,17 @@ async def get_monster(
 
 @app.get("/api/v2/items", tags=["items"])
 async def list_items(
+    response: Response,
     db = Depends(get_db),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of items to return"),
-    offset: int = Query(0, ge=0, description="Number of items to skip")
+    offset: int = Query(0, ge=0, description="Number of items to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from next_cursor; pass empty for the first page of a cursor walk"),
+    fields: Optional[str] = Query(None, description="Extra comma-separated fields (e.g. rarity,content_data), or * for all")
 ):
-    """List all items with pagination."""
-    items = db.query(UnifiedItem).offset(offset).limit(limit).all()
-    return [{"id": item.id, "name": item.name, "item_type": item.item_type, "short_description": item.short_description} for item in items]
+    """List all items with pagination (summary fields unless more are requested)."""
+    projection = LIST_PROJECTIONS["items"]
+    query = projection.query(db, resolve_list_fields(projection, fields))
+    return list_page(projection, query, response, limit, offset, cursor)
 
 @app.get("/api/v2/items/{item_id}", tags=["items"])
 async def get_item(
@@ -306,6 +462,86 @@ async def get_item(
         raise HTTPException(status_code=404, detail="Item not found")
     return {"id": item.id, "name": item.name, "item_type": item.item_type, "short_description": item.short_description}
 
+# ============================================================================
+# CHARACTER VERSIONING ENDPOINTS
+# ============================================================================
+
+def versioning_etag(db, repository_id: str, variant: str, if_none_match: Optional[str]) -> Tuple[str, bool]:
+    """ETag of a repository view and whether the client's copy is current; 404 for unknown repositories."""
+    etag = repository_etag(db, repository_id, variant)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    current = if_none_match is not None and (if_none_match.strip() == "*" or etag in [
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    ])
+    return etag, current
+
+@app.get("/api/v2/character-repositories/{repository_id}/tree", tags=["versioning"])
+async def get_repository_tree(
+    response: Response,
+    repository_id: str = Path(..., description="ID of the character repository."),
+    depth_limit: Optional[int] = Query(None, ge=1, le=1000, description="Commit depths (generations) per page, newest first"),
+    before_depth: Optional[int] = Query(None, ge=0, description="Continue below this depth (page.next_before_depth)"),
+    include_snapshots: bool = Query(False, description="Include each commit's full character_data"),
+    if_none_match: Optional[str] = Header(None),
+    db = Depends(get_db)
+):
+    """Get a repository's branches, commit metadata and tags; 304 when If-None-Match is current."""
+    etag, current = versioning_etag(db, repository_id, f"tree:{depth_limit}:{before_depth}:{include_snapshots}", if_none_match)
+    if current:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return CharacterRepositoryManager.get_repository_tree(db, repository_id, include_snapshots=include_snapshots,
+                                                          depth_limit=depth_limit, before_depth=before_depth)
+
+@app.get("/api/v2/character-repositories/{repository_id}/timeline", tags=["versioning"])
+async def get_repository_timeline(
+    response: Response,
+    repository_id: str = Path(..., description="ID of the character repository."),
+    if_none_match: Optional[str] = Header(None),
+    db = Depends(get_db)
+):
+    """Get the timeline of a repository's commits; 304 when If-None-Match is current."""
+    etag, current = versioning_etag(db, repository_id, "timeline", if_none_match)
+    if current:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return CharacterVersioningAPI.get_character_timeline_for_frontend(db, repository_id)
+
+@app.get("/api/v2/character-repositories/{repository_id}/graph", tags=["versioning"])
+async def get_repository_graph(
+    response: Response,
+    repository_id: str = Path(..., description="ID of the character repository."),
+    if_none_match: Optional[str] = Header(None),
+    db = Depends(get_db)
+):
+    """Get the commit graph (nodes and edges) of a repository; 304 when If-None-Match is current."""
+    etag, current = versioning_etag(db, repository_id, "graph", if_none_match)
+    if current:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return CharacterVersioningAPI.get_character_visualization_data(db, repository_id)
+
+@app.get("/api/v2/character-commits/{commit_hash}/snapshot", tags=["versioning"])
+async def get_commit_snapshot(
+    response: Response,
+    commit_hash: str = Path(..., description="Hash of the commit whose character snapshot to retrieve."),
+    if_none_match: Optional[str] = Header(None),
+    db = Depends(get_db)
+):
+    """
+    Get the character data stored at a commit. Commits never change, so the snapshot is cacheable
+    forever, but only privately: character data must not be kept by shared caches.
+    """
+    if db.query(CharacterCommit.id).filter(CharacterCommit.commit_hash == commit_hash).first() is None:
+        raise HTTPException(status_code=404, detail="Commit not found")
+    etag = f'"{commit_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if if_none_match is not None and etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return CharacterRepositoryManager.get_character_at_commit(db, commit_hash)
+
 # ============================================================================
 # DIRECT EDIT ENDPOINTS
 # ============================================================================
@@ -680,6 +916,8 @@ class FactoryCreateRequest(BaseModel):
     user_preferences: Optional[Dict[str, Any]] = None
     extra_fields: Optional[Dict[str, Any]] = None
     save_to_database: Optional[bool] = True
+    response_mode: Optional[str] = Field(None, description="'fast' returns a template if the LLM misses the latency SLO (npc, monster)")
+    slo_seconds: Optional[float] = Field(None, description="Fast-mode latency SLO; defaults to FAST_MODE_SLO_SECONDS")
 
 class FactoryResponse(BaseModel):
     """Response model for factory operations."""
@@ -691,12 +929,48 @@ class FactoryResponse(BaseModel):
     warnings: Optional[List[str]] = None
     processing_time: Optional[float] = None
 
+async def run_idempotent(endpoint: str, idempotency_key: Optional[str], request: BaseModel,
+                         response: Response, handler) -> FactoryResponse:
+    """
+    Run a factory handler once per Idempotency-Key.
+    Repeats attach to the in-flight request or replay the stored response
+    (marked with an Idempotent-Replayed header).
+    """
+    if not idempotency_key:
+        return await handler()
+    
+    async def run_handler():
+        return (await handler()).model_dump()
+    
+    try:
+        result, outcome = await idempotency_ledger.run(
+            endpoint, idempotency_key, request.model_dump(), run_handler
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    if outcome != "executed":
+        logger.info(f"Idempotency-Key {idempotency_key[:40]} for {endpoint}: {outcome}")
+        response.headers["Idempotent-Replayed"] = "true"
+    return FactoryResponse(**result)
+
 @app.post("/api/v2/factory/create", response_model=FactoryResponse, tags=["factory"])
-async def factory_create_from_scratch(request: FactoryCreateRequest, db = Depends(get_db)):
+async def factory_create_from_scratch(request: FactoryCreateRequest, response: Response, db = Depends(get_db),
+                                      idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
     """
     Create D&D objects from scratch using the factory pattern.
     Supports: character, monster, npc, weapon, armor, spell, other_item
+    
+    Send an Idempotency-Key header to make retries safe: a repeat returns the
+    original result instead of generating (and saving) a second object.
     """
+    return await run_idempotent(
+        "factory_create", idempotency_key, request, response,
+        lambda: _factory_create_from_scratch(request, db)
+    )
+
+async def _factory_create_from_scratch(request: FactoryCreateRequest, db) -> FactoryResponse:
+    """Factory create handler behind the idempotency ledger."""
     start_time = time.time()
     
     try:
@@ -715,12 +989,18 @@ async def factory_create_from_scratch(request: FactoryCreateRequest, db = Depend
             request.prompt,
             theme=request.theme,
             user_preferences=request.user_preferences or {},
-            extra_fields=request.extra_fields or {}
+            extra_fields=request.extra_fields or {},
+            response_mode=request.response_mode,
+            slo_seconds=request.slo_seconds
         )
         
         object_id = None
         warnings = []
         
+        # Fast-mode templates are upgraded in the background under this ID
+        if isinstance(result, dict) and (result.get("generation") or {}).get("upgrade_id"):
+            object_id = result["generation"]["upgrade_id"]
+        
         # Save to database if requested (only for characters currently)
         if request.save_to_database and creation_type == CreationOptions.CHARACTER:
             try:
@@ -790,6 +1070,17 @@ async def factory_create_from_scratch(request: FactoryCreateRequest, db = Depend
             processing_time=processing_time
         )
 
+@app.get("/api/v2/factory/objects/{object_id}/upgrade", tags=["factory"])
+async def get_factory_object_upgrade(object_id: str):
+    """
+    Get the LLM upgrade of a fast-mode template.
+    Status is 'pending' while the LLM runs, then 'ready' (with data) or 'failed'.
+    """
+    upgrade = speculative_upgrades.get(object_id)
+    if upgrade is None:
+        raise HTTPException(status_code=404, detail=f"No upgrade found for object: {object_id}")
+    return upgrade
+
 @app.get("/api/v2/factory/types", tags=["factory"])
 async def get_factory_creation_types():
     """Get available creation types for the factory system."""
@@ -847,11 +1138,21 @@ class FactoryEvolveRequest(BaseModel):
     save_to_database: Optional[bool] = True
 
 @app.post("/api/v2/factory/evolve", response_model=FactoryResponse, tags=["factory"])
-async def factory_evolve_object(request: FactoryEvolveRequest, db = Depends(get_db)):
+async def factory_evolve_object(request: FactoryEvolveRequest, response: Response, db = Depends(get_db),
+                                idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
     """
     Evolve/modify existing D&D objects or create new versions using the factory pattern.
     This can be used for leveling up, retheming, multiclassing, or other modifications.
+    
+    Accepts an Idempotency-Key header like /api/v2/factory/create.
     """
+    return await run_idempotent(
+        "factory_evolve", idempotency_key, request, response,
+        lambda: _factory_evolve_object(request, db)
+    )
+
+async def _factory_evolve_object(request: FactoryEvolveRequest, db) -> FactoryResponse:
+    """Factory evolve handler behind the idempotency ledger."""
     start_time = time.time()
     
     try:
@@ -884,13 +1185,19 @@ async def factory_evolve_object(request: FactoryEvolveRequest, db = Depends(get_
                         "charisma": existing_character.charisma
                     },
                     "skills": existing_character.skills,
-                    "equipment": existing_character.equipment
+                    "equipment": existing_character.equipment_with_inventory()
                 }
         
         # Create the evolution prompt with base data
         evolution_context = request.evolution_prompt
         if base_character_data:
-            evolution_context = f"Based on this existing character: {base_character_data}, {request.evolution_prompt}"
+            character_context = compact_context(
+                {"character": base_character_data},
+                flow="factory_evolve_object",
+                budgets={"character": 600},
+                baseline=str(base_character_data)
+            )
+            evolution_context = f"Based on this existing character:\n{character_context}\n{request.evolution_prompt}"
         
         # Use the factory to create the evolved object
         factory = app.state.creation_factory
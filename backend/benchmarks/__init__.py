@@ -0,0 +1,8 @@
+"""
+Benchmarks for the catalog, pagination, versioning and storage services.
+
+Each module times a service in src/ against the access pattern it replaced,
+on a scratch database (in-memory SQLite unless a database URL is given), and
+prints the results as JSON. Run them from the backend directory:
+    python -m benchmarks.catalog_class_index --items 50000
+"""
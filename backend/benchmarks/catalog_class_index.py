@@ -0,0 +1,129 @@
+"""
+Benchmark of class-filtered catalog searches (src/services/catalog_class_index.py).
+
+Loading rows and filtering class_restrictions in Python, a LIKE over the JSON
+text and the indexed unified_item_classes lookup, on a synthetic catalog.
+
+Usage (50k items, in-memory SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.catalog_class_index --items 50000
+"""
+
+import argparse
+import json
+from typing import Any, Dict, List
+
+from sqlalchemy import select, text
+
+from src.services.catalog_class_index import class_restriction_filter
+
+
+BENCHMARK_CLASSES = ["wizard", "sorcerer", "warlock", "cleric", "druid", "bard", "paladin", "ranger",
+                     "fighter", "rogue", "barbarian", "monk", "artificer"]
+BENCHMARK_CREATOR = "class-index-benchmark"
+
+
+def benchmark(items: int = 50000, database_url: str = "sqlite://", repeats: int = 20) -> Dict[str, Any]:
+    """
+    Time class-filtered spell and equipment searches on a synthetic catalog:
+    loading rows and filtering class_restrictions in Python (what the search
+    paths did), a LIKE over the JSON text, and the indexed lookup. Returns
+    milliseconds per query and, on SQLite, the indexed query plan.
+    """
+    import random
+    import time
+    import uuid
+    from sqlalchemy import String, cast, create_engine, func
+    from sqlalchemy.orm import sessionmaker
+    from src.models.database_models import Base, UnifiedItem, UnifiedItemClass
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    rng = random.Random(42)
+
+    session = Session()
+
+    def clear() -> None:
+        benchmark_ids = select(UnifiedItem.id).where(UnifiedItem.created_by == BENCHMARK_CREATOR)
+        session.query(UnifiedItemClass).filter(UnifiedItemClass.item_id.in_(benchmark_ids)).delete(
+            synchronize_session=False)
+        session.query(UnifiedItem).filter(UnifiedItem.created_by == BENCHMARK_CREATOR).delete(
+            synchronize_session=False)
+        session.commit()
+
+    clear()
+    rows, class_rows = [], []
+    for i in range(items):
+        is_spell = i % 2 == 0
+        classes = rng.sample(BENCHMARK_CLASSES, rng.randint(1, 3)) if is_spell or i % 10 == 1 else None
+        item_id = uuid.uuid4()
+        rows.append({
+            "id": item_id, "name": f"Benchmark {'Spell' if is_spell else 'Gear'} {i}",
+            "item_type": "spell" if is_spell else "item", "source_type": "custom",
+            "content_data": {"description": "benchmark item"}, "class_restrictions": classes,
+            "spell_level": rng.randint(0, 9) if is_spell else None,
+            "created_by": BENCHMARK_CREATOR, "is_active": True,
+        })
+        class_rows.extend({"class_name": name, "item_id": item_id} for name in classes or [])
+    # Bulk insert bypasses the ORM listeners; the class rows are written alongside
+    session.execute(UnifiedItem.__table__.insert(), rows)
+    session.execute(UnifiedItemClass.__table__.insert(), class_rows)
+    session.commit()
+    if engine.dialect.name in ("sqlite", "postgresql"):
+        # Planner statistics, as a long-lived database would have
+        session.execute(text("ANALYZE"))
+        session.commit()
+
+    def timed(run) -> tuple:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            found = run()
+        return round((time.perf_counter() - start) * 1000 / repeats, 3), found
+
+    def json_scan(item_type: str, class_names: List[str]) -> int:
+        candidates = session.query(UnifiedItem).filter(
+            UnifiedItem.is_active == True, UnifiedItem.item_type == item_type,
+            UnifiedItem.class_restrictions.isnot(None)
+        )
+        return sum(1 for item in candidates if set(class_names) <= set(item.class_restrictions or []))
+
+    def count(item_type: str, *criteria) -> int:
+        return session.query(func.count(UnifiedItem.id)).filter(
+            UnifiedItem.is_active == True, UnifiedItem.item_type == item_type, *criteria
+        ).scalar()
+
+    def json_like(item_type: str, class_names: List[str]) -> int:
+        json_text = cast(UnifiedItem.class_restrictions, String)
+        return count(item_type, *(json_text.like(f'%"{name}"%') for name in class_names))
+
+    def indexed(item_type: str, class_names: List[str]) -> int:
+        return count(item_type, class_restriction_filter(class_names))
+
+    results: Dict[str, Any] = {"items": items, "database": engine.dialect.name, "repeats": repeats, "queries": {}}
+    for item_type, class_names in (("spell", ["wizard"]), ("item", ["wizard"]), ("spell", ["artificer", "monk"])):
+        scan_ms, scan_found = timed(lambda: json_scan(item_type, class_names))
+        like_ms, like_found = timed(lambda: json_like(item_type, class_names))
+        index_ms, index_found = timed(lambda: indexed(item_type, class_names))
+        results["queries"][f"{item_type}:{'+'.join(class_names)}"] = {
+            "json_scan_ms": scan_ms, "json_like_ms": like_ms, "indexed_ms": index_ms,
+            "matches": index_found, "results_agree": scan_found == like_found == index_found,
+        }
+
+    if engine.dialect.name == "sqlite":
+        statement = session.query(UnifiedItem.id).filter(
+            UnifiedItem.item_type == "spell", class_restriction_filter(["wizard"])
+        ).statement.compile(engine, compile_kwargs={"literal_binds": True})
+        results["plan"] = [row[-1] for row in session.execute(text(f"EXPLAIN QUERY PLAN {statement}"))]
+
+    clear()
+    session.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark class-filtered catalog searches")
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.items, args.database_url, args.repeats), indent=2))
@@ -0,0 +1,105 @@
+"""
+Benchmark of catalog statistics (src/services/catalog_counters.py).
+
+The eight COUNT(*) queries get_catalog_stats() used to run, one GROUP BY and
+the counter table read, on a synthetic catalog.
+
+Usage (50k items, in-memory SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.catalog_counters --items 50000
+"""
+
+import argparse
+import json
+from typing import Any, Dict
+
+from src.services.catalog_counters import (
+    ITEM_TYPES, catalog_stats, grouped_counts, rebuild_catalog_counters, summarize_counts
+)
+
+
+BENCHMARK_CREATOR = "catalog-counters-benchmark"
+
+
+def benchmark(items: int = 50000, database_url: str = "sqlite://", repeats: int = 20) -> Dict[str, Any]:
+    """
+    Time the stats three ways on a synthetic catalog: the eight COUNT(*)
+    queries get_catalog_stats() used to run, one GROUP BY, and the counter
+    table read. Also checks all three agree.
+    """
+    import random
+    import time
+    import uuid
+    from datetime import datetime
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+    from src.models.database_models import Base, UnifiedItem
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    rng = random.Random(42)
+
+    def clear() -> None:
+        session.query(UnifiedItem).filter(UnifiedItem.created_by == BENCHMARK_CREATOR).delete(synchronize_session=False)
+        session.commit()
+
+    clear()
+    rarities = [None, "common", "uncommon", "rare", "very_rare", "legendary"]
+    now = datetime.utcnow()
+    rows = []
+    for i in range(items):
+        item_type = rng.choice(ITEM_TYPES)
+        rows.append({
+            "id": uuid.uuid4(), "name": f"Benchmark Item {i}", "item_type": item_type,
+            "source_type": rng.choice(["official", "custom", "custom"]), "content_data": {},
+            "rarity": None if item_type == "spell" else rng.choice(rarities),
+            "spell_level": rng.randint(0, 9) if item_type == "spell" else None,
+            "created_by": BENCHMARK_CREATOR, "created_at": now, "is_active": rng.random() > 0.05,
+        })
+    session.execute(UnifiedItem.__table__.insert(), rows)
+    session.commit()
+    with engine.begin() as connection:
+        rebuild_catalog_counters(connection)
+        if connection.dialect.name == "sqlite":
+            connection.execute(text("ANALYZE"))
+
+    def eight_counts() -> Dict[str, Any]:
+        active = session.query(UnifiedItem).filter(UnifiedItem.is_active == True)
+        return {
+            "total_items": active.count(),
+            "official_items": active.filter(UnifiedItem.source_type == "official").count(),
+            "custom_items": active.filter(UnifiedItem.source_type == "custom").count(),
+            "by_type": {item_type: active.filter(UnifiedItem.item_type == item_type).count()
+                        for item_type in ITEM_TYPES},
+        }
+
+    def group_by() -> Dict[str, Any]:
+        return summarize_counts(grouped_counts(session.connection()).items())
+
+    results: Dict[str, Any] = {"items": items, "database": engine.dialect.name, "repeats": repeats}
+    outputs = {}
+    for label, run in (("eight_counts", eight_counts), ("group_by", group_by),
+                       ("counter_table", lambda: catalog_stats(session))):
+        outputs[label] = run()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            run()
+        results[f"{label}_ms"] = round((time.perf_counter() - start) * 1000 / repeats, 3)
+    legacy_keys = ("total_items", "official_items", "custom_items", "by_type")
+    results["consistent"] = (outputs["group_by"] == outputs["counter_table"] and
+                             all(outputs["eight_counts"][key] == outputs["group_by"][key] for key in legacy_keys))
+
+    clear()
+    with engine.begin() as connection:
+        rebuild_catalog_counters(connection)
+    session.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark catalog statistics")
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.items, args.database_url, args.repeats), indent=2))
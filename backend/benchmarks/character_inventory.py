@@ -0,0 +1,135 @@
+"""
+Benchmark of inventory writes (src/services/character_inventory.py).
+
+Add, update, remove and attune on a character with a large inventory: the old
+read-modify-write of the Character.equipment blob against the row-level
+CharacterDB helpers, plus the migration of the blob into the tables.
+
+Usage (300-item inventory, in-memory SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.character_inventory --items 300
+"""
+
+import argparse
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+
+from src.services.character_inventory import migrate_character_equipment
+
+
+def benchmark(items: int = 300, database_url: str = "sqlite://", operations: int = 50) -> Dict[str, Any]:
+    """
+    Time add / update / remove / attune on a character with a large inventory:
+    the old read-modify-write of the equipment blob against the row-level
+    helpers. Updates and removals target the last item, the worst case for the
+    old linear scan by name.
+    """
+    import time
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.orm.attributes import flag_modified
+    from src.models.database_models import Base, Character, CharacterDB
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    written = {"bytes": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_bytes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE")):
+            written["bytes"] += len(str(parameters))
+
+    def make_character(name: str) -> str:
+        inventory = [{
+            "name": f"Item {i}", "quantity": 1, "weight": 1.5, "rarity": "uncommon",
+            "requires_attunement": i % 10 == 0, "description": "A well-worn piece of adventuring kit. " * 3,
+            "item_id": str(uuid.uuid4()), "added_at": datetime.utcnow().isoformat(),
+        } for i in range(items)]
+        character = Character(id=str(uuid.uuid4()), name=name, species="Dwarf", level=5,
+                              character_classes={"Fighter": 5}, equipment={"inventory": inventory})
+        session.add(character)
+        session.commit()
+        return character.id
+
+    # The old blob implementation, as it was in CharacterDB
+    def legacy_add(character_id: str, item: Dict[str, Any]) -> None:
+        character = CharacterDB.get_character(session, character_id)
+        character.equipment["inventory"].append(dict(item, item_id=str(uuid.uuid4())))
+        flag_modified(character, "equipment")
+        session.commit()
+        session.refresh(character)
+
+    def legacy_update(character_id: str, name: str, updates: Dict[str, Any]) -> None:
+        character = CharacterDB.get_character(session, character_id)
+        for entry in character.equipment["inventory"]:
+            if entry.get("name") == name:
+                entry.update(updates)
+                break
+        flag_modified(character, "equipment")
+        session.commit()
+        session.refresh(character)
+
+    def legacy_remove(character_id: str, name: str) -> None:
+        character = CharacterDB.get_character(session, character_id)
+        inventory = character.equipment["inventory"]
+        for i, entry in enumerate(inventory):
+            if entry.get("name") == name:
+                inventory.pop(i)
+                break
+        flag_modified(character, "equipment")
+        session.commit()
+        session.refresh(character)
+
+    legacy_id = make_character("Legacy Benchmark")
+    table_id = make_character("Table Benchmark")
+    migrated = migrate_character_equipment(session, session.get(Character, table_id))
+    session.commit()
+    last_name = f"Item {items - 1}"
+
+    cases = {
+        "add": (lambda: legacy_add(legacy_id, {"name": "Torch"}),
+                lambda: CharacterDB.add_inventory_item(session, table_id, {"name": "Torch"})),
+        "update_last": (lambda: legacy_update(legacy_id, last_name, {"quantity": 2}),
+                        lambda: CharacterDB.update_inventory_item(session, table_id, last_name, {"quantity": 2})),
+        "remove_added": (lambda: legacy_remove(legacy_id, "Torch"),
+                         lambda: CharacterDB.remove_inventory_item(session, table_id, "Torch")),
+    }
+    results: Dict[str, Any] = {"items": items, "operations": operations, "database": engine.dialect.name,
+                               "migrated_items": migrated}
+    for label, (legacy, normalised) in cases.items():
+        results[label] = {}
+        for variant, run in (("blob", legacy), ("table", normalised)):
+            written["bytes"] = 0
+            start = time.perf_counter()
+            for _ in range(operations):
+                run()
+            results[label][variant] = {
+                "ms_per_op": round((time.perf_counter() - start) * 1000 / operations, 3),
+                "bytes_written_per_op": written["bytes"] // operations,
+            }
+
+    start = time.perf_counter()
+    CharacterDB.add_attuned_item(session, table_id, "Item 0")
+    CharacterDB.remove_attuned_item(session, table_id, "Item 0")
+    results["attune_cycle_table_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    session.expire_all()
+    legacy_names = [entry["name"] for entry in session.get(Character, legacy_id).equipment["inventory"]]
+    results["consistent"] = legacy_names == [entry["name"] for entry in CharacterDB.get_inventory(session, table_id)]
+
+    event.remove(engine, "before_cursor_execute", _count_bytes)
+    for character_id in (legacy_id, table_id):
+        session.delete(session.get(Character, character_id))
+    session.commit()
+    session.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark normalised inventory against the equipment blob")
+    parser.add_argument("--items", type=int, default=300)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--operations", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.items, args.database_url, args.operations), indent=2))
@@ -0,0 +1,149 @@
+"""
+Benchmark of compressed JSON and text columns (src/models/compressed_json.py).
+
+Stored size and read/write latency of generated characters, backstories and
+items in plain JSON/Text columns against CompressedJSON/CompressedText, with
+and without a trained dictionary.
+
+Usage (in-memory SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.compressed_json --rows 2000
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import Column, Integer, MetaData, Table, literal_column, select
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from src.models.compressed_json import CompressedJSON, CompressedText, dictionary_table, train_dictionary
+
+
+def _benchmark_samples(rows: int) -> Dict[str, List[Any]]:
+    """Generated values shaped like each column family, built from the D&D 5e data."""
+    import random
+    from src.services.dnd_data import (
+        DND_SPELL_DATABASE, DND_WEAPON_DATABASE, DND_FEAT_DATABASE, DND_ADVENTURING_GEAR_DATABASE
+    )
+
+    rng = random.Random(7)
+    spells = [name for schools in DND_SPELL_DATABASE.values() for names in schools.values() for name in names]
+    weapons = [(name, data) for category in DND_WEAPON_DATABASE.values() for name, data in category.items()]
+    gear = [(name, data) for category in DND_ADVENTURING_GEAR_DATABASE.values() for name, data in category.items()]
+    feats = [(name, data) for category in DND_FEAT_DATABASE.values() if isinstance(category, dict)
+             for name, data in category.items() if isinstance(data, dict)]
+    sentences = [
+        "Raised in the shadow of the {place}, {name} learned early that {lesson}.",
+        "After the fall of {place}, {name} swore an oath to {goal}.",
+        "{name} still carries a {item} taken from {place}, a reminder that {lesson}.",
+        "A mentor at {place} taught {name} to {goal}, though the lessons came at a price.",
+        "Rumours in {place} say {name} once bargained with a fey noble to {goal}.",
+    ]
+    words = {
+        "place": ["Saltmarsh", "the Sword Coast", "Neverwinter", "the Underdark", "Baldur's Gate", "Waterdeep"],
+        "lesson": ["trust is earned", "knowledge is power", "every debt is repaid", "the gods are silent"],
+        "goal": ["protect the innocent", "recover a lost tome", "avenge a fallen sibling", "map the ruins"],
+        "item": ["silver locket", "cracked holy symbol", "weathered map", "rune-etched dagger"],
+    }
+    samples: Dict[str, List[Any]] = {"character_data": [], "backstory": [], "item_content": []}
+    for i in range(rows):
+        name = f"Hero {i}"
+        backstory = " ".join(
+            rng.choice(sentences).format(name=name, **{k: rng.choice(v) for k, v in words.items()})
+            for _ in range(rng.randint(6, 18))
+        )
+        samples["backstory"].append(backstory)
+        samples["character_data"].append({
+            "core": {
+                "name": name, "species": rng.choice(["Elf", "Dwarf", "Human", "Tiefling", "Halfling"]),
+                "level": rng.randint(1, 20), "classes": {rng.choice(["Wizard", "Fighter", "Cleric", "Rogue"]): 5},
+                "ability_scores": {a: rng.randint(8, 18) for a in
+                                   ("strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma")},
+                "skill_proficiencies": {f"skill_{k}": "proficient" for k in rng.sample(range(18), 5)},
+                "feats": [{"name": n, **{k: v for k, v in d.items() if isinstance(v, (str, int, list))}}
+                          for n, d in rng.sample(feats, min(3, len(feats)))],
+                "backstory": backstory,
+            },
+            "state": {
+                "hit_points": rng.randint(10, 150), "conditions": [],
+                "weapons": [{"name": n, **d} for n, d in rng.sample(weapons, 3)],
+                "equipment": {n: {"quantity": rng.randint(1, 5), **d} for n, d in rng.sample(gear, 12)},
+                "spells_known": rng.sample(spells, 15),
+            },
+        })
+        weapon_name, weapon = rng.choice(weapons)
+        samples["item_content"].append({**weapon, "name": f"{weapon_name} +{rng.randint(1, 3)}",
+                                        "description": backstory[:rng.randint(80, 400)]})
+    return samples
+
+
+def benchmark(rows: int = 2000, database_url: str = "sqlite://", dictionary: bool = True) -> Dict[str, Any]:
+    """
+    Stored size and read/write latency per column family: JSON/Text columns
+    against CompressedJSON/CompressedText, with and without a trained dictionary.
+    """
+    from sqlalchemy import JSON, Text, create_engine, func
+
+    engine = create_engine(database_url)
+    samples = _benchmark_samples(rows)
+    results: Dict[str, Any] = {"rows": rows, "database": engine.dialect.name, "zstd": zstandard is not None,
+                               "families": {}}
+
+    for family, values in samples.items():
+        as_text = family == "backstory"
+        variants = [("plain", Text() if as_text else JSON())]
+        variants.append(("compressed", (CompressedText if as_text else CompressedJSON)(family=f"bench_{family}")))
+        family_results = {}
+        for label, column_type in variants + ([("compressed_dict", None)] if dictionary and zstandard else []):
+            if label == "compressed_dict":
+                # Train on a tenth of the values, as on a live table
+                train_dictionary(engine, f"bench_{family}", values[: max(10, rows // 10)], as_text=as_text)
+                column_type = variants[1][1]
+            metadata = MetaData()
+            table = Table(f"compression_benchmark_{family}", metadata,
+                          Column("id", Integer, primary_key=True), Column("value", column_type))
+            metadata.drop_all(bind=engine)
+            metadata.create_all(bind=engine)
+
+            start = time.perf_counter()
+            with engine.begin() as connection:
+                for i, value in enumerate(values):
+                    connection.execute(table.insert(), {"id": i, "value": value})
+            write_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            with engine.connect() as connection:
+                for i in range(len(values)):
+                    connection.execute(select(table.c.value).where(table.c.id == i)).scalar()
+            read_ms = (time.perf_counter() - start) * 1000
+
+            with engine.connect() as connection:
+                stored_bytes = connection.execute(
+                    select(func.sum(func.length(literal_column("value")))).select_from(table)
+                ).scalar()
+            family_results[label] = {
+                "stored_bytes": int(stored_bytes or 0), "write_ms_per_row": round(write_ms / rows, 4),
+                "read_ms_per_row": round(read_ms / rows, 4),
+            }
+            metadata.drop_all(bind=engine)
+        plain_bytes = family_results["plain"]["stored_bytes"]
+        for label, measured in family_results.items():
+            measured["ratio"] = round(measured["stored_bytes"] / plain_bytes, 3) if plain_bytes else 1.0
+        results["families"][family] = family_results
+
+    with engine.begin() as connection:
+        connection.execute(dictionary_table.delete().where(dictionary_table.c.family.like("bench_%")))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark compressed JSON/Text columns")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--no-dictionary", action="store_true")
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.rows, args.database_url, not args.no_dictionary), indent=2))
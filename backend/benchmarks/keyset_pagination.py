@@ -0,0 +1,88 @@
+"""
+Benchmark of OFFSET against keyset pagination (src/services/keyset_pagination.py).
+
+Fetches page N of a scratch table indexed like the list tables, at increasing
+depths, with OFFSET and by seeking past the previous page's (created_at, id).
+
+Usage (in-memory SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.keyset_pagination --rows 100000
+"""
+
+import argparse
+import json
+from datetime import datetime
+from typing import Any, Dict, Sequence
+
+from sqlalchemy import Index, text, tuple_
+
+
+def benchmark(rows: int = 100000, database_url: str = "sqlite://", page_size: int = 100,
+              depths: Sequence[int] = (0, 100, 500, 999), repeats: int = 10) -> Dict[str, Any]:
+    """
+    Time fetching page N with OFFSET against seeking to it with a cursor, on a
+    scratch table indexed like the list tables.
+    """
+    import time
+    import uuid
+    from datetime import timedelta
+    from sqlalchemy import Column, DateTime, MetaData, String, Table, create_engine, select
+
+    engine = create_engine(database_url)
+    metadata = MetaData()
+    table = Table(
+        "keyset_benchmark", metadata,
+        Column("id", String(36), primary_key=True),
+        Column("name", String(100)),
+        Column("created_at", DateTime),
+        Index("ix_keyset_benchmark_created_id", "created_at", "id"),
+    )
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    start_time = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        for start in range(0, rows, 10000):
+            connection.execute(table.insert(), [
+                # Coarse timestamps so many rows tie on created_at and the id tiebreak matters
+                {"id": str(uuid.uuid4()), "name": f"Row {i}", "created_at": start_time + timedelta(seconds=i // 10)}
+                for i in range(start, min(start + 10000, rows))
+            ])
+        if engine.dialect.name == "sqlite":
+            connection.execute(text("ANALYZE"))
+
+    ordered = select(table.c.id, table.c.name, table.c.created_at).order_by(table.c.created_at, table.c.id)
+    results: Dict[str, Any] = {"rows": rows, "page_size": page_size, "database": engine.dialect.name, "pages": {}}
+    with engine.connect() as connection:
+        for depth in depths:
+            if depth * page_size >= rows:
+                continue
+            begin = time.perf_counter()
+            for _ in range(repeats):
+                by_offset = connection.execute(ordered.offset(depth * page_size).limit(page_size)).all()
+            offset_ms = (time.perf_counter() - begin) * 1000 / repeats
+
+            previous = connection.execute(ordered.offset(depth * page_size - 1).limit(1)).first() if depth else None
+            query = ordered
+            if previous:
+                query = query.where(tuple_(table.c.created_at, table.c.id) > tuple_(previous.created_at, previous.id))
+            begin = time.perf_counter()
+            for _ in range(repeats):
+                by_cursor = connection.execute(query.limit(page_size)).all()
+            cursor_ms = (time.perf_counter() - begin) * 1000 / repeats
+
+            results["pages"][depth] = {
+                "offset_ms": round(offset_ms, 2), "cursor_ms": round(cursor_ms, 2),
+                "same_rows": [r.id for r in by_offset] == [r.id for r in by_cursor],
+            }
+    metadata.drop_all(engine)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OFFSET against keyset pagination")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.rows, args.database_url, args.page_size,
+                               depths=(0, 100, 500, args.rows // args.page_size - 1), repeats=args.repeats), indent=2))
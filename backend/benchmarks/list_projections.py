@@ -0,0 +1,98 @@
+"""
+Benchmark of list pages (src/services/list_projections.py).
+
+Time and memory for one page of characters: full ORM rows, as the list
+endpoints used to load them, against the summary projection.
+
+Usage (500-row pages, in-memory SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.list_projections --rows 500
+"""
+
+import argparse
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List
+
+from src.services.list_projections import LIST_PROJECTIONS
+
+
+def benchmark(rows: int = 500, database_url: str = "sqlite://", repeats: int = 20) -> Dict[str, Any]:
+    """
+    Time and trace memory for one page of characters: full ORM rows (the old
+    list path) against the summary projection.
+    """
+    import time
+    import tracemalloc
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.models.database_models import Base, Character
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    player = "list-projection-benchmark"
+
+    def clear() -> None:
+        session.query(Character).filter(Character.player_name == player).delete(synchronize_session=False)
+        session.commit()
+
+    clear()
+    # Blob sizes typical of a mid-level generated character
+    equipment = {f"Item {i}": {"quantity": 1, "weight": 2.0, "description": "x" * 120} for i in range(40)}
+    features = {f"Feature {i}": "y" * 300 for i in range(25)}
+    spells = {f"level_{level}": [f"Spell {level}-{i}" for i in range(8)] for level in range(10)}
+    skills = {f"skill_{i}": "proficient" for i in range(18)}
+    session.execute(Character.__table__.insert(), [{
+        "id": str(uuid.uuid4()), "name": f"Benchmark Hero {i}", "player_name": player, "species": "Elf",
+        "background": "Sage", "level": 10, "character_classes": {"Wizard": 10},
+        "equipment": equipment, "features": features, "spells": spells, "skills": skills,
+        "backstory": "z" * 4000, "created_at": datetime.utcnow(), "is_active": True,
+    } for i in range(rows)])
+    session.commit()
+
+    def full_rows() -> List[Dict[str, Any]]:
+        characters = session.query(Character).filter(
+            Character.player_name == player, Character.is_active == True
+        ).limit(rows).all()
+        page = [{"id": c.id, "name": c.name, "species": c.species, "background": c.background,
+                 "level": c.level, "character_classes": c.character_classes,
+                 "created_at": c.created_at.isoformat()} for c in characters]
+        session.expunge_all()
+        return page
+
+    projection = LIST_PROJECTIONS["characters"]
+    summary_fields = projection.resolve_fields(None)
+
+    def summary_rows() -> List[Dict[str, Any]]:
+        query = projection.query(session, summary_fields).filter(
+            Character.player_name == player, Character.is_active == True
+        )
+        return projection.rows(query.limit(rows))
+
+    results: Dict[str, Any] = {"rows": rows, "database": engine.dialect.name, "repeats": repeats}
+    for label, run in (("full_orm", full_rows), ("summary_projection", summary_rows)):
+        run()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            run()
+        elapsed_ms = (time.perf_counter() - start) * 1000 / repeats
+        tracemalloc.start()
+        page = run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[label] = {"ms_per_page": round(elapsed_ms, 2), "peak_kb": round(peak / 1024, 1),
+                          "rows_returned": len(page)}
+
+    clear()
+    session.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint projections")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.rows, args.database_url, args.repeats), indent=2))
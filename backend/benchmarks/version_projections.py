@@ -0,0 +1,100 @@
+"""
+Benchmark of versioning reads (src/services/version_projections.py).
+
+Builds a repository with large snapshots and compares the old full tree (every
+commit through to_dict()) with the metadata tree, a 50-generation depth page
+and an ETag check: milliseconds and JSON bytes per request.
+
+Usage (300 commits of ~20 KB snapshots, in-memory SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.version_projections --commits 300
+"""
+
+import argparse
+import json
+from typing import Any, Dict
+
+from src.services.version_projections import repository_etag
+
+
+def benchmark(commits: int = 300, database_url: str = "sqlite://", repeats: int = 5) -> Dict[str, Any]:
+    """
+    Build a repository with large snapshots and compare the old full tree
+    (every commit through to_dict()) with the metadata tree, a 50-generation
+    depth page, and an ETag check: milliseconds and JSON bytes per request.
+    """
+    import random
+    import time
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.models.database_models import (
+        Base, CharacterBranch, CharacterCommit, CharacterRepository, CharacterRepositoryManager, CharacterTag
+    )
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    rng = random.Random(3)
+
+    def snapshot(level: int) -> Dict[str, Any]:
+        return {
+            "name": "Benchmark Hero", "level": level, "character_classes": {"Wizard": level},
+            "equipment": {f"Item {i}": {"weight": rng.random(), "notes": "x" * 80} for i in range(60)},
+            "spells": {f"level_{n}": [f"Spell {n}-{i}" for i in range(10)] for n in range(10)},
+            "backstory": " ".join(f"word{rng.randint(0, 500)}" for _ in range(1500)),
+        }
+
+    repo = CharacterRepositoryManager.create_repository(session, "Benchmark Hero",
+                                                        initial_character_data=snapshot(1))
+    for i in range(1, commits):
+        branch = "main"
+        if i == commits // 2:
+            CharacterRepositoryManager.create_branch(session, repo.id, "alternate")
+        if i > commits // 2 and i % 3 == 0:
+            branch = "alternate"
+        CharacterRepositoryManager.create_commit(session, repo.id, branch, f"Commit {i}",
+                                                 snapshot(1 + i // 20), 1 + i // 20)
+
+    def old_tree() -> Dict[str, Any]:
+        branches = session.query(CharacterBranch).filter(CharacterBranch.repository_id == repo.id).all()
+        all_commits = session.query(CharacterCommit).filter(
+            CharacterCommit.repository_id == repo.id
+        ).order_by(CharacterCommit.created_at.desc()).all()
+        tags = session.query(CharacterTag).filter(CharacterTag.repository_id == repo.id).all()
+        return {
+            "repository": session.get(CharacterRepository, repo.id).to_dict(),
+            "branches": [branch.to_dict() for branch in branches],
+            "commits": [commit.to_dict() for commit in all_commits],
+            "tags": [tag.to_dict() for tag in tags],
+        }
+
+    cases = {
+        "full_tree_with_snapshots": old_tree,
+        "metadata_tree": lambda: CharacterRepositoryManager.get_repository_tree(session, repo.id),
+        "metadata_tree_page_50": lambda: CharacterRepositoryManager.get_repository_tree(session, repo.id, depth_limit=50),
+        "etag_only": lambda: repository_etag(session, repo.id, "tree"),
+    }
+    results: Dict[str, Any] = {"commits": commits, "database": engine.dialect.name, "repeats": repeats}
+    for label, run in cases.items():
+        body = json.dumps(run(), default=str)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            json.dumps(run(), default=str)
+            session.expunge_all()
+        results[label] = {"ms_per_request": round((time.perf_counter() - start) * 1000 / repeats, 2),
+                          "response_kb": round(len(body) / 1024, 1)}
+
+    session.query(CharacterCommit).filter(CharacterCommit.repository_id == repo.id).delete()
+    session.query(CharacterBranch).filter(CharacterBranch.repository_id == repo.id).delete()
+    session.query(CharacterRepository).filter(CharacterRepository.id == repo.id).delete()
+    session.commit()
+    session.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark versioning tree projections")
+    parser.add_argument("--commits", type=int, default=300)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.commits, args.database_url, args.repeats), indent=2))
@@ -57,6 +57,7 @@ class ItemSearchRequest(BaseModel):
     source_type: Optional[str] = Field(None, description="Source type (official, custom, llm_generated)")
     source_info: Optional[str] = Field(None, description="LLM or provenance info (optional)")
     name_filter: Optional[str] = Field(None, description="Filter by name (partial match)")
+    query: Optional[str] = Field(None, description="Full-text query over name, description and content (ranked, prefix and typo tolerant)")
     limit: int = Field(100, description="Maximum number of results", ge=1, le=500)
 
 class CreateCustomItemRequest(BaseModel):
@@ -122,6 +123,26 @@ async def search_catalog(
 ):
     """Search the unified item catalog with various filters."""
     try:
+        if request.query:
+            results = catalog.full_text_search(
+                request.query,
+                limit=request.limit,
+                item_type=request.item_type,
+                item_subtype=request.item_subtype,
+                spell_level=request.spell_level,
+                spell_school=request.spell_school,
+                source_type=request.source_type,
+                class_restrictions=request.class_restrictions
+            )
+            return {
+                "status": "success",
+                "data": {
+                    "results": results,
+                    "count": len(results),
+                    "filters_applied": request.dict(exclude_none=True)
+                }
+            }
+        
         items = catalog.search_items(
             item_type=request.item_type,
             item_subtype=request.item_subtype,
@@ -153,11 +174,30 @@ async def search_catalog_get(
     spell_school: Optional[str] = Query(None),
     source_type: Optional[str] = Query(None),
     name_filter: Optional[str] = Query(None),
+    q: Optional[str] = Query(None, description="Full-text query (ranked, with highlights)"),
     limit: int = Query(100, ge=1, le=500),
     catalog: UnifiedCatalogService = Depends(get_catalog_service)
 ):
     """Search the unified item catalog using GET parameters."""
     try:
+        if q:
+            results = catalog.full_text_search(
+                q,
+                limit=limit,
+                item_type=item_type,
+                item_subtype=item_subtype,
+                spell_level=spell_level,
+                spell_school=spell_school,
+                source_type=source_type
+            )
+            return {
+                "status": "success",
+                "data": {
+                    "results": results,
+                    "count": len(results)
+                }
+            }
+        
         items = catalog.search_items(
             item_type=item_type,
             item_subtype=item_subtype,
@@ -412,7 +452,7 @@ async def populate_catalog(catalog: UnifiedCatalogService = Depends(get_catalog_
     try:
         from src.services.unified_catalog_migration import run_migration
         
-        results = run_migration(catalog.db)
+        results = run_migration(None, catalog.session)
         
         return {
             "status": "success",
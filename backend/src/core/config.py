@@ -50,6 +50,72 @@ class Settings(BaseSettings):
     llm_max_retries: int = 3
     llm_temperature: float = 0.7
     
+    # Stage-aware model routing - each pipeline stage goes to a provider and model tier.
+    # Tiers are "provider:model" specs; an empty spec uses the default service above.
+    # Cheap structured stages run on a small local model, narrative stages on the large one.
+    # Off by default: enable (LLM_STAGE_ROUTING_ENABLED=true) where the small-tier provider runs.
+    llm_stage_routing_enabled: bool = False
+    llm_small_model: str = "ollama:llama3.2:3b"
+    llm_large_model: str = ""
+    llm_stage_tiers: str = (
+        "thematic_spells=small,theme_spell_logic=small,theme_weapon_logic=small,"
+        "npc_roleplay=small,chapter_hooks=small,json_fix=small,pool_personalize=small,"
+        "backstory=large,campaign_skeleton=large,chapter_narrative=large"
+    )
+    
+    @property
+    def llm_stage_tiers_map(self) -> dict[str, str]:
+        """Parse stage -> tier rules from comma-separated stage=tier pairs."""
+        pairs = (item.split("=", 1) for item in self.llm_stage_tiers.split(",") if "=" in item)
+        return {stage.strip(): tier.strip() for stage, tier in pairs}
+    
+    # Theme rule cache - themes compiled at startup so theme filtering never waits on the LLM
+    theme_rule_warm_themes: str = (
+        "traditional D&D,high fantasy,dark fantasy,gothic horror,steampunk,"
+        "nautical,desert,arctic,fey,celestial,infernal,undead"
+    )
+    
+    @property
+    def theme_rule_warm_themes_list(self) -> list[str]:
+        """Parse warm themes from comma-separated string."""
+        return [theme.strip() for theme in self.theme_rule_warm_themes.split(",") if theme.strip()]
+    
+    # Pre-generated content pools - "type:segment" pairs (NPC role or monster CR band) per theme
+    content_pool_enabled: bool = True
+    content_pool_segments: str = (
+        "npc:commoner,npc:guard,npc:merchant,npc:noble,npc:innkeeper,"
+        "monster:cr0-1,monster:cr2-4,monster:cr5-10"
+    )
+    content_pool_themes: str = "traditional D&D"
+    content_pool_target_size: int = 3
+    content_pool_low_watermark: int = 1
+    content_pool_personalize_with_llm: bool = True
+    
+    @property
+    def content_pool_segments_list(self) -> list[str]:
+        """Parse pool segments from comma-separated string."""
+        return [segment.strip() for segment in self.content_pool_segments.split(",") if segment.strip()]
+    
+    @property
+    def content_pool_themes_list(self) -> list[str]:
+        """Parse pool themes from comma-separated string."""
+        return [theme.strip() for theme in self.content_pool_themes.split(",") if theme.strip()]
+    
+    # Fast response mode - NPC/monster templates returned when the LLM misses this SLO
+    fast_mode_slo_seconds: float = 2.0
+    fast_mode_upgrade_ttl_seconds: int = 3600
+    
+    # Idempotency-Key ledger for factory create/evolve
+    idempotency_ttl_hours: int = 24  # how long completed responses are replayed
+    idempotency_lock_seconds: int = 900  # after this, an unfinished request may be retried
+    
+    # Upsert official D&D content into the unified catalog on startup (unchanged rows are skipped)
+    catalog_sync_on_startup: bool = True
+    
+    # Compress rows written before the compressed JSON/Text columns, in the background after startup
+    compression_backfill_on_startup: bool = True
+    compression_backfill_batch_size: int = 200
+    
     # Security Configuration - MUST be provided via environment variables
     secret_key: Optional[str] = None  # Must be set via SECRET_KEY environment variable
     access_token_expire_minutes: int = 30
@@ -0,0 +1,473 @@
+"""
+Transparent compression for large JSON and text columns.
+
+Character snapshots, chapter content, item/NPC content_data and backstories
+make up most of the database and its I/O. CompressedJSON is a drop-in
+replacement for the JSON column type (CompressedText for Text) that stores a
+one-byte header followed by the payload:
+
+- 0x00: raw UTF-8 JSON/text (values under the threshold, or incompressible)
+- 0x01: zstd frame; a trained dictionary is named by the frame's dictionary ID
+- 0x02: zlib, used when the zstandard package is not installed
+
+Values written before a column was switched (JSON text, Postgres json, raw
+bytes without a header) are still read, so the switch is safe with existing
+data. compress_existing_rows() rewrites those rows in small batches while the
+application keeps running.
+
+POSTGRES:
+A json/jsonb/text column has to become bytea first. Startup never alters
+tables; it refuses to start while a column is unconverted. The conversion is
+a deploy step, run before the new version starts:
+    cd backend && python -m src.models.compressed_json
+It copies values into a bytea shadow column in batches and swaps the column
+names, so the table is never rewritten under a lock.
+
+DICTIONARIES:
+Small values compress poorly on their own. A zstd dictionary trained on
+samples of one column family (character_data, chapter_content, ...) is stored
+in compression_dictionaries and used for new writes to columns of that
+family; older frames keep naming the dictionary they were written with.
+
+Benchmark (size and read/write latency on generated characters and items):
+    cd backend && python -m benchmarks.compressed_json --rows 2000
+
+Usage:
+    character_data = Column(CompressedJSON(family="character_data"), nullable=False)
+    load_dictionaries(engine)                                   # at startup
+    train_dictionary(engine, "character_data", samples)          # optional
+    migrate_compressed_columns(engine, Base.metadata)            # deploy step (Postgres)
+    compress_existing_rows(engine, Character.__table__, "backstory")
+"""
+
+import json
+import logging
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import (Column, DateTime, Integer, LargeBinary, MetaData, String, Table, bindparam, inspect,
+                        literal_column, select, text)
+from sqlalchemy.types import TypeDecorator
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+HEADER_RAW = 0x00
+HEADER_ZSTD = 0x01
+HEADER_ZLIB = 0x02
+
+DEFAULT_THRESHOLD = 256  # bytes of serialized value below which values are stored raw
+DEFAULT_LEVEL = 3
+
+_dictionary_metadata = MetaData()
+
+# Own metadata: shared by every backend that uses the type, created by load_dictionaries()
+dictionary_table = Table(
+    "compression_dictionaries", _dictionary_metadata,
+    Column("dict_id", Integer, primary_key=True, autoincrement=False),
+    Column("family", String(50), nullable=False, index=True),
+    Column("data", LargeBinary, nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+
+# ============================================================================
+# CODEC
+# ============================================================================
+
+class CompressionCodec:
+    """Compressors per column family plus every known dictionary, with size stats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest: Dict[str, int] = {}  # family -> newest dict_id
+        self._dictionaries: Dict[int, Any] = {}  # dict_id -> zstandard.ZstdCompressionDict
+        self._local = threading.local()  # zstd (de)compressor objects are not thread-safe
+        self.stats = {"values_written": 0, "values_compressed": 0, "raw_bytes": 0, "stored_bytes": 0,
+                      "legacy_reads": 0}
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def register(self, family: str, dict_id: int, data: bytes) -> None:
+        if zstandard is None:
+            return
+        dictionary = zstandard.ZstdCompressionDict(data)
+        dictionary.precompute_compress(level=DEFAULT_LEVEL)
+        with self._lock:
+            self._dictionaries[dict_id] = dictionary
+            if dict_id >= self._latest.get(family, -1):
+                self._latest[family] = dict_id
+
+    def _compressor(self, family: str, level: int):
+        dict_id = self._latest.get(family, 0)
+        cache = self._local.__dict__.setdefault("compressors", {})
+        key = (dict_id, level)
+        if key not in cache:
+            dictionary = self._dictionaries.get(dict_id)
+            cache[key] = zstandard.ZstdCompressor(level=level, dict_data=dictionary) if dictionary \
+                else zstandard.ZstdCompressor(level=level)
+        return cache[key]
+
+    def _decompressor(self, dict_id: int):
+        cache = self._local.__dict__.setdefault("decompressors", {})
+        if dict_id not in cache:
+            dictionary = self._dictionaries.get(dict_id)
+            if dict_id and dictionary is None:
+                raise ValueError(f"Compression dictionary {dict_id} is not loaded")
+            cache[dict_id] = zstandard.ZstdDecompressor(dict_data=dictionary) if dictionary \
+                else zstandard.ZstdDecompressor()
+        return cache[dict_id]
+
+    def encode(self, payload: bytes, family: str, threshold: int, level: int) -> bytes:
+        self._count("values_written")
+        self._count("raw_bytes", len(payload))
+        stored = bytes([HEADER_RAW]) + payload
+        if len(payload) >= threshold:
+            if zstandard is not None:
+                compressed = bytes([HEADER_ZSTD]) + self._compressor(family, level).compress(payload)
+            else:
+                compressed = bytes([HEADER_ZLIB]) + zlib.compress(payload, 6)
+            if len(compressed) < len(stored):
+                stored = compressed
+                self._count("values_compressed")
+        self._count("stored_bytes", len(stored))
+        return stored
+
+    def decode(self, stored: bytes) -> bytes:
+        header, body = stored[0], stored[1:]
+        if header == HEADER_RAW:
+            return body
+        if header == HEADER_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read zstd-compressed values")
+            dict_id = zstandard.get_frame_parameters(body).dict_id
+            return self._decompressor(dict_id).decompress(body)
+        if header == HEADER_ZLIB:
+            return zlib.decompress(body)
+        # Not written by this type: raw JSON/text from before the column was converted
+        self._count("legacy_reads")
+        return stored
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["dictionaries"] = dict(self._latest)
+        stats["zstd"] = zstandard is not None
+        stats["ratio"] = round(stats["stored_bytes"] / stats["raw_bytes"], 4) if stats["raw_bytes"] else 1.0
+        return stats
+
+
+codec = CompressionCodec()
+
+
+def is_encoded(value: Any) -> bool:
+    """Whether a stored column value was written by CompressedJSON/CompressedText."""
+    return isinstance(value, (bytes, memoryview)) and len(value) > 0 and bytes(value[:1])[0] in (
+        HEADER_RAW, HEADER_ZSTD, HEADER_ZLIB)
+
+
+# ============================================================================
+# COLUMN TYPES
+# ============================================================================
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON column stored compressed (zstd, optional per-family dictionary).
+    Values serialize to at least threshold bytes before compression is tried.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, family: str = "default", threshold: int = DEFAULT_THRESHOLD, level: int = DEFAULT_LEVEL):
+        super().__init__()
+        self.family = family
+        self.threshold = threshold
+        self.level = level
+
+    def _dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def _loads(self, payload: bytes) -> Any:
+        return json.loads(payload.decode("utf-8"))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return codec.encode(self._dumps(value), self.family, self.threshold, self.level)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            # Legacy JSON/Text column value (e.g. SQLite text written before the switch)
+            codec._count("legacy_reads")
+            return self._loads(value.encode("utf-8"))
+        if not isinstance(value, (bytes, memoryview)):
+            # Legacy Postgres json value, already parsed by the driver
+            codec._count("legacy_reads")
+            return value
+        return self._loads(codec.decode(bytes(value)))
+
+
+class CompressedText(CompressedJSON):
+    """Text column stored compressed; values are str."""
+    cache_ok = True
+
+    def _dumps(self, value: Any) -> bytes:
+        return str(value).encode("utf-8")
+
+    def _loads(self, payload: bytes) -> Any:
+        return payload.decode("utf-8")
+
+
+# ============================================================================
+# DICTIONARIES
+# ============================================================================
+
+def load_dictionaries(engine) -> int:
+    """Create the dictionary table if missing and register every stored dictionary."""
+    try:
+        _dictionary_metadata.create_all(bind=engine)
+        with engine.connect() as connection:
+            rows = connection.execute(select(dictionary_table)).all()
+    except Exception as e:
+        logger.warning(f"Could not load compression dictionaries: {e}")
+        return 0
+    for row in rows:
+        codec.register(row.family, row.dict_id, row.data)
+    return len(rows)
+
+
+def train_dictionary(engine, family: str, samples: Iterable[Any], size: int = 16384,
+                     as_text: bool = False) -> Optional[int]:
+    """
+    Train, store and register a zstd dictionary for a column family.
+
+    Args:
+        engine: Database holding compression_dictionaries
+        family: Column family the dictionary is for (CompressedJSON family)
+        samples: Representative values (JSON-able, or str with as_text)
+        size: Dictionary size in bytes
+
+    Returns:
+        The new dictionary ID, or None without zstandard or enough samples
+    """
+    if zstandard is None:
+        logger.warning("zstandard not installed; compression dictionaries are unavailable")
+        return None
+    encoded = [
+        (str(sample) if as_text else json.dumps(sample, separators=(",", ":"), ensure_ascii=False)).encode("utf-8")
+        for sample in samples
+    ]
+    if len(encoded) < 10:
+        return None
+    dictionary = zstandard.train_dictionary(size, encoded)
+    _dictionary_metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(dictionary_table.insert(), {
+            "dict_id": dictionary.dict_id(), "family": family, "data": dictionary.as_bytes(),
+            "created_at": datetime.utcnow(),
+        })
+    codec.register(family, dictionary.dict_id(), dictionary.as_bytes())
+    logger.info(f"Trained {len(dictionary.as_bytes())}-byte compression dictionary {dictionary.dict_id()} for {family}")
+    return dictionary.dict_id()
+
+
+# ============================================================================
+# ONLINE MIGRATION
+# ============================================================================
+
+def needs_binary_migration(engine, table: Table, column: str) -> bool:
+    """Postgres only: whether a compressed column still has its old json/jsonb/text type."""
+    if engine.dialect.name != "postgresql":
+        return False  # SQLite stores blobs in any column; other values are read as legacy text
+    current = next(c for c in inspect(engine).get_columns(table.name) if c["name"] == column)
+    return "BYTEA" not in str(current["type"]).upper()
+
+
+def migrate_column_to_binary(engine, table: Table, column: str, batch_size: int = 1000,
+                             pause_seconds: float = 0.0) -> Dict[str, int]:
+    """
+    Postgres: give a json/jsonb/text column the bytea type without rewriting
+    the table under a lock (ALTER COLUMN ... TYPE would).
+
+    1. Add a nullable bytea shadow column; a trigger keeps it in step with writes
+    2. Backfill the shadow with each value's UTF-8 text, one short transaction per batch
+    3. Swap the names in one short transaction. The old column stays behind,
+       nullable, as <column>_pre_compression; drop it once the release is settled
+    4. A NOT NULL column gets a NOT VALID check, validated without blocking writes
+
+    Safe to re-run after an interruption. compress_existing_rows() then
+    compresses the copied values online.
+    """
+    results = {"backfilled": 0}
+    if not needs_binary_migration(engine, table, column):
+        return results
+    name = table.name
+    shadow, legacy, trigger = f"{column}_compressed", f"{column}_pre_compression", f"{name}_{column}_to_bytea"
+    (pk,) = table.primary_key.columns
+    nullable = next(c for c in inspect(engine).get_columns(name) if c["name"] == column)["nullable"]
+    logger.info(f"Migrating {name}.{column} to bytea through {shadow}")
+    with engine.begin() as connection:
+        connection.execute(text(f'ALTER TABLE {name} ADD COLUMN IF NOT EXISTS "{shadow}" bytea'))
+        connection.execute(text(
+            f"CREATE OR REPLACE FUNCTION {trigger}() RETURNS trigger AS $$ BEGIN "
+            f'NEW."{shadow}" := convert_to(NEW."{column}"::text, \'UTF8\'); RETURN NEW; '
+            "END $$ LANGUAGE plpgsql"
+        ))
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger} ON {name}"))
+        connection.execute(text(
+            f'CREATE TRIGGER {trigger} BEFORE INSERT OR UPDATE OF "{column}" ON {name} '
+            f"FOR EACH ROW EXECUTE FUNCTION {trigger}()"
+        ))
+
+    backfill = text(
+        f'UPDATE {name} SET "{shadow}" = convert_to("{column}"::text, \'UTF8\') '
+        f'WHERE "{pk.name}" IN (SELECT "{pk.name}" FROM {name} '
+        f'WHERE "{shadow}" IS NULL AND "{column}" IS NOT NULL LIMIT :limit)'
+    )
+    while True:
+        with engine.begin() as connection:
+            updated = connection.execute(backfill, {"limit": batch_size}).rowcount
+        results["backfilled"] += updated
+        if not updated:
+            break
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger} ON {name}"))
+        connection.execute(text(f"DROP FUNCTION IF EXISTS {trigger}()"))
+        connection.execute(text(f'ALTER TABLE {name} RENAME COLUMN "{column}" TO "{legacy}"'))
+        connection.execute(text(f'ALTER TABLE {name} ALTER COLUMN "{legacy}" DROP NOT NULL'))
+        connection.execute(text(f'ALTER TABLE {name} RENAME COLUMN "{shadow}" TO "{column}"'))
+        if not nullable:
+            connection.execute(text(
+                f'ALTER TABLE {name} ADD CONSTRAINT {trigger}_not_null CHECK ("{column}" IS NOT NULL) NOT VALID'
+            ))
+    if not nullable:
+        with engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {name} VALIDATE CONSTRAINT {trigger}_not_null"))
+    logger.info(f"Migrated {name}.{column} to bytea ({results['backfilled']} rows); "
+                f"the old values remain in {name}.{legacy}")
+    return results
+
+
+def compress_existing_rows(engine, table: Table, column: str, batch_size: int = 200,
+                           pause_seconds: float = 0.0) -> Dict[str, int]:
+    """
+    Rewrite values stored before a column became CompressedJSON/CompressedText.
+
+    Walks the table in primary-key order, one short transaction per batch.
+    Each row is updated only if its value is unchanged since it was read, so
+    concurrent application writes are never overwritten.
+    """
+    column_type = table.c[column].type
+    if not isinstance(column_type, CompressedJSON):
+        raise ValueError(f"{table.name}.{column} is not a compressed column")
+    if needs_binary_migration(engine, table, column):
+        raise ValueError(f"{table.name}.{column} is not bytea yet; run migrate_compressed_columns() first")
+
+    (pk,) = table.primary_key.columns
+    stored = literal_column(f'"{column}"')  # the stored value, without the type's processing
+    raw = column_type.impl
+
+    def rewrite(old_type):
+        return table.update().where(pk == bindparam("key")).where(
+            stored == bindparam("old", type_=old_type)
+        ).values({column: bindparam("new", type_=raw)})
+
+    results = {"scanned": 0, "rewritten": 0, "skipped_concurrent": 0, "bytes_before": 0, "bytes_after": 0}
+    last_key = None
+    while True:
+        query = select(pk, stored).select_from(table).order_by(pk).limit(batch_size)
+        if last_key is not None:
+            query = query.where(pk > last_key)
+        with engine.begin() as connection:
+            rows = connection.execute(query).all()
+            if not rows:
+                break
+            last_key = rows[-1][0]
+            for key, value in rows:
+                results["scanned"] += 1
+                if value is None or is_encoded(value) or isinstance(value, (dict, list)):
+                    continue
+                old = value if isinstance(value, str) else bytes(value)
+                new = column_type.process_bind_param(column_type.process_result_value(old, engine.dialect),
+                                                     engine.dialect)
+                outcome = connection.execute(
+                    rewrite(String() if isinstance(old, str) else raw), {"key": key, "old": old, "new": new}
+                )
+                if outcome.rowcount:
+                    results["rewritten"] += 1
+                    results["bytes_before"] += len(old.encode("utf-8") if isinstance(old, str) else old)
+                    results["bytes_after"] += len(new)
+                else:
+                    results["skipped_concurrent"] += 1
+        if pause_seconds:
+            time.sleep(pause_seconds)
+    logger.info(f"Compressed {table.name}.{column}: {results}")
+    return results
+
+
+def compressed_columns(metadata: MetaData) -> List[tuple]:
+    """(table, column name) for every CompressedJSON/CompressedText column in the metadata."""
+    return [(table, column.name) for table in metadata.sorted_tables for column in table.columns
+            if isinstance(column.type, CompressedJSON)]
+
+
+def prepare_compressed_columns(engine, metadata: MetaData) -> None:
+    """
+    Startup: load dictionaries and check that compressed columns are binary.
+
+    Never alters a table; Postgres columns are migrated by an explicit deploy
+    step (migrate_compressed_columns, see the __main__ block).
+
+    Raises:
+        RuntimeError: if a Postgres column still has its pre-compression type
+    """
+    load_dictionaries(engine)
+    pending = [f"{table.name}.{column}" for table, column in compressed_columns(metadata)
+               if needs_binary_migration(engine, table, column)]
+    if pending:
+        raise RuntimeError(f"Compressed columns {pending} are not bytea yet; "
+                           "run `python -m src.models.compressed_json` before starting this version")
+
+
+def migrate_compressed_columns(engine, metadata: MetaData, **kwargs) -> Dict[str, Dict[str, int]]:
+    """migrate_column_to_binary() for every compressed column that still needs it (Postgres)."""
+    return {f"{table.name}.{column}": migrate_column_to_binary(engine, table, column, **kwargs)
+            for table, column in compressed_columns(metadata)
+            if needs_binary_migration(engine, table, column)}
+
+
+def compress_all_existing_rows(engine, metadata: MetaData, **kwargs) -> Dict[str, Dict[str, int]]:
+    """compress_existing_rows() for every compressed column; failures are logged and skipped."""
+    results = {}
+    for table, column in compressed_columns(metadata):
+        try:
+            results[f"{table.name}.{column}"] = compress_existing_rows(engine, table, column, **kwargs)
+        except Exception as e:
+            logger.warning(f"Compression backfill of {table.name}.{column} failed: {e}")
+    return results
+
+
+if __name__ == "__main__":
+    # Deploy step for PostgreSQL, run before starting a version with new compressed columns:
+    #     cd backend && python -m src.models.compressed_json
+    from sqlalchemy import create_engine
+    from src.core.config import settings
+    from src.models.compressed_json import migrate_compressed_columns as migrate
+    from src.models.database_models import Base
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"Migration results: {migrate(create_engine(settings.effective_database_url), Base.metadata)}")
@@ -1,7 +1,7 @@
 """
 Database models and operations for D&D Character Creator.
 """
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, Text, JSON, ForeignKey, func, create_engine
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, Text, JSON, ForeignKey, func, create_engine, UniqueConstraint, Index, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
 from datetime import datetime
@@ -24,6 +24,8 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, Session, sessionmaker
 from sqlalchemy.orm.attributes import flag_modified
 
+from src.models.compressed_json import CompressedJSON, CompressedText
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -98,7 +100,12 @@ class CharacterRepository(Base):
     branches = relationship("CharacterBranch", back_populates="repository", cascade="all, delete-orphan")
     commits = relationship("CharacterCommit", back_populates="repository", cascade="all, delete-orphan")
     
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, branch_count: Optional[int] = None, commit_count: Optional[int] = None) -> Dict[str, Any]:
+        """Repository fields; pass the counts when known to avoid loading every branch and commit."""
+        if branch_count is None:
+            branch_count = len(self.branches) if self.branches else 0
+        if commit_count is None:
+            commit_count = len(self.commits) if self.commits else 0
         return {
             "id": self.id,
             "repository_id": self.repository_id,
@@ -111,8 +118,8 @@ class CharacterRepository(Base):
             "default_branch": self.default_branch,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "branch_count": len(self.branches) if self.branches else 0,
-            "commit_count": len(self.commits) if self.commits else 0
+            "branch_count": branch_count,
+            "commit_count": commit_count
         }
 
 
@@ -149,7 +156,10 @@ class CharacterBranch(Base):
     repository = relationship("CharacterRepository", back_populates="branches")
     commits = relationship("CharacterCommit", back_populates="branch", cascade="all, delete-orphan")
     
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, commit_count: Optional[int] = None) -> Dict[str, Any]:
+        """Branch fields; pass commit_count when known to avoid loading every commit."""
+        if commit_count is None:
+            commit_count = len(self.commits) if self.commits else 0
         return {
             "id": self.id,
             "repository_id": self.repository_id,
@@ -164,7 +174,7 @@ class CharacterBranch(Base):
             "merged_into": self.merged_into,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "commit_count": len(self.commits) if self.commits else 0
+            "commit_count": commit_count
         }
 
 
@@ -174,6 +184,8 @@ class CharacterCommit(Base):
     Each level-up, major change, or story development creates a new commit.
     """
     __tablename__ = "character_commits"
+    # Tree pages by commit depth
+    __table_args__ = (Index("ix_character_commits_repository_depth", "repository_id", "depth"),)
     
     id = Column(String(36), primary_key=True, index=True)
     repository_id = Column(String(36), ForeignKey("character_repositories.id"), nullable=False)
@@ -195,9 +207,10 @@ class CharacterCommit(Base):
     # Git-like relationship tracking
     parent_commit_hash = Column(String(64), nullable=True)  # Previous commit (null for initial)
     merge_parent_hash = Column(String(64), nullable=True)  # If this is a merge commit
+    depth = Column(Integer, nullable=True)  # Generation from the initial commit (0); see services/version_projections.py
     
     # Character data snapshot (complete character state at this point)
-    character_data = Column(JSON, nullable=False)  # Full CharacterCore + CharacterState data
+    character_data = Column(CompressedJSON(family="character_data"), nullable=False)  # Full CharacterCore + CharacterState data
     
     # Change tracking
     changes_summary = Column(JSON, nullable=True)  # What changed from parent commit
@@ -236,6 +249,7 @@ class CharacterCommit(Base):
             "milestone_name": self.milestone_name,
             "parent_commit_hash": self.parent_commit_hash,
             "merge_parent_hash": self.merge_parent_hash,
+            "depth": self.depth,
             "character_data": self.character_data,
             "changes_summary": self.changes_summary,
             "files_changed": self.files_changed,
@@ -293,6 +307,8 @@ class Character(Base):
     Also supports the CharacterRepository versioning system.
     """
     __tablename__ = "characters"
+    # Keyset pagination of the active character list
+    __table_args__ = (Index("ix_characters_active_created_id", "is_active", "created_at", "id"),)
     
     id = Column(String(36), primary_key=True, index=True)
     
@@ -338,7 +354,7 @@ class Character(Base):
     is_active = Column(Boolean, default=True)
     
     # Additional character data
-    backstory = Column(Text, nullable=True)
+    backstory = Column(CompressedText(family="backstory"), nullable=True)
     notes = Column(Text, nullable=True)
     
     # Approval state: 'pending', 'approved', 'rejected'
@@ -367,7 +383,7 @@ class Character(Base):
             "armor_class": self.armor_class,
             "hit_points": self.hit_points,
             "proficiency_bonus": self.proficiency_bonus,
-            "equipment": self.equipment,
+            "equipment": self.equipment_with_inventory(),
             "features": self.features,
             "spells": self.spells,
             "skills": self.skills,
@@ -378,8 +394,52 @@ class Character(Base):
             "is_active": self.is_active
         }
     
+    def equipment_with_inventory(self) -> Dict[str, Any]:
+        """
+        Character.equipment in its legacy shape, with the "inventory",
+        "attuned_items" and "equipped_items" keys rebuilt from their tables.
+        """
+        from src.services.character_inventory import legacy_equipment
+        return legacy_equipment(self.equipment, self.inventory_items, self.equipped_slots)
+    
     # Relationships
     item_access = relationship("CharacterItemAccess", back_populates="character", cascade="all, delete-orphan")
+    inventory_items = relationship("CharacterInventoryItem", cascade="all, delete-orphan",
+                                   order_by="CharacterInventoryItem.position")
+    equipped_slots = relationship("CharacterEquippedSlot", cascade="all, delete-orphan")
+
+
+class CharacterInventoryItem(Base):
+    """
+    One row per inventory entry, replacing the "inventory" list (and the
+    "attuned_items" names) in Character.equipment so adding, updating or
+    removing an item writes one row instead of the whole blob; see
+    services/character_inventory.py.
+    """
+    __tablename__ = "character_inventory_items"
+    __table_args__ = (
+        Index("ix_character_inventory_character_position", "character_id", "position"),
+        Index("ix_character_inventory_character_name", "character_id", "name"),
+    )
+    
+    item_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    character_id = Column(String(36), ForeignKey("characters.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(200), nullable=False)
+    position = Column(Integer, nullable=False)  # Inventory order
+    data = Column(JSON, nullable=False)  # The item as stored in the old list, including name and item_id
+    requires_attunement = Column(Boolean, default=False)
+    attuned_at = Column(DateTime, nullable=True)  # Set while attuned
+    added_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class CharacterEquippedSlot(Base):
+    """Item name equipped in each slot, replacing "equipped_items" in Character.equipment."""
+    __tablename__ = "character_equipped_slots"
+    
+    character_id = Column(String(36), ForeignKey("characters.id", ondelete="CASCADE"), primary_key=True)
+    slot = Column(String(50), primary_key=True)
+    item_name = Column(String(200), nullable=False)
 
 
 class CharacterSession(Base):
@@ -404,13 +464,15 @@ class CharacterSession(Base):
 class CustomContent(Base):
     """Database model for user-created custom content."""
     __tablename__ = "custom_content"
+    # Keyset pagination of the per-type lists (/npcs, /monsters)
+    __table_args__ = (Index("ix_custom_content_type_created_id", "content_type", "created_at", "id"),)
     
     id = Column(String(36), primary_key=True, index=True)
     name = Column(String(100), nullable=False, index=True)
     content_type = Column(String(50), nullable=False)  # "species", "class", "spell", etc.
     
     # Content data
-    content_data = Column(JSON, nullable=False)
+    content_data = Column(CompressedJSON(family="custom_content"), nullable=False)
     description = Column(Text, nullable=True)
     
     # Metadata
@@ -454,6 +516,11 @@ class UnifiedItem(Base):
     Every item gets a UUID for consistent tracking and relationships.
     """
     __tablename__ = "unified_items"
+    # Keyset pagination of /items; covering index for the catalog stats GROUP BY
+    __table_args__ = (
+        Index("ix_unified_items_created_id", "created_at", "id"),
+        Index("ix_unified_items_stats", "is_active", "source_type", "item_type", "rarity", "spell_level"),
+    )
     
     # Primary identification
     id = Column(GUID(), primary_key=True, default=uuid.uuid4, index=True)
@@ -465,7 +532,7 @@ class UnifiedItem(Base):
     llm_metadata = Column(JSON, nullable=True)  # LLM-specific metadata (model, prompt, etc.)
     
     # Content and properties
-    content_data = Column(JSON, nullable=False)  # All item properties, stats, descriptions
+    content_data = Column(CompressedJSON(family="item_content"), nullable=False)  # All item properties, stats, descriptions
     short_description = Column(String(500), nullable=True)  # Brief description for catalog views
     
     # D&D 5e specific metadata
@@ -486,6 +553,7 @@ class UnifiedItem(Base):
     is_active = Column(Boolean, default=True)
     is_public = Column(Boolean, default=True)  # Most official items are public
     version = Column(Integer, default=1)  # For tracking updates to items
+    content_hash = Column(String(64), nullable=True)  # Official items: SHA-256 of the migrated columns
     
     # Source attribution
     source_book = Column(String(100), nullable=True)  # 'Player\'s Handbook 2024', 'Custom Creation', etc.
@@ -519,6 +587,85 @@ class UnifiedItem(Base):
         }
 
 
+@event.listens_for(UnifiedItem, "after_insert")
+@event.listens_for(UnifiedItem, "after_update")
+def _index_unified_item(mapper, connection, target):
+    """Keep the full-text catalog index (services/catalog_search.py) in step with item writes."""
+    from src.services.catalog_search import index_item
+    index_item(connection, target)
+
+
+@event.listens_for(UnifiedItem, "after_delete")
+def _unindex_unified_item(mapper, connection, target):
+    from src.services.catalog_search import remove_item
+    remove_item(connection, target)
+
+
+class UnifiedItemClass(Base):
+    """
+    One row per (class, item) for items with class restrictions, mirroring
+    UnifiedItem.class_restrictions so class filters are primary-key lookups
+    instead of JSON scans; see services/catalog_class_index.py.
+    """
+    __tablename__ = "unified_item_classes"
+    
+    class_name = Column(String(50), primary_key=True)  # lowercased, e.g. 'wizard'
+    item_id = Column(GUID(), ForeignKey("unified_items.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+@event.listens_for(UnifiedItem, "after_insert")
+def _insert_item_classes(mapper, connection, target):
+    from src.services.catalog_class_index import sync_item_classes
+    sync_item_classes(connection, target, replace=False)
+
+
+@event.listens_for(UnifiedItem, "after_update")
+def _update_item_classes(mapper, connection, target):
+    from sqlalchemy import inspect
+    from src.services.catalog_class_index import sync_item_classes
+    if inspect(target).attrs.class_restrictions.history.has_changes():
+        sync_item_classes(connection, target)
+
+
+@event.listens_for(UnifiedItem, "before_delete")
+def _delete_item_classes(mapper, connection, target):
+    from src.services.catalog_class_index import remove_item_classes
+    remove_item_classes(connection, target)
+
+
+class UnifiedItemCounter(Base):
+    """
+    Active item count per (source_type, item_type, rarity, spell_level),
+    maintained alongside unified_items so catalog stats need no table scan;
+    see services/catalog_counters.py.
+    """
+    __tablename__ = "unified_item_counters"
+    
+    source_type = Column(String(20), primary_key=True)
+    item_type = Column(String(50), primary_key=True)
+    rarity = Column(String(20), primary_key=True, default="")  # '' for items without a rarity
+    spell_level = Column(Integer, primary_key=True, default=-1)  # -1 for non-spells
+    item_count = Column(Integer, nullable=False, default=0)
+
+
+@event.listens_for(UnifiedItem, "after_insert")
+def _count_inserted_item(mapper, connection, target):
+    from src.services.catalog_counters import item_inserted
+    item_inserted(connection, target)
+
+
+@event.listens_for(UnifiedItem, "before_update")
+def _count_updated_item(mapper, connection, target):
+    from src.services.catalog_counters import item_updating
+    item_updating(connection, target)
+
+
+@event.listens_for(UnifiedItem, "before_delete")
+def _count_deleted_item(mapper, connection, target):
+    from src.services.catalog_counters import item_deleted
+    item_deleted(connection, target)
+
+
 class CharacterItemAccess(Base):
     """
     Junction table tracking which items a character has access to (spells known, equipment owned, etc.).
@@ -1023,6 +1170,48 @@ class CharacterEquipmentAccess(Base):
             "updated_at": self.updated_at.isoformat() if self.updated_at else None
         }
 
+class ThemeRule(Base):
+    """
+    Compiled spell/weapon theme logic, one row per (kind, theme, version).
+    themed_names indexes the logic against the D&D 5e catalog so theme filtering
+    needs no LLM call; see services/theme_rules.py.
+    """
+    __tablename__ = "theme_rules"
+    __table_args__ = (UniqueConstraint("kind", "theme", "version", name="uq_theme_rules_kind_theme_version"),)
+    
+    id = Column(String(36), primary_key=True, index=True)
+    kind = Column(String(20), nullable=False)  # "spell" or "weapon"
+    theme = Column(String(100), nullable=False, index=True)  # normalized theme string
+    version = Column(Integer, nullable=False, index=True)
+    
+    logic = Column(JSON, nullable=False)  # keywords, schools/types, avoid, description
+    themed_names = Column(JSON, nullable=False, default=list)  # catalog entries the logic selects
+    source = Column(String(20), default="llm")  # "llm" or "builtin"
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class IdempotencyRecord(Base):
+    """
+    Ledger of factory requests made with an Idempotency-Key header, one row per
+    (endpoint, key). Completed rows hold the stored response returned to retries;
+    see services/idempotency.py.
+    """
+    __tablename__ = "idempotency_records"
+    __table_args__ = (UniqueConstraint("endpoint", "idempotency_key", name="uq_idempotency_endpoint_key"),)
+    
+    id = Column(String(36), primary_key=True, index=True)
+    endpoint = Column(String(50), nullable=False)  # e.g. "factory_create", "factory_evolve"
+    idempotency_key = Column(String(255), nullable=False, index=True)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request body
+    
+    status = Column(String(20), nullable=False, default="in_progress")  # "in_progress" or "completed"
+    response = Column(JSON, nullable=True)  # stored response body once completed
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+
 # ============================================================================
 # DATABASE ACCESS LAYER - CRUD OPERATIONS
 # ============================================================================
@@ -1051,12 +1240,57 @@ ACCESS PATTERNS:
 engine = None
 SessionLocal = None
 
+# Columns added to existing tables after their first release; create_all() only creates missing tables
+ADDED_COLUMNS = [
+    ("unified_items", "content_hash", "VARCHAR(64)"),
+    ("character_commits", "depth", "INTEGER"),
+]
+
+def _add_missing_columns(engine):
+    """Add ADDED_COLUMNS to databases created before the columns existed."""
+    from sqlalchemy import inspect, text
+    inspector = inspect(engine)
+    for table, column, column_type in ADDED_COLUMNS:
+        if column not in {c["name"] for c in inspector.get_columns(table)}:
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+            logger.info(f"Added column {table}.{column}")
+
 def init_database(database_url: str):
     """Initialize database connection."""
     global engine, SessionLocal
     engine = create_engine(database_url)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    
+    # Indexes added to existing tables: (created_at, id) for cursor pagination, catalog stats
+    from src.services.keyset_pagination import ensure_keyset_keys
+    ensure_keyset_keys(engine, [Character.__table__, CustomContent.__table__, UnifiedItem.__table__])
+    
+    # Compressed JSON/Text columns: dictionaries, and bytea conversion on Postgres
+    from src.models.compressed_json import prepare_compressed_columns
+    prepare_compressed_columns(engine, Base.metadata)
+    
+    # Full-text catalog index (FTS5 / tsvector); search falls back to ILIKE without it
+    from src.services.catalog_search import ensure_search_index
+    ensure_search_index(engine)
+    
+    # Class-restriction lookup table; backfilled from the JSON column when empty
+    from src.services.catalog_class_index import ensure_class_index
+    ensure_class_index(engine)
+    
+    # Materialised catalog stats; recounted on startup
+    from src.services.catalog_counters import ensure_catalog_counters
+    ensure_catalog_counters(engine)
+    
+    # Inventory, equipped slots and attunements moved out of Character.equipment
+    from src.services.character_inventory import ensure_inventory_migrated
+    ensure_inventory_migrated(engine)
+    
+    # Depth of commits made before the column existed, and its index
+    from src.services.version_projections import ensure_commit_depths
+    ensure_commit_depths(engine)
 
 def get_db():
     """Get database session."""
@@ -1083,6 +1317,8 @@ class CharacterDB:
     @staticmethod
     def create_character(db: Session, character_data: Dict[str, Any]) -> Character:
         """Create a new character in the database."""
+        from src.services.character_inventory import sync_character_equipment
+        
         db_character = Character(
             id=str(uuid.uuid4()),  # Generate UUID for new character
             name=character_data.get("name", ""),
@@ -1101,13 +1337,14 @@ class CharacterDB:
             armor_class=character_data.get("armor_class", 10),
             hit_points=character_data.get("hit_points", 1),
             proficiency_bonus=character_data.get("proficiency_bonus", 2),
-            equipment=character_data.get("equipment", {}),
             features=character_data.get("features", {}),
             spells=character_data.get("spells", {}),
             skills=character_data.get("skills", {}),
             backstory=character_data.get("backstory"),
             notes=character_data.get("notes")
         )
+        # Inventory, attunements and equipped slots go to their tables
+        sync_character_equipment(db, db_character, character_data.get("equipment", {}))
         
         db.add(db_character)
         db.commit()
@@ -1135,13 +1372,18 @@ class CharacterDB:
     @staticmethod
     def update_character(db: Session, character_id: str, updates: Dict[str, Any]) -> Optional[Character]:
         """Update an existing character in the database."""
+        from src.services.character_inventory import sync_character_equipment
+        
         db_character = CharacterDB.get_character(db, character_id)
         if not db_character:
             return None
         
         # Update character fields with provided data
         for key, value in updates.items():
-            if hasattr(db_character, key):
+            if key == "equipment":
+                # Inventory, attunements and equipped slots go to their tables
+                sync_character_equipment(db, db_character, value)
+            elif hasattr(db_character, key):
                 setattr(db_character, key, value)
         
         db.commit()
@@ -1282,198 +1524,142 @@ class CharacterDB:
     # INVENTORY MANAGEMENT METHODS
     # ============================================================================
     
+    @staticmethod
+    def _character_exists(db: Session, character_id: str) -> bool:
+        return db.query(Character.id).filter(Character.id == character_id, Character.is_active == True).first() is not None
+    
+    @staticmethod
+    def _inventory_query(db: Session, character_id: str):
+        """Inventory rows of an active character (indexed by character_id)."""
+        return db.query(CharacterInventoryItem).join(
+            Character, Character.id == CharacterInventoryItem.character_id
+        ).filter(CharacterInventoryItem.character_id == character_id, Character.is_active == True)
+    
+    @staticmethod
+    def _find_inventory_item(db: Session, character_id: str, item_name: Optional[str] = None,
+                             item_id: Optional[str] = None) -> Optional[CharacterInventoryItem]:
+        """An inventory row by item ID, or the first with the given name in inventory order."""
+        query = CharacterDB._inventory_query(db, character_id)
+        if item_id:
+            return query.filter(CharacterInventoryItem.item_id == item_id).first()
+        return query.filter(CharacterInventoryItem.name == item_name).order_by(CharacterInventoryItem.position).first()
+    
     @staticmethod
     def get_inventory(db: Session, character_id: str) -> List[Dict[str, Any]]:
         """Get character's inventory items."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character:
-            return []
-        
-        # Extract inventory from equipment JSON field
-        equipment_data = character.equipment or {}
-        return equipment_data.get("inventory", [])
+        rows = CharacterDB._inventory_query(db, character_id).order_by(CharacterInventoryItem.position).all()
+        return [row.data for row in rows]
     
     @staticmethod
     def add_inventory_item(db: Session, character_id: str, item_data: Dict[str, Any]) -> bool:
         """Add an item to character's inventory."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character:
+        if not CharacterDB._character_exists(db, character_id):
             return False
         
-        # Initialize equipment if it doesn't exist
-        if not character.equipment:
-            character.equipment = {}
-        
-        # Initialize inventory list if it doesn't exist
-        if "inventory" not in character.equipment:
-            character.equipment["inventory"] = []
-        
         # Add timestamp and unique ID to item
         item_data["added_at"] = datetime.utcnow().isoformat()
         item_data["item_id"] = str(uuid.uuid4())
         
-        # Add item to inventory
-        character.equipment["inventory"].append(item_data)
-        
-        # Mark the JSON field as modified (SQLAlchemy doesn't auto-detect JSON changes)
-        flag_modified(character, "equipment")
-        
+        # Append after the last item (index range scan on character_id, position)
+        last_position = db.query(func.max(CharacterInventoryItem.position)).filter(
+            CharacterInventoryItem.character_id == character_id
+        ).scalar()
+        db.add(CharacterInventoryItem(
+            item_id=item_data["item_id"],
+            character_id=character_id,
+            name=item_data.get("name") or "",
+            position=(last_position + 1) if last_position is not None else 0,
+            data=item_data,
+            requires_attunement=bool(item_data.get("requires_attunement", False)),
+        ))
         db.commit()
-        db.refresh(character)
         return True
     
     @staticmethod
-    def update_inventory_item(db: Session, character_id: str, item_name: str, updates: Dict[str, Any]) -> bool:
-        """Update an existing inventory item."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character or not character.equipment:
-            return False
-        
-        inventory = character.equipment.get("inventory", [])
-        
-        # Find item by name
-        for item in inventory:
-            if item.get("name") == item_name:
-                # Update item fields
-                for key, value in updates.items():
-                    if value is not None:  # Only update non-None values
-                        item[key] = value
-                
-                item["updated_at"] = datetime.utcnow().isoformat()
-                
-                # Mark the JSON field as modified
-                flag_modified(character, "equipment")
-                
-                db.commit()
-                db.refresh(character)
-                return True
-        
-        return False  # Item not found
+    def update_inventory_item(db: Session, character_id: str, item_name: str, updates: Dict[str, Any],
+                              item_id: Optional[str] = None) -> bool:
+        """Update an existing inventory item, found by item_id when given, else by name."""
+        row = CharacterDB._find_inventory_item(db, character_id, item_name, item_id)
+        if not row:
+            return False  # Item not found
+        
+        # Update item fields (only non-None values)
+        data = dict(row.data or {})
+        data.update({key: value for key, value in updates.items() if value is not None})
+        data["updated_at"] = datetime.utcnow().isoformat()
+        
+        row.data = data
+        row.name = data.get("name") or ""
+        row.requires_attunement = bool(data.get("requires_attunement", False))
+        row.updated_at = datetime.utcnow()
+        db.commit()
+        return True
     
     @staticmethod
-    def remove_inventory_item(db: Session, character_id: str, item_name: str) -> bool:
-        """Remove an item from character's inventory."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character or not character.equipment:
-            return False
-        
-        inventory = character.equipment.get("inventory", [])
+    def remove_inventory_item(db: Session, character_id: str, item_name: str, item_id: Optional[str] = None) -> bool:
+        """
+        Remove an item from character's inventory, found by item_id when given, else by name.
         
-        # Find and remove item by name
-        for i, item in enumerate(inventory):
-            if item.get("name") == item_name:
-                inventory.pop(i)
-                
-                # Mark the JSON field as modified
-                flag_modified(character, "equipment")
-                
-                db.commit()
-                db.refresh(character)
-                return True
+        Attunement is stored on the item's row, so removing an attuned item also ends the
+        attunement and frees its slot.
+        """
+        row = CharacterDB._find_inventory_item(db, character_id, item_name, item_id)
+        if not row:
+            return False  # Item not found
         
-        return False  # Item not found
+        db.delete(row)
+        db.commit()
+        return True
     
     @staticmethod
     def get_equipped_items(db: Session, character_id: str) -> Dict[str, str]:
         """Get character's equipped items."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character:
-            return {}
-        
-        equipment_data = character.equipment or {}
-        return equipment_data.get("equipped_items", {})
+        rows = db.query(CharacterEquippedSlot.slot, CharacterEquippedSlot.item_name).join(
+            Character, Character.id == CharacterEquippedSlot.character_id
+        ).filter(CharacterEquippedSlot.character_id == character_id, Character.is_active == True).all()
+        return {slot: item_name for slot, item_name in rows}
     
     @staticmethod
     def equip_item(db: Session, character_id: str, item_name: str, slot: str) -> bool:
         """Equip an item to a specific slot."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character:
+        if not CharacterDB._character_exists(db, character_id):
             return False
         
-        # Initialize equipment if it doesn't exist
-        if not character.equipment:
-            character.equipment = {}
-        
-        # Initialize equipped_items if it doesn't exist
-        if "equipped_items" not in character.equipment:
-            character.equipment["equipped_items"] = {}
-        
-        # Equip the item
-        character.equipment["equipped_items"][slot] = item_name
-        
-        # Mark the JSON field as modified
-        flag_modified(character, "equipment")
-        
+        db.merge(CharacterEquippedSlot(character_id=character_id, slot=slot, item_name=item_name))
         db.commit()
-        db.refresh(character)
         return True
     
     @staticmethod
     def unequip_item(db: Session, character_id: str, slot: str) -> bool:
         """Unequip an item from a specific slot."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character or not character.equipment:
-            return False
-        
-        equipped_items = character.equipment.get("equipped_items", {})
-        
-        if slot in equipped_items:
-            del equipped_items[slot]
-            
-            # Mark the JSON field as modified
-            flag_modified(character, "equipment")
-            
-            db.commit()
-            db.refresh(character)
-            return True
-        
-        return False  # Slot not equipped
+        removed = db.query(CharacterEquippedSlot).filter(
+            CharacterEquippedSlot.character_id == character_id, CharacterEquippedSlot.slot == slot
+        ).delete(synchronize_session=False)
+        db.commit()
+        return removed > 0  # False when the slot was not equipped
     
     @staticmethod
     def get_attuned_items(db: Session, character_id: str) -> List[str]:
-        """Get character's attuned items."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character:
-            return []
-        
-        equipment_data = character.equipment or {}
-        return equipment_data.get("attuned_items", [])
+        """Get character's attuned items, in attunement order."""
+        rows = CharacterDB._inventory_query(db, character_id).filter(
+            CharacterInventoryItem.attuned_at.isnot(None)
+        ).order_by(CharacterInventoryItem.attuned_at).all()
+        return [row.name for row in rows]
     
     @staticmethod
     def add_attuned_item(db: Session, character_id: str, item_name: str) -> bool:
         """Add an item to attuned items (max 3). Only items that require attunement can be attuned."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character:
-            return False
-        
-        # Initialize equipment if it doesn't exist
-        if not character.equipment:
-            character.equipment = {}
-        
-        # Initialize attuned_items if it doesn't exist
-        if "attuned_items" not in character.equipment:
-            character.equipment["attuned_items"] = []
-        
         # Check if the item exists in inventory and requires attunement
-        inventory = character.equipment.get("inventory", [])
-        item_found = False
-        requires_attunement = False
-        
-        for item in inventory:
-            if item.get("name") == item_name:
-                item_found = True
-                requires_attunement = item.get("requires_attunement", False)
-                break
-        
-        if not item_found:
+        item = CharacterDB._find_inventory_item(db, character_id, item_name)
+        if not item:
             logger.warning(f"Item {item_name} not found in character's inventory")
             return False
         
-        if not requires_attunement:
+        if not item.requires_attunement:
             logger.warning(f"Item {item_name} does not require attunement")
             return False
         
-        attuned_items = character.equipment["attuned_items"]
+        attuned_items = CharacterDB.get_attuned_items(db, character_id)
         
         # Check attunement limit (D&D 5e limit is 3)
         if len(attuned_items) >= 3:
@@ -1483,47 +1669,29 @@ class CharacterDB:
         if item_name in attuned_items:
             return False
         
-        # Add to attuned items
-        attuned_items.append(item_name)
-        
-        # Mark the JSON field as modified
-        flag_modified(character, "equipment")
-        
+        item.attuned_at = datetime.utcnow()
         db.commit()
-        db.refresh(character)
         return True
     
     @staticmethod
     def remove_attuned_item(db: Session, character_id: str, item_name: str) -> bool:
         """Remove an item from attuned items."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character or not character.equipment:
-            return False
-        
-        attuned_items = character.equipment.get("attuned_items", [])
-        
-        if item_name in attuned_items:
-            attuned_items.remove(item_name)
-            
-            # Mark the JSON field as modified
-            flag_modified(character, "equipment")
-            
-            db.commit()
-            db.refresh(character)
-            return True
-        
-        return False
+        removed = db.query(CharacterInventoryItem).filter(
+            CharacterInventoryItem.character_id == character_id,
+            CharacterInventoryItem.name == item_name,
+            CharacterInventoryItem.attuned_at.isnot(None)
+        ).update({CharacterInventoryItem.attuned_at: None}, synchronize_session=False)
+        db.commit()
+        return removed > 0
     
     @staticmethod
     def get_attunement_info(db: Session, character_id: str) -> Dict[str, Any]:
         """Get detailed attunement information for a character."""
-        character = CharacterDB.get_character(db, character_id)
-        if not character:
+        if not CharacterDB._character_exists(db, character_id):
             return {"error": "Character not found"}
         
-        equipment_data = character.equipment or {}
-        attuned_items = equipment_data.get("attuned_items", [])
-        inventory = equipment_data.get("inventory", [])
+        attuned_items = CharacterDB.get_attuned_items(db, character_id)
+        inventory = CharacterDB.get_inventory(db, character_id)
         
         # Categorize inventory items by attunement status
         attuned_item_details = []
@@ -1632,14 +1800,23 @@ class CharacterDB:
                 query = query.filter(UnifiedItem.spell_school == spell_school)
             if rarity:
                 query = query.filter(UnifiedItem.rarity == rarity)
-            if search_text:
-                query = query.filter(UnifiedItem.name.ilike(f"%{search_text}%"))
             
             # Class restrictions filter (if item has restrictions, check if any match)
             if class_restrictions:
-                # This is a complex JSON query - for now, fetch all and filter in Python
-                # In production, you'd want a proper JSON query
-                pass
+                from src.services.catalog_class_index import class_restriction_filter
+                query = query.filter(class_restriction_filter(class_restrictions, match_all=False))
+            
+            if search_text:
+                # Ranked full-text match over name, description and content
+                from src.services.catalog_search import search_catalog
+                matches = search_catalog(
+                    db, search_text, limit=limit, item_type=item_type, source_type=source_type,
+                    spell_level=spell_level, spell_school=spell_school, rarity=rarity,
+                    class_restrictions=class_restrictions, class_match="any"
+                )
+                ranked_ids = [match["item"]["id"] for match in matches]
+                items = {str(item.id): item for item in query.filter(UnifiedItem.id.in_(ranked_ids))}
+                return [items[item_id] for item_id in ranked_ids if item_id in items]
             
             return query.limit(limit).all()
         except Exception as e:
@@ -1929,6 +2106,14 @@ class CharacterRepositoryManager:
         commit_hash = hashlib.sha256(hash_input.encode()).hexdigest()
         short_hash = commit_hash[:8]
         
+        # One deeper than the parent (None until ensure_commit_depths() backfills an old parent)
+        depth = 0
+        if branch.head_commit_hash:
+            parent_depth = db.query(CharacterCommit.depth).filter(
+                CharacterCommit.commit_hash == branch.head_commit_hash
+            ).scalar()
+            depth = parent_depth + 1 if parent_depth is not None else None
+        
         # Create commit
         commit = CharacterCommit(
             id=str(uuid.uuid4()),  # Generate UUID for new commit
@@ -1941,6 +2126,7 @@ class CharacterRepositoryManager:
             character_level=character_level,
             character_data=character_data,
             parent_commit_hash=branch.head_commit_hash,
+            depth=depth,
             milestone_name=milestone_name,
             session_date=session_date,
             campaign_context=campaign_context,
@@ -2040,17 +2226,28 @@ class CharacterRepositoryManager:
         return tag
     
     @staticmethod
-    def get_repository_tree(db: Session, repository_id: str) -> Dict[str, Any]:
+    def get_repository_tree(db: Session, repository_id: str, include_snapshots: bool = False,
+                            depth_limit: int = None, before_depth: int = None) -> Dict[str, Any]:
         """
-        Get complete repository tree structure for visualization.
+        Get repository tree structure for visualization.
+        
+        Commits carry metadata only; fetch a snapshot with get_character_at_commit().
+        With depth_limit, commits come a page of generations at a time from the
+        newest down, continuing from page["next_before_depth"].
         
         Args:
             db: Database session
             repository_id: Repository ID
+            include_snapshots: Include each commit's character_data (full to_dict())
+            depth_limit: Number of commit depths per page (all when None)
+            before_depth: Only commits shallower than this depth
             
         Returns:
             Dict: Repository tree data
         """
+        from sqlalchemy import func
+        from src.services.version_projections import commit_counts_by_branch, commit_metadata_query, commit_rows
+        
         repo = db.query(CharacterRepository).filter(
             CharacterRepository.id == repository_id
         ).first()
@@ -2061,20 +2258,38 @@ class CharacterRepositoryManager:
         branches = db.query(CharacterBranch).filter(
             CharacterBranch.repository_id == repository_id
         ).all()
-        
-        commits = db.query(CharacterCommit).filter(
-            CharacterCommit.repository_id == repository_id
-        ).order_by(CharacterCommit.created_at.desc()).all()
+        commit_counts = commit_counts_by_branch(db, repository_id)
+        
+        query = commit_metadata_query(db, repository_id)
+        if before_depth is not None:
+            query = query.filter(CharacterCommit.depth < before_depth)
+        if depth_limit is not None:
+            top = before_depth if before_depth is not None else (db.query(func.max(CharacterCommit.depth)).filter(
+                CharacterCommit.repository_id == repository_id
+            ).scalar() or 0) + 1
+            query = query.filter(CharacterCommit.depth >= top - depth_limit)
+        commits = commit_rows(query.order_by(CharacterCommit.depth.desc(), CharacterCommit.created_at.desc()))
+        
+        if include_snapshots and commits:
+            snapshots = dict(db.query(CharacterCommit.commit_hash, CharacterCommit.character_data).filter(
+                CharacterCommit.commit_hash.in_([commit["commit_hash"] for commit in commits])
+            ).all())
+            for commit in commits:
+                commit["character_data"] = snapshots.get(commit["commit_hash"])
         
         tags = db.query(CharacterTag).filter(
             CharacterTag.repository_id == repository_id
         ).all()
         
+        depths = [commit["depth"] for commit in commits if commit["depth"] is not None]
+        next_before_depth = min(depths) if depth_limit is not None and depths and min(depths) > 0 else None
+        
         return {
-            "repository": repo.to_dict(),
-            "branches": [branch.to_dict() for branch in branches],
-            "commits": [commit.to_dict() for commit in commits],
-            "tags": [tag.to_dict() for tag in tags]
+            "repository": repo.to_dict(branch_count=len(branches), commit_count=sum(commit_counts.values())),
+            "branches": [branch.to_dict(commit_count=commit_counts.get(branch.id, 0)) for branch in branches],
+            "commits": commits,
+            "tags": [tag.to_dict() for tag in tags],
+            "page": {"depth_limit": depth_limit, "before_depth": before_depth, "next_before_depth": next_before_depth}
         }
 
 
@@ -2104,18 +2319,23 @@ class CharacterVersioningAPI:
         Returns:
             Dict: Timeline data for frontend
         """
-        commits = db.query(CharacterCommit).filter(
-            CharacterCommit.repository_id == repository_id
-        ).order_by(CharacterCommit.created_at.asc()).all()
+        from src.services.version_projections import commit_metadata_query
+        
+        # Metadata columns only; snapshots are never loaded
+        commits = commit_metadata_query(db, repository_id, (
+            "commit_hash", "short_hash", "branch_id", "created_at", "character_level", "commit_message",
+            "milestone_name", "commit_type"
+        )).order_by(CharacterCommit.created_at.asc()).all()
         
         branches = db.query(CharacterBranch).filter(
             CharacterBranch.repository_id == repository_id
         ).all()
+        branch_names = {b.id: b.branch_name for b in branches}
         
         # Build timeline events
         events = []
         for commit in commits:
-            branch_name = next((b.branch_name for b in branches if b.id == commit.branch_id), "main")
+            branch_name = branch_names.get(commit.branch_id, "main")
             
             events.append({
                 "id": commit.commit_hash,
@@ -2163,13 +2383,18 @@ class CharacterVersioningAPI:
         Returns:
             Dict: Graph data with nodes and edges
         """
-        commits = db.query(CharacterCommit).filter(
-            CharacterCommit.repository_id == repository_id
-        ).all()
+        from src.services.version_projections import commit_metadata_query
+        
+        # Metadata columns only; snapshots are never loaded
+        commits = commit_metadata_query(db, repository_id, (
+            "commit_hash", "short_hash", "branch_id", "created_at", "character_level", "commit_message",
+            "milestone_name", "commit_type", "parent_commit_hash", "merge_parent_hash"
+        )).all()
         
         branches = db.query(CharacterBranch).filter(
             CharacterBranch.repository_id == repository_id
         ).all()
+        branches_by_id = {b.id: b for b in branches}
         
         # Create branch color mapping
         branch_colors = {
@@ -2182,7 +2407,7 @@ class CharacterVersioningAPI:
         # Build nodes (commits)
         nodes = []
         for commit in commits:
-            branch = next((b for b in branches if b.id == commit.branch_id), None)
+            branch = branches_by_id.get(commit.branch_id)
             branch_name = branch.branch_name if branch else "main"
             
             nodes.append({
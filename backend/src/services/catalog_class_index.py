@@ -0,0 +1,205 @@
+"""
+Indexed class-restriction filtering for the unified item catalog.
+
+UnifiedItem.class_restrictions is a JSON array, so "spells a wizard can cast"
+was either a JSON .contains() filter (a full scan whose semantics differ by
+backend) or, in CharacterDB.search_unified_items, no filter at all. The classes
+are now mirrored into unified_item_classes, one (class_name, item_id) row per
+class, whose primary key makes a class filter an index range lookup:
+
+    unified_items.id IN (SELECT item_id FROM unified_item_classes WHERE class_name = 'wizard')
+
+MAINTENANCE:
+- UnifiedItem insert/update/delete listeners (database_models.py) rewrite an
+  item's rows inside the writing transaction; updates only when
+  class_restrictions changed. Bulk Core writes call sync_items_classes()
+- ensure_class_index() in init_database() backfills the table when it is empty
+  and drops rows left behind by bulk deletes that bypass the ORM
+- Class names are stored lowercased and trimmed; the JSON column stays the
+  source of truth returned by the API
+
+MATCHING:
+- match_all=True: the item must allow every requested class
+  (UnifiedCatalogService, as the chained .contains() filters did)
+- match_all=False: any requested class is enough (CharacterDB, e.g. a
+  multiclass character's spell options)
+- Items without class restrictions never match a class filter
+
+Benchmark (50k items, in-memory SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.catalog_class_index --items 50000
+
+Usage:
+    query = query.filter(class_restriction_filter(["wizard"]))
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, bindparam, select, text
+
+logger = logging.getLogger(__name__)
+
+CLASS_TABLE = "unified_item_classes"
+
+
+def normalize_class_names(class_names: Optional[Iterable[Any]]) -> List[str]:
+    """Lowercased, de-duplicated class names; non-strings and blanks dropped."""
+    names = []
+    for name in class_names or []:
+        if isinstance(name, str) and name.strip() and name.strip().lower() not in names:
+            names.append(name.strip().lower())
+    return names
+
+
+class ClassIndexStats:
+    """Write and backfill counters for the class lookup table."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {"synced_items": 0, "removed_items": 0, "backfilled_items": 0, "orphans_removed": 0}
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats)
+
+
+class_index_stats = ClassIndexStats()
+
+
+def _table():
+    from src.models.database_models import UnifiedItemClass
+    return UnifiedItemClass.__table__
+
+
+# ============================================================================
+# INDEX MAINTENANCE
+# ============================================================================
+
+def sync_item_classes(connection, item, replace: bool = True) -> None:
+    """Write one item's class rows inside the writing transaction."""
+    sync_items_classes(connection, [item], replace)
+
+
+def sync_items_classes(connection, items: List[Any], replace: bool = True) -> None:
+    """Write class rows for several items (bulk writes that bypass the ORM)."""
+    if not items:
+        return
+    table = _table()
+    if replace:
+        connection.execute(table.delete().where(table.c.item_id == bindparam("item_id")),
+                           [{"item_id": item.id} for item in items])
+    rows = [{"class_name": name, "item_id": item.id}
+            for item in items for name in normalize_class_names(item.class_restrictions)]
+    if rows:
+        connection.execute(table.insert(), rows)
+    class_index_stats.count("synced_items", len(items))
+
+
+def remove_item_classes(connection, item) -> None:
+    """Drop one item's class rows before the item itself is deleted."""
+    remove_items_classes(connection, [item])
+
+
+def remove_items_classes(connection, items: List[Any]) -> None:
+    """Drop class rows for several items."""
+    if not items:
+        return
+    table = _table()
+    connection.execute(table.delete().where(table.c.item_id == bindparam("item_id")),
+                       [{"item_id": item.id} for item in items])
+    class_index_stats.count("removed_items", len(items))
+
+
+def rebuild_class_index(connection) -> int:
+    """Rebuild the table from every item's class_restrictions (e.g. after bulk writes)."""
+    from src.models.database_models import UnifiedItem
+
+    table = _table()
+    connection.execute(table.delete())
+    rows = []
+    for item_id, class_restrictions in connection.execute(
+        select(UnifiedItem.id, UnifiedItem.class_restrictions).where(UnifiedItem.class_restrictions.isnot(None))
+    ):
+        rows.extend({"class_name": name, "item_id": item_id} for name in normalize_class_names(class_restrictions))
+    if rows:
+        connection.execute(table.insert(), rows)
+    class_index_stats.count("backfilled_items", len({row["item_id"] for row in rows}))
+    return len(rows)
+
+
+def ensure_class_index(engine) -> int:
+    """
+    Backfill the class table when it is empty but items exist, and remove rows
+    whose item is gone. Returns the number of rows written by a backfill.
+    """
+    try:
+        with engine.begin() as connection:
+            orphans = connection.execute(text(
+                f"DELETE FROM {CLASS_TABLE} WHERE item_id NOT IN (SELECT id FROM unified_items)"
+            )).rowcount
+            if orphans:
+                class_index_stats.count("orphans_removed", orphans)
+            if connection.execute(text(f"SELECT 1 FROM {CLASS_TABLE} LIMIT 1")).first() is not None:
+                return 0
+            written = rebuild_class_index(connection)
+            if written and connection.dialect.name == "sqlite":
+                # Without statistics SQLite prefers the unselective item_type index
+                connection.execute(text("ANALYZE"))
+        if written:
+            logger.info(f"Backfilled {written} class restriction rows for the unified catalog")
+        return written
+    except Exception as e:
+        logger.warning(f"Could not prepare the class restriction index: {e}")
+        return 0
+
+
+# ============================================================================
+# QUERYING
+# ============================================================================
+
+def class_restriction_filter(class_names: Iterable[str], match_all: bool = True):
+    """
+    SQLAlchemy criterion restricting UnifiedItem rows to the given classes.
+
+    Args:
+        class_names: Classes to match (case-insensitive)
+        match_all: Require every class (True) or any of them (False)
+    """
+    from src.models.database_models import UnifiedItem, UnifiedItemClass
+
+    names = normalize_class_names(class_names)
+    if not names:
+        return UnifiedItem.id.isnot(None)
+    if not match_all or len(names) == 1:
+        return UnifiedItem.id.in_(
+            select(UnifiedItemClass.item_id).where(UnifiedItemClass.class_name.in_(names))
+        )
+    return and_(*(
+        UnifiedItem.id.in_(select(UnifiedItemClass.item_id).where(UnifiedItemClass.class_name == name))
+        for name in names
+    ))
+
+
+def class_restriction_sql(class_names: Iterable[str], match_all: bool = True,
+                          alias: str = "u") -> Optional[tuple]:
+    """
+    Raw-SQL version of class_restriction_filter for text() queries over
+    unified_items (aliased as alias). Returns (clause, params), or None for no filter.
+    """
+    names = normalize_class_names(class_names)
+    if not names:
+        return None
+    params = {f"class_{i}": name for i, name in enumerate(names)}
+    if not match_all:
+        placeholders = ", ".join(f":{key}" for key in params)
+        clause = f"{alias}.id IN (SELECT item_id FROM {CLASS_TABLE} WHERE class_name IN ({placeholders}))"
+        return clause, params
+    clause = " AND ".join(
+        f"{alias}.id IN (SELECT item_id FROM {CLASS_TABLE} WHERE class_name = :{key})" for key in params
+    )
+    return clause, params
@@ -0,0 +1,236 @@
+"""
+Materialised counters for unified catalog statistics.
+
+get_catalog_stats() used to run eight COUNT(*) queries (total, official,
+custom and one per item type) each time the dashboard polled it. Active items
+are now counted in unified_item_counters, one row per
+(source_type, item_type, rarity, spell_level), so the stats are a read of a
+few dozen rows however large the catalog grows:
+
+    SELECT source_type, item_type, rarity, spell_level, item_count
+    FROM unified_item_counters WHERE item_count > 0
+
+MAINTENANCE:
+- UnifiedItem insert/update/delete listeners (database_models.py) adjust the
+  affected rows inside the writing transaction; updates only when is_active
+  or one of the key columns changed. Deactivating an item decrements it, and
+  updates and deletes read the previous values from the stored row
+- Bulk Core writes that bypass the ORM (the official catalog upsert) call
+  rebuild_catalog_counters(), a single GROUP BY over unified_items
+- ensure_catalog_counters() in init_database() rebuilds the table on startup,
+  which also repairs any drift from writes made outside the listeners
+- NULL rarity and spell_level are stored as NO_RARITY / NO_SPELL_LEVEL so the
+  key can be a primary key on every backend
+
+Benchmark (50k items, in-memory SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.catalog_counters --items 50000
+
+Usage:
+    stats = catalog_stats(session)
+"""
+
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func, select
+
+logger = logging.getLogger(__name__)
+
+NO_RARITY = ""
+NO_SPELL_LEVEL = -1
+ITEM_TYPES = ["spell", "weapon", "armor", "equipment", "tool"]
+KEY_COLUMNS = ("source_type", "item_type", "rarity", "spell_level")
+
+CounterKey = Tuple[str, str, str, int]
+
+
+class CatalogCounterStats:
+    """Maintenance counters for the catalog counter table."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {"adjustments": 0, "rebuilds": 0, "counter_reads": 0, "group_by_reads": 0}
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats)
+
+
+catalog_counter_stats = CatalogCounterStats()
+
+
+def _table():
+    from src.models.database_models import UnifiedItemCounter
+    return UnifiedItemCounter.__table__
+
+
+def counter_key(source_type: Optional[str], item_type: Optional[str], rarity: Optional[str],
+                spell_level: Optional[int]) -> CounterKey:
+    """Counter row key for an item's column values."""
+    return (source_type or "", item_type or "",
+            rarity if rarity is not None else NO_RARITY,
+            spell_level if spell_level is not None else NO_SPELL_LEVEL)
+
+
+# ============================================================================
+# MAINTENANCE
+# ============================================================================
+
+def adjust_counters(connection, deltas: Dict[CounterKey, int]) -> None:
+    """Add deltas to counter rows inside the writing transaction, creating missing rows."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = _table()
+    rows = [dict(zip(KEY_COLUMNS, key), item_count=delta) for key, delta in deltas.items()]
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c[name] for name in KEY_COLUMNS],
+            set_={"item_count": table.c.item_count + statement.excluded.item_count},
+        ), rows)
+    else:
+        for row in rows:
+            matches = [table.c[name] == row[name] for name in KEY_COLUMNS]
+            updated = connection.execute(
+                table.update().where(*matches).values(item_count=table.c.item_count + row["item_count"])
+            ).rowcount
+            if not updated:
+                connection.execute(table.insert(), [row])
+    catalog_counter_stats.count("adjustments", len(rows))
+
+
+def item_inserted(connection, item) -> None:
+    """Count a newly inserted item if it is active."""
+    if item.is_active:
+        adjust_counters(connection, {counter_key(item.source_type, item.item_type, item.rarity, item.spell_level): 1})
+
+
+def item_updating(connection, item) -> None:
+    """
+    Move an item between counter rows before its UPDATE when is_active or a
+    key column changed. The previous values are read from the stored row, as
+    the instance may have been expired before it was modified.
+    """
+    from sqlalchemy import inspect
+
+    attrs = inspect(item).attrs
+    if not any(attrs[name].history.has_changes() for name in KEY_COLUMNS + ("is_active",)):
+        return
+    deltas: Counter = Counter()
+    stored = _stored_row(connection, item)
+    if stored is not None and stored.is_active:
+        deltas[counter_key(stored.source_type, stored.item_type, stored.rarity, stored.spell_level)] -= 1
+    if item.is_active:
+        deltas[counter_key(item.source_type, item.item_type, item.rarity, item.spell_level)] += 1
+    adjust_counters(connection, deltas)
+
+
+def _stored_row(connection, item):
+    from src.models.database_models import UnifiedItem
+
+    items = UnifiedItem.__table__
+    return connection.execute(
+        select(items.c.source_type, items.c.item_type, items.c.rarity, items.c.spell_level, items.c.is_active)
+        .where(items.c.id == item.id)
+    ).first()
+
+
+def item_deleted(connection, item) -> None:
+    """Uncount an item about to be deleted, from its stored values."""
+    row = _stored_row(connection, item)
+    if row is not None and row.is_active:
+        adjust_counters(connection, {counter_key(row.source_type, row.item_type, row.rarity, row.spell_level): -1})
+
+
+def grouped_counts(connection) -> Dict[CounterKey, int]:
+    """Active item counts by counter key from one GROUP BY over unified_items."""
+    from src.models.database_models import UnifiedItem
+
+    items = UnifiedItem.__table__
+    keys = [items.c[name] for name in KEY_COLUMNS]
+    counts = {}
+    for row in connection.execute(select(*keys, func.count()).where(items.c.is_active == True).group_by(*keys)):
+        key = counter_key(*row[:4])
+        counts[key] = counts.get(key, 0) + row[4]
+    return counts
+
+
+def rebuild_catalog_counters(connection) -> int:
+    """Recount the table from unified_items (after bulk writes). Returns the number of counter rows."""
+    table = _table()
+    counts = grouped_counts(connection)
+    connection.execute(table.delete())
+    if counts:
+        connection.execute(table.insert(), [dict(zip(KEY_COLUMNS, key), item_count=count)
+                                             for key, count in counts.items()])
+    catalog_counter_stats.count("rebuilds")
+    return len(counts)
+
+
+def ensure_catalog_counters(engine) -> int:
+    """Rebuild the counters on startup; a failure leaves stats on the GROUP BY path."""
+    try:
+        with engine.begin() as connection:
+            return rebuild_catalog_counters(connection)
+    except Exception as e:
+        logger.warning(f"Could not rebuild catalog counters: {e}")
+        return 0
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def summarize_counts(counts: Iterable[Tuple[CounterKey, int]]) -> Dict[str, Any]:
+    """Catalog stats from (key, count) pairs."""
+    by_source: Counter = Counter()
+    by_type: Counter = Counter({item_type: 0 for item_type in ITEM_TYPES})
+    by_rarity: Counter = Counter()
+    by_spell_level: Counter = Counter()
+    for (source_type, item_type, rarity, spell_level), count in counts:
+        if count <= 0:
+            continue
+        by_source[source_type] += count
+        by_type[item_type] += count
+        if rarity != NO_RARITY:
+            by_rarity[rarity] += count
+        if item_type == "spell" and spell_level != NO_SPELL_LEVEL:
+            by_spell_level[str(spell_level)] += count
+    return {
+        "total_items": sum(by_source.values()),
+        "official_items": by_source["official"],
+        "custom_items": by_source["custom"],
+        "by_source_type": dict(by_source),
+        "by_type": dict(by_type),
+        "by_rarity": dict(sorted(by_rarity.items())),
+        "by_spell_level": dict(sorted(by_spell_level.items(), key=lambda level: int(level[0]))),
+    }
+
+
+def catalog_stats(session) -> Dict[str, Any]:
+    """Catalog stats from the counter table, or from one GROUP BY when it is unavailable."""
+    table = _table()
+    try:
+        # Savepoint so a missing table does not abort the caller's transaction
+        with session.begin_nested():
+            rows = session.execute(
+                select(*(table.c[name] for name in KEY_COLUMNS), table.c.item_count).where(table.c.item_count > 0)
+            ).all()
+        catalog_counter_stats.count("counter_reads")
+        return summarize_counts((tuple(row[:4]), row[4]) for row in rows)
+    except Exception as e:
+        logger.warning(f"Catalog counters unavailable, counting items instead: {e}")
+        catalog_counter_stats.count("group_by_reads")
+        return summarize_counts(grouped_counts(session.connection()).items())
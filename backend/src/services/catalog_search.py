@@ -0,0 +1,474 @@
+"""
+Ranked full-text search over the unified item catalog.
+
+Name search used to be UnifiedItem.name ILIKE '%text%': a full table scan that
+ignored descriptions and item content and returned rows in no useful order.
+Items are now indexed in a full-text side table, one row per item with three
+weighted fields: name, description (short_description plus the content
+description) and keywords (type, school, damage type, properties, classes...).
+
+BACKENDS:
+- SQLite: FTS5 virtual table unified_items_fts, ranked by bm25() with per-field
+  weights, highlights from snippet()
+- PostgreSQL: unified_items_search table with a weighted tsvector and a GIN
+  index, ranked by ts_rank() (Postgres has no BM25), highlights from ts_headline()
+- Anything else, or if the index is unavailable: ILIKE over name and
+  description, ranked name-first
+
+MATCHING:
+- Every query term matches as a prefix ("fire" finds "Fireball")
+- Only if the prefix query finds nothing, terms missing from the index
+  vocabulary are expanded with their closest indexed terms, so "firbal" still
+  finds "Fireball"
+- All terms must match; if nothing does, any term may match
+- The vocabulary is cached per engine for VOCABULARY_TTL_SECONDS; item writes
+  do not reload it, so typo expansion can lag new terms by up to the TTL
+- Highlights are HTML-escaped item text with matches wrapped in <mark>
+
+The index is kept in sync by UnifiedItem insert/update/delete listeners
+(database_models.py) and created and backfilled by ensure_search_index() in
+init_database().
+
+Usage:
+    results = search_catalog(session, "firbal", item_type="spell", limit=10)
+    # [{"item": {...}, "score": 7.31, "highlights": {"name": "<mark>Fireball</mark>", ...}}]
+"""
+
+import difflib
+import html
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Column, MetaData, Table, Text, bindparam, text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "unified_items_fts"
+PG_TABLE = "unified_items_search"
+
+# Relative weight of a match in each field (bm25 weights / tsvector A, B, C)
+FIELD_WEIGHTS = {"name": 10.0, "description": 2.0, "keywords": 1.0}
+
+# content_data fields folded into the keywords column
+KEYWORD_FIELDS = (
+    "school", "damage_type", "properties", "classes", "category", "type",
+    "mastery", "components", "rarity", "tags",
+)
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# The index returns raw item text; matches are delimited with these control
+# characters, the text is HTML-escaped and only then are they swapped for <mark>
+_MATCH_START = "\x02"
+_MATCH_END = "\x03"
+
+# Closest-term expansion for terms missing from the vocabulary
+TYPO_MAX_EXPANSIONS = 3
+TYPO_CUTOFF = 0.75
+VOCABULARY_TTL_SECONDS = 300.0
+
+_TERM_PATTERN = re.compile(r"[\w']+", re.UNICODE)
+
+_search_metadata = MetaData()
+
+
+def _guid():
+    from src.models.database_models import GUID
+    return GUID()
+
+
+# Not part of Base.metadata: the FTS5 table is created with raw DDL
+fts_table = Table(
+    FTS_TABLE, _search_metadata,
+    Column("item_id", _guid()),
+    Column("name", Text), Column("description", Text), Column("keywords", Text),
+)
+pg_search_table = Table(
+    PG_TABLE, _search_metadata,
+    Column("item_id", _guid(), primary_key=True),
+    Column("name", Text), Column("description", Text), Column("keywords", Text),
+)
+
+
+# ============================================================================
+# DOCUMENTS
+# ============================================================================
+
+def _flatten(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            yield from _flatten(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten(item)
+
+
+def search_document(item) -> Dict[str, str]:
+    """Name, description and keyword text indexed for a UnifiedItem."""
+    content = item.content_data if isinstance(item.content_data, dict) else {}
+    description_parts = [item.short_description or ""]
+    content_description = content.get("description")
+    if isinstance(content_description, str) and content_description not in description_parts[0]:
+        description_parts.append(content_description)
+
+    keywords = [item.item_type, item.item_subtype, item.spell_school, item.rarity]
+    keywords.extend(_flatten(item.class_restrictions or []))
+    for field in KEYWORD_FIELDS:
+        keywords.extend(_flatten(content.get(field)))
+    return {
+        "name": item.name or "",
+        "description": " ".join(part for part in description_parts if part),
+        "keywords": " ".join(str(k).replace("_", " ") for k in keywords if k),
+    }
+
+
+# ============================================================================
+# INDEX MAINTENANCE
+# ============================================================================
+
+class SearchIndexState:
+    """Which engines have a usable index, plus a vocabulary cache per engine."""
+
+    def __init__(self, vocabulary_ttl: float = VOCABULARY_TTL_SECONDS):
+        self._lock = threading.Lock()
+        self.ready: Dict[str, str] = {}  # engine url -> dialect name
+        self.vocabulary_ttl = vocabulary_ttl
+        self.vocabulary: Dict[str, Tuple[float, List[str]]] = {}  # engine url -> (loaded at, terms)
+        self.stats = {"indexed": 0, "removed": 0, "searches": 0, "fallback_searches": 0,
+                      "typo_expansions": 0, "or_fallbacks": 0, "vocabulary_loads": 0}
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def backend(self, bind) -> Optional[str]:
+        return self.ready.get(str(bind.engine.url))
+
+    def cached_vocabulary(self, bind) -> Optional[List[str]]:
+        """The engine's vocabulary if it was loaded within the TTL."""
+        entry = self.vocabulary.get(str(bind.engine.url))
+        if entry is None or time.time() - entry[0] > self.vocabulary_ttl:
+            return None
+        return entry[1]
+
+    def invalidate(self, bind) -> None:
+        self.vocabulary.pop(str(bind.engine.url), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["backends"] = sorted(set(self.ready.values()))
+        return stats
+
+
+search_index = SearchIndexState()
+
+
+def ensure_search_index(engine) -> Optional[str]:
+    """
+    Create the dialect's search index if missing and backfill it when empty.
+
+    Returns the backend name ("fts5" or "tsvector"), or None if unsupported.
+    """
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as connection:
+            if dialect == "sqlite":
+                weights = ", ".join(FIELD_WEIGHTS)
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    f"item_id UNINDEXED, {weights}, "
+                    "tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+                ))
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}_vocab USING fts5vocab({FTS_TABLE}, 'row')"
+                ))
+                backend = "fts5"
+            elif dialect == "postgresql":
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+                    "item_id UUID PRIMARY KEY REFERENCES unified_items(id) ON DELETE CASCADE, "
+                    "name TEXT, description TEXT, keywords TEXT, "
+                    "document TSVECTOR GENERATED ALWAYS AS ("
+                    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+                    "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+                    "setweight(to_tsvector('english', coalesce(keywords, '')), 'C')) STORED)"
+                ))
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{PG_TABLE}_document ON {PG_TABLE} USING GIN (document)"
+                ))
+                backend = "tsvector"
+            else:
+                return None
+        search_index.ready[str(engine.url)] = backend
+    except Exception as e:
+        logger.warning(f"Full-text catalog index unavailable ({dialect}), using ILIKE search: {e}")
+        return None
+
+    with engine.begin() as connection:
+        table = fts_table if backend == "fts5" else pg_search_table
+        if connection.execute(text(f"SELECT COUNT(*) FROM {table.name}")).scalar() == 0:
+            indexed = rebuild_search_index(connection)
+            if indexed:
+                logger.info(f"Indexed {indexed} catalog items for full-text search ({backend})")
+    return backend
+
+
+def rebuild_search_index(connection) -> int:
+    """Re-index every unified item (e.g. after bulk writes that bypass the ORM)."""
+    from sqlalchemy.orm import Session
+    from src.models.database_models import UnifiedItem
+
+    backend = search_index.backend(connection)
+    if backend is None:
+        return 0
+    table = fts_table if backend == "fts5" else pg_search_table
+    connection.execute(table.delete())
+    session = Session(bind=connection)
+    rows = [{"item_id": item.id, **search_document(item)} for item in session.query(UnifiedItem).all()]
+    if rows:
+        connection.execute(table.insert(), rows)
+    search_index.invalidate(connection)
+    search_index.count("indexed", len(rows))
+    return len(rows)
+
+
+def index_item(connection, item) -> None:
+    """Insert or refresh one item's index row inside the writing transaction."""
+    index_items(connection, [item])
+
+
+def index_items(connection, items: List[Any]) -> None:
+    """Insert or refresh index rows for several items (bulk writes that bypass the ORM)."""
+    backend = search_index.backend(connection)
+    if backend is None or not items:
+        return
+    table = fts_table if backend == "fts5" else pg_search_table
+    connection.execute(table.delete().where(table.c.item_id == bindparam("item_id")),
+                       [{"item_id": item.id} for item in items])
+    connection.execute(table.insert(), [{"item_id": item.id, **search_document(item)} for item in items])
+    search_index.count("indexed", len(items))
+
+
+def remove_item(connection, item) -> None:
+    """Drop one item's index row."""
+    remove_items(connection, [item])
+
+
+def remove_items(connection, items: List[Any]) -> None:
+    """Drop index rows for several items."""
+    backend = search_index.backend(connection)
+    if backend is None or not items:
+        return
+    table = fts_table if backend == "fts5" else pg_search_table
+    connection.execute(table.delete().where(table.c.item_id == bindparam("item_id")),
+                       [{"item_id": item.id} for item in items])
+    search_index.count("removed", len(items))
+
+
+# ============================================================================
+# QUERYING
+# ============================================================================
+
+def query_terms(query: str) -> List[str]:
+    return [term.lower() for term in _TERM_PATTERN.findall(query or "")]
+
+
+def _vocabulary(session, backend: str) -> List[str]:
+    """Indexed terms, reloaded once the cached copy is older than the TTL."""
+    bind = session.get_bind()
+    vocabulary = search_index.cached_vocabulary(bind)
+    if vocabulary is None:
+        if backend == "fts5":
+            sql = f"SELECT term FROM {FTS_TABLE}_vocab"
+        else:
+            sql = f"SELECT word FROM ts_stat('SELECT document FROM {PG_TABLE}')"
+        vocabulary = [row[0] for row in session.execute(text(sql))]
+        search_index.vocabulary[str(bind.engine.url)] = (time.time(), vocabulary)
+        search_index.count("vocabulary_loads")
+    return vocabulary
+
+
+def expand_terms(terms: List[str], vocabulary: List[str]) -> List[List[str]]:
+    """
+    Alternatives per query term: the term itself (as a prefix) plus, when no
+    indexed term starts with it, the closest indexed terms.
+    """
+    expanded = []
+    for term in terms:
+        alternatives = [term]
+        # Indexed terms are stemmed, so "fireball" is known through "firebal"
+        if not any(word.startswith(term) or (term.startswith(word) and len(word) >= len(term) - 2)
+                   for word in vocabulary):
+            close = difflib.get_close_matches(term, vocabulary, n=TYPO_MAX_EXPANSIONS, cutoff=TYPO_CUTOFF)
+            if close:
+                search_index.count("typo_expansions")
+            alternatives.extend(word for word in close if word != term)
+        expanded.append(alternatives)
+    return expanded
+
+
+def _fts5_expression(expanded: List[List[str]], operator: str) -> str:
+    groups = []
+    for alternatives in expanded:
+        options = " OR ".join(f'"{term.replace(chr(34), "")}"*' for term in alternatives)
+        groups.append(f"({options})")
+    return f" {operator} ".join(groups)
+
+
+def _tsquery_expression(expanded: List[List[str]], operator: str) -> str:
+    groups = []
+    for alternatives in expanded:
+        cleaned = [re.sub(r"[^\w]", "", term) for term in alternatives]
+        options = " | ".join(f"{term}:*" for term in cleaned if term)
+        if options:
+            groups.append(f"({options})")
+    return f" {'&' if operator == 'AND' else '|'} ".join(groups)
+
+
+def _filter_sql(filters: Dict[str, Any], classes: Optional[tuple]) -> str:
+    clauses = ["u.is_active = :is_active"]
+    for column in ("item_type", "item_subtype", "spell_level", "spell_school", "source_type", "rarity"):
+        if filters.get(column) is not None:
+            clauses.append(f"u.{column} = :{column}")
+    if classes:
+        clauses.append(classes[0])
+    return " AND ".join(clauses)
+
+
+def _ranked_ids(session, backend: str, expression: str, filters: Dict[str, Any], limit: int,
+                classes: Optional[tuple] = None) -> List[Dict[str, Any]]:
+    params = {k: v for k, v in filters.items() if v is not None}
+    params.update({"is_active": True, "expression": expression, "limit": limit})
+    if classes:
+        params.update(classes[1])
+    where = _filter_sql(filters, classes)
+    if backend == "fts5":
+        weights = ", ".join(str(weight) for weight in FIELD_WEIGHTS.values())
+        sql = f"""
+            SELECT f.item_id AS item_id, -bm25({FTS_TABLE}, 0.0, {weights}) AS score,
+                   highlight({FTS_TABLE}, 1, '{_MATCH_START}', '{_MATCH_END}') AS name_hl,
+                   snippet({FTS_TABLE}, 2, '{_MATCH_START}', '{_MATCH_END}', '…', 16) AS description_hl,
+                   snippet({FTS_TABLE}, 3, '{_MATCH_START}', '{_MATCH_END}', '…', 8) AS keywords_hl
+            FROM {FTS_TABLE} f JOIN unified_items u ON u.id = f.item_id
+            WHERE {FTS_TABLE} MATCH :expression AND {where}
+            ORDER BY bm25({FTS_TABLE}, 0.0, {weights}) LIMIT :limit
+        """
+    else:
+        options = f"StartSel={_MATCH_START}, StopSel={_MATCH_END}, MaxWords=20, MinWords=5"
+        sql = f"""
+            SELECT s.item_id AS item_id,
+                   ts_rank('{{0.1, 0.2, 0.4, 1.0}}', s.document, q) AS score,
+                   ts_headline('english', s.name, q, 'HighlightAll=true, {options}') AS name_hl,
+                   ts_headline('english', coalesce(s.description, ''), q, '{options}') AS description_hl,
+                   ts_headline('english', coalesce(s.keywords, ''), q, '{options}') AS keywords_hl
+            FROM {PG_TABLE} s JOIN unified_items u ON u.id = s.item_id,
+                 to_tsquery('english', :expression) q
+            WHERE s.document @@ q AND {where}
+            ORDER BY score DESC LIMIT :limit
+        """
+    return [dict(row._mapping) for row in session.execute(text(sql), params)]
+
+
+def render_highlight(fragment: Optional[str]) -> Optional[str]:
+    """HTML-escape an index snippet and mark its matches; None if nothing matched."""
+    if not fragment or _MATCH_START not in fragment:
+        return None
+    return html.escape(fragment).replace(_MATCH_START, HIGHLIGHT_START).replace(_MATCH_END, HIGHLIGHT_END)
+
+
+def _ilike_search(session, terms: List[str], filters: Dict[str, Any], limit: int,
+                  class_filter=None) -> List[Dict[str, Any]]:
+    """Fallback without a full-text index: every term in name or description, names first."""
+    from sqlalchemy import and_, or_
+    from src.models.database_models import UnifiedItem
+
+    search_index.count("fallback_searches")
+    query = session.query(UnifiedItem).filter(UnifiedItem.is_active == True)
+    for column, value in filters.items():
+        if value is not None:
+            query = query.filter(getattr(UnifiedItem, column) == value)
+    if class_filter is not None:
+        query = query.filter(class_filter)
+    query = query.filter(and_(*(
+        or_(UnifiedItem.name.ilike(f"%{term}%"), UnifiedItem.short_description.ilike(f"%{term}%"))
+        for term in terms
+    )))
+    results = []
+    for item in query.limit(limit * 4).all():
+        name = (item.name or "").lower()
+        score = sum(3.0 if name.startswith(term) else 2.0 if term in name else 1.0 for term in terms)
+        results.append({"item": item.to_dict(), "score": score, "highlights": {}})
+    results.sort(key=lambda r: (-r["score"], r["item"]["name"]))
+    return results[:limit]
+
+
+def search_catalog(session, query: str, limit: int = 20,
+                   class_restrictions: Optional[List[str]] = None, class_match: str = "all",
+                   **filters) -> List[Dict[str, Any]]:
+    """
+    Ranked full-text search of active catalog items.
+
+    Args:
+        session: SQLAlchemy session
+        query: Free text; each term matches as a prefix, with typo expansion
+            if the prefixes match nothing
+        limit: Maximum number of results
+        class_restrictions: Only items usable by these classes (indexed lookup)
+        class_match: "all" classes or "any" of them
+        **filters: Exact-match filters (item_type, item_subtype, spell_level,
+            spell_school, source_type, rarity)
+
+    Returns:
+        Best match first: {"item": item dict, "score": float, "highlights": {field: snippet}}
+    """
+    from src.models.database_models import UnifiedItem
+    from src.services.catalog_class_index import class_restriction_filter, class_restriction_sql
+
+    terms = query_terms(query)
+    if not terms:
+        return []
+    search_index.count("searches")
+    match_all = class_match != "any"
+    class_filter = class_restriction_filter(class_restrictions, match_all) if class_restrictions else None
+    backend = search_index.backend(session.get_bind())
+    if backend is None:
+        return _ilike_search(session, terms, filters, limit, class_filter)
+
+    try:
+        # A savepoint, so a failed index query leaves the caller's transaction usable
+        with session.begin_nested():
+            classes = class_restriction_sql(class_restrictions, match_all)
+            build = _fts5_expression if backend == "fts5" else _tsquery_expression
+            expanded = [[term] for term in terms]
+            rows = _ranked_ids(session, backend, build(expanded, "AND"), filters, limit, classes)
+            if not rows:
+                # Typo expansion (and the vocabulary it needs) only when prefixes find nothing
+                typo_expanded = expand_terms(terms, _vocabulary(session, backend))
+                if typo_expanded != expanded:
+                    expanded = typo_expanded
+                    rows = _ranked_ids(session, backend, build(expanded, "AND"), filters, limit, classes)
+            if not rows and len(terms) > 1:
+                search_index.count("or_fallbacks")
+                rows = _ranked_ids(session, backend, build(expanded, "OR"), filters, limit, classes)
+    except Exception as e:
+        logger.warning(f"Full-text catalog search failed, using ILIKE: {e}")
+        return _ilike_search(session, terms, filters, limit, class_filter)
+
+    items = {str(item.id): item for item in session.query(UnifiedItem).filter(
+        UnifiedItem.id.in_([str(row["item_id"]) for row in rows])
+    )}
+    results = []
+    for row in rows:
+        item = items.get(str(row["item_id"]))
+        if item is None:
+            continue
+        highlights = {field: render_highlight(row[f"{field}_hl"]) for field in FIELD_WEIGHTS}
+        highlights = {field: fragment for field, fragment in highlights.items() if fragment}
+        results.append({"item": item.to_dict(), "score": round(float(row["score"]), 4), "highlights": highlights})
+    return results
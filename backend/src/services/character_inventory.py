@@ -0,0 +1,299 @@
+"""
+Normalised character inventory: migration of the equipment JSON and benchmark.
+
+CharacterDB's inventory, equip and attunement helpers used to load the whole
+Character.equipment blob, scan its "inventory" list by name, mutate it and
+rewrite the blob with flag_modified() - a full read and write of every item
+for each change, dozens of times a minute during a session. Those three keys
+now live in tables:
+
+    "inventory"       -> character_inventory_items, one row per entry
+                         (item_id primary key, indexed by (character_id, position)
+                         and (character_id, name))
+    "attuned_items"   -> character_inventory_items.attuned_at
+    "equipped_items"  -> character_equipped_slots, one row per (character_id, slot)
+
+Each helper now touches only the rows involved. Everything else in
+Character.equipment is unchanged. Readers that want the old blob shape
+(Character.to_dict(), the evolve context) get it from
+Character.equipment_with_inventory(), which rebuilds the moved keys from the
+tables; list pages rebuild them for every row of the page at once with
+attach_legacy_equipment().
+
+WRITES:
+- CharacterDB.create_character() and update_character() pass equipment
+  through sync_character_equipment(): clients that send the legacy shape back
+  (a GET followed by a PUT) have those keys applied to the tables, matched by
+  item_id, and never stored in the blob again
+
+MIGRATION:
+- migrate_inventory_blobs() moves the keys out of existing blobs in batches,
+  one transaction per batch with the characters locked (FOR UPDATE where the
+  backend has it), and removes them from the blob once their rows exist
+- Only characters whose equipment JSON mentions one of the keys are loaded;
+  migrated characters no longer match, so the startup run is cheap
+- Entries keep their item_id when they have a unique one; entries whose
+  item_id already has a row for the character were moved before and are
+  skipped. Attuned names are matched to the first inventory entry with that
+  name, and ones with no entry become inventory rows of their own, still
+  attuned
+
+Benchmark (300-item inventory, SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.character_inventory --items 300
+
+Usage:
+    moved = ensure_inventory_migrated(engine)
+    sync_character_equipment(db, character, updates["equipment"])
+"""
+
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import String, cast, or_
+
+logger = logging.getLogger(__name__)
+
+LEGACY_KEYS = ("inventory", "equipped_items", "attuned_items")
+
+
+def _entry(item: Any) -> Dict[str, Any]:
+    return dict(item) if isinstance(item, dict) else {"name": str(item)}
+
+
+def legacy_equipment(equipment: Optional[Dict[str, Any]], items: Iterable[Any],
+                     slots: Iterable[Any]) -> Dict[str, Any]:
+    """
+    The equipment JSON in its legacy shape: the stored blob plus "inventory",
+    "attuned_items" and "equipped_items" rebuilt from a character's inventory
+    rows (in position order) and equipped slot rows.
+    """
+    equipment = dict(equipment or {})
+    items = list(items)
+    slots = list(slots)
+    if items:
+        equipment["inventory"] = [item.data for item in items]
+        attuned = sorted((item for item in items if item.attuned_at), key=lambda item: item.attuned_at)
+        if attuned:
+            equipment["attuned_items"] = [item.name for item in attuned]
+    if slots:
+        equipment["equipped_items"] = {slot.slot: slot.item_name for slot in slots}
+    return equipment
+
+
+def attach_legacy_equipment(session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Rebuild the legacy keys in the "equipment" of projected character rows
+    (dicts with "id" and "equipment"), with one query per table for the page.
+    """
+    from src.models.database_models import CharacterInventoryItem, CharacterEquippedSlot
+
+    rows = [row for row in rows if "equipment" in row]
+    if not rows:
+        return
+    ids = [row["id"] for row in rows]
+    items: Dict[str, List[Any]] = {}
+    for item in session.query(CharacterInventoryItem).filter(
+        CharacterInventoryItem.character_id.in_(ids)
+    ).order_by(CharacterInventoryItem.character_id, CharacterInventoryItem.position):
+        items.setdefault(item.character_id, []).append(item)
+    slots: Dict[str, List[Any]] = {}
+    for slot in session.query(CharacterEquippedSlot).filter(CharacterEquippedSlot.character_id.in_(ids)):
+        slots.setdefault(slot.character_id, []).append(slot)
+    for row in rows:
+        row["equipment"] = legacy_equipment(row["equipment"], items.get(row["id"], []), slots.get(row["id"], []))
+
+
+def _item_owners(session, item_ids: Iterable[str]) -> Dict[str, str]:
+    """character_id of existing inventory rows by item_id."""
+    from src.models.database_models import CharacterInventoryItem
+
+    item_ids = list(set(item_ids))
+    if not item_ids:
+        return {}
+    return dict(session.query(CharacterInventoryItem.item_id, CharacterInventoryItem.character_id).filter(
+        CharacterInventoryItem.item_id.in_(item_ids)
+    ).all())
+
+
+def _attunement_time(now: datetime, offset: int) -> datetime:
+    # Attunement order is kept through increasing timestamps
+    return datetime.fromtimestamp(now.timestamp() + offset / 1000)
+
+
+def migrate_character_equipment(session, character) -> int:
+    """
+    Move one character's inventory, equipped slots and attunements from its
+    equipment JSON into the tables. Returns the number of inventory entries moved.
+    """
+    from sqlalchemy import func
+    from src.models.database_models import CharacterInventoryItem, CharacterEquippedSlot
+
+    equipment = dict(character.equipment or {})
+    if not any(key in equipment for key in LEGACY_KEYS):
+        return 0
+
+    now = datetime.utcnow()
+    last_position = session.query(func.max(CharacterInventoryItem.position)).filter(
+        CharacterInventoryItem.character_id == character.id
+    ).scalar()
+    position = (last_position + 1) if last_position is not None else 0
+    entries = [_entry(item) for item in equipment.get("inventory") or []]
+    owners = _item_owners(session, (str(data["item_id"]) for data in entries if data.get("item_id")))
+
+    rows: List[Any] = []
+    taken = set(owners)
+    for data in entries:
+        item_id = str(data["item_id"]) if data.get("item_id") else None
+        if item_id and owners.get(item_id) == character.id:
+            continue  # Already has its row (the blob was written back after an earlier move)
+        if not item_id or item_id in taken:
+            item_id = str(uuid.uuid4())
+        data["item_id"] = item_id
+        taken.add(item_id)
+        rows.append(CharacterInventoryItem(
+            item_id=item_id, character_id=character.id, name=str(data.get("name") or ""),
+            position=position, data=data, requires_attunement=bool(data.get("requires_attunement", False)),
+            added_at=now,
+        ))
+        position += 1
+
+    attuned_names = list(equipment.get("attuned_items") or [])
+    existing = session.query(CharacterInventoryItem).filter(
+        CharacterInventoryItem.character_id == character.id,
+        CharacterInventoryItem.name.in_([str(name) for name in attuned_names])
+    ).order_by(CharacterInventoryItem.position).all() if attuned_names else []
+    already_attuned = [row for row in existing if row.attuned_at is not None]
+    candidates = rows + [row for row in existing if row.attuned_at is None]
+    for offset, name in enumerate(attuned_names):
+        current = next((row for row in already_attuned if row.name == name), None)
+        if current is not None:
+            already_attuned.remove(current)
+            continue
+        match = next((row for row in candidates if row.name == name and row.attuned_at is None), None)
+        if match is None:
+            # The blob allowed attunement to items no longer carried; keep it as an inventory row
+            logger.info(f"Attunement to {name!r} for character {character.id} has no inventory entry; adding one")
+            data = {"name": str(name), "requires_attunement": True, "item_id": str(uuid.uuid4())}
+            match = CharacterInventoryItem(
+                item_id=data["item_id"], character_id=character.id, name=data["name"], position=position,
+                data=data, requires_attunement=True, added_at=now,
+            )
+            rows.append(match)
+            position += 1
+        match.attuned_at = _attunement_time(now, offset)
+
+    session.add_all(rows)
+    for slot, item_name in (equipment.get("equipped_items") or {}).items():
+        session.merge(CharacterEquippedSlot(character_id=character.id, slot=str(slot), item_name=str(item_name)))
+
+    character.equipment = {key: value for key, value in equipment.items() if key not in LEGACY_KEYS}
+    return len(rows)
+
+
+def sync_character_equipment(session, character, equipment: Optional[Dict[str, Any]]) -> None:
+    """
+    Store an equipment JSON written by a client. Legacy keys it carries
+    replace the matching table state: "inventory" entries update the rows with
+    their item_id (others are added, rows not listed are removed),
+    "attuned_items" sets the attuned rows by name and "equipped_items" the
+    slots. Only the remaining keys go into Character.equipment.
+    """
+    from src.models.database_models import CharacterInventoryItem, CharacterEquippedSlot
+
+    equipment = dict(equipment or {})
+    character.equipment = {key: value for key, value in equipment.items() if key not in LEGACY_KEYS}
+    now = datetime.utcnow()
+
+    if "inventory" in equipment:
+        entries = [_entry(item) for item in equipment["inventory"] or []]
+        current = {row.item_id: row for row in character.inventory_items}
+        owners = _item_owners(session, (str(data["item_id"]) for data in entries
+                                        if data.get("item_id") and str(data["item_id"]) not in current))
+        taken = set(owners)
+        kept = []
+        for position, data in enumerate(entries):
+            row = current.pop(str(data["item_id"]), None) if data.get("item_id") else None
+            if row is None:
+                item_id = str(data["item_id"]) if data.get("item_id") else None
+                if not item_id or item_id in taken:
+                    item_id = str(uuid.uuid4())
+                taken.add(item_id)
+                row = CharacterInventoryItem(item_id=item_id, character_id=character.id, added_at=now)
+            elif data != row.data:
+                row.updated_at = now
+            data["item_id"] = row.item_id
+            row.name = str(data.get("name") or "")
+            row.position = position
+            row.data = data
+            row.requires_attunement = bool(data.get("requires_attunement", False))
+            kept.append(row)
+        character.inventory_items = kept  # Rows no longer listed are deleted (delete-orphan)
+
+    if "attuned_items" in equipment:
+        names = [str(name) for name in equipment["attuned_items"] or []]
+        attuned = sorted((row for row in character.inventory_items if row.attuned_at), key=lambda row: row.attuned_at)
+        if [row.name for row in attuned] != names:
+            for row in attuned:
+                row.attuned_at = None
+            for offset, name in enumerate(names):
+                match = next((row for row in character.inventory_items
+                              if row.name == name and row.attuned_at is None), None)
+                if match is None:
+                    data = {"name": name, "requires_attunement": True, "item_id": str(uuid.uuid4())}
+                    match = CharacterInventoryItem(
+                        item_id=data["item_id"], character_id=character.id, name=name,
+                        position=len(character.inventory_items), data=data, requires_attunement=True, added_at=now,
+                    )
+                    character.inventory_items.append(match)
+                match.attuned_at = _attunement_time(now, offset)
+
+    if "equipped_items" in equipment:
+        slots = {str(slot): str(item_name) for slot, item_name in (equipment["equipped_items"] or {}).items()}
+        current_slots = {row.slot: row for row in character.equipped_slots}
+        kept_slots = []
+        for slot, item_name in slots.items():
+            row = current_slots.get(slot) or CharacterEquippedSlot(character_id=character.id, slot=slot)
+            row.item_name = item_name
+            kept_slots.append(row)
+        character.equipped_slots = kept_slots
+
+
+def migrate_inventory_blobs(engine, batch_size: int = 200) -> Dict[str, int]:
+    """Move the legacy keys out of every character's equipment JSON, a batch per transaction."""
+    from sqlalchemy.orm import sessionmaker
+    from src.models.database_models import Character
+
+    Session = sessionmaker(bind=engine)
+    mentions_legacy_key = or_(*(cast(Character.equipment, String).like(f'%"{key}"%') for key in LEGACY_KEYS))
+    results = {"characters": 0, "items": 0}
+    last_id: Optional[str] = None
+    while True:
+        with Session() as session:
+            query = session.query(Character).filter(mentions_legacy_key)
+            if last_id is not None:
+                query = query.filter(Character.id > last_id)
+            batch = query.order_by(Character.id).limit(batch_size).with_for_update().all()
+            if not batch:
+                break
+            for character in batch:
+                # The LIKE prefilter also matches the key names nested deeper in the JSON
+                if any(key in (character.equipment or {}) for key in LEGACY_KEYS):
+                    results["items"] += migrate_character_equipment(session, character)
+                    results["characters"] += 1
+            session.commit()
+            last_id = batch[-1].id
+    return results
+
+
+def ensure_inventory_migrated(engine) -> Dict[str, int]:
+    """migrate_inventory_blobs() for init_database(); failures are logged, not raised."""
+    try:
+        results = migrate_inventory_blobs(engine)
+        if results["characters"]:
+            logger.info(f"Moved {results['items']} inventory items of {results['characters']} characters into tables")
+        return results
+    except Exception as e:
+        logger.warning(f"Could not migrate character inventories: {e}")
+        return {"characters": 0, "items": 0}
@@ -0,0 +1,309 @@
+"""
+Pre-generated NPC and monster pools for instant factory delivery.
+
+Generating an NPC or monster through the LLM takes seconds to minutes, yet most
+requests ask for common roles, challenge ratings and themes. This service keeps
+a small pool of finished objects per (type, role or CR band, theme), refilled
+in the background whenever no factory request is using the LLM. A matching
+request claims a pooled object in milliseconds, then a lightweight pass adapts
+it to the request (challenge rating rebalance plus a short name/description
+rewrite on the small model tier).
+
+CLAIMING:
+- Pools are opt-in per request (use_pool=True) and only serve requests that
+  name their segment: npc_type for NPCs, challenge_rating for monsters. An
+  unsegmented request ("an ancient red dragon") says nothing about the
+  pool's role or CR band, so it is generated normally
+- An NPC request with a challenge_rating is only served from its role's pool
+  when the pooled NPCs are in the same CR band
+
+REFILL:
+- A pool that drops to its low watermark is refilled up to its target size
+- Refill waits for idle LLM capacity (no factory requests in flight) and
+  generates one object at a time
+- Template fallbacks (LLM unavailable) are not pooled; they are instant anyway
+
+Items are not pooled: item creation is not implemented in the factory yet.
+
+Usage:
+    pool = ContentPoolService(factory, ContentPoolService.specs_from_settings(settings))
+    factory.content_pool = pool
+    task = asyncio.create_task(pool.run())
+    npc = await pool.claim("npc", "a nervous gnome innkeeper", theme="high fantasy", npc_type="innkeeper")
+    # factory requests opt in with extra_fields={"use_pool": true, "npc_type": "innkeeper"}
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.services.json_repair import repair_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THEME = "traditional D&D"
+
+# (upper CR bound, band name, representative CR used for pool generation)
+CR_BANDS: List[Tuple[float, str, float]] = [
+    (1, "cr0-1", 1.0),
+    (4, "cr2-4", 3.0),
+    (10, "cr5-10", 7.0),
+    (16, "cr11-16", 13.0),
+    (30, "cr17+", 19.0),
+]
+
+POOLED_TYPES = ("npc", "monster")
+
+# Challenge rating pooled NPCs of a role are generated at (SRD stat block CRs)
+NPC_ROLE_CR: Dict[str, float] = {
+    "commoner": 0.0, "merchant": 0.0, "innkeeper": 0.0, "guard": 0.125, "noble": 0.125,
+    "bandit": 0.125, "cultist": 0.125, "acolyte": 0.25, "scout": 0.5, "thug": 0.5,
+    "spy": 1.0, "priest": 2.0, "knight": 3.0, "veteran": 3.0, "mage": 6.0, "assassin": 8.0,
+}
+DEFAULT_NPC_CR = 0.5
+
+
+def cr_band(challenge_rating: float) -> str:
+    """Name of the CR band a challenge rating falls in."""
+    for upper, name, _ in CR_BANDS:
+        if challenge_rating <= upper:
+            return name
+    return CR_BANDS[-1][1]
+
+
+def _band_cr(band: str) -> float:
+    return next((cr for _, name, cr in CR_BANDS if name == band), 1.0)
+
+
+def npc_role_cr(role: str) -> float:
+    """Challenge rating pooled NPCs of a role are generated at."""
+    return NPC_ROLE_CR.get(_normalize(role), DEFAULT_NPC_CR)
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+@dataclass
+class PoolSpec:
+    """One pool: creation type, segment (NPC role or monster CR band) and theme."""
+    creation_type: str
+    segment: str
+    theme: str = DEFAULT_THEME
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        return (self.creation_type, _normalize(self.segment), _normalize(self.theme))
+
+
+def pool_key(creation_type: str, theme: Optional[str] = None, **params) -> Optional[Tuple[str, str, str]]:
+    """Pool key for a factory request's parameters, or None if they do not name a segment."""
+    if creation_type == "monster":
+        if params.get("challenge_rating") is None:
+            return None
+        segment = cr_band(float(params["challenge_rating"]))
+    else:
+        if not params.get("npc_type"):
+            return None
+        segment = params["npc_type"]
+    return (creation_type, _normalize(segment), _normalize(theme or DEFAULT_THEME))
+
+
+class ContentPoolService:
+    """Warm pools of pre-generated NPCs and monsters with low-watermark refill."""
+
+    def __init__(self, factory, specs: List[PoolSpec], target_size: int = 3,
+                 low_watermark: int = 1, personalize_with_llm: bool = True,
+                 personalize_timeout: float = 8.0, idle_poll: float = 2.0):
+        self.factory = factory
+        self.specs = {spec.key: spec for spec in specs}
+        self.target_size = target_size
+        self.low_watermark = low_watermark
+        self.personalize_with_llm = personalize_with_llm
+        self.personalize_timeout = personalize_timeout
+        self.idle_poll = idle_poll
+        self.pools: Dict[Tuple[str, str, str], Deque[Dict[str, Any]]] = {key: deque() for key in self.specs}
+        # Pools at or below the watermark are refilled all the way to the target
+        self._refilling = set(self.specs)
+        self._wakeup = asyncio.Event()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "unsegmented": 0, "generated": 0, "generation_failures": 0,
+                      "templates_discarded": 0, "personalized_llm": 0, "claim_ms_total": 0.0}
+
+    @classmethod
+    def specs_from_settings(cls, settings) -> List[PoolSpec]:
+        """Cartesian product of content_pool_segments and content_pool_themes."""
+        specs = []
+        for segment in settings.content_pool_segments_list:
+            creation_type, _, name = segment.partition(":")
+            for theme in settings.content_pool_themes_list:
+                specs.append(PoolSpec(creation_type.strip(), name.strip(), theme))
+        return specs
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    # ------------------------------------------------------------------
+    # Claiming
+    # ------------------------------------------------------------------
+
+    def take(self, creation_type: str, theme: Optional[str] = None, **params) -> Optional[Dict[str, Any]]:
+        """
+        Pop a pooled object for the request, or None if the request names no
+        segment, its pool is empty or unknown, or (NPCs) the requested CR is
+        outside the pool's CR band.
+        """
+        key = pool_key(creation_type, theme, **params)
+        if key is None:
+            self._count("unsegmented")
+            return None
+        pool = self.pools.get(key)
+        if (pool and creation_type == "npc" and params.get("challenge_rating") is not None
+                and cr_band(float(params["challenge_rating"])) != cr_band(npc_role_cr(key[1]))):
+            pool = None
+        obj = pool.popleft() if pool else None
+        if obj is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        if len(pool) <= self.low_watermark and key not in self._refilling:
+            self._refilling.add(key)
+            self._wakeup.set()
+        return obj
+
+    async def claim(self, creation_type: str, prompt: str, theme: Optional[str] = None,
+                    **params) -> Optional[Dict[str, Any]]:
+        """Claim and personalise a pooled object for a factory request."""
+        start = time.time()
+        obj = self.take(creation_type, theme, **params)
+        if obj is None:
+            return None
+        self._count("claim_ms_total", (time.time() - start) * 1000)
+        return await self.personalize(creation_type, obj, prompt, **params)
+
+    async def personalize(self, creation_type: str, obj: Dict[str, Any], prompt: str,
+                          **params) -> Dict[str, Any]:
+        """
+        Adapt a pooled object to the request: rebalance for the requested CR, then
+        a short rewrite of name and description on the small model tier.
+        """
+        from src.services.creation_validation import validate_and_enhance_creature
+
+        if creation_type == "monster" and "challenge_rating" in params:
+            challenge_rating = float(params["challenge_rating"])
+            if obj.get("challenge_rating") != challenge_rating:
+                obj["challenge_rating"] = challenge_rating
+                obj = validate_and_enhance_creature(obj, challenge_rating)
+        elif "challenge_rating" in params:
+            obj["challenge_rating"] = float(params["challenge_rating"])
+
+        llm_service = getattr(self.factory, "llm_service", None)
+        if not (self.personalize_with_llm and llm_service and prompt):
+            return obj
+
+        personalize_prompt = f"""Adapt this D&D 5e {creation_type} to the request. Keep its role and stats.
+REQUEST: {prompt}
+CURRENT: {json.dumps({"name": obj.get("name"), "description": obj.get("description")})}
+
+Return ONLY this JSON:
+{{"name":"Name fitting the request","description":"1-2 sentences matching the request"}}"""
+        try:
+            response = await asyncio.wait_for(
+                llm_service.generate_content(
+                    personalize_prompt, max_tokens=200, temperature=0.7,
+                    json_mode=True, stage="pool_personalize"
+                ),
+                self.personalize_timeout
+            )
+            data, _ = repair_json(response, "{")
+            for field in ("name", "description"):
+                if isinstance(data.get(field), str) and data[field].strip():
+                    obj[field] = data[field].strip()
+            self._count("personalized_llm")
+        except Exception as e:
+            logger.debug(f"Pooled {creation_type} personalisation skipped: {e}")
+        return obj
+
+    # ------------------------------------------------------------------
+    # Refill
+    # ------------------------------------------------------------------
+
+    def _next_to_refill(self) -> Optional[PoolSpec]:
+        """The emptiest pool still being refilled, or None if all are full."""
+        for key in [key for key in self._refilling if len(self.pools[key]) >= self.target_size]:
+            self._refilling.discard(key)
+        if not self._refilling:
+            return None
+        key = min(self._refilling, key=lambda k: len(self.pools[k]))
+        return self.specs[key]
+
+    async def _wait_for_idle(self) -> None:
+        """Block while factory requests are using the LLM."""
+        while getattr(self.factory, "active_requests", 0) > 0:
+            await asyncio.sleep(self.idle_poll)
+
+    async def generate(self, spec: PoolSpec) -> Optional[Dict[str, Any]]:
+        """Generate one object for a pool with the factory's LLM path (never a template)."""
+        if not getattr(self.factory, "llm_service", None):
+            self._count("templates_discarded")
+            return None
+        theme_text = "" if _normalize(spec.theme) == _normalize(DEFAULT_THEME) else f" for a {spec.theme} setting"
+        if spec.creation_type == "monster":
+            prompt = f"A memorable monster{theme_text}"
+            return await self.factory._generate_monster_with_llm(prompt, _band_cr(spec.segment), "monstrosity")
+        prompt = f"A memorable {spec.segment}{theme_text}"
+        return await self.factory._generate_npc_with_llm(prompt, npc_role_cr(spec.segment), spec.segment)
+
+    async def refill_once(self) -> bool:
+        """Generate one object for the emptiest refilling pool; False if nothing to do."""
+        spec = self._next_to_refill()
+        if spec is None:
+            return False
+        await self._wait_for_idle()
+        try:
+            obj = await self.generate(spec)
+        except Exception as e:
+            logger.warning(f"Pool generation failed for {spec.key}: {e}")
+            obj = None
+        if obj is None:
+            self._count("generation_failures")
+            # Back off so an unavailable LLM is not hammered
+            await asyncio.sleep(self.idle_poll * 10)
+            return True
+        self.pools[spec.key].append(obj)
+        self._count("generated")
+        return True
+
+    async def run(self) -> None:
+        """Background refill loop; sleeps until a pool hits its low watermark."""
+        logger.info(f"Content pool refill started for {len(self.specs)} pools")
+        while True:
+            try:
+                if await self.refill_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Content pool refill error: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=60)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        claims = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / claims, 4) if claims else 0.0
+        stats["avg_claim_ms"] = round(stats.pop("claim_ms_total") / stats["hits"], 3) if stats["hits"] else 0.0
+        stats["pools"] = {"/".join(key): len(pool) for key, pool in self.pools.items()}
+        stats["target_size"] = self.target_size
+        stats["low_watermark"] = self.low_watermark
+        return stats
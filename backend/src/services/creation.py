@@ -18,6 +18,9 @@ This eliminates code duplication and ensures consistency across all creation typ
 import json
 import logging
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
 from typing import Dict, Any, List, Optional, Union
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
@@ -39,7 +42,12 @@ from src.core.enums import (
 # Import core D&D components
 from src.models.core_models import AbilityScore, ProficiencyLevel, ASIManager, MagicItemManager
 from src.models.character_models import CharacterCore  # DnDCondition, CharacterSheet, CharacterState, CharacterStats - may not exist yet
-from src.services.llm_service import create_llm_service, LLMService
+from src.services.llm_service import create_llm_service, llm_session, retry_scope, LLMService
+from src.services.json_repair import repair_json, build_fix_json_prompt, json_repair_stats
+from src.services.theme_rules import theme_rule_cache, spell_matches_theme, weapon_matches_theme
+from src.services.llm_schemas import (
+    get_content_schema, check_required_fields, is_schema_rejection, structured_output_stats
+)
 from src.models.database_models import CustomContent
 from src.services.ability_management import AdvancedAbilityManager
 from src.services.generators import (
@@ -79,6 +87,7 @@ class CreationConfig:
     max_retries: int = 2
     enable_progress_feedback: bool = True
     auto_save: bool = False
+    json_fix_followup: bool = True  # Ask the LLM to fix malformed JSON before regenerating
 
 class CreationResult:
     """Result container for all creation operations."""
@@ -100,36 +109,102 @@ class CreationResult:
         """Check if the result is valid."""
         return self.success and bool(self.data)
 
+# ============================================================================
+# PER-REQUEST CREATION CONTEXT
+# ============================================================================
+
+@dataclass
+class CreationContext:
+    """
+    Per-request creation state: verbose logs and the custom content registered
+    for this character. Creators hold only shared components, so one instance
+    can serve concurrent requests; each request runs in its own context.
+    """
+    verbose_logs: Optional[List[Dict[str, Any]]] = None  # None unless verbose_generation
+    _content_registry: Optional[ContentRegistry] = None
+    _custom_content_generator: Optional[CustomContentGenerator] = None
+    
+    @property
+    def content_registry(self) -> ContentRegistry:
+        """This request's custom content registry, created on first use."""
+        if self._content_registry is None:
+            self._content_registry = ContentRegistry()
+        return self._content_registry
+    
+    def custom_content_generator(self, llm_service: LLMService) -> CustomContentGenerator:
+        """Custom content generator bound to this request's registry, created on first use."""
+        if self._custom_content_generator is None:
+            self._custom_content_generator = CustomContentGenerator(llm_service, self.content_registry)
+        return self._custom_content_generator
+
+
+current_creation_context: ContextVar[Optional[CreationContext]] = ContextVar("current_creation_context", default=None)
+
+
+@contextmanager
+def creation_context(context: Optional[CreationContext] = None):
+    """Run creator calls in a request context (a fresh one unless given)."""
+    context = context or CreationContext()
+    token = current_creation_context.set(context)
+    try:
+        yield context
+    finally:
+        current_creation_context.reset(token)
+
+
+@lru_cache(maxsize=1)
+def _default_llm_service() -> LLMService:
+    """Fallback service for creators built without one; created once per process."""
+    return create_llm_service("ollama", model="tinyllama:latest", timeout=300)
+
 # ============================================================================
 # BASE CREATOR CLASS - FOUNDATION FOR ALL CONTENT TYPES
 # ============================================================================
 
+# Content that depends only on shared inputs (e.g. the theme), so concurrent
+# duplicates may share one LLM call regardless of temperature
+COALESCED_CONTENT_TYPES = {"theme_spell_logic", "theme_weapon_logic"}
+
+
 class BaseCreator(ABC):
     """
     Base creator class that provides core functionality for all content types.
     Character creation contains the complete feature set, while other creators
     use subsets of this functionality.
+    
+    Creators are stateless and reusable: per-request state (verbose logs,
+    registered custom content) lives in the current CreationContext.
     """
     
     def __init__(self, llm_service: Optional[LLMService] = None, 
                  config: Optional[CreationConfig] = None):
-        self.llm_service = llm_service or create_llm_service("ollama", model="tinyllama:latest", timeout=300)
+        self.llm_service = llm_service or _default_llm_service()
         self.config = config or CreationConfig()
         
-        # Core shared components used by all content types
-        self.backstory_generator = BackstoryGenerator(self.llm_service)
-        self.content_registry = ContentRegistry()
-        self.custom_content_generator = CustomContentGenerator(self.llm_service, self.content_registry)
-        
-        # Advanced integrated generators for comprehensive content creation
         # TODO: Implement CharacterGenerator, CreatureGenerator, ItemGenerator
-        # self.character_generator = CharacterGenerator(self.llm_service, self.content_registry)
-        self.npc_generator = NPCGenerator(self.llm_service, self.content_registry)
-        # self.creature_generator = CreatureGenerator(self.llm_service, self.content_registry)
-        # self.item_generator = ItemGenerator(self.llm_service)
         
         logger.info(f"{self.__class__.__name__} initialized with shared components")
     
+    @property
+    def verbose_logs(self) -> List[Dict[str, Any]]:
+        """Verbose logs of the current request; absent unless verbose_generation is on."""
+        context = current_creation_context.get()
+        if context is None or context.verbose_logs is None:
+            raise AttributeError("verbose_logs")
+        return context.verbose_logs
+    
+    @property
+    def content_registry(self) -> ContentRegistry:
+        """Custom content registered by the current request."""
+        context = current_creation_context.get()
+        return context.content_registry if context else ContentRegistry()
+    
+    @property
+    def custom_content_generator(self) -> CustomContentGenerator:
+        """Custom content generator for the current request."""
+        context = current_creation_context.get() or CreationContext()
+        return context.custom_content_generator(self.llm_service)
+    
     async def _generate_with_llm(self, prompt: str, content_type: str = "content") -> Dict[str, Any]:
         """
         Core LLM generation method used by all content types.
@@ -137,91 +212,143 @@ class BaseCreator(ABC):
         """
         import time
         
-        for attempt in range(self.config.max_retries):
-            try:
-                start_time = time.time()
-                logger.info(f"LLM generation attempt {attempt + 1}/{self.config.max_retries} for {content_type}")
-                
-                # Log the prompt being sent for verbose mode
-                if hasattr(self, 'verbose_logs'):
-                    self.verbose_logs.append({
-                        'type': 'llm_request',
-                        'timestamp': time.time(),
-                        'content_type': content_type,
-                        'attempt': attempt + 1,
-                        'prompt': prompt,
-                        'prompt_length': len(prompt)
-                    })
-                
-                response = await self.llm_service.generate_content(prompt)
-                generation_time = time.time() - start_time
-                
-                cleaned_response = self._clean_json_response(response)
-                data = json.loads(cleaned_response)
-                
-                # Log the response for verbose mode
-                if hasattr(self, 'verbose_logs'):
-                    self.verbose_logs.append({
-                        'type': 'llm_response',
-                        'timestamp': time.time(),
-                        'content_type': content_type,
-                        'attempt': attempt + 1,
-                        'raw_response': response,
-                        'cleaned_response': cleaned_response,
-                        'parsed_data': data,
-                        'response_length': len(response),
-                        'generation_time': generation_time,
-                        'success': True
-                    })
-                
-                logger.info(f"LLM generation successful for {content_type} in {generation_time:.2f}s")
-                return data
-                
-            except (json.JSONDecodeError, Exception) as e:
-                generation_time = time.time() - start_time
-                
-                # Log the failure for verbose mode
-                if hasattr(self, 'verbose_logs'):
-                    self.verbose_logs.append({
-                        'type': 'llm_error',
-                        'timestamp': time.time(),
-                        'content_type': content_type,
-                        'attempt': attempt + 1,
-                        'error': str(e),
-                        'generation_time': generation_time,
-                        'success': False
-                    })
-                
-                logger.warning(f"LLM generation attempt {attempt + 1} failed in {generation_time:.2f}s: {e}")
-                if attempt == self.config.max_retries - 1:
-                    raise e
+        # One retry budget for this call and the provider underneath it
+        with retry_scope() as retry_policy:
+            for attempt in range(self.config.max_retries):
+                try:
+                    start_time = time.time()
+                    logger.info(f"LLM generation attempt {attempt + 1}/{self.config.max_retries} for {content_type}")
+                    
+                    # Log the prompt being sent for verbose mode
+                    if hasattr(self, 'verbose_logs'):
+                        self.verbose_logs.append({
+                            'type': 'llm_request',
+                            'timestamp': time.time(),
+                            'content_type': content_type,
+                            'attempt': attempt + 1,
+                            'retries': retry_policy.retries,
+                            'prompt': prompt,
+                            'prompt_length': len(prompt)
+                        })
+                    
+                    response = await self._request_llm_json(prompt, content_type)
+                    generation_time = time.time() - start_time
+                    
+                    data, repairs = await self._parse_llm_json(response, content_type)
+                    cleaned_response = json.dumps(data)
+                    
+                    # Log the response for verbose mode
+                    if hasattr(self, 'verbose_logs'):
+                        self.verbose_logs.append({
+                            'type': 'llm_response',
+                            'timestamp': time.time(),
+                            'content_type': content_type,
+                            'attempt': attempt + 1,
+                            'retries': retry_policy.retries,
+                            'raw_response': response,
+                            'cleaned_response': cleaned_response,
+                            'parsed_data': data,
+                            'json_repairs': repairs,
+                            'response_length': len(response),
+                            'generation_time': generation_time,
+                            'success': True
+                        })
+                    
+                    logger.info(f"LLM generation successful for {content_type} in {generation_time:.2f}s")
+                    return data
+                    
+                except (json.JSONDecodeError, Exception) as e:
+                    generation_time = time.time() - start_time
+                    
+                    # Log the failure for verbose mode
+                    if hasattr(self, 'verbose_logs'):
+                        self.verbose_logs.append({
+                            'type': 'llm_error',
+                            'timestamp': time.time(),
+                            'content_type': content_type,
+                            'attempt': attempt + 1,
+                            'retries': retry_policy.retries,
+                            'error': str(e),
+                            'generation_time': generation_time,
+                            'success': False
+                        })
+                    
+                    logger.warning(f"LLM generation attempt {attempt + 1} failed in {generation_time:.2f}s: {e}")
+                    # Parse failures, 429s, 5xx and timeouts draw on the request's shared retry budget
+                    if attempt == self.config.max_retries - 1 or not await retry_policy.retry(e, "creator"):
+                        raise e
+            
+            raise Exception(f"All LLM generation attempts failed for {content_type}")
+    
+    async def _request_llm_json(self, prompt: str, content_type: str) -> str:
+        """
+        Request JSON using the provider's native structured-output mode.
+        Content types with a known shape are schema-constrained; everything else
+        uses plain JSON mode. Falls back to an unconstrained request if the
+        provider rejects structured output.
+        """
+        schema = get_content_schema(content_type)
+        structured = {"json_schema": schema} if schema else {"json_mode": True}
+        # Identical concurrent requests for theme-wide content share one upstream call,
+        # and stay out of the character's session since the result is shared
+        coalesce = {"coalesce": True, "session": None} if content_type in COALESCED_CONTENT_TYPES else {}
+        try:
+            return await self.llm_service.generate_content(prompt, stage=content_type, **structured, **coalesce)
+        except Exception as e:
+            if not is_schema_rejection(e):
+                raise
+            logger.warning(f"Structured output rejected for {content_type} ({e}), retrying unconstrained")
+            structured_output_stats.record(content_type, "schema_rejected")
+            return await self.llm_service.generate_content(prompt, stage=content_type, **coalesce)
+    
+    async def _parse_llm_json(self, response: str, content_type: str = "content"):
+        """
+        Parse an LLM response as JSON without regenerating it where possible.
         
-        raise Exception(f"All LLM generation attempts failed for {content_type}")
+        Malformed JSON is first repaired locally; if that fails a short "fix this
+        JSON" follow-up is sent instead of re-running the full generation prompt.
+        Returns (data, repairs) and raises ValueError if both steps fail.
+        """
+        try:
+            data, repairs = repair_json(response, "{")
+            json_repair_stats.record("repaired_locally" if repairs else "clean", repairs)
+            if repairs:
+                logger.info(f"Repaired LLM JSON for {content_type}: {', '.join(repairs)}")
+            self._record_structured_output(data, repairs, content_type)
+            return data, repairs
+        except ValueError as e:
+            if not self.config.json_fix_followup or not response or not response.strip():
+                json_repair_stats.record("failed")
+                structured_output_stats.record(content_type, "parse_error")
+                raise
+            logger.warning(f"Local JSON repair failed for {content_type} ({e}), requesting targeted fix")
+        
+        try:
+            fixed_response = await self.llm_service.generate_content(
+                build_fix_json_prompt(response.strip()), json_mode=True, stage="json_fix"
+            )
+            data, repairs = repair_json(fixed_response, "{")
+            json_repair_stats.record("repaired_by_llm", repairs + ["llm_followup"])
+            self._record_structured_output(data, repairs + ["llm_followup"], content_type)
+            return data, repairs + ["llm_followup"]
+        except Exception as e:
+            json_repair_stats.record("failed")
+            structured_output_stats.record(content_type, "parse_error")
+            raise ValueError(f"Could not parse JSON for {content_type}: {e}")
+    
+    def _record_structured_output(self, data: Any, repairs: List[str], content_type: str):
+        """Post-validate parsed output against its schema and record the outcome."""
+        missing = check_required_fields(data, get_content_schema(content_type))
+        if missing:
+            logger.warning(f"LLM {content_type} output missing required fields: {missing}")
+            structured_output_stats.record(content_type, "missing_fields")
+        else:
+            structured_output_stats.record(content_type, "repaired" if repairs else "valid")
     
     def _clean_json_response(self, response: str) -> str:
         """Clean and extract JSON from LLM response - shared by all creators."""
-        if not response:
-            raise ValueError("Empty response")
-        
-        # Remove markdown and find JSON boundaries
-        response = response.replace('```json', '').replace('```', '').strip()
-        
-        first_brace = response.find('{')
-        last_brace = response.rfind('}')
-        
-        if first_brace == -1 or last_brace == -1:
-            raise ValueError("No JSON found in response")
-        
-        json_str = response[first_brace:last_brace + 1]
-        
-        # Basic JSON repair
-        open_braces = json_str.count('{')
-        close_braces = json_str.count('}')
-        
-        if open_braces > close_braces:
-            json_str += '}' * (open_braces - close_braces)
-        
-        return json_str
+        data, _ = repair_json(response, "{")
+        return json.dumps(data)
     
     def _extract_character_concept(self, character_data: Dict[str, Any]) -> str:
         """Extract character concept - used by all content types."""
@@ -500,12 +627,21 @@ class CharacterCreator(BaseCreator):
         Create a complete D&D 5e 2024 character with full features.
         This is the most comprehensive creation method.
         """
+        verbose_generation = user_preferences.get("verbose_generation", False) if user_preferences else False
+        context = CreationContext(verbose_logs=[] if verbose_generation else None)
+        
+        # One LLM session per character so local models reuse the context of earlier stages
+        with llm_session(), creation_context(context):
+            return await self._create_character_in_session(prompt, user_preferences, import_existing)
+    
+    async def _create_character_in_session(self, prompt: str, user_preferences: Optional[Dict[str, Any]] = None,
+                                           import_existing: Optional[Dict[str, Any]] = None) -> CreationResult:
+        """Character creation pipeline; see create_character."""
         start_time = time.time()
         
         # Initialize verbose logging if requested
         verbose_generation = user_preferences.get("verbose_generation", False) if user_preferences else False
         if verbose_generation:
-            self.verbose_logs = []
             self.verbose_logs.append({
                 'type': 'creation_start',
                 'timestamp': time.time(),
@@ -1159,7 +1295,7 @@ Match the character concept exactly. Return complete JSON only."""
             
             # Apply theme-aware spell filtering if theme is provided
             if theme:
-                suggested_spells = await self._filter_spells_by_theme(suggested_spells, theme, character_data)
+                suggested_spells = self._filter_spells_by_theme(suggested_spells, theme, character_data)
             
             # If character already has spells, validate and enhance them
             existing_spells = character_data.get("spells_known", [])
@@ -1437,7 +1573,7 @@ THEME CONSIDERATIONS:
 
 Return complete JSON with exactly {count} spells."""
 
-            response_data = await self._generate_with_llm(prompt, f"thematic_spells_{theme}")
+            response_data = await self._generate_with_llm(prompt, "thematic_spells")
             
             if isinstance(response_data, dict) and "spells" in response_data:
                 spells = response_data["spells"]
@@ -1471,30 +1607,24 @@ Return complete JSON with exactly {count} spells."""
             logger.warning(f"Failed to generate thematic spells for '{theme}': {e}")
             return []
 
-    async def _filter_spells_by_theme(self, spells: List[Dict[str, Any]], theme: str, character_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _filter_spells_by_theme(self, spells: List[Dict[str, Any]], theme: str, character_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
-        Filter and prioritize spells based on campaign theme using LLM-generated theme logic.
+        Filter and prioritize spells based on campaign theme using compiled theme rules.
         Theme is suggestive - enhances spell selection but doesn't override character concept.
+        Pure in-memory lookup; unknown themes are compiled in the background.
         """
         if not theme or not spells:
             return spells
         
         try:
-            # Generate theme-appropriate filtering logic using LLM
-            theme_logic = await self._generate_theme_spell_logic(theme, character_data)
-            
-            if not theme_logic:
-                logger.info(f"Could not generate theme logic for '{theme}', using all spells")
-                return spells
+            rule = theme_rule_cache.get_rule("spell", theme, self)
             
             themed_spells = []
             other_spells = []
             
-            # Apply LLM-generated theme logic to filter spells
+            # Apply compiled theme rule to filter spells
             for spell in spells:
-                is_themed = self._evaluate_spell_for_theme(spell, theme_logic)
-                
-                if is_themed:
+                if rule.matches(spell):
                     themed_spells.append(spell)
                 else:
                     other_spells.append(spell)
@@ -1503,9 +1633,9 @@ Return complete JSON with exactly {count} spells."""
             filtered_spells = themed_spells + other_spells
             
             if themed_spells:
-                logger.info(f"Theme '{theme}' filtering: {len(themed_spells)} themed spells prioritized, {len(other_spells)} standard spells available")
+                logger.info(f"Theme '{theme}' filtering ({rule.source}): {len(themed_spells)} themed spells prioritized, {len(other_spells)} standard spells available")
             else:
-                logger.info(f"Theme '{theme}' filtering: No specific themed spells found, using all {len(spells)} spells")
+                logger.info(f"Theme '{theme}' filtering ({rule.source}): No specific themed spells found, using all {len(spells)} spells")
             
             return filtered_spells
             
@@ -1600,30 +1730,24 @@ Return complete JSON with exactly {count} spells."""
             logger.warning(f"Weapon enhancement failed: {e}")
             return character_data
 
-    async def _filter_weapons_by_theme(self, weapons: List[Dict[str, Any]], theme: str, character_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _filter_weapons_by_theme(self, weapons: List[Dict[str, Any]], theme: str, character_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
-        Filter and prioritize weapons based on campaign theme using LLM-generated theme logic.
+        Filter and prioritize weapons based on campaign theme using compiled theme rules.
         Theme is suggestive - enhances weapon selection but doesn't override character concept.
+        Pure in-memory lookup; unknown themes are compiled in the background.
         """
         if not theme or not weapons:
             return weapons
         
         try:
-            # Generate theme-appropriate filtering logic using LLM
-            theme_logic = await self._generate_theme_weapon_logic(theme, character_data)
-            
-            if not theme_logic:
-                logger.info(f"Could not generate weapon theme logic for '{theme}', using all weapons")
-                return weapons
+            rule = theme_rule_cache.get_rule("weapon", theme, self)
             
             themed_weapons = []
             other_weapons = []
             
-            # Apply LLM-generated theme logic to filter weapons
+            # Apply compiled theme rule to filter weapons
             for weapon in weapons:
-                is_themed = self._evaluate_weapon_for_theme(weapon, theme_logic)
-                
-                if is_themed:
+                if rule.matches(weapon):
                     themed_weapons.append(weapon)
                 else:
                     other_weapons.append(weapon)
@@ -1632,9 +1756,9 @@ Return complete JSON with exactly {count} spells."""
             filtered_weapons = themed_weapons + other_weapons
             
             if themed_weapons:
-                logger.info(f"Theme '{theme}' filtering: {len(themed_weapons)} themed weapons prioritized, {len(other_weapons)} standard weapons available")
+                logger.info(f"Theme '{theme}' filtering ({rule.source}): {len(themed_weapons)} themed weapons prioritized, {len(other_weapons)} standard weapons available")
             else:
-                logger.info(f"Theme '{theme}' filtering: No specific themed weapons found, using all {len(weapons)} weapons")
+                logger.info(f"Theme '{theme}' filtering ({rule.source}): No specific themed weapons found, using all {len(weapons)} weapons")
             
             return filtered_weapons
             
@@ -2008,27 +2132,7 @@ Return complete JSON only."""
         Evaluate if a spell matches the theme using LLM-generated logic.
         """
         try:
-            spell_name = spell.get("name", "").lower()
-            spell_desc = spell.get("description", "").lower()
-            spell_school = spell.get("school", "").lower()
-            
-            # Check keywords in spell name and description
-            keywords = theme_logic.get("keywords", [])
-            if any(keyword.lower() in spell_name or keyword.lower() in spell_desc for keyword in keywords):
-                return True
-            
-            # Check school preferences
-            preferred_schools = theme_logic.get("schools", [])
-            if spell_school in [school.lower() for school in preferred_schools]:
-                return True
-            
-            # Avoid certain schools if specified
-            avoid_schools = theme_logic.get("avoid", [])
-            if spell_school in [school.lower() for school in avoid_schools]:
-                return False
-            
-            return False
-            
+            return spell_matches_theme(spell, theme_logic)
         except Exception as e:
             logger.warning(f"Error evaluating spell for theme: {e}")
             return False
@@ -2038,30 +2142,7 @@ Return complete JSON only."""
         Evaluate if a weapon matches the theme using LLM-generated logic.
         """
         try:
-            weapon_name = weapon.get("name", "").lower()
-            weapon_desc = weapon.get("description", "").lower()
-            weapon_type = weapon.get("type", "").lower()
-            weapon_category = weapon.get("category", "").lower()
-            
-            # Check keywords in weapon name and description
-            keywords = theme_logic.get("keywords", [])
-            if any(keyword.lower() in weapon_name or keyword.lower() in weapon_desc for keyword in keywords):
-                return True
-            
-            # Check type preferences
-            preferred_types = theme_logic.get("types", [])
-            if any(weapon_type_pref.lower() in weapon_type or weapon_type_pref.lower() in weapon_category 
-                   for weapon_type_pref in preferred_types):
-                return True
-            
-            # Avoid certain types if specified
-            avoid_types = theme_logic.get("avoid", [])
-            if any(avoid_type.lower() in weapon_name or avoid_type.lower() in weapon_desc or avoid_type.lower() in weapon_type 
-                   for avoid_type in avoid_types):
-                return False
-            
-            return False
-            
+            return weapon_matches_theme(weapon, theme_logic)
         except Exception as e:
             logger.warning(f"Error evaluating weapon for theme: {e}")
             return False
@@ -40,12 +40,15 @@ from typing import Dict, Any, Optional, Type, List
 from dataclasses import dataclass
 import json
 import re
+import time
 import logging
 
 from src.core.enums import CreationOptions
 from src.models.character_models import CharacterCore
 from src.services.creation import CharacterCreator
 from src.services.generators import CustomContentGenerator
+from src.services.prompt_serializer import compact_context
+from src.services.speculative_creation import FAST_MODE, race_against_template
 
 logger = logging.getLogger(__name__)
 
@@ -72,11 +75,18 @@ class CreationFactory:
     interface for creating characters, monsters, NPCs, items, etc.
     """
     
-    def __init__(self, llm_service=None, database=None):
+    def __init__(self, llm_service=None, database=None, content_pool=None):
         self.llm_service = llm_service
         self.database = database
         self._configs = self._build_creation_configs()
         self.last_verbose_logs = []  # Store verbose logs from last creation
+        # Pre-generated NPC/monster pools (ContentPoolService); refilled while no request is active
+        self.content_pool = content_pool
+        self.active_requests = 0
+        self._npc_generator = None  # Deterministic NPC builders for fast mode, created on first use
+        # One stateless CharacterCreator shared by all requests (state lives in a CreationContext)
+        self._character_creator = None
+        self.creator_stats = {"constructed": 0, "reused": 0, "construction_ms": 0.0}
     
     def _build_creation_configs(self) -> Dict[CreationOptions, CreationConfig]:
         """Build mapping of creation types to their required components."""
@@ -136,6 +146,24 @@ class CreationFactory:
         """Get the configuration for a specific creation type."""
         return self._configs.get(creation_type)
     
+    @property
+    def character_creator(self) -> CharacterCreator:
+        """Shared CharacterCreator, constructed on first use and reused for every request."""
+        if self._character_creator is None:
+            start = time.perf_counter()
+            self._character_creator = CharacterCreator(self.llm_service)
+            self.creator_stats["constructed"] += 1
+            self.creator_stats["construction_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        else:
+            self.creator_stats["reused"] += 1
+        return self._character_creator
+    
+    def get_creator_stats(self) -> Dict[str, Any]:
+        """Creator reuse counts and the construction time each reuse avoids."""
+        stats = dict(self.creator_stats)
+        stats["construction_ms_saved"] = round(stats["reused"] * stats["construction_ms"], 3)
+        return stats
+    
     async def create_from_scratch(self, creation_type: CreationOptions, prompt: str, **kwargs) -> Any:
         """
         Create a D&D object from scratch using LLM generation.
@@ -158,6 +186,35 @@ class CreationFactory:
         if theme:
             logger.info(f"Creating {creation_type.value} with theme: {theme}")
         
+        # Type-specific parameters (npc_type, challenge_rating, ...) may arrive in extra_fields
+        kwargs = {**(kwargs.get('extra_fields') or {}), **kwargs}
+        
+        self.active_requests += 1
+        try:
+            return await self._route_create(creation_type, prompt, **kwargs)
+        finally:
+            self.active_requests -= 1
+    
+    async def _route_create(self, creation_type: CreationOptions, prompt: str, **kwargs) -> Any:
+        """
+        Route a from-scratch request. NPCs and monsters are served from the pools
+        when the request opts in (use_pool=True) and names its segment.
+        """
+        if (self.content_pool and kwargs.get('use_pool', False)
+                and creation_type in (CreationOptions.MONSTER, CreationOptions.NPC)):
+            pool_params = {k: kwargs[k] for k in ('npc_type', 'challenge_rating') if k in kwargs}
+            pooled = await self.content_pool.claim(
+                creation_type.value, prompt, kwargs.get('theme'), **pool_params
+            )
+            if pooled is not None:
+                logger.info(f"Served {creation_type.value} from pre-generated pool")
+                return pooled
+        
+        # Fast mode: race a deterministic template against the LLM under a latency SLO
+        if (kwargs.get('response_mode') == FAST_MODE and self.llm_service
+                and creation_type in (CreationOptions.MONSTER, CreationOptions.NPC)):
+            return await self._create_speculative(creation_type, prompt, **kwargs)
+        
         # Route to appropriate creation method
         if creation_type == CreationOptions.CHARACTER:
             return await self._create_character_from_scratch(prompt, **kwargs)
@@ -171,6 +228,59 @@ class CreationFactory:
         else:
             raise ValueError(f"Creation not implemented for: {creation_type}")
     
+    async def _create_speculative(self, creation_type: CreationOptions, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Build the deterministic NPC/monster template immediately and race it against the LLM.
+        
+        Returns the LLM result if it arrives within the SLO, otherwise the template
+        with a generation.upgrade_id under which the LLM result can be fetched later.
+        """
+        start = time.time()
+        challenge_rating = float(kwargs.get('challenge_rating', 1.0 if creation_type == CreationOptions.MONSTER else 0.5))
+        if creation_type == CreationOptions.MONSTER:
+            creature_type = kwargs.get('creature_type', 'monstrosity')
+            template = self._create_basic_monster_template(prompt, challenge_rating, creature_type)
+            llm_call = self._generate_monster_with_llm(prompt, challenge_rating, creature_type)
+        else:
+            npc_role = kwargs.get('npc_type', 'commoner')
+            template = self._create_speculative_npc_template(prompt, challenge_rating, npc_role)
+            llm_call = self._generate_npc_with_llm(prompt, challenge_rating, npc_role)
+        template_ms = (time.time() - start) * 1000
+        
+        slo_seconds = kwargs.get('slo_seconds')
+        if slo_seconds is None:
+            from src.core.config import settings
+            slo_seconds = settings.fast_mode_slo_seconds
+        
+        return await race_against_template(
+            self._track_active(llm_call), template, float(slo_seconds),
+            creation_type.value, template_ms=template_ms
+        )
+    
+    async def _track_active(self, coro):
+        """Count a (possibly backgrounded) LLM call as active so pool refills wait for it."""
+        self.active_requests += 1
+        try:
+            return await coro
+        finally:
+            self.active_requests -= 1
+    
+    def _create_speculative_npc_template(self, prompt: str, challenge_rating: float, npc_role: str) -> Dict[str, Any]:
+        """Basic NPC template with the NPC generator's CR stats and fallback roleplay."""
+        if self._npc_generator is None:
+            from src.services.generators import NPCGenerator
+            from src.models.custom_content_models import ContentRegistry
+            self._npc_generator = NPCGenerator(self.llm_service, ContentRegistry())
+        
+        npc = self._create_basic_npc_template(prompt, challenge_rating, npc_role)
+        stats = self._npc_generator._generate_npc_stats_for_cr(npc_role, challenge_rating)
+        roleplay = self._npc_generator._get_fallback_npc_roleplay(npc_role, prompt)
+        if isinstance(npc.get("abilities"), dict):
+            npc["abilities"].update({name.lower(): value for name, value in stats.items()})
+        npc["name"] = roleplay["name"]
+        npc["roleplay"] = roleplay
+        return npc
+    
     async def evolve_existing(self, creation_type: CreationOptions, existing_data: Dict[str, Any], 
                              evolution_prompt: str, **kwargs) -> Any:
         """
@@ -196,14 +306,18 @@ class CreationFactory:
             logger.info(f"Evolving {creation_type.value} with theme context: {theme}")
         
         # Route to appropriate evolution method
-        if creation_type == CreationOptions.CHARACTER:
-            return await self._evolve_character(existing_data, evolution_prompt, **kwargs)
-        elif creation_type == CreationOptions.MONSTER:
-            return await self._evolve_monster(existing_data, evolution_prompt, **kwargs)
-        elif creation_type == CreationOptions.NPC:
-            return await self._evolve_npc(existing_data, evolution_prompt, **kwargs)
-        else:
-            raise ValueError(f"Evolution not supported for: {creation_type}")
+        self.active_requests += 1
+        try:
+            if creation_type == CreationOptions.CHARACTER:
+                return await self._evolve_character(existing_data, evolution_prompt, **kwargs)
+            elif creation_type == CreationOptions.MONSTER:
+                return await self._evolve_monster(existing_data, evolution_prompt, **kwargs)
+            elif creation_type == CreationOptions.NPC:
+                return await self._evolve_npc(existing_data, evolution_prompt, **kwargs)
+            else:
+                raise ValueError(f"Evolution not supported for: {creation_type}")
+        finally:
+            self.active_requests -= 1
     
     # Legacy method for backward compatibility
     def create(self, creation_type: CreationOptions, **kwargs) -> Any:
@@ -220,7 +334,7 @@ class CreationFactory:
         This includes generating the character's core stats, equipment (weapons, armor),
         spells (if applicable), and other items as a complete package.
         """
-        creator = CharacterCreator(self.llm_service)
+        creator = self.character_creator
         
         # Extract theme parameter for character creation
         theme = kwargs.get('theme')
@@ -259,7 +373,7 @@ class CreationFactory:
         3. Respect character's established personality and goals
         4. Equipment/spell changes should be story-driven
         """
-        creator = CharacterCreator(self.llm_service)
+        creator = self.character_creator
         
         # Extract theme parameter for evolution context
         theme = kwargs.get('theme')
@@ -274,27 +388,38 @@ class CreationFactory:
             user_preferences['theme'] = theme
             logger.info(f"Evolving character with theme context: {theme}")
         
+        # Embed the existing character compactly; journal entries get their own budget
+        # so a long campaign log cannot crowd out the character itself
+        preserve_backstory = kwargs.get('preserve_backstory', True)
+        character_section = dict(existing_data)
+        if not preserve_backstory:
+            character_section.pop('backstory', None)
+        sections = {"character": character_section}
+        
         if evolution_type == 'refine':
-            # Iterative refinement
-            result = await creator.refine_character(
-                existing_data, 
-                evolution_prompt, 
-                user_preferences
-            )
+            instruction = f"Refine this character: {evolution_prompt}"
         elif evolution_type == 'level_up':
-            # Level up using journal
-            journal_entries = kwargs.get('journal_entries', [])
             new_level = kwargs.get('new_level', existing_data.get('level', 1) + 1)
             multiclass = kwargs.get('multiclass_option')
-            result = await creator.level_up_character_with_journal(
-                existing_data, journal_entries, new_level, multiclass
-            )
+            sections["journal"] = kwargs.get('journal_entries', [])
+            user_preferences = {**user_preferences, 'level': new_level}
+            instruction = f"Level this character up to level {new_level}"
+            if multiclass:
+                instruction += f", multiclassing into {multiclass}"
+            instruction += f", guided by their journal. {evolution_prompt}"
         else:
-            # General enhancement
-            preserve_backstory = kwargs.get('preserve_backstory', True)
-            result = await creator.enhance_existing_character(
-                existing_data, evolution_prompt, preserve_backstory
-            )
+            instruction = evolution_prompt
+        if preserve_backstory:
+            instruction += "\nPreserve the existing backstory; only append new experiences."
+        
+        character_context = compact_context(
+            sections, flow="evolve_character", budgets={"character": 800, "journal": 400}
+        )
+        result = await creator.create_character(
+            f"Based on this existing character:\n{character_context}\n{instruction}",
+            user_preferences,
+            import_existing=existing_data
+        )
         
         if result.success:
             # Store verbose logs for later retrieval
@@ -313,8 +438,28 @@ class CreationFactory:
             challenge_rating = float(kwargs.get('challenge_rating', 1.0))
             creature_type = kwargs.get('creature_type', 'monstrosity')
             
-            # Use LLM to generate monster based on prompt
-            monster_prompt = f"""Create a D&D 5e monster based on this description: {prompt}
+            # Use the LLM service if available
+            if self.llm_service:
+                try:
+                    return await self._generate_monster_with_llm(prompt, challenge_rating, creature_type)
+                except Exception as llm_error:
+                    logger.debug(f"LLM generation failed with error: {llm_error}")
+                    # Fall through to basic template
+                    return self._create_basic_monster_template(prompt, challenge_rating, creature_type)
+            
+            else:
+                logger.debug("No LLM service available, using basic template")
+                # Fallback: create a basic monster template
+                return self._create_basic_monster_template(prompt, challenge_rating, creature_type)
+                
+        except Exception as e:
+            # Return a basic template if generation fails
+            return self._create_basic_monster_template(prompt, kwargs.get('challenge_rating', 1.0), kwargs.get('creature_type', 'monstrosity'))
+    
+    async def _generate_monster_with_llm(self, prompt: str, challenge_rating: float, creature_type: str) -> Dict[str, Any]:
+        """Generate and validate a monster with the LLM; raises if generation fails."""
+        # Use LLM to generate monster based on prompt
+        monster_prompt = f"""Create a D&D 5e monster based on this description: {prompt}
 
 Challenge Rating: {challenge_rating}
 Creature Type: {creature_type}
@@ -360,51 +505,18 @@ Generate a complete monster stat block in JSON format:
 
 Return only valid JSON."""
 
-            # Use the LLM service if available
-            if self.llm_service:
-                try:
-                    print(f"DEBUG: Using LLM service to generate monster: {type(self.llm_service)}")
-                    response = await self.llm_service.generate_content(monster_prompt)
-                    print(f"DEBUG: LLM response received: {response[:200]}...")
-                    
-                    # Try to parse the JSON response
-                    import json
-                    try:
-                        monster_data = json.loads(response)
-                        print(f"DEBUG: Successfully parsed JSON from LLM response")
-                    except json.JSONDecodeError:
-                        print(f"DEBUG: Failed to parse JSON directly, trying regex extraction")
-                        # Try to extract JSON from response
-                        import re
-                        json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                        if json_match:
-                            monster_data = json.loads(json_match.group())
-                            print(f"DEBUG: Successfully extracted JSON from LLM response")
-                        else:
-                            print(f"DEBUG: Could not extract JSON from LLM response, using fallback")
-                            raise ValueError("Could not parse JSON from LLM response")
-                    
-                    # Validate and enhance the monster using the existing validation system
-                    from src.services.creation_validation import validate_and_enhance_creature
-                    enhanced_monster = validate_and_enhance_creature(monster_data, challenge_rating)
-                    print(f"DEBUG: Monster creation via LLM successful")
-                    
-                    return enhanced_monster
-                    
-                except Exception as llm_error:
-                    print(f"DEBUG: LLM generation failed with error: {llm_error}")
-                    # Fall through to basic template
-                    return self._create_basic_monster_template(prompt, challenge_rating, creature_type)
-            
-            else:
-                print(f"DEBUG: No LLM service available, using basic template")
-                # Fallback: create a basic monster template
-                return self._create_basic_monster_template(prompt, challenge_rating, creature_type)
-                return self._create_basic_monster_template(prompt, challenge_rating, creature_type)
-                
-        except Exception as e:
-            # Return a basic template if generation fails
-            return self._create_basic_monster_template(prompt, kwargs.get('challenge_rating', 1.0), kwargs.get('creature_type', 'monstrosity'))
+        logger.debug(f"Using LLM service to generate monster: {type(self.llm_service)}")
+        # Schema-constrained generation; raises ValueError if unparseable
+        from src.services.llm_schemas import generate_structured
+        monster_data = await generate_structured(self.llm_service, monster_prompt, "monster")
+        logger.debug("Successfully parsed JSON from LLM response")
+        
+        # Validate and enhance the monster using the existing validation system
+        from src.services.creation_validation import validate_and_enhance_creature
+        enhanced_monster = validate_and_enhance_creature(monster_data, challenge_rating)
+        logger.debug("Monster creation via LLM successful")
+        
+        return enhanced_monster
     
     async def _evolve_monster(self, existing_data: Dict[str, Any], evolution_prompt: str, **kwargs) -> Dict[str, Any]:
         """Evolve an existing monster (e.g., power up, new abilities).
@@ -423,8 +535,28 @@ Return only valid JSON."""
             npc_role = kwargs.get('npc_type', 'commoner')
             challenge_rating = float(kwargs.get('challenge_rating', 0.5))
             
-            # Use LLM to generate NPC based on prompt
-            npc_prompt = f"""Create a D&D 5e NPC based on this description: {prompt}
+            # Use the LLM service if available
+            if self.llm_service:
+                try:
+                    return await self._generate_npc_with_llm(prompt, challenge_rating, npc_role)
+                except Exception as llm_error:
+                    logger.debug(f"LLM generation failed with error: {llm_error}")
+                    # Fall through to basic template
+                    return self._create_basic_npc_template(prompt, challenge_rating, npc_role)
+            
+            else:
+                logger.debug("No LLM service available, using basic template")
+                # Fallback: create a basic NPC template
+                return self._create_basic_npc_template(prompt, challenge_rating, npc_role)
+                
+        except Exception as e:
+            # Return a basic template if generation fails
+            return self._create_basic_npc_template(prompt, kwargs.get('challenge_rating', 0.5), kwargs.get('npc_type', 'commoner'))
+    
+    async def _generate_npc_with_llm(self, prompt: str, challenge_rating: float, npc_role: str) -> Dict[str, Any]:
+        """Generate and validate an NPC with the LLM; raises if generation fails."""
+        # Use LLM to generate NPC based on prompt
+        npc_prompt = f"""Create a D&D 5e NPC based on this description: {prompt}
 
 Role: {npc_role}
 Challenge Rating: {challenge_rating}
@@ -470,56 +602,24 @@ Generate a complete NPC in JSON format:
 
 Return only valid JSON."""
 
-            # Use the LLM service if available
-            if self.llm_service:
-                try:
-                    print(f"DEBUG: Using LLM service to generate NPC: {type(self.llm_service)}")
-                    response = await self.llm_service.generate_content(npc_prompt)
-                    print(f"DEBUG: LLM response received: {response[:200]}...")
-                    
-                    # Try to parse the JSON response
-                    import json
-                    try:
-                        npc_data = json.loads(response)
-                        print(f"DEBUG: Successfully parsed JSON from LLM response")
-                    except json.JSONDecodeError:
-                        print(f"DEBUG: Failed to parse JSON directly, trying regex extraction")
-                        # Try to extract JSON from response
-                        import re
-                        json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                        if json_match:
-                            npc_data = json.loads(json_match.group())
-                            print(f"DEBUG: Successfully extracted JSON from LLM response")
-                        else:
-                            print(f"DEBUG: Could not extract JSON from LLM response, using fallback")
-                            raise ValueError("Could not parse JSON from LLM response")
-                    
-                    # Validate and enhance the NPC using the existing validation system
-                    from src.core.enums import NPCType, NPCRole
-                    from src.services.creation_validation import validate_and_enhance_npc
-                    
-                    # Map role to enums (with fallbacks)
-                    npc_type_enum = NPCType.MAJOR  # Default to major for generated NPCs
-                    npc_role_enum = getattr(NPCRole, npc_role.upper(), NPCRole.CIVILIAN)
-                    
-                    enhanced_npc = validate_and_enhance_npc(npc_data, npc_type_enum, npc_role_enum)
-                    print(f"DEBUG: NPC creation via LLM successful")
-                    
-                    return enhanced_npc
-                    
-                except Exception as llm_error:
-                    print(f"DEBUG: LLM generation failed with error: {llm_error}")
-                    # Fall through to basic template
-                    return self._create_basic_npc_template(prompt, challenge_rating, npc_role)
-            
-            else:
-                print(f"DEBUG: No LLM service available, using basic template")
-                # Fallback: create a basic NPC template
-                return self._create_basic_npc_template(prompt, challenge_rating, npc_role)
-                
-        except Exception as e:
-            # Return a basic template if generation fails
-            return self._create_basic_npc_template(prompt, kwargs.get('challenge_rating', 0.5), kwargs.get('npc_type', 'commoner'))
+        logger.debug(f"Using LLM service to generate NPC: {type(self.llm_service)}")
+        # Schema-constrained generation; raises ValueError if unparseable
+        from src.services.llm_schemas import generate_structured
+        npc_data = await generate_structured(self.llm_service, npc_prompt, "npc")
+        logger.debug("Successfully parsed JSON from LLM response")
+        
+        # Validate and enhance the NPC using the existing validation system
+        from src.core.enums import NPCType, NPCRole
+        from src.services.creation_validation import validate_and_enhance_npc
+        
+        # Map role to enums (with fallbacks)
+        npc_type_enum = NPCType.MAJOR  # Default to major for generated NPCs
+        npc_role_enum = getattr(NPCRole, npc_role.upper(), NPCRole.CIVILIAN)
+        
+        enhanced_npc = validate_and_enhance_npc(npc_data, npc_type_enum, npc_role_enum)
+        logger.debug("NPC creation via LLM successful")
+        
+        return enhanced_npc
     
     async def _create_item_from_scratch(self, item_type: CreationOptions, prompt: str, **kwargs) -> Dict[str, Any]:
         """Create a new item from scratch using LLM generation.
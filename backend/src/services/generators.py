@@ -9,6 +9,7 @@ import json
 import logging
 import random
 from src.services.llm_service import LLMService
+from src.services.json_repair import repair_json
 from src.models.custom_content_models import (
     ContentRegistry, CustomSpecies, CustomClass, CustomSpell, 
     CustomWeapon, CustomArmor, CustomFeat, CustomItem
@@ -56,7 +57,7 @@ class BackstoryGenerator:
         theme_text = f"\nTheme(s): {', '.join(themes)}" if themes else ""
         prompt = f"""Character: {name}, {species} {primary_class}\nDescription: {user_description}{theme_text}\n\nReturn ONLY this JSON (no other text):\n{{"main_backstory":"2 sentences about their past","origin":"Where from","motivation":"What drives them","secret":"Hidden aspect","relationships":"Key connections"}}"""
         try:
-            response = await self.llm_service.generate_content(prompt)
+            response = await self.llm_service.generate_content(prompt, stage="backstory")
             cleaned_response = self._clean_json_response(response)
             backstory_data = json.loads(cleaned_response)
             required_fields = ["main_backstory", "origin", "motivation", "secret", "relationships"]
@@ -71,15 +72,9 @@ class BackstoryGenerator:
             return self._get_fallback_backstory(character_data, user_description, themes)
     
     def _clean_json_response(self, response: str) -> str:
-        """Clean JSON response."""
-        if not response:
-            raise ValueError("Empty response")
-        response = response.strip().replace('```json', '').replace('```', '')
-        start = response.find('{')
-        end = response.rfind('}')
-        if start == -1 or end == -1:
-            raise ValueError("No JSON found in response")
-        return response[start:end+1]
+        """Clean JSON response, repairing common LLM formatting errors."""
+        data, _ = repair_json(response, "{")
+        return json.dumps(data)
     
     def _get_fallback_backstory(self, character_data: Dict[str, Any], user_description: str, themes: Optional[List[str]] = None) -> Dict[str, str]:
         """Generate fallback backstory using templates, with optional theme(s)."""
@@ -761,7 +756,7 @@ Description: {user_description}
 Return ONLY this JSON:
 {{"name":"NPC Name","personality":"Brief personality","motivation":"What drives them","secret":"Hidden aspect","relationships":"Key relationships","mannerisms":"Speech/behavior quirks","goals":"Current objectives","fears":"What they fear"}}"""
             
-            response = await self.llm_service.generate_content(prompt)
+            response = await self.llm_service.generate_content(prompt, stage="npc_roleplay")
             data = json.loads(self._clean_json_response(response))
             return data
         except Exception as e:
@@ -819,15 +814,9 @@ Return ONLY this JSON:
         return random.choice(surnames)
     
     def _clean_json_response(self, response: str) -> str:
-        """Clean JSON response."""
-        if not response:
-            raise ValueError("Empty response")
-        response = response.strip().replace('```json', '').replace('```', '')
-        start = response.find('{')
-        end = response.rfind('}')
-        if start == -1 or end == -1:
-            raise ValueError("No JSON found in response")
-        return response[start:end+1]
+        """Clean JSON response, repairing common LLM formatting errors."""
+        data, _ = repair_json(response, "{")
+        return json.dumps(data)
     
     def _generate_npc_stats_for_cr(self, npc_role: str, challenge_rating: float) -> Dict[str, int]:
         """Generate NPC stats appropriate for challenge rating using D&D 5e 2024 guidelines."""
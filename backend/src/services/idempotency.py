@@ -0,0 +1,251 @@
+"""
+Idempotency-Key ledger for factory create and evolve requests.
+
+Clients retry factory requests after gateway timeouts. Without a ledger every
+retry starts a fresh multi-call LLM generation and, with save_to_database, a
+duplicate character row. Requests carrying an Idempotency-Key header are
+recorded in the idempotency_records table, keyed by (endpoint, key):
+
+- First request: claims the key, runs, stores the response
+- Repeat while running: attaches to the in-flight result (same process), or
+  polls the ledger until the owning worker completes it
+- Repeat after completion: returns the stored response without running
+- Same key with a different request body: rejected (422)
+
+Failed requests are not stored, so a retry runs again. A claim left unfinished
+for longer than the lock period (crashed worker) can be taken over.
+
+Usage:
+    response, outcome = await idempotency_ledger.run(
+        "factory_create", key, request.model_dump(), lambda: handler(request, db)
+    )
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """Idempotency key misuse; status_code is the HTTP status to report."""
+
+    def __init__(self, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def request_fingerprint(payload: Dict[str, Any]) -> str:
+    """Stable SHA-256 of a request body."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotencyLedger:
+    """Persisted (endpoint, key) ledger with in-process attachment to in-flight requests."""
+
+    def __init__(self, ttl_hours: int = 24, lock_seconds: int = 900, poll_interval: float = 1.0):
+        self.ttl_hours = ttl_hours
+        self.lock_seconds = lock_seconds
+        self.poll_interval = poll_interval
+        self._inflight: Dict[Tuple[str, str], Tuple[str, asyncio.Future]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"executed": 0, "attached": 0, "replayed": 0, "conflicts": 0, "failures_not_stored": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _session(self):
+        from src.models import database_models
+        return database_models.SessionLocal() if database_models.SessionLocal else None
+
+    async def run(self, endpoint: str, key: str, payload: Dict[str, Any],
+                  handler: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], str]:
+        """
+        Run handler at most once per (endpoint, key).
+
+        Returns:
+            (response, outcome) where outcome is "executed", "attached" or "replayed"
+        """
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyConflict(f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters", 400)
+        scope = (endpoint, key)
+        request_hash = request_fingerprint(payload)
+
+        waited = False
+        while True:
+            inflight = self._inflight.get(scope)
+            if inflight is not None:
+                self._check_hash(inflight[0], request_hash)
+                self._count("attached")
+                return await asyncio.shield(inflight[1]), "attached"
+
+            state, stored = self._claim(endpoint, key, request_hash)
+            if state == "completed":
+                self._count("attached" if waited else "replayed")
+                return stored, "attached" if waited else "replayed"
+            if state == "claimed":
+                break
+            # Another worker owns the key; wait for it to finish or its lock to lapse
+            waited = True
+            await asyncio.sleep(self.poll_interval)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[scope] = (request_hash, future)
+        try:
+            response = await handler()
+        except BaseException as e:
+            self._release(endpoint, key)
+            future.set_exception(e)
+            future.exception()  # attached requests re-raise it; mark retrieved for the rest
+            raise
+        finally:
+            self._inflight.pop(scope, None)
+
+        if response.get("success", True):
+            self._complete(endpoint, key, response)
+        else:
+            self._release(endpoint, key)
+            self._count("failures_not_stored")
+        self._count("executed")
+        future.set_result(response)
+        return response, "executed"
+
+    def _check_hash(self, stored_hash: str, request_hash: str) -> None:
+        if stored_hash != request_hash:
+            self._count("conflicts")
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request body", 422)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _query(self, db, endpoint: str, key: str):
+        from src.models.database_models import IdempotencyRecord
+        return db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.endpoint == endpoint,
+            IdempotencyRecord.idempotency_key == key
+        )
+
+    def _claim(self, endpoint: str, key: str, request_hash: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Claim the key for this request.
+
+        Returns ("claimed", None), ("completed", stored_response) or ("running", None)
+        if another worker holds an unexpired claim.
+        """
+        from sqlalchemy.exc import IntegrityError
+        from src.models.database_models import IdempotencyRecord
+
+        db = self._session()
+        if db is None:
+            return "claimed", None
+        try:
+            now = datetime.utcnow()
+            row = self._query(db, endpoint, key).first()
+            if row is not None:
+                expired = row.status == "completed" and row.expires_at is not None and row.expires_at <= now
+                abandoned = row.status == "in_progress" and row.created_at <= now - timedelta(seconds=self.lock_seconds)
+                if not (expired or abandoned):
+                    self._check_hash(row.request_hash, request_hash)
+                    if row.status == "completed":
+                        return "completed", row.response
+                    return "running", None
+                row.request_hash = request_hash
+                row.status = "in_progress"
+                row.response = None
+                row.created_at = now
+                row.completed_at = None
+                row.expires_at = None
+            else:
+                db.add(IdempotencyRecord(
+                    id=str(uuid.uuid4()), endpoint=endpoint, idempotency_key=key,
+                    request_hash=request_hash, status="in_progress", created_at=now
+                ))
+            db.commit()
+            return "claimed", None
+        except IntegrityError:
+            # Another worker inserted the key first
+            db.rollback()
+            return "running", None
+        except IdempotencyConflict:
+            raise
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Idempotency ledger unavailable, running {endpoint} without it: {e}")
+            return "claimed", None
+        finally:
+            db.close()
+
+    def _complete(self, endpoint: str, key: str, response: Dict[str, Any]) -> None:
+        """Store the response so repeats replay it until the TTL expires."""
+        db = self._session()
+        if db is None:
+            return
+        try:
+            row = self._query(db, endpoint, key).first()
+            if row is None:
+                return
+            now = datetime.utcnow()
+            row.status = "completed"
+            row.response = json.loads(json.dumps(response, default=str))
+            row.completed_at = now
+            row.expires_at = now + timedelta(hours=self.ttl_hours)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not store idempotent response for {endpoint}: {e}")
+        finally:
+            db.close()
+
+    def _release(self, endpoint: str, key: str) -> None:
+        """Drop a claim after a failure so the client can retry."""
+        db = self._session()
+        if db is None:
+            return
+        try:
+            self._query(db, endpoint, key).delete()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not release idempotency key for {endpoint}: {e}")
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        """Delete completed records past their TTL."""
+        from src.models.database_models import IdempotencyRecord
+
+        db = self._session()
+        if db is None:
+            return 0
+        try:
+            deleted = db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.expires_at <= datetime.utcnow()
+            ).delete()
+            db.commit()
+            return deleted
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not purge expired idempotency records: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["in_flight"] = len(self._inflight)
+        return stats
+
+
+idempotency_ledger = IdempotencyLedger()
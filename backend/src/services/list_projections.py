@@ -0,0 +1,151 @@
+"""
+Summary projections for list and browse endpoints.
+
+The list endpoints used to load full ORM rows - characters with their
+equipment, features, spells and skills, catalog items with their
+content_data - only to return a few of their fields. Each listable resource
+now has a summary projection: the query selects just the columns the endpoint
+has always returned, and a fields= query parameter adds more. The default
+response shape is unchanged; only blobs that were never returned are skipped.
+
+    GET /api/v2/characters?fields=equipment,spells
+    GET /api/v2/items?fields=*
+
+Rows come back as plain dicts built from column tuples, so no ORM objects or
+identity-map entries are created for a page. Pages are ordered by
+(created_at, id) and can be walked with cursors (see keyset_pagination).
+
+Benchmark (500-row pages, in-memory SQLite unless a database URL is given):
+    cd backend && python -m benchmarks.list_projections --rows 500
+
+Usage:
+    projection = LIST_PROJECTIONS["npcs"]
+    query = projection.query(db, projection.resolve_fields(fields))
+    rows = projection.rows(query.filter(...).offset(offset).limit(limit))
+    rows, next_cursor = projection.page(query.filter(...), limit, cursor=cursor)
+"""
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.services.keyset_pagination import keyset_query, split_page
+
+ALL_FIELDS = "*"
+# Keyset columns added to page queries; not returned unless also requested
+KEY_CREATED_AT = "_keyset_created_at"
+KEY_ID = "_keyset_id"
+
+
+@dataclass
+class ListProjection:
+    """
+    Summary and optional fields of one listable model, by model attribute
+    name. expand(session, rows), when set, completes a page's rows in place
+    (e.g. with data kept in other tables).
+    """
+    model: Any
+    summary: Tuple[str, ...]
+    optional: Tuple[str, ...]
+    expand: Optional[Callable[[Any, List[Dict[str, Any]]], None]] = None
+
+    @property
+    def available(self) -> Tuple[str, ...]:
+        return self.summary + self.optional
+
+    def resolve_fields(self, fields: Optional[str]) -> List[str]:
+        """
+        Summary fields plus those requested in a comma-separated fields= value.
+
+        Raises:
+            ValueError: for a field the resource does not have
+        """
+        requested = [name.strip() for name in (fields or "").split(",") if name.strip()]
+        if ALL_FIELDS in requested:
+            return list(self.available)
+        unknown = [name for name in requested if name not in self.available]
+        if unknown:
+            raise ValueError(f"Unknown fields {unknown}; available: {', '.join(self.available)}")
+        return list(self.summary) + [name for name in self.optional if name in requested]
+
+    def query(self, db, field_names: List[str]):
+        """Query selecting only the given columns of the model."""
+        return db.query(*(getattr(self.model, name) for name in field_names))
+
+    def rows(self, query) -> List[Dict[str, Any]]:
+        """Run a projection query and return JSON-ready dicts."""
+        return self._expanded(query, [_row_dict(row) for row in query])
+
+    def page(self, query, limit: int, cursor: Optional[str] = None,
+             offset: int = 0) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of a projection query in (created_at, id) order, and the
+        cursor for the page after it (None on the last page).
+
+        Raises:
+            ValueError: for an invalid cursor
+        """
+        keyed = query.add_columns(self.model.created_at.label(KEY_CREATED_AT), self.model.id.label(KEY_ID))
+        keyed = keyset_query(keyed, self.model, cursor)
+        if offset:
+            keyed = keyed.offset(offset)
+        rows, next_cursor = split_page(keyed.limit(limit + 1).all(), limit,
+                                       lambda row: (row._mapping[KEY_CREATED_AT], row._mapping[KEY_ID]))
+        return self._expanded(query, [_row_dict(row) for row in rows]), next_cursor
+
+    def _expanded(self, query, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.expand is not None and rows:
+            self.expand(query.session, rows)
+        return rows
+
+
+def _row_dict(row) -> Dict[str, Any]:
+    return {name: _serialize(value) for name, value in row._mapping.items() if name not in (KEY_CREATED_AT, KEY_ID)}
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _projections() -> Dict[str, ListProjection]:
+    from src.models.database_models import Character, CustomContent, UnifiedItem
+    from src.services.character_inventory import attach_legacy_equipment
+
+    content = ListProjection(
+        CustomContent,
+        summary=("id", "name", "description", "content_data"),
+        optional=("created_by", "created_at", "updated_at", "is_public"),
+    )
+    return {
+        "characters": ListProjection(
+            Character,
+            summary=("id", "name", "species", "background", "level", "character_classes", "backstory",
+                     "created_at"),
+            optional=(
+                "player_name", "alignment", "strength", "dexterity", "constitution", "intelligence",
+                "wisdom", "charisma", "armor_class", "hit_points", "proficiency_bonus", "equipment",
+                "features", "spells", "skills", "notes", "updated_at", "approval_state",
+            ),
+            # equipment in its legacy shape, with the inventory tables folded back in
+            expand=attach_legacy_equipment,
+        ),
+        "npcs": content,
+        "monsters": content,
+        "items": ListProjection(
+            UnifiedItem,
+            summary=("id", "name", "item_type", "short_description"),
+            optional=(
+                "item_subtype", "source_type", "rarity", "requires_attunement", "spell_level",
+                "spell_school", "class_restrictions", "value_gp", "weight_lbs", "source_book",
+                "content_data", "created_at", "updated_at",
+            ),
+        ),
+    }
+
+
+LIST_PROJECTIONS = _projections()
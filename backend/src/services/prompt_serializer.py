@@ -0,0 +1,287 @@
+"""
+Compact, token-budgeted serialisation of existing objects for LLM prompts.
+
+Evolve and refine flows embed the current object in the prompt so the model can
+build on it. Interpolating a dict repr or indented JSON spends most of the input
+budget on quoting, whitespace, database bookkeeping and values the model should
+not be reasoning about (derived modifiers, timestamps, empty lists). This module
+strips those, abbreviates well-known keys and caps each section at a token
+budget so a long backstory cannot crowd out the rest of the prompt.
+
+RULES:
+- None, empty strings/lists/dicts, false flags and known defaults are dropped
+- Derived and bookkeeping fields (ids, timestamps, modifiers, histories) are dropped
+- Well-known keys are abbreviated (hit_points -> hp, strength -> STR, ...)
+- Output is minified JSON so nested structure stays unambiguous
+- Each section is fitted to its token budget by shortening the longest strings
+  first, then trimming long lists
+
+Token counts use tiktoken when installed, with a word/punctuation estimate
+otherwise.
+
+Usage:
+    context = compact_context({"character": data}, flow="factory_evolve_object")
+    stats = prompt_compaction_stats.get_stats()   # input-token reduction per flow
+"""
+
+import json
+import logging
+import math
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # ImportError, or the encoding file is unavailable offline
+    _ENCODING = None
+
+# Default per-section budget when a section has no explicit entry
+DEFAULT_SECTION_BUDGET = 400
+
+# Strings are never shortened below this many characters
+MIN_STRING_CHARS = 40
+
+# Lists are never trimmed below this many items
+MIN_LIST_ITEMS = 3
+
+KEY_ABBREVIATIONS = {
+    "character_classes": "classes",
+    "ability_scores": "abil",
+    "abilities": "abil",
+    "strength": "STR",
+    "dexterity": "DEX",
+    "constitution": "CON",
+    "intelligence": "INT",
+    "wisdom": "WIS",
+    "charisma": "CHA",
+    "hit_points": "hp",
+    "max_hit_points": "max_hp",
+    "armor_class": "ac",
+    "challenge_rating": "cr",
+    "skill_proficiencies": "skills",
+    "saving_throw_proficiencies": "saves",
+    "personality_traits": "traits",
+    "description": "desc",
+    "spells_known": "spells",
+    "equipment": "equip",
+    "background": "bg",
+    "alignment": "align",
+}
+
+# Values the model can recompute or that carry no creative signal
+DERIVED_FIELDS = {
+    "id", "uuid", "user_id", "owner_id", "campaign_id", "character_id",
+    "created_at", "updated_at", "last_modified", "last_refined", "timestamp",
+    "proficiency_bonus", "ability_modifiers", "spell_save_dc", "spell_attack_bonus",
+    "passive_perception", "initiative", "carrying_capacity",
+    "verbose_logs", "refinement_history", "refinement_count", "evolution_history",
+    "version", "is_active", "is_public",
+}
+
+# Field defaults that add nothing when present
+DEFAULT_VALUES = {
+    "temp_hp": 0,
+    "temporary_hit_points": 0,
+    "exhaustion_level": 0,
+    "inspiration": False,
+    "size": "Medium",
+}
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, or estimate from words and punctuation."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    # BPE keeps common words whole and splits long ones roughly every 4 chars
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _WORD_PATTERN.findall(text))
+
+
+# ============================================================================
+# COMPACTION
+# ============================================================================
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def compact_value(value: Any) -> Any:
+    """Recursively drop empty, default and derived fields and abbreviate keys."""
+    if isinstance(value, dict):
+        compacted = {}
+        for key, item in value.items():
+            key_str = str(key)
+            if key_str in DERIVED_FIELDS:
+                continue
+            if key_str in DEFAULT_VALUES and item == DEFAULT_VALUES[key_str]:
+                continue
+            if item is False:
+                # Unset flags (e.g. non-proficient skills) are the default
+                continue
+            item = compact_value(item)
+            if _is_empty(item):
+                continue
+            compacted[KEY_ABBREVIATIONS.get(key_str, key_str)] = item
+        return compacted
+    if isinstance(value, (list, tuple, set)):
+        items = [compact_value(item) for item in value]
+        return [item for item in items if not _is_empty(item)]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _dumps(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _longest_string(value: Any, path=()) -> Optional[tuple]:
+    """Return (length, path) of the longest string leaf."""
+    best = None
+    if isinstance(value, str):
+        return (len(value), path)
+    children = value.items() if isinstance(value, dict) else enumerate(value) if isinstance(value, list) else ()
+    for key, child in children:
+        found = _longest_string(child, path + (key,))
+        if found and (best is None or found[0] > best[0]):
+            best = found
+    return best
+
+
+def _longest_list(value: Any, path=()) -> Optional[tuple]:
+    """Return (length, path) of the longest list."""
+    best = (len(value), path) if isinstance(value, list) else None
+    children = value.items() if isinstance(value, dict) else enumerate(value) if isinstance(value, list) else ()
+    for key, child in children:
+        found = _longest_list(child, path + (key,))
+        if found and (best is None or found[0] > best[0]):
+            best = found
+    return best
+
+
+def _get_path(value: Any, path: tuple) -> Any:
+    for key in path:
+        value = value[key]
+    return value
+
+
+def _set_path(value: Any, path: tuple, new_value: Any) -> Any:
+    if not path:
+        return new_value
+    _get_path(value, path[:-1])[path[-1]] = new_value
+    return value
+
+
+def fit_to_budget(value: Any, budget: int) -> str:
+    """
+    Serialise value within a token budget.
+
+    Shortens the longest string leaf (keeping its start) until the section fits,
+    then trims the longest list, then hard-truncates as a last resort.
+    """
+    value = json.loads(json.dumps(value, default=str)) if not isinstance(value, str) else value
+    text = _dumps(value)
+    tokens = count_tokens(text)
+
+    while tokens > budget:
+        longest = _longest_string(value)
+        if not longest or longest[0] <= MIN_STRING_CHARS:
+            break
+        length, path = longest
+        keep = max(MIN_STRING_CHARS, int(length * budget / tokens) - 1)
+        shortened = _get_path(value, path)[:keep].rsplit(" ", 1)[0] + "…"
+        if len(shortened) >= length:
+            break
+        value = _set_path(value, path, shortened)
+        text = _dumps(value)
+        tokens = count_tokens(text)
+
+    while tokens > budget:
+        longest = _longest_list(value)
+        if not longest or longest[0] <= MIN_LIST_ITEMS:
+            break
+        length, path = longest
+        value = _set_path(value, path, _get_path(value, path)[:max(MIN_LIST_ITEMS, length // 2)])
+        text = _dumps(value)
+        tokens = count_tokens(text)
+
+    if tokens > budget:
+        text = text[:max(1, len(text) * budget // tokens)] + "…"
+    return text
+
+
+# ============================================================================
+# REDUCTION TRACKING
+# ============================================================================
+
+class PromptCompactionStats:
+    """Thread-safe per-flow input-token totals before and after compaction."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.flows: Dict[str, Dict[str, int]] = {}
+
+    def record(self, flow: str, original_tokens: int, compact_tokens: int) -> None:
+        with self._lock:
+            totals = self.flows.setdefault(flow, {"calls": 0, "original_tokens": 0, "compact_tokens": 0})
+            totals["calls"] += 1
+            totals["original_tokens"] += original_tokens
+            totals["compact_tokens"] += compact_tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {k: dict(v) for k, v in self.flows.items()}
+        for totals in snapshot.values():
+            original = totals["original_tokens"]
+            totals["tokens_saved"] = original - totals["compact_tokens"]
+            totals["reduction_rate"] = round(totals["tokens_saved"] / original, 4) if original else 0.0
+        return {"tokenizer": "tiktoken" if _ENCODING is not None else "estimate", "flows": snapshot}
+
+
+prompt_compaction_stats = PromptCompactionStats()
+
+
+def compact_context(sections: Dict[str, Any], flow: str,
+                    budgets: Optional[Dict[str, int]] = None,
+                    baseline: Optional[str] = None) -> str:
+    """
+    Build a compact prompt context from named sections.
+
+    Args:
+        sections: Section name -> object (dict, list or string) to embed
+        flow: Name the reduction is reported under
+        budgets: Per-section token budgets (DEFAULT_SECTION_BUDGET otherwise)
+        baseline: The text the flow used to send, for reduction reporting;
+            defaults to the sections as indented JSON
+
+    Returns:
+        One "SECTION: {...}" line per non-empty section
+    """
+    budgets = budgets or {}
+    lines: List[str] = []
+    for name, value in sections.items():
+        value = compact_value(value)
+        if _is_empty(value):
+            continue
+        budget = budgets.get(name, DEFAULT_SECTION_BUDGET)
+        lines.append(f"{name.upper()}: {fit_to_budget(value, budget)}")
+    context = "\n".join(lines)
+
+    if baseline is None:
+        baseline = json.dumps(sections, indent=2, default=str)
+    original_tokens = count_tokens(baseline)
+    compact_tokens = count_tokens(context)
+    prompt_compaction_stats.record(flow, original_tokens, compact_tokens)
+    logger.debug(f"Compacted {flow} context: {original_tokens} -> {compact_tokens} tokens")
+    return context
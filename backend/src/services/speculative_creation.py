@@ -0,0 +1,154 @@
+"""
+Speculative template responses for latency-bound NPC and monster creation.
+
+The factory's deterministic builders (basic monster/NPC templates, CR-based NPC
+stats, fallback roleplay) used to run only after the LLM had failed. In "fast"
+response mode they run up front instead: the template is computed immediately
+and raced against the LLM under a latency SLO. If the LLM answers within the
+SLO its result is returned as usual; otherwise the template is returned and the
+LLM keeps running in the background, upgrading the object once it finishes.
+
+UPGRADES:
+- The response carries generation.upgrade_id (also used as the object_id)
+- GET /api/v2/factory/objects/{object_id}/upgrade reports pending, ready or failed
+- Upgrades live in memory, bounded by count and age; evicted pending upgrades
+  are cancelled
+
+Usage:
+    result = await race_against_template(llm_coro, template, slo_seconds=2.0, creation_type="npc")
+    upgrade = speculative_upgrades.get(result["generation"]["upgrade_id"])
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FAST_MODE = "fast"
+
+
+class SpeculativeUpgradeRegistry:
+    """In-memory background LLM upgrades keyed by upgrade (object) ID."""
+
+    def __init__(self, max_entries: int = 500, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._upgrades: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {"fast_requests": 0, "llm_within_slo": 0, "template_served": 0,
+                      "upgrades_ready": 0, "upgrades_failed": 0, "upgrades_evicted": 0,
+                      "template_ms_total": 0.0}
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def _evict(self) -> None:
+        """Drop expired entries and the oldest entries beyond max_entries."""
+        cutoff = time.time() - self.ttl_seconds
+        while self._upgrades:
+            upgrade_id, entry = next(iter(self._upgrades.items()))
+            if entry["created_at"] >= cutoff and len(self._upgrades) <= self.max_entries:
+                break
+            self._upgrades.popitem(last=False)
+            if not entry["task"].done():
+                entry["task"].cancel()
+            self.stats["upgrades_evicted"] += 1
+
+    def register(self, task: asyncio.Task, creation_type: str) -> str:
+        """Track a running LLM task and return its upgrade ID."""
+        upgrade_id = str(uuid.uuid4())
+        with self._lock:
+            self._upgrades[upgrade_id] = {"task": task, "creation_type": creation_type,
+                                          "created_at": time.time()}
+            self._evict()
+        task.add_done_callback(self._record_outcome)
+        return upgrade_id
+
+    def _record_outcome(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        self._count("upgrades_failed" if task.exception() else "upgrades_ready")
+
+    def get(self, upgrade_id: str) -> Optional[Dict[str, Any]]:
+        """Upgrade status and, once ready, the LLM-generated object."""
+        with self._lock:
+            self._evict()
+            entry = self._upgrades.get(upgrade_id)
+        if entry is None:
+            return None
+        task = entry["task"]
+        upgrade = {"upgrade_id": upgrade_id, "creation_type": entry["creation_type"],
+                   "status": "pending", "data": None, "error": None}
+        if task.done():
+            if task.cancelled() or task.exception():
+                upgrade["status"] = "failed"
+                upgrade["error"] = "cancelled" if task.cancelled() else str(task.exception())
+            else:
+                upgrade["status"] = "ready"
+                upgrade["data"] = task.result()
+        return upgrade
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            pending = sum(1 for entry in self._upgrades.values() if not entry["task"].done())
+            stats["tracked"] = len(self._upgrades)
+        stats["pending"] = pending
+        fast = stats["fast_requests"]
+        stats["template_rate"] = round(stats["template_served"] / fast, 4) if fast else 0.0
+        template_ms_total = stats.pop("template_ms_total")
+        stats["avg_template_ms"] = round(template_ms_total / fast, 3) if fast else 0.0
+        return stats
+
+
+speculative_upgrades = SpeculativeUpgradeRegistry()
+
+
+async def race_against_template(llm_call: Awaitable[Dict[str, Any]], template: Dict[str, Any],
+                                slo_seconds: float, creation_type: str,
+                                registry: Optional[SpeculativeUpgradeRegistry] = None,
+                                template_ms: float = 0.0) -> Dict[str, Any]:
+    """
+    Wait up to slo_seconds for the LLM result, else return the template.
+
+    Args:
+        llm_call: Coroutine producing the LLM object; raises on failure
+        template: Deterministic object already built for the request
+        slo_seconds: Latency budget for the LLM
+        creation_type: Reported with the upgrade
+        registry: Upgrade registry (the module-level one by default)
+        template_ms: Time spent building the template, for stats
+
+    Returns:
+        The LLM object, or the template with a generation block pointing at
+        the pending upgrade
+    """
+    registry = registry or speculative_upgrades
+    registry._count("fast_requests")
+    registry._count("template_ms_total", template_ms)
+
+    task = asyncio.ensure_future(llm_call)
+    try:
+        # shield() keeps the LLM running when the SLO expires
+        result = await asyncio.wait_for(asyncio.shield(task), timeout=max(0.0, slo_seconds))
+        registry._count("llm_within_slo")
+        result.setdefault("generation", {"source": "llm", "status": "complete"})
+        return result
+    except asyncio.TimeoutError:
+        upgrade_id = registry.register(task, creation_type)
+        status = "pending"
+    except Exception as e:
+        logger.warning(f"Speculative {creation_type} LLM generation failed: {e}")
+        upgrade_id = None
+        status = "failed"
+
+    registry._count("template_served")
+    template["generation"] = {"source": "template", "status": status, "upgrade_id": upgrade_id,
+                              "slo_seconds": slo_seconds}
+    return template
@@ -0,0 +1,340 @@
+"""
+Compiled, persisted theme rules for spell and weapon theming.
+
+Theme filtering logic (keywords, preferred schools/types, things to avoid)
+depends almost entirely on the theme string, yet it used to cost an LLM
+round-trip per character. Rules are now compiled once per theme, indexed
+against the D&D 5e spell and weapon catalogs, persisted in the theme_rules
+table and held in memory, so filtering a character's spells or weapons is a
+dictionary lookup.
+
+LIFECYCLE:
+- Startup: persisted rules for the current THEME_RULES_VERSION are loaded, then
+  the configured top themes are compiled in the background if missing
+- Hot path: get_rule() returns the compiled rule, or a keyword fallback built
+  from the theme words while the real rule is compiled in the background
+- Themes come from users, so background compiles are bounded: one in flight
+  per theme, MAX_CONCURRENT_COMPILES at once, at most MAX_PENDING_COMPILES
+  queued and MAX_BACKGROUND_COMPILES per process; past that misses stay on the
+  keyword fallback
+- Bumping THEME_RULES_VERSION (prompt or matching changes) recompiles everything
+
+Usage:
+    rule = theme_rule_cache.get_rule("spell", theme, creator)
+    themed = [s for s in spells if rule.matches(s)]
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from src.services.dnd_data import DND_SPELL_DATABASE, ALL_WEAPONS
+
+logger = logging.getLogger(__name__)
+
+# Bump when the logic prompts or matching rules change to invalidate persisted rules
+THEME_RULES_VERSION = 1
+
+RULE_KINDS = ("spell", "weapon")
+
+# Matches the theme_rules.theme column
+MAX_THEME_LENGTH = 100
+
+MAX_CONCURRENT_COMPILES = 2
+MAX_PENDING_COMPILES = 32
+MAX_BACKGROUND_COMPILES = 256
+
+_STOPWORDS = {"the", "and", "of", "a", "an", "in", "with", "d&d", "dnd", "campaign", "theme", "style"}
+
+
+def normalize_theme(theme: str) -> str:
+    """Case- and whitespace-insensitive theme key, cut to MAX_THEME_LENGTH."""
+    return " ".join((theme or "").lower().split())[:MAX_THEME_LENGTH].rstrip()
+
+
+# ============================================================================
+# MATCHING
+# ============================================================================
+
+def spell_matches_theme(spell: Dict[str, Any], theme_logic: Dict[str, Any]) -> bool:
+    """Whether a spell matches theme logic by keyword or preferred school."""
+    spell_name = (spell.get("name") or "").lower()
+    spell_desc = (spell.get("description") or "").lower()
+    spell_school = (spell.get("school") or "").lower()
+
+    # Check keywords in spell name and description
+    keywords = theme_logic.get("keywords", [])
+    if any(keyword.lower() in spell_name or keyword.lower() in spell_desc for keyword in keywords):
+        return True
+
+    # Check school preferences
+    preferred_schools = theme_logic.get("schools", [])
+    return spell_school in [school.lower() for school in preferred_schools]
+
+
+def weapon_matches_theme(weapon: Dict[str, Any], theme_logic: Dict[str, Any]) -> bool:
+    """Whether a weapon matches theme logic by keyword or preferred type."""
+    weapon_name = (weapon.get("name") or "").lower()
+    weapon_desc = (weapon.get("description") or "").lower()
+    weapon_type = (weapon.get("type") or "").lower()
+    weapon_category = (weapon.get("category") or "").lower()
+
+    # Check keywords in weapon name and description
+    keywords = theme_logic.get("keywords", [])
+    if any(keyword.lower() in weapon_name or keyword.lower() in weapon_desc for keyword in keywords):
+        return True
+
+    # Check type preferences
+    preferred_types = theme_logic.get("types", [])
+    return any(pref.lower() in weapon_type or pref.lower() in weapon_category for pref in preferred_types)
+
+
+_MATCHERS = {"spell": spell_matches_theme, "weapon": weapon_matches_theme}
+
+
+@lru_cache(maxsize=None)
+def _catalog(kind: str) -> Tuple[Dict[str, Any], ...]:
+    """Catalog entries (name, school/type, ...) the rules are indexed against."""
+    if kind == "spell":
+        return tuple(
+            {"name": name, "school": school}
+            for schools in DND_SPELL_DATABASE.values()
+            for school, names in schools.items()
+            for name in names
+        )
+    return tuple({**data, "name": name} for name, data in ALL_WEAPONS.items())
+
+
+@lru_cache(maxsize=None)
+def _catalog_names(kind: str) -> FrozenSet[str]:
+    return frozenset(entry["name"] for entry in _catalog(kind))
+
+
+def fallback_logic(kind: str, theme: str) -> Dict[str, Any]:
+    """Keyword-only logic from the theme words, used until the compiled rule is ready."""
+    words = [w for w in re.findall(r"[a-z]+", normalize_theme(theme)) if len(w) > 2 and w not in _STOPWORDS]
+    logic = {"keywords": words, "avoid": [], "description": f"Keyword match on '{theme}' (rule pending)"}
+    logic["schools" if kind == "spell" else "types"] = []
+    return logic
+
+
+# ============================================================================
+# COMPILED RULES
+# ============================================================================
+
+@dataclass
+class CompiledThemeRule:
+    """Theme logic plus the catalog entries it selects."""
+    kind: str
+    theme: str
+    logic: Dict[str, Any]
+    themed_names: FrozenSet[str]
+    version: int = THEME_RULES_VERSION
+    source: str = "llm"  # "llm", "builtin" or "fallback"
+
+    def matches(self, entry: Dict[str, Any]) -> bool:
+        """Catalog entries use the precomputed index; custom content is evaluated."""
+        name = entry.get("name", "")
+        if name in _catalog_names(self.kind):
+            return name in self.themed_names
+        return _MATCHERS[self.kind](entry, self.logic)
+
+
+def compile_rule(kind: str, theme: str, logic: Dict[str, Any], source: str = "llm") -> CompiledThemeRule:
+    """Index theme logic against the catalog."""
+    matcher = _MATCHERS[kind]
+    themed = frozenset(entry["name"] for entry in _catalog(kind) if matcher(entry, logic))
+    return CompiledThemeRule(kind, normalize_theme(theme), logic, themed, THEME_RULES_VERSION, source)
+
+
+class ThemeRuleCache:
+    """In-memory theme rules backed by the theme_rules table."""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_COMPILES, max_pending: int = MAX_PENDING_COMPILES,
+                 max_background: int = MAX_BACKGROUND_COMPILES):
+        self._lock = threading.Lock()
+        self._rules: Dict[Tuple[str, str], CompiledThemeRule] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.max_background = max_background
+        self.stats = {"hits": 0, "misses": 0, "compiled": 0, "loaded": 0, "compile_failures": 0,
+                      "background_compiles": 0, "compiles_skipped": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def get(self, kind: str, theme: str) -> Optional[CompiledThemeRule]:
+        """Pure in-memory lookup of a compiled rule."""
+        return self._rules.get((kind, normalize_theme(theme)))
+
+    def put(self, rule: CompiledThemeRule) -> None:
+        self._rules[(rule.kind, rule.theme)] = rule
+
+    def get_rule(self, kind: str, theme: str, creator=None) -> CompiledThemeRule:
+        """
+        Return the compiled rule for a theme without calling the LLM.
+
+        On a miss, returns a keyword fallback and schedules background
+        compilation with the creator's LLM so the next request hits.
+        """
+        rule = self.get(kind, theme)
+        if rule:
+            self._count("hits")
+            return rule
+        self._count("misses")
+        if creator is not None:
+            self.schedule_compile(theme, creator)
+        return compile_rule(kind, theme, fallback_logic(kind, theme), source="fallback")
+
+    def schedule_compile(self, theme: str, creator) -> None:
+        """
+        Compile a theme in the background if an event loop is running.
+
+        A theme already compiling is not queued again, and nothing is queued
+        once max_pending compiles are waiting or max_background have been started.
+        """
+        key = normalize_theme(theme)
+        if not key or key in self._pending:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        with self._lock:
+            if len(self._pending) >= self.max_pending or self.stats["background_compiles"] >= self.max_background:
+                self.stats["compiles_skipped"] += 1
+                return
+            self.stats["background_compiles"] += 1
+        self._start(key, creator)
+
+    def _start(self, key: str, creator) -> asyncio.Task:
+        """Run compile() for a normalized theme as the one in-flight task for it."""
+        task = asyncio.get_running_loop().create_task(self._compile_bounded(key, creator))
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return task
+
+    async def _compile_bounded(self, key: str, creator) -> List[CompiledThemeRule]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        async with self._slots:
+            try:
+                return await self.compile(key, creator)
+            except Exception as e:
+                self._count("compile_failures")
+                logger.warning(f"Failed to compile theme rules for '{key}': {e}")
+                return []
+
+    async def compile(self, theme: str, creator) -> List[CompiledThemeRule]:
+        """Generate spell and weapon logic for a theme with the LLM and persist it."""
+        theme = normalize_theme(theme)
+        compiled = []
+        generators = {
+            "spell": creator._generate_theme_spell_logic,
+            "weapon": creator._generate_theme_weapon_logic,
+        }
+        for kind, generate in generators.items():
+            if self.get(kind, theme):
+                continue
+            logic = await generate(theme, {})
+            if not logic:
+                self._count("compile_failures")
+                continue
+            source = "builtin" if theme == "traditional d&d" else "llm"
+            rule = compile_rule(kind, theme, logic, source)
+            self.put(rule)
+            self.persist(rule)
+            self._count("compiled")
+            compiled.append(rule)
+            logger.info(f"Compiled {kind} theme rule for '{theme}': {len(rule.themed_names)} catalog matches")
+        return compiled
+
+    async def warm(self, themes: List[str], creator) -> None:
+        """Load persisted rules, then compile any missing top themes."""
+        self.load()
+        for theme in themes:
+            if all(self.get(kind, theme) for kind in RULE_KINDS):
+                continue
+            key = normalize_theme(theme)
+            # Join a compile a request miss already started rather than running a second one
+            await (self._pending.get(key) or self._start(key, creator))
+        logger.info(f"Theme rule cache warm: {len(self._rules)} rules")
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _session(self):
+        from src.models import database_models
+        return database_models.SessionLocal() if database_models.SessionLocal else None
+
+    def load(self) -> int:
+        """Load rules of the current version from the database."""
+        from src.models.database_models import ThemeRule
+
+        db = self._session()
+        if db is None:
+            return 0
+        try:
+            rows = db.query(ThemeRule).filter(ThemeRule.version == THEME_RULES_VERSION).all()
+            for row in rows:
+                self.put(CompiledThemeRule(
+                    row.kind, row.theme, row.logic, frozenset(row.themed_names or []),
+                    row.version, row.source
+                ))
+            with self._lock:
+                self.stats["loaded"] += len(rows)
+            return len(rows)
+        except Exception as e:
+            logger.warning(f"Could not load persisted theme rules: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def persist(self, rule: CompiledThemeRule) -> None:
+        """Upsert a compiled rule into the theme_rules table."""
+        from src.models.database_models import ThemeRule
+
+        db = self._session()
+        if db is None:
+            return
+        try:
+            row = db.query(ThemeRule).filter(
+                ThemeRule.kind == rule.kind,
+                ThemeRule.theme == rule.theme,
+                ThemeRule.version == rule.version
+            ).first()
+            if row is None:
+                row = ThemeRule(id=str(uuid.uuid4()), kind=rule.kind, theme=rule.theme, version=rule.version)
+                db.add(row)
+            row.logic = rule.logic
+            row.themed_names = sorted(rule.themed_names)
+            row.source = rule.source
+            row.updated_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not persist theme rule for '{rule.theme}': {e}")
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["rules"] = len(self._rules)
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["version"] = THEME_RULES_VERSION
+        return stats
+
+
+theme_rule_cache = ThemeRuleCache()
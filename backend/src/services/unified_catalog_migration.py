@@ -2,10 +2,22 @@
 Migration script to populate the unified item catalog with official D&D 5e content.
 This script converts all traditional D&D data from dnd_data.py into UUID-based entries
 in the UnifiedItem table.
+
+The migration is an idempotent upsert, safe to run on every startup:
+- Official items get deterministic IDs (UUIDv5 of item type and name), so
+  CharacterItemAccess rows referencing them survive re-runs and deploys
+- Each row carries a content_hash; only new or changed rows are written, in
+  batched INSERT ... ON CONFLICT (id) DO UPDATE statements
+- Official rows from older runs with random IDs are re-pointed to their
+  deterministic ID; official items no longer in dnd_data.py are deactivated
 """
 
+import hashlib
+import json
+import time
 import uuid
 import logging
+from types import SimpleNamespace
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
@@ -14,14 +26,40 @@ from src.services.dnd_data import (
     DND_SPELL_DATABASE, DND_WEAPON_DATABASE, DND_ARMOR_DATABASE, 
     DND_TOOLS_DATABASE, DND_ADVENTURING_GEAR_DATABASE
 )
-from src.models.database_models import UnifiedItem, CharacterDB
+from src.models.database_models import UnifiedItem, CharacterItemAccess, CharacterDB
 
 logger = logging.getLogger(__name__)
 
+# Namespace for deterministic official item IDs - never change it, IDs are persisted
+OFFICIAL_ITEM_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "dnd-char-creator/unified-catalog/official")
+
+# Rows per INSERT ... ON CONFLICT statement
+UPSERT_BATCH_SIZE = 500
+
+# Columns covered by content_hash; a change in any of them rewrites the row
+HASHED_COLUMNS = (
+    "name", "item_type", "item_subtype", "content_data", "short_description", "rarity",
+    "requires_attunement", "spell_level", "spell_school", "class_restrictions",
+    "value_gp", "weight_lbs", "source_book", "is_public",
+)
+
+
+def official_item_id(item_type: str, name: str) -> uuid.UUID:
+    """Deterministic ID of an official catalog item."""
+    return uuid.uuid5(OFFICIAL_ITEM_NAMESPACE, f"{item_type}:{name.strip().lower()}")
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """SHA-256 over a row's catalog columns."""
+    canonical = json.dumps({column: row.get(column) for column in HASHED_COLUMNS},
+                           sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
 class UnifiedCatalogMigration:
     """Handles migration of traditional D&D content to unified UUID catalog."""
     
-    def __init__(self, db: CharacterDB):
+    def __init__(self, db: Optional[CharacterDB] = None):
         self.db = db
         self.spell_school_mapping = {
             "abjuration": "Abjuration",
@@ -35,41 +73,171 @@ class UnifiedCatalogMigration:
         }
 
     def migrate_all_official_content(self, session) -> Dict[str, int]:
-        """Migrate all official D&D content to unified catalog."""
+        """Upsert all official D&D content into the unified catalog."""
+        start = time.perf_counter()
         results = {
             "spells": 0,
             "weapons": 0,
             "armor": 0,
             "equipment": 0,
             "tools": 0,
+            "inserted": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "remapped": 0,
+            "deactivated": 0,
             "errors": 0
         }
         try:
-            # Clear existing official content to avoid duplicates
-            self._clear_existing_official_content(session)
-            # Migrate each content type
-            results["spells"] = self._migrate_spells(session)
-            results["weapons"] = self._migrate_weapons(session)
-            results["armor"] = self._migrate_armor(session)
-            results["equipment"] = self._migrate_equipment(session)
-            results["tools"] = self._migrate_tools(session)
+            rows: Dict[uuid.UUID, Dict[str, Any]] = {}
+            for key, build in (("spells", self._spell_rows), ("weapons", self._weapon_rows),
+                               ("armor", self._armor_rows), ("equipment", self._equipment_rows),
+                               ("tools", self._tool_rows)):
+                for row in build():
+                    if row["id"] in rows:
+                        logger.warning(f"Duplicate official {row['item_type']} '{row['name']}' skipped")
+                        continue
+                    rows[row["id"]] = row
+                    results[key] += 1
+            
+            self._upsert(session, rows, results)
             session.commit()
+            results["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
             logger.info(f"Migration completed successfully: {results}")
         except Exception as e:
+            session.rollback()
             logger.error(f"Migration failed: {e}")
             results["errors"] += 1
         return results
     
-    def _clear_existing_official_content(self, session: Session):
-        """Remove existing official content to prevent duplicates."""
-        deleted = session.query(UnifiedItem).filter(
-            UnifiedItem.source_type == "official"
-        ).delete()
-        logger.info(f"Cleared {deleted} existing official items")
+    # ------------------------------------------------------------------
+    # Upsert
+    # ------------------------------------------------------------------
     
-    def _migrate_spells(self, session: Session) -> int:
-        """Migrate all spells from DND_SPELL_DATABASE."""
-        count = 0
+    def _upsert(self, session: Session, rows: Dict[uuid.UUID, Dict[str, Any]], results: Dict[str, int]):
+        """Write new and changed rows, re-point legacy IDs, deactivate dropped items."""
+        existing = {}
+        legacy = []
+        for item_id, item_type, name, stored_hash, is_active in session.query(
+            UnifiedItem.id, UnifiedItem.item_type, UnifiedItem.name, UnifiedItem.content_hash, UnifiedItem.is_active
+        ).filter(UnifiedItem.source_type == "official"):
+            if item_id in rows:
+                existing[item_id] = (stored_hash, is_active)
+            else:
+                legacy.append((item_id, official_item_id(item_type, name)))
+        
+        now = datetime.now(timezone.utc)
+        pending = []
+        for item_id, row in rows.items():
+            stored_hash, is_active = existing.get(item_id, (None, None))
+            if stored_hash == row["content_hash"] and is_active:
+                results["unchanged"] += 1
+                continue
+            results["updated" if item_id in existing else "inserted"] += 1
+            pending.append({**row, "created_at": now, "updated_at": now})
+        
+        for batch_start in range(0, len(pending), UPSERT_BATCH_SIZE):
+            self._upsert_batch(session, pending[batch_start:batch_start + UPSERT_BATCH_SIZE])
+        
+        # Keep the full-text and class indexes in step with the Core writes
+        from sqlalchemy import bindparam
+        from src.services.catalog_class_index import sync_items_classes, remove_items_classes
+        from src.services.catalog_search import index_items, remove_items
+        connection = session.connection()
+        written = [SimpleNamespace(**row) for row in pending]
+        index_items(connection, written)
+        sync_items_classes(connection, written)
+        
+        # Older runs used random IDs; move references to the deterministic ID and drop the old row
+        remapped = [{"old_id": old_id, "new_id": new_id} for old_id, new_id in legacy if new_id in rows]
+        if remapped:
+            access = CharacterItemAccess.__table__
+            items = UnifiedItem.__table__
+            connection.execute(
+                access.update().where(access.c.item_id == bindparam("old_id")).values(item_id=bindparam("new_id")),
+                remapped
+            )
+            old_items = [SimpleNamespace(id=pair["old_id"]) for pair in remapped]
+            remove_items(connection, old_items)
+            remove_items_classes(connection, old_items)
+            connection.execute(items.delete().where(items.c.id == bindparam("old_id")),
+                               [{"old_id": pair["old_id"]} for pair in remapped])
+            results["remapped"] = len(remapped)
+        
+        # No longer in dnd_data.py; deactivate but keep the row for characters that reference it
+        dropped = [old_id for old_id, new_id in legacy if new_id not in rows]
+        if dropped:
+            results["deactivated"] = session.query(UnifiedItem).filter(
+                UnifiedItem.id.in_(dropped), UnifiedItem.is_active == True
+            ).update({UnifiedItem.is_active: False, UnifiedItem.updated_at: now}, synchronize_session=False)
+        
+        # The Core writes above bypass the counter listeners; one GROUP BY recounts
+        if pending or remapped or dropped:
+            from src.services.catalog_counters import rebuild_catalog_counters
+            rebuild_catalog_counters(connection)
+    
+    def _upsert_batch(self, session: Session, batch: List[Dict[str, Any]]):
+        """INSERT ... ON CONFLICT (id) DO UPDATE for one batch (ORM merge elsewhere)."""
+        table = UnifiedItem.__table__
+        dialect = session.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            for row in batch:
+                session.merge(UnifiedItem(**row))
+            session.flush()
+            return
+        
+        statement = insert(table)
+        updated = {column: statement.excluded[column] for column in HASHED_COLUMNS}
+        updated.update({
+            "content_hash": statement.excluded.content_hash,
+            "source_type": statement.excluded.source_type,
+            "is_active": True,
+            "updated_at": statement.excluded.updated_at,
+            "version": table.c.version + 1,
+        })
+        # executemany of one cached statement; SQLAlchemy batches it into multi-row VALUES
+        session.execute(statement.on_conflict_do_update(index_elements=[table.c.id], set_=updated), batch)
+    
+    def _row(self, item_type: str, name: str, **columns) -> Dict[str, Any]:
+        """Full unified_items row for an official item, with ID and content hash."""
+        row = {
+            "id": official_item_id(item_type, name),
+            "name": name,
+            "item_type": item_type,
+            "item_subtype": None,
+            "source_type": "official",
+            "source_info": None,
+            "llm_metadata": None,
+            "content_data": {},
+            "short_description": None,
+            "rarity": None,
+            "requires_attunement": False,
+            "spell_level": None,
+            "spell_school": None,
+            "class_restrictions": None,
+            "value_gp": None,
+            "weight_lbs": None,
+            "created_by": None,
+            "is_active": True,
+            "is_public": True,
+            "version": 1,
+            "source_book": "Player's Handbook 2024",
+        }
+        row.update(columns)
+        row["content_hash"] = content_hash(row)
+        return row
+    
+    # ------------------------------------------------------------------
+    # Rows per content type
+    # ------------------------------------------------------------------
+    
+    def _spell_rows(self) -> List[Dict[str, Any]]:
+        """Rows for all spells in DND_SPELL_DATABASE."""
+        rows = []
         
         for level_key, schools in DND_SPELL_DATABASE.items():
             spell_level = 0 if level_key == "cantrips" else int(level_key.split("_")[1])
@@ -80,34 +248,24 @@ class UnifiedCatalogMigration:
                         # Get detailed spell data
                         spell_data = self._get_spell_details(spell_name, spell_level, school)
                         
-                        # Create unified item
-                        item = UnifiedItem(
-                            id=uuid.uuid4(),
-                            name=spell_name,
-                            item_type="spell",
+                        rows.append(self._row(
+                            "spell", spell_name,
                             item_subtype=f"level_{spell_level}",
-                            source_type="official",
                             content_data=spell_data,
                             short_description=spell_data.get("description", "")[:500],
                             spell_level=spell_level,
                             spell_school=self.spell_school_mapping.get(school, school.title()),
-                            class_restrictions=spell_data.get("classes", []),
-                            source_book="Player's Handbook 2024",
-                            is_public=True,
-                            created_at=datetime.now(timezone.utc)
-                        )
-                        
-                        session.add(item)
-                        count += 1
+                            class_restrictions=spell_data.get("classes", [])
+                        ))
                         
                     except Exception as e:
                         logger.error(f"Failed to migrate spell {spell_name}: {e}")
         
-        return count
+        return rows
     
-    def _migrate_weapons(self, session: Session) -> int:
-        """Migrate all weapons from DND_WEAPON_DATABASE."""
-        count = 0
+    def _weapon_rows(self) -> List[Dict[str, Any]]:
+        """Rows for all weapons in DND_WEAPON_DATABASE."""
+        rows = []
         
         for category, weapons in DND_WEAPON_DATABASE.items():
             for weapon_name, weapon_data in weapons.items():
@@ -115,118 +273,79 @@ class UnifiedCatalogMigration:
                     # Determine weapon subtype
                     subtype = self._get_weapon_subtype(category, weapon_data)
                     
-                    # Create unified item
-                    item = UnifiedItem(
-                        id=uuid.uuid4(),
-                        name=weapon_name,
-                        item_type="weapon",
+                    rows.append(self._row(
+                        "weapon", weapon_name,
                         item_subtype=subtype,
-                        source_type="official",
                         content_data=weapon_data,
                         short_description=f"{category.replace('_', ' ').title()} weapon",
                         value_gp=self._parse_cost_to_gp(weapon_data.get("cost", "0 gp")),
-                        weight_lbs=self._parse_weight_to_lbs(weapon_data.get("weight", 1)),
-                        source_book="Player's Handbook 2024",
-                        is_public=True,
-                        created_at=datetime.now(timezone.utc)
-                    )
-                    
-                    session.add(item)
-                    count += 1
+                        weight_lbs=self._parse_weight_to_lbs(weapon_data.get("weight", 1))
+                    ))
                     
                 except Exception as e:
                     logger.error(f"Failed to migrate weapon {weapon_name}: {e}")
         
-        return count
+        return rows
     
-    def _migrate_armor(self, session: Session) -> int:
-        """Migrate all armor from DND_ARMOR_DATABASE."""
-        count = 0
+    def _armor_rows(self) -> List[Dict[str, Any]]:
+        """Rows for all armor in DND_ARMOR_DATABASE."""
+        rows = []
         
         for category, armor_items in DND_ARMOR_DATABASE.items():
             for armor_name, armor_data in armor_items.items():
                 try:
-                    # Create unified item
-                    item = UnifiedItem(
-                        id=uuid.uuid4(),
-                        name=armor_name,
-                        item_type="armor",
+                    rows.append(self._row(
+                        "armor", armor_name,
                         item_subtype=category,
-                        source_type="official",
                         content_data=armor_data,
                         short_description=f"{category.replace('_', ' ').title()} armor",
                         value_gp=self._parse_cost_to_gp(armor_data.get("cost", "0 gp")),
-                        weight_lbs=self._parse_weight_to_lbs(armor_data.get("weight", 1)),
-                        source_book="Player's Handbook 2024",
-                        is_public=True,
-                        created_at=datetime.now(timezone.utc)
-                    )
-                    
-                    session.add(item)
-                    count += 1
+                        weight_lbs=self._parse_weight_to_lbs(armor_data.get("weight", 1))
+                    ))
                     
                 except Exception as e:
                     logger.error(f"Failed to migrate armor {armor_name}: {e}")
         
-        return count
+        return rows
     
-    def _migrate_equipment(self, session: Session) -> int:
-        """Migrate all equipment from DND_ADVENTURING_GEAR_DATABASE."""
-        count = 0
+    def _equipment_rows(self) -> List[Dict[str, Any]]:
+        """Rows for all equipment in DND_ADVENTURING_GEAR_DATABASE."""
+        rows = []
         for category, items in DND_ADVENTURING_GEAR_DATABASE.items():
             for item_name, item_data in items.items():
                 try:
-                    # Create unified item
-                    item = UnifiedItem(
-                        id=uuid.uuid4(),
-                        name=item_name,
-                        item_type="equipment",
+                    rows.append(self._row(
+                        "equipment", item_name,
                         item_subtype=category,
-                        source_type="official",
                         content_data=item_data,
                         short_description=f"{category.replace('_', ' ').title()} equipment",
                         value_gp=self._parse_cost_to_gp(item_data.get("cost", "0 gp")),
-                        weight_lbs=self._parse_weight_to_lbs(item_data.get("weight", 1)),
-                        source_book="Player's Handbook 2024",
-                        is_public=True,
-                        created_at=datetime.now(timezone.utc)
-                    )
-                    session.add(item)
-                    count += 1
+                        weight_lbs=self._parse_weight_to_lbs(item_data.get("weight", 1))
+                    ))
                 except Exception as e:
                     logger.error(f"Failed to migrate equipment {item_name}: {e}")
-        return count
+        return rows
     
-    def _migrate_tools(self, session: Session) -> int:
-        """Migrate all tools from DND_TOOLS_DATABASE."""
-        count = 0
+    def _tool_rows(self) -> List[Dict[str, Any]]:
+        """Rows for all tools in DND_TOOLS_DATABASE."""
+        rows = []
         
         for category, tools in DND_TOOLS_DATABASE.items():
             for tool_name, tool_data in tools.items():
                 try:
-                    # Create unified item
-                    item = UnifiedItem(
-                        id=uuid.uuid4(),
-                        name=tool_name,
-                        item_type="tool",
+                    rows.append(self._row(
+                        "tool", tool_name,
                         item_subtype=category,
-                        source_type="official",
                         content_data=tool_data,
                         short_description=f"{category.replace('_', ' ').title()} tool",
                         value_gp=self._parse_cost_to_gp(tool_data.get("cost", "0 gp")),
-                        weight_lbs=self._parse_weight_to_lbs(tool_data.get("weight", 1)),
-                        source_book="Player's Handbook 2024",
-                        is_public=True,
-                        created_at=datetime.now(timezone.utc)
-                    )
-                    
-                    session.add(item)
-                    count += 1
+                        weight_lbs=self._parse_weight_to_lbs(tool_data.get("weight", 1))
+                    ))
                     
                 except Exception as e:
                     logger.error(f"Failed to migrate tool {tool_name}: {e}")
         
-        return count
+        return rows
     
     def _get_spell_details(self, spell_name: str, level: int, school: str) -> Dict[str, Any]:
         """Get detailed spell information."""
@@ -266,7 +385,7 @@ class UnifiedCatalogMigration:
         if any(word in spell_name.lower() for word in ["animal", "plant", "nature", "druid"]):
             classes.append("druid")
         
-        return list(set(classes))  # Remove duplicates
+        return sorted(set(classes))  # Remove duplicates; sorted so the content hash is stable
     
     def _get_weapon_subtype(self, category: str, weapon_data: Dict[str, Any]) -> str:
         """Determine weapon subtype based on category and properties."""
@@ -346,6 +465,18 @@ def run_migration(db: CharacterDB, session) -> Dict[str, int]:
     return migration.migrate_all_official_content(session)
 
 
+def sync_official_catalog() -> Dict[str, int]:
+    """Run the migration in its own session (application startup)."""
+    from src.models import database_models
+    if database_models.SessionLocal is None:
+        return {}
+    session = database_models.SessionLocal()
+    try:
+        return UnifiedCatalogMigration().migrate_all_official_content(session)
+    finally:
+        session.close()
+
+
 if __name__ == "__main__":
     import sys
     import os
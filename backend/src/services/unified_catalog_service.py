@@ -13,6 +13,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
 from src.models.database_models import UnifiedItem, CharacterItemAccess, Character, CharacterDB, get_db
+from src.services.catalog_class_index import class_restriction_filter
+from src.services.catalog_counters import catalog_stats
+from src.services.catalog_search import search_catalog
 from src.services.creation_validation import validate_item_allocation, CreationResult
 
 logger = logging.getLogger(__name__)
@@ -37,6 +40,14 @@ class UnifiedCatalogService:
                      name_filter: Optional[str] = None,
                      limit: int = 100) -> List[Dict[str, Any]]:
         """Search the unified item catalog with various filters."""
+        if name_filter:
+            # Ranked full-text search, best match first
+            results = self.full_text_search(
+                name_filter, limit=limit, item_type=item_type, item_subtype=item_subtype,
+                spell_level=spell_level, spell_school=spell_school, source_type=source_type,
+                class_restrictions=class_restrictions
+            )
+            return [result["item"] for result in results]
         
         query = self.session.query(UnifiedItem).filter(UnifiedItem.is_active == True)
         
@@ -51,18 +62,26 @@ class UnifiedCatalogService:
             query = query.filter(UnifiedItem.spell_school == spell_school)
         if source_type:
             query = query.filter(UnifiedItem.source_type == source_type)
-        if name_filter:
-            query = query.filter(UnifiedItem.name.ilike(f"%{name_filter}%"))
         if class_restrictions:
-            # Check if any of the specified classes can use this item
-            for class_name in class_restrictions:
-                query = query.filter(UnifiedItem.class_restrictions.contains([class_name]))
+            # Items usable by every specified class (indexed unified_item_classes lookup)
+            query = query.filter(class_restriction_filter(class_restrictions))
         
         # Limit results
         items = query.limit(limit).all()
         
         return [item.to_dict() for item in items]
     
+    def full_text_search(self, query: str, limit: int = 20,
+                         class_restrictions: Optional[List[str]] = None,
+                         **filters) -> List[Dict[str, Any]]:
+        """
+        Ranked full-text search over item name, description and content.
+        
+        Returns {"item", "score", "highlights"} dicts, best match first.
+        """
+        return search_catalog(self.session, query, limit=limit,
+                              class_restrictions=class_restrictions, **filters)
+    
     def get_item_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific item by UUID."""
         item = self.session.query(UnifiedItem).filter(
@@ -388,32 +407,11 @@ class UnifiedCatalogService:
         return uuids
     
     def get_catalog_stats(self) -> Dict[str, Any]:
-        """Get statistics about the unified item catalog."""
-        
-        total_items = self.session.query(UnifiedItem).filter(UnifiedItem.is_active == True).count()
-        
-        official_items = self.session.query(UnifiedItem).filter(
-            and_(UnifiedItem.is_active == True, UnifiedItem.source_type == "official")
-        ).count()
-        
-        custom_items = self.session.query(UnifiedItem).filter(
-            and_(UnifiedItem.is_active == True, UnifiedItem.source_type == "custom")
-        ).count()
-        
-        # Count by type
-        type_counts = {}
-        for item_type in ["spell", "weapon", "armor", "equipment", "tool"]:
-            count = self.session.query(UnifiedItem).filter(
-                and_(UnifiedItem.is_active == True, UnifiedItem.item_type == item_type)
-            ).count()
-            type_counts[item_type] = count
-        
-        return {
-            "total_items": total_items,
-            "official_items": official_items,
-            "custom_items": custom_items,
-            "by_type": type_counts
-        }
+        """
+        Get statistics about the unified item catalog: totals, and active items
+        by source, type, rarity and spell level (read from the counter table).
+        """
+        return catalog_stats(self.session)
     
     # Validation methods for item allocation are now handled by creation_validation.py only.
 
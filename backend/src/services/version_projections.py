@@ -0,0 +1,173 @@
+"""
+Metadata-only projections for the character versioning tree and timeline.
+
+get_repository_tree() loaded every CharacterCommit of a repository with its
+full character_data snapshot and serialised them all through to_dict(); the
+repository and branch to_dict() then loaded every commit again just to count
+them. The timeline and graph views did the same loading for a handful of
+scalar fields. For a long-lived character that is megabytes per request.
+
+The views now select only the metadata columns (COMMIT_METADATA_COLUMNS), so
+snapshots are never read; a snapshot is fetched on its own by commit hash
+(CharacterRepositoryManager.get_character_at_commit). Counts come from
+GROUP BY queries.
+
+DEPTH PAGINATION:
+- character_commits.depth is the commit's generation: 0 for the initial
+  commit, parent + 1 after that (the deeper parent for merges). It is set by
+  create_commit() and backfilled by ensure_commit_depths() on startup
+- Tree pages walk from the newest generation down:
+      WHERE repository_id = :repo
+        AND depth < :before_depth AND depth >= :before_depth - :depth_limit
+      ORDER BY depth DESC
+  served by the (repository_id, depth) index; a page holds depth_limit
+  generations (every branch's commits at those depths) and its
+  next_before_depth continues
+
+ETAGS:
+- repository_etag() hashes the branch heads (plus branch state and tags),
+  which change whenever a commit, branch, merge or tag does, so an unchanged
+  tree answers If-None-Match with 304 after two small queries
+
+Benchmark (repository with 300 commits of ~20 KB snapshots, SQLite unless a
+database URL is given):
+    cd backend && python -m benchmarks.version_projections --commits 300
+
+Usage:
+    tree = CharacterRepositoryManager.get_repository_tree(db, repo_id, depth_limit=50)
+    etag = repository_etag(db, repo_id, variant="tree:50")
+"""
+
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Everything on CharacterCommit except the character_data snapshot
+COMMIT_METADATA_COLUMNS = (
+    "id", "repository_id", "branch_id", "commit_hash", "short_hash", "commit_message", "commit_type",
+    "character_level", "experience_points", "milestone_name", "parent_commit_hash", "merge_parent_hash",
+    "depth", "changes_summary", "files_changed", "session_date", "campaign_context", "dm_notes",
+    "created_at", "created_by",
+)
+
+
+def _isoformat(value: Any) -> Any:
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def commit_metadata_query(db, repository_id: str, columns: Iterable[str] = COMMIT_METADATA_COLUMNS):
+    """Query selecting only the given CharacterCommit columns of one repository."""
+    from src.models.database_models import CharacterCommit
+    return db.query(*(getattr(CharacterCommit, name) for name in columns)).filter(
+        CharacterCommit.repository_id == repository_id
+    )
+
+
+def commit_rows(query) -> List[Dict[str, Any]]:
+    """Run a commit metadata query and return JSON-ready dicts."""
+    return [{name: _isoformat(value) for name, value in row._mapping.items()} for row in query]
+
+
+def commit_counts_by_branch(db, repository_id: str) -> Dict[str, int]:
+    """Commits per branch_id in one GROUP BY."""
+    from sqlalchemy import func
+    from src.models.database_models import CharacterCommit
+    return dict(db.query(CharacterCommit.branch_id, func.count()).filter(
+        CharacterCommit.repository_id == repository_id
+    ).group_by(CharacterCommit.branch_id).all())
+
+
+def repository_etag(db, repository_id: str, variant: str = "") -> Optional[str]:
+    """
+    Strong ETag for a repository's versioning views, or None when the
+    repository does not exist. variant distinguishes representations (view,
+    page, options) of the same state.
+    """
+    from src.models.database_models import CharacterBranch, CharacterRepository, CharacterTag
+
+    repository = db.query(CharacterRepository.id, CharacterRepository.updated_at).filter(
+        CharacterRepository.id == repository_id
+    ).first()
+    if repository is None:
+        return None
+    branches = db.query(
+        CharacterBranch.id, CharacterBranch.head_commit_hash, CharacterBranch.is_active,
+        CharacterBranch.is_merged, CharacterBranch.updated_at
+    ).filter(CharacterBranch.repository_id == repository_id).order_by(CharacterBranch.id).all()
+    tags = db.query(CharacterTag.id, CharacterTag.commit_hash).filter(
+        CharacterTag.repository_id == repository_id
+    ).order_by(CharacterTag.id).all()
+
+    digest = hashlib.sha256(variant.encode())
+    digest.update(str(repository.updated_at).encode())
+    for row in branches:
+        digest.update("|".join(str(value) for value in row).encode())
+    for row in tags:
+        digest.update("|".join(str(value) for value in row).encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+# ============================================================================
+# DEPTH BACKFILL
+# ============================================================================
+
+def compute_depths(commits: Iterable[Any]) -> Dict[str, int]:
+    """
+    Depth per commit_hash from (commit_hash, parent_commit_hash,
+    merge_parent_hash) rows; parents outside the rows count as roots.
+    """
+    parents = {row.commit_hash: [p for p in (row.parent_commit_hash, row.merge_parent_hash) if p]
+               for row in commits}
+    depths: Dict[str, int] = {}
+    for start in parents:
+        stack = [start]
+        while stack:
+            commit_hash = stack[-1]
+            if commit_hash in depths:
+                stack.pop()
+                continue
+            pending = [p for p in parents.get(commit_hash, []) if p in parents and p not in depths]
+            if pending:
+                stack.extend(pending)
+                continue
+            known = [depths[p] for p in parents.get(commit_hash, []) if p in depths]
+            depths[commit_hash] = max(known) + 1 if known else 0
+            stack.pop()
+    return depths
+
+
+def ensure_commit_depths(engine) -> int:
+    """Create the depth index and fill depth for commits without one. Returns the rows updated."""
+    from sqlalchemy import bindparam, inspect, select
+    from src.models.database_models import CharacterCommit
+
+    table = CharacterCommit.__table__
+    try:
+        existing = {index["name"] for index in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+        updated = 0
+        with engine.begin() as connection:
+            repositories = [row[0] for row in connection.execute(
+                select(table.c.repository_id).where(table.c.depth.is_(None)).distinct()
+            )]
+            for repository_id in repositories:
+                commits = connection.execute(
+                    select(table.c.commit_hash, table.c.parent_commit_hash, table.c.merge_parent_hash)
+                    .where(table.c.repository_id == repository_id)
+                ).all()
+                depths = compute_depths(commits)
+                connection.execute(
+                    table.update().where(table.c.commit_hash == bindparam("hash")).values(depth=bindparam("new_depth")),
+                    [{"hash": commit_hash, "new_depth": depth} for commit_hash, depth in depths.items()]
+                )
+                updated += len(depths)
+        if updated:
+            logger.info(f"Backfilled depth for {updated} commits in {len(repositories)} repositories")
+        return updated
+    except Exception as e:
+        logger.warning(f"Could not backfill commit depths: {e}")
+        return 0
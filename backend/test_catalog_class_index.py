@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Catalog Class Index Test
+
+Class-restricted catalog queries through the unified_item_classes lookup:
+all/any matching, upkeep by the UnifiedItem listeners and the startup backfill.
+"""
+
+import uuid
+
+from sqlalchemy import text
+
+from testing_support import memory_database
+from src.models.database_models import UnifiedItem, UnifiedItemClass
+from src.services.catalog_class_index import (
+    class_restriction_filter, class_restriction_sql, ensure_class_index, normalize_class_names
+)
+
+ITEMS = {
+    "Fireball": ["Wizard", "Sorcerer"],
+    "Cure Wounds": ["Cleric", "Druid", "Bard", "Paladin", "Ranger"],
+    "Mage Hand": ["wizard", " Sorcerer ", "Bard", "Warlock", "wizard"],
+    "Longsword": None,
+}
+
+
+def _session():
+    engine, Session = memory_database()
+    session = Session()
+    for name, classes in ITEMS.items():
+        session.add(UnifiedItem(name=name, item_type="spell" if classes else "weapon", source_type="official",
+                                content_data={}, class_restrictions=classes, is_active=True))
+    session.commit()
+    return engine, session
+
+
+def _matching(session, class_names, match_all=True):
+    return sorted(item.name for item in session.query(UnifiedItem).filter(
+        class_restriction_filter(class_names, match_all)))
+
+
+def _matching_sql(session, class_names, match_all=True):
+    clause, params = class_restriction_sql(class_names, match_all)
+    return sorted(row[0] for row in session.execute(text(f"SELECT u.name FROM unified_items u WHERE {clause}"), params))
+
+
+def test_class_matching():
+    print("🧪 Testing class restriction matching...")
+
+    engine, session = _session()
+    assert normalize_class_names(ITEMS["Mage Hand"]) == ["wizard", "sorcerer", "bard", "warlock"]
+    assert _matching(session, ["WIZARD"]) == ["Fireball", "Mage Hand"]
+    assert _matching(session, ["wizard", "bard"]) == ["Mage Hand"]
+    assert _matching(session, ["wizard", "bard"], match_all=False) == ["Cure Wounds", "Fireball", "Mage Hand"]
+    # Items without restrictions never match a class filter; no classes means no filter
+    assert "Longsword" not in _matching(session, ["fighter"], match_all=False)
+    assert len(_matching(session, [])) == len(ITEMS)
+
+    for class_names, match_all in ((["wizard"], True), (["wizard", "bard"], True), (["cleric", "warlock"], False)):
+        assert _matching_sql(session, class_names, match_all) == _matching(session, class_names, match_all)
+    print("✅ All/any matching is case-insensitive and agrees with the raw SQL clause")
+
+
+def test_listeners_keep_rows_current():
+    print("🧪 Testing class row upkeep...")
+
+    engine, session = _session()
+    fireball = session.query(UnifiedItem).filter(UnifiedItem.name == "Fireball").one()
+    fireball.class_restrictions = ["Wizard", "Sorcerer", "Warlock"]
+    session.commit()
+    assert _matching(session, ["warlock"]) == ["Fireball", "Mage Hand"]
+
+    fireball.class_restrictions = None
+    session.commit()
+    assert "Fireball" not in _matching(session, ["wizard"])
+
+    session.delete(session.query(UnifiedItem).filter(UnifiedItem.name == "Mage Hand").one())
+    session.commit()
+    assert session.query(UnifiedItemClass).filter(UnifiedItemClass.class_name == "warlock").count() == 0
+    print("✅ Updates and deletes rewrite the item's class rows")
+
+
+def test_backfill_and_orphans():
+    print("🧪 Testing the startup backfill...")
+
+    engine, session = _session()
+    expected = _matching(session, ["bard"], match_all=False)
+    with engine.begin() as connection:
+        connection.execute(UnifiedItemClass.__table__.delete())
+        # Bulk writes bypass the listeners
+        connection.execute(UnifiedItem.__table__.insert(), [{
+            "id": uuid.uuid4(), "name": "Vicious Mockery", "item_type": "spell", "source_type": "official",
+            "content_data": {}, "class_restrictions": ["Bard"], "is_active": True,
+        }])
+    assert _matching(session, ["bard"]) == []
+
+    assert ensure_class_index(engine) > 0
+    assert _matching(session, ["bard"], match_all=False) == sorted(expected + ["Vicious Mockery"])
+    # A populated table is left alone
+    assert ensure_class_index(engine) == 0
+
+    with engine.begin() as connection:
+        connection.execute(UnifiedItem.__table__.delete().where(UnifiedItem.__table__.c.name == "Vicious Mockery"))
+    ensure_class_index(engine)
+    assert _matching(session, ["bard"], match_all=False) == expected
+    session.close()
+    print("✅ Empty tables are backfilled and orphaned rows removed")
+
+
+if __name__ == "__main__":
+    test_class_matching()
+    test_listeners_keep_rows_current()
+    test_backfill_and_orphans()
+    print("\n✅ ALL CATALOG CLASS INDEX TESTS PASSED!")
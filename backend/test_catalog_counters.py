@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Catalog Counter Test
+
+The unified_item_counters rows kept by the UnifiedItem listeners must always
+equal a COUNT/GROUP BY over unified_items, and the catalog stats come from them.
+"""
+
+import uuid
+
+from sqlalchemy import select
+
+from testing_support import memory_database
+from src.models.database_models import UnifiedItem, UnifiedItemCounter
+from src.services.catalog_counters import (
+    catalog_counter_stats, catalog_stats, grouped_counts, rebuild_catalog_counters, summarize_counts
+)
+
+ITEMS = [
+    ("Fireball", "spell", "official", None, 3),
+    ("Fire Bolt", "spell", "official", None, 0),
+    ("Shield", "spell", "official", None, 1),
+    ("Longsword", "weapon", "official", None, None),
+    ("Flame Tongue", "weapon", "official", "rare", None),
+    ("Plate", "armor", "official", None, None),
+    ("Homebrew Blade", "weapon", "custom", "uncommon", None),
+    ("Homebrew Hex", "spell", "custom", None, 1),
+]
+
+
+def _session():
+    engine, Session = memory_database()
+    session = Session()
+    for name, item_type, source_type, rarity, spell_level in ITEMS:
+        session.add(UnifiedItem(name=name, item_type=item_type, source_type=source_type, rarity=rarity,
+                                spell_level=spell_level, content_data={}, is_active=True))
+    session.commit()
+    return engine, session
+
+
+def _counters(session):
+    table = UnifiedItemCounter.__table__
+    rows = session.execute(select(table.c.source_type, table.c.item_type, table.c.rarity, table.c.spell_level,
+                                  table.c.item_count).where(table.c.item_count != 0)).all()
+    return {tuple(row[:4]): row[4] for row in rows}
+
+
+def _assert_consistent(session):
+    assert _counters(session) == grouped_counts(session.connection())
+    assert catalog_stats(session) == summarize_counts(grouped_counts(session.connection()).items())
+
+
+def test_listeners_match_group_by():
+    print("🧪 Testing counter upkeep...")
+
+    engine, session = _session()
+    _assert_consistent(session)
+    stats = catalog_stats(session)
+    assert (stats["total_items"], stats["official_items"], stats["custom_items"]) == (8, 6, 2)
+    assert stats["by_type"] == {"spell": 4, "weapon": 3, "armor": 1, "equipment": 0, "tool": 0}
+    assert stats["by_rarity"] == {"rare": 1, "uncommon": 1}
+    assert stats["by_spell_level"] == {"0": 1, "1": 2, "3": 1}
+
+    def item(name):
+        return session.query(UnifiedItem).filter(UnifiedItem.name == name).one()
+
+    item("Fireball").spell_level = 4
+    item("Longsword").rarity = "common"
+    session.commit()
+    _assert_consistent(session)
+
+    item("Shield").is_active = False
+    session.commit()
+    _assert_consistent(session)
+    assert catalog_stats(session)["by_spell_level"] == {"0": 1, "1": 1, "4": 1}
+
+    # Edits that leave the key alone do not touch the counters
+    before = catalog_counter_stats.get_stats()["adjustments"]
+    shield = item("Shield")
+    shield.short_description = "Inactive and edited"
+    item("Plate").short_description = "Heavy"
+    session.commit()
+    assert catalog_counter_stats.get_stats()["adjustments"] == before
+
+    shield.is_active = True
+    session.delete(item("Homebrew Hex"))
+    session.delete(item("Flame Tongue"))
+    session.commit()
+    _assert_consistent(session)
+    stats = catalog_stats(session)
+    assert (stats["total_items"], stats["custom_items"], stats["by_rarity"]) == (6, 1, {"common": 1, "uncommon": 1})
+    session.close()
+    print("✅ Inserts, updates, deactivations and deletes keep counters equal to the GROUP BY")
+
+
+def test_rebuild_after_bulk_writes():
+    print("🧪 Testing rebuilds after bulk writes...")
+
+    engine, session = _session()
+    with engine.begin() as connection:
+        # Core writes bypass the listeners
+        connection.execute(UnifiedItem.__table__.insert(), [
+            {"id": uuid.uuid4(), "name": f"Potion {i}", "item_type": "equipment", "source_type": "official",
+             "rarity": "common", "content_data": {}, "is_active": True} for i in range(5)
+        ])
+        assert _counters(session) != grouped_counts(connection)
+        assert rebuild_catalog_counters(connection) == len(grouped_counts(connection))
+    _assert_consistent(session)
+    assert catalog_stats(session)["by_type"]["equipment"] == 5
+    session.close()
+    print("✅ rebuild_catalog_counters() repairs drift from bulk writes")
+
+
+def test_group_by_fallback():
+    print("🧪 Testing the GROUP BY fallback...")
+
+    engine, session = _session()
+    expected = catalog_stats(session)
+    UnifiedItemCounter.__table__.drop(bind=engine)
+    before = catalog_counter_stats.get_stats()["group_by_reads"]
+    assert catalog_stats(session) == expected
+    assert catalog_counter_stats.get_stats()["group_by_reads"] == before + 1
+    # The caller's transaction is still usable
+    assert session.query(UnifiedItem).count() == len(ITEMS)
+    session.close()
+    print("✅ Without the counter table, stats come from one GROUP BY")
+
+
+if __name__ == "__main__":
+    test_listeners_match_group_by()
+    test_rebuild_after_bulk_writes()
+    test_group_by_fallback()
+    print("\n✅ ALL CATALOG COUNTER TESTS PASSED!")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Official Catalog Migration Test
+
+The official-content migration as an idempotent upsert with UUIDv5 item IDs:
+re-runs write nothing, legacy random IDs are re-pointed along with character
+references, and items dropped from the rules are deactivated.
+"""
+
+import uuid
+
+from testing_support import scratch_database
+from src.models.database_models import Character, CharacterItemAccess, UnifiedItem
+from src.services.unified_catalog_migration import UnifiedCatalogMigration, official_item_id
+
+
+def _migrate(session):
+    results = UnifiedCatalogMigration().migrate_all_official_content(session)
+    assert results["errors"] == 0, results
+    return results
+
+
+def test_rerun_writes_nothing():
+    print("🧪 Testing migration re-runs...")
+
+    session = scratch_database("catalog_migration")
+    first = _migrate(session)
+    total = first["spells"] + first["weapons"] + first["armor"] + first["equipment"] + first["tools"]
+    assert first["inserted"] == total > 0
+    ids = {item_id for (item_id,) in session.query(UnifiedItem.id)}
+
+    second = _migrate(session)
+    assert (second["inserted"], second["updated"], second["unchanged"]) == (0, 0, total)
+    assert {item_id for (item_id,) in session.query(UnifiedItem.id)} == ids
+
+    fireball = session.query(UnifiedItem).filter(UnifiedItem.name == "Fireball").one()
+    assert fireball.id == official_item_id("spell", "Fireball") == official_item_id("spell", " fireball ")
+
+    # A changed row is rewritten, and only that row
+    fireball.short_description = "Edited by hand"
+    fireball.content_hash = "stale"
+    session.commit()
+    third = _migrate(session)
+    assert (third["inserted"], third["updated"]) == (0, 1)
+    session.refresh(fireball)
+    assert fireball.short_description != "Edited by hand"
+    session.close()
+    print("✅ Re-runs keep IDs and write only new or changed rows")
+
+
+def test_legacy_ids_are_remapped():
+    print("🧪 Testing legacy ID remapping...")
+
+    session = scratch_database("catalog_migration")
+    legacy_id, retired_id = uuid.uuid4(), uuid.uuid4()
+    session.add_all([
+        UnifiedItem(id=legacy_id, name="Fireball", item_type="spell", source_type="official",
+                    content_data={}, is_active=True),
+        UnifiedItem(id=retired_id, name="Spell Removed From The Rules", item_type="spell",
+                    source_type="official", content_data={}, is_active=True),
+        Character(id="character-1", name="Tester", species="Elf", level=5, character_classes={"Wizard": 5}),
+    ])
+    session.flush()
+    session.add(CharacterItemAccess(character_id="character-1", item_id=legacy_id, access_type="spells_known"))
+    session.commit()
+
+    results = _migrate(session)
+    assert results["remapped"] == 1 and results["deactivated"] == 1
+
+    new_id = official_item_id("spell", "Fireball")
+    assert session.get(UnifiedItem, legacy_id) is None
+    access = session.query(CharacterItemAccess).filter(CharacterItemAccess.character_id == "character-1").one()
+    assert access.item_id == new_id
+    assert session.get(UnifiedItem, retired_id).is_active is False
+    session.close()
+    print("✅ Character references follow the deterministic ID; dropped items are kept inactive")
+
+
+if __name__ == "__main__":
+    test_rerun_writes_nothing()
+    test_legacy_ids_are_remapped()
+    print("\n✅ ALL CATALOG MIGRATION TESTS PASSED!")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Catalog Search Test
+
+Ranked full-text search over the unified catalog (SQLite FTS5 here): prefix and
+typo matching, ranking, filters, highlight escaping, index upkeep and the
+vocabulary cache behind typo expansion.
+"""
+
+
+from testing_support import scratch_database
+from src.models.database_models import UnifiedItem
+from src.services.catalog_search import search_catalog, search_index
+
+ITEMS = [
+    {"name": "Fireball", "item_type": "spell", "spell_level": 3, "spell_school": "evocation",
+     "class_restrictions": ["Wizard", "Sorcerer"],
+     "short_description": "A bright streak blossoms into an explosion of flame."},
+    {"name": "Fire Bolt", "item_type": "spell", "spell_level": 0, "spell_school": "evocation",
+     "class_restrictions": ["Wizard", "Sorcerer", "Artificer"],
+     "short_description": "You hurl a mote of fire at a creature or object."},
+    {"name": "Flame Tongue", "item_type": "weapon", "rarity": "rare",
+     "short_description": "Speak the command word and fire erupts from the blade."},
+    {"name": "Shield", "item_type": "spell", "spell_level": 1, "spell_school": "abjuration",
+     "class_restrictions": ["Wizard"], "short_description": "An invisible barrier of magical force."},
+    {"name": "Cursed <b>Blade</b>", "item_type": "weapon",
+     "short_description": "Whispers <script>alert('fire')</script> to its wielder."},
+]
+
+
+def _session():
+    session = scratch_database("catalog_search")
+    for data in ITEMS:
+        session.add(UnifiedItem(source_type="official", content_data={}, is_active=True, **data))
+    session.commit()
+    return session
+
+
+def _names(results):
+    return [result["item"]["name"] for result in results]
+
+
+def test_prefix_typo_and_ranking():
+    print("🧪 Testing matching and ranking...")
+
+    session = _session()
+    fire = _names(search_catalog(session, "fire"))
+    # Name matches outrank description matches
+    assert set(fire[:2]) == {"Fireball", "Fire Bolt"}
+    assert {"Flame Tongue", "Cursed <b>Blade</b>"} <= set(fire[2:])
+    assert "Shield" not in fire
+
+    assert _names(search_catalog(session, "firbal"))[0] == "Fireball"
+    # No item matches every term, so any term may match
+    assert {"Fireball", "Shield"} <= set(_names(search_catalog(session, "fireball shield")))
+    assert search_catalog(session, "   ") == []
+    session.close()
+    print("✅ Prefix, typo and OR-fallback matches are ranked name first")
+
+
+def test_filters():
+    print("🧪 Testing search filters...")
+
+    session = _session()
+    assert _names(search_catalog(session, "fire", item_type="weapon")) in (
+        ["Flame Tongue", "Cursed <b>Blade</b>"], ["Cursed <b>Blade</b>", "Flame Tongue"]
+    )
+    assert _names(search_catalog(session, "fire", spell_level=0)) == ["Fire Bolt"]
+    assert set(_names(search_catalog(session, "evocation", class_restrictions=["artificer"]))) == {"Fire Bolt"}
+    assert set(_names(search_catalog(session, "evocation", class_restrictions=["wizard", "artificer"],
+                                     class_match="any"))) == {"Fireball", "Fire Bolt"}
+    session.close()
+    print("✅ Type, level and class filters narrow the ranked results")
+
+
+def test_highlights_are_escaped():
+    print("🧪 Testing highlight escaping...")
+
+    session = _session()
+    (cursed,) = [r for r in search_catalog(session, "fire") if r["item"]["name"].startswith("Cursed")]
+    description = cursed["highlights"]["description"]
+    assert "<script>" not in description
+    assert "&lt;script&gt;" in description and "<mark>fire</mark>" in description
+
+    (blade,) = search_catalog(session, "blade", item_type="weapon", limit=1)
+    assert blade["highlights"]["name"] == "Cursed &lt;b&gt;<mark>Blade</mark>&lt;/b&gt;"
+    session.close()
+    print("✅ Item text is escaped, only <mark> is markup")
+
+
+def test_listeners_keep_index_current():
+    print("🧪 Testing index maintenance...")
+
+    session = _session()
+    shield = session.query(UnifiedItem).filter(UnifiedItem.name == "Shield").one()
+    shield.name = "Shield of Faith"
+    session.commit()
+    assert _names(search_catalog(session, "faith")) == ["Shield of Faith"]
+
+    session.delete(shield)
+    session.commit()
+    assert search_catalog(session, "faith") == []
+    session.close()
+    print("✅ Updates and deletes reach the index")
+
+
+def test_vocabulary_cache():
+    print("🧪 Testing the typo vocabulary cache...")
+
+    session = _session()
+    loads = search_index.get_stats()["vocabulary_loads"]
+    # Prefix hits never need the vocabulary
+    assert _names(search_catalog(session, "fireb")) == ["Fireball"]
+    assert search_index.get_stats()["vocabulary_loads"] == loads
+
+    assert _names(search_catalog(session, "firbal")) == ["Fireball"]
+    assert _names(search_catalog(session, "sheild")) == ["Shield"]
+    assert search_index.get_stats()["vocabulary_loads"] == loads + 1
+
+    # Writes do not reload it; new items are found by prefix straight away
+    session.add(UnifiedItem(name="Thunderwave", item_type="spell", source_type="official",
+                            content_data={}, is_active=True))
+    session.commit()
+    assert _names(search_catalog(session, "thunder")) == ["Thunderwave"]
+    assert search_catalog(session, "thundrwave") == []
+    assert search_index.get_stats()["vocabulary_loads"] == loads + 1
+
+    # Once the TTL has passed the next miss reloads it
+    url = str(session.get_bind().engine.url)
+    loaded_at, terms = search_index.vocabulary[url]
+    search_index.vocabulary[url] = (loaded_at - search_index.vocabulary_ttl - 1, terms)
+    assert _names(search_catalog(session, "thundrwave")) == ["Thunderwave"]
+    assert search_index.get_stats()["vocabulary_loads"] == loads + 2
+    session.close()
+    print("✅ The vocabulary loads only on a miss and refreshes after its TTL")
+
+
+if __name__ == "__main__":
+    test_prefix_typo_and_ranking()
+    test_filters()
+    test_highlights_are_escaped()
+    test_listeners_keep_index_current()
+    test_vocabulary_cache()
+    print("\n✅ ALL CATALOG SEARCH TESTS PASSED!")
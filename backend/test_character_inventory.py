@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Character Inventory Test
+
+Inventory, equipped slots and attunements moved from the Character.equipment
+JSON into tables: the startup migration, writes of the legacy shape, and the
+row-level CharacterDB helpers.
+"""
+
+
+from testing_support import memory_database
+from src.models.database_models import Character, CharacterDB
+from src.services.character_inventory import migrate_inventory_blobs
+
+LEGACY_EQUIPMENT = {
+    "inventory": [
+        {"name": "Ring of Protection", "requires_attunement": True, "item_id": "ring-1"},
+        {"name": "Rope", "quantity": 1, "item_id": "rope-1"},
+        {"name": "Ring of Protection", "requires_attunement": True, "item_id": "ring-1"},
+    ],
+    "attuned_items": ["Ring of Protection", "Cloak of Elvenkind"],
+    "equipped_items": {"finger": "Ring of Protection"},
+    "gold": 25,
+}
+
+
+def _database(equipment):
+    engine, Session = memory_database()
+    with Session() as session:
+        session.add(Character(id="character-1", name="Tester", species="Elf", level=3,
+                              character_classes={"Wizard": 3}, equipment=equipment))
+        session.commit()
+    return engine, Session
+
+
+def test_migration_round_trip():
+    print("🧪 Testing inventory migration round trip...")
+
+    engine, Session = _database(LEGACY_EQUIPMENT)
+    assert migrate_inventory_blobs(engine) == {"characters": 1, "items": 4}
+    # Migrated characters no longer match the prefilter
+    assert migrate_inventory_blobs(engine) == {"characters": 0, "items": 0}
+
+    with Session() as session:
+        character = session.get(Character, "character-1")
+        assert character.equipment == {"gold": 25}
+
+        equipment = character.to_dict()["equipment"]
+        assert equipment["gold"] == 25
+        assert equipment["equipped_items"] == LEGACY_EQUIPMENT["equipped_items"]
+        assert equipment["attuned_items"] == LEGACY_EQUIPMENT["attuned_items"]
+        assert [item["name"] for item in equipment["inventory"]] == [
+            "Ring of Protection", "Rope", "Ring of Protection", "Cloak of Elvenkind"
+        ]
+        # The duplicated item_id is replaced so each row keeps a unique key
+        assert equipment["inventory"][:2] == LEGACY_EQUIPMENT["inventory"][:2]
+        assert len({item["item_id"] for item in equipment["inventory"]}) == 4
+
+        assert CharacterDB.get_equipped_items(session, "character-1") == LEGACY_EQUIPMENT["equipped_items"]
+        assert CharacterDB.get_attuned_items(session, "character-1") == LEGACY_EQUIPMENT["attuned_items"]
+    print("✅ Inventory, slots and attunements survive the move")
+
+
+def test_legacy_shape_written_back():
+    print("🧪 Testing equipment written back in the legacy shape...")
+
+    engine, Session = _database({"inventory": [{"name": "Rope", "item_id": "rope-1"}], "gold": 5})
+    migrate_inventory_blobs(engine)
+    with Session() as session:
+        # A client GETs the character and PUTs its equipment back, adding a torch and attuning
+        equipment = session.get(Character, "character-1").to_dict()["equipment"]
+        equipment["inventory"].append({"name": "Torch"})
+        equipment["attuned_items"] = ["Rope"]
+        equipment["equipped_items"] = {"main_hand": "Torch"}
+        CharacterDB.update_character(session, "character-1", {"equipment": equipment})
+
+        character = session.get(Character, "character-1")
+        assert character.equipment == {"gold": 5}
+        assert [item["name"] for item in CharacterDB.get_inventory(session, "character-1")] == ["Rope", "Torch"]
+        assert CharacterDB.get_attuned_items(session, "character-1") == ["Rope"]
+        assert CharacterDB.get_equipped_items(session, "character-1") == {"main_hand": "Torch"}
+
+        # Entries left out of a PUT are removed, kept ones keep their item_id
+        equipment = character.to_dict()["equipment"]
+        equipment["inventory"] = [item for item in equipment["inventory"] if item["name"] == "Rope"]
+        CharacterDB.update_character(session, "character-1", {"equipment": equipment})
+        assert CharacterDB.get_inventory(session, "character-1") == [{"name": "Rope", "item_id": "rope-1"}]
+
+    # Blobs written back before this fix are not moved twice
+    with Session() as session:
+        character = session.get(Character, "character-1")
+        character.equipment = character.to_dict()["equipment"]
+        session.commit()
+    assert migrate_inventory_blobs(engine) == {"characters": 1, "items": 0}
+    with Session() as session:
+        assert [item["item_id"] for item in CharacterDB.get_inventory(session, "character-1")] == ["rope-1"]
+        assert CharacterDB.get_attuned_items(session, "character-1") == ["Rope"]
+
+    with Session() as session:
+        created = CharacterDB.create_character(session, {"name": "New", "equipment": dict(LEGACY_EQUIPMENT)})
+        assert created.equipment == {"gold": 25}
+        assert created.to_dict()["equipment"]["attuned_items"] == LEGACY_EQUIPMENT["attuned_items"]
+    print("✅ Legacy keys sent by clients go to the tables, never back into the blob")
+
+
+def test_row_level_helpers():
+    print("🧪 Testing row-level inventory helpers...")
+
+    engine, Session = _database({"gold": 5})
+    with Session() as session:
+        assert CharacterDB.add_inventory_item(session, "character-1", {"name": "Wand", "requires_attunement": True})
+        assert CharacterDB.add_inventory_item(session, "character-1", {"name": "Torch"})
+        assert CharacterDB.update_inventory_item(session, "character-1", "Torch", {"quantity": 3})
+        assert CharacterDB.add_attuned_item(session, "character-1", "Wand")
+        assert not CharacterDB.add_attuned_item(session, "character-1", "Torch")
+        assert CharacterDB.equip_item(session, "character-1", "Wand", "main_hand")
+
+        inventory = CharacterDB.get_inventory(session, "character-1")
+        assert [item["name"] for item in inventory] == ["Wand", "Torch"]
+        assert inventory[1]["quantity"] == 3
+        assert session.get(Character, "character-1").equipment == {"gold": 5}
+
+        # Attunement lives on the item row: removing the item ends it
+        assert CharacterDB.remove_inventory_item(session, "character-1", "Wand")
+        assert CharacterDB.get_attuned_items(session, "character-1") == []
+        assert not CharacterDB.remove_inventory_item(session, "character-1", "Wand")
+        assert CharacterDB.unequip_item(session, "character-1", "main_hand")
+        assert not CharacterDB.unequip_item(session, "character-1", "main_hand")
+    print("✅ Helpers add, update, attune, equip and remove single rows")
+
+
+if __name__ == "__main__":
+    test_migration_round_trip()
+    test_legacy_shape_written_back()
+    test_row_level_helpers()
+    print("\n✅ ALL CHARACTER INVENTORY TESTS PASSED!")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Compressed JSON Test
+
+CompressedJSON / CompressedText columns: round trips, small values kept raw,
+values written before the switch, the online backfill, trained dictionaries
+and a startup that leaves table definitions alone.
+"""
+
+
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, event, select, text
+
+from src.models.compressed_json import (
+    HEADER_RAW, CompressedJSON, CompressedText, compress_existing_rows, is_encoded, migrate_compressed_columns,
+    needs_binary_migration, prepare_compressed_columns, train_dictionary, zstandard
+)
+
+CHARACTER = {
+    "name": "Thorin Oakenshield",
+    "species": "Dwarf",
+    "classes": {"Fighter": 5},
+    "ability_scores": {"strength": 16, "dexterity": 12, "constitution": 15, "intelligence": 10,
+                       "wisdom": 13, "charisma": 8},
+    "equipment": [{"name": "Battleaxe", "quantity": 1}] * 20,
+    "notes": "Naïve déjà vu – ünïcödé survives.",
+}
+
+
+def _table():
+    engine = create_engine("sqlite://")
+    metadata = MetaData()
+    table = Table("documents", metadata,
+                  Column("id", Integer, primary_key=True),
+                  Column("data", CompressedJSON(family="test_documents")),
+                  Column("notes", CompressedText(family="test_notes")))
+    metadata.create_all(bind=engine)
+    return engine, table
+
+
+def _stored(engine, table, column="data"):
+    with engine.connect() as connection:
+        return [row[0] for row in connection.execute(text(f"SELECT {column} FROM {table.name} ORDER BY id"))]
+
+
+def test_round_trip():
+    print("🧪 Testing round trips...")
+
+    engine, table = _table()
+    with engine.begin() as connection:
+        connection.execute(table.insert(), [
+            {"id": 1, "data": CHARACTER, "notes": "A long backstory. " * 100},
+            {"id": 2, "data": {"hp": 12}, "notes": "short"},
+            {"id": 3, "data": None, "notes": None},
+        ])
+        rows = connection.execute(select(table).order_by(table.c.id)).all()
+    assert [(row.data, row.notes) for row in rows] == [
+        (CHARACTER, "A long backstory. " * 100), ({"hp": 12}, "short"), (None, None)
+    ]
+
+    large, small, missing = _stored(engine, table)
+    assert is_encoded(large) and large[0] != HEADER_RAW and len(large) < len(str(CHARACTER))
+    # Values under the threshold are stored raw behind the header
+    assert small == bytes([HEADER_RAW]) + b'{"hp":12}'
+    assert missing is None
+    print("✅ Values round-trip; large ones are compressed, small ones stored raw")
+
+
+def test_legacy_values_and_backfill():
+    print("🧪 Testing legacy values and the backfill...")
+
+    engine, table = _table()
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO documents (id, data, notes) VALUES (1, :data, :notes)"),
+                           {"data": '{"name": "Legacy", "tags": ["old"]}', "notes": "Written before the switch"})
+        connection.execute(table.insert(), {"id": 2, "data": CHARACTER, "notes": None})
+    with engine.connect() as connection:
+        legacy = connection.execute(select(table).where(table.c.id == 1)).one()
+    assert legacy.data == {"name": "Legacy", "tags": ["old"]}
+    assert legacy.notes == "Written before the switch"
+
+    results = compress_existing_rows(engine, table, "data", batch_size=1)
+    assert (results["scanned"], results["rewritten"], results["skipped_concurrent"]) == (2, 1, 0)
+    assert compress_existing_rows(engine, table, "notes")["rewritten"] == 1
+    assert all(is_encoded(value) for value in _stored(engine, table))
+    with engine.connect() as connection:
+        rows = connection.execute(select(table).order_by(table.c.id)).all()
+    assert [row.data for row in rows] == [{"name": "Legacy", "tags": ["old"]}, CHARACTER]
+    assert rows[0].notes == "Written before the switch"
+
+    # A second pass has nothing left to do
+    assert compress_existing_rows(engine, table, "data")["rewritten"] == 0
+    print("✅ Pre-switch values are read and rewritten in place")
+
+
+def test_dictionaries():
+    print("🧪 Testing trained dictionaries...")
+
+    if zstandard is None:
+        print("⚠️ zstandard not installed, skipping")
+        return
+    engine, table = _table()
+    samples = [dict(CHARACTER, name=f"Adventurer {i}", level=i % 20) for i in range(200)]
+    dict_id = train_dictionary(engine, "test_documents", samples, size=4096)
+    assert dict_id
+
+    value = dict(CHARACTER, name="Fresh Adventurer")
+    with engine.begin() as connection:
+        connection.execute(table.insert(), {"id": 1, "data": value})
+        assert connection.execute(select(table.c.data)).scalar_one() == value
+    (stored,) = _stored(engine, table)
+    assert zstandard.get_frame_parameters(stored[1:]).dict_id == dict_id
+    print("✅ New writes name the family's dictionary and read back")
+
+
+def test_startup_never_alters_tables():
+    print("🧪 Testing startup preparation...")
+
+    engine, table = _table()
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement.upper()))
+    prepare_compressed_columns(engine, table.metadata)
+    assert not any(statement.startswith(("ALTER", "DROP")) for statement in statements)
+    # Only Postgres json/text columns need the explicit bytea migration
+    assert not needs_binary_migration(engine, table, "data")
+    assert migrate_compressed_columns(engine, table.metadata) == {}
+    print("✅ Startup only loads dictionaries; type changes are a deploy step")
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_legacy_values_and_backfill()
+    test_dictionaries()
+    test_startup_never_alters_tables()
+    print("\n✅ ALL COMPRESSED JSON TESTS PASSED!")
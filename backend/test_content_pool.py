@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Content Pool Test
+
+Pre-generated NPC and monster pools: segment keys, refill up to the target
+size, claims that hit or miss their pool, the low-watermark refill trigger and
+factory requests opting in with use_pool.
+"""
+
+import asyncio
+import json
+
+from testing_support import ScriptedLLMService
+from src.core.enums import CreationOptions
+from src.services.content_pool import ContentPoolService, PoolSpec, cr_band, pool_key
+from src.services.creation_factory import CreationFactory
+
+GUARD = json.dumps({
+    "name": "Pooled Guard", "species": "human", "role": "guard", "hit_points": 11, "armor_class": 16,
+    "abilities": {"strength": 13, "dexterity": 12, "constitution": 12,
+                  "intelligence": 10, "wisdom": 11, "charisma": 10},
+    "description": "A watchful guard"
+})
+PERSONALIZED = '{"name": "Sergeant Hobb", "description": "A gruff dwarf guarding the mine gate"}'
+
+
+def _pool(*steps, target_size: int = 2, **kwargs):
+    service = ScriptedLLMService(steps or [GUARD])
+    factory = CreationFactory(llm_service=service)
+    pool = ContentPoolService(factory, [PoolSpec("npc", "Guard")], target_size=target_size,
+                              idle_poll=0.01, **kwargs)
+    factory.content_pool = pool
+    return pool, factory, service
+
+
+def _fill(pool: ContentPoolService) -> None:
+    async def scenario():
+        while await pool.refill_once():
+            pass
+    asyncio.run(scenario())
+
+
+def test_pool_keys():
+    print("🧪 Testing pool keys...")
+
+    assert [cr_band(cr) for cr in (0.25, 3, 7, 16, 24)] == ["cr0-1", "cr2-4", "cr5-10", "cr11-16", "cr17+"]
+    assert pool_key("monster", None, challenge_rating=3) == ("monster", "cr2-4", "traditional d&d")
+    assert pool_key("npc", "  Gothic Horror", npc_type="Guard") == ("npc", "guard", "gothic horror")
+    assert PoolSpec("npc", "Guard", "Gothic  horror").key == pool_key("npc", "gothic horror", npc_type="guard")
+    # Requests that do not name a role or challenge rating have no pool
+    assert pool_key("npc", None) is None and pool_key("monster", None, challenge_rating=None) is None
+    print("✅ Pools are keyed by type, role or CR band, and normalised theme")
+
+
+def test_refill_to_target():
+    print("🧪 Testing refill...")
+
+    pool, _, service = _pool(target_size=3)
+    _fill(pool)
+    stats = pool.get_stats()
+    assert stats["pools"] == {"npc/guard/traditional d&d": 3} and stats["generated"] == 3
+    assert len(service.calls) == 3
+    assert all(kwargs.get("json_schema") for _, kwargs in service.calls)
+    print("✅ Empty pools are generated up to their target size")
+
+
+def test_claims():
+    print("🧪 Testing claims...")
+
+    pool, _, service = _pool(GUARD, GUARD, PERSONALIZED, target_size=2)
+    _fill(pool)
+
+    async def scenario():
+        npc = await pool.claim("npc", "a gruff dwarf guard at the mine", npc_type="guard", challenge_rating=0.125)
+        assert npc["name"] == "Sergeant Hobb" and npc["challenge_rating"] == 0.125
+        assert service.calls[-1][1]["stage"] == "pool_personalize"
+        # A CR outside the role's band, an unknown role or no role is generated normally
+        assert await pool.claim("npc", "an elite guard", npc_type="guard", challenge_rating=9) is None
+        assert await pool.claim("npc", "a spy", npc_type="spy") is None
+        assert await pool.claim("npc", "someone") is None
+
+    asyncio.run(scenario())
+    stats = pool.get_stats()
+    assert (stats["hits"], stats["misses"], stats["unsegmented"], stats["personalized_llm"]) == (1, 2, 1, 1)
+    assert stats["hit_rate"] == round(1 / 3, 4)
+    print("✅ Matching requests claim and personalise a pooled object")
+
+
+def test_low_watermark_triggers_refill():
+    print("🧪 Testing the low watermark...")
+
+    pool, _, _ = _pool(target_size=3, low_watermark=1, personalize_with_llm=False)
+    _fill(pool)
+    assert pool.take("npc", npc_type="guard") is not None
+    # Two left: above the watermark, nothing to refill yet
+    assert pool._next_to_refill() is None and not pool._wakeup.is_set()
+    assert pool.take("npc", npc_type="guard") is not None
+    assert pool._wakeup.is_set() and pool._next_to_refill() is not None
+    _fill(pool)
+    assert pool.get_stats()["pools"]["npc/guard/traditional d&d"] == 3
+    print("✅ A pool at its watermark is refilled back to the target")
+
+
+def test_factory_requests_opt_in():
+    print("🧪 Testing factory requests...")
+
+    pool, factory, service = _pool(target_size=1, personalize_with_llm=False)
+    _fill(pool)
+    calls = len(service.calls)
+
+    async def scenario():
+        plain = await factory.create_from_scratch(CreationOptions.NPC, "a guard", npc_type="guard")
+        assert len(service.calls) == calls + 1 and pool.get_stats()["hits"] == 0
+        pooled = await factory.create_from_scratch(
+            CreationOptions.NPC, "a guard", extra_fields={"use_pool": True, "npc_type": "guard"}
+        )
+        assert len(service.calls) == calls + 1 and pool.get_stats()["hits"] == 1
+        return plain, pooled
+
+    plain, pooled = asyncio.run(scenario())
+    assert pooled["name"] == plain["name"] == "Pooled Guard"
+    assert factory.active_requests == 0
+    print("✅ Only requests with use_pool are served from the pool")
+
+
+if __name__ == "__main__":
+    test_pool_keys()
+    test_refill_to_target()
+    test_claims()
+    test_low_watermark_triggers_refill()
+    test_factory_requests_opt_in()
+    print("\n✅ ALL CONTENT POOL TESTS PASSED!")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Creator Reuse Test
+
+One CharacterCreator per factory, with per-request state (verbose logs,
+registered custom content) kept in each request's CreationContext.
+No LLM is called.
+"""
+
+import asyncio
+
+from testing_support import ScriptedLLMService
+from src.services.creation import CreationContext, creation_context
+from src.services.creation_factory import CreationFactory
+
+
+def test_factory_reuses_one_creator():
+    print("🧪 Testing creator reuse...")
+
+    factory = CreationFactory(llm_service=ScriptedLLMService())
+    creator = factory.character_creator
+    assert all(factory.character_creator is creator for _ in range(5))
+
+    stats = factory.get_creator_stats()
+    assert stats["constructed"] == 1
+    assert stats["reused"] == 5
+    print("✅ One creator serves every request")
+
+
+def test_request_state_is_isolated():
+    print("🧪 Testing per-request creation contexts...")
+
+    creator = CreationFactory(llm_service=ScriptedLLMService()).character_creator
+
+    async def request(name: str):
+        with creation_context(CreationContext(verbose_logs=[])):
+            creator.content_registry.custom_items[name] = name
+            creator.verbose_logs.append({"type": "creation_start", "request": name})
+            await asyncio.sleep(0.01)  # let the other request run in between
+            return sorted(creator.content_registry.custom_items), list(creator.verbose_logs)
+
+    async def both():
+        return await asyncio.gather(request("first"), request("second"))
+
+    (first_items, first_logs), (second_items, second_logs) = asyncio.run(both())
+    assert first_items == ["first"] and second_items == ["second"]
+    assert first_logs == [{"type": "creation_start", "request": "first"}]
+    assert second_logs == [{"type": "creation_start", "request": "second"}]
+
+    # Outside a request nothing leaks, and verbose logs are absent as before
+    assert creator.content_registry.custom_items == {}
+    assert not hasattr(creator, "verbose_logs")
+    with creation_context():
+        assert not hasattr(creator, "verbose_logs")
+    print("✅ Concurrent requests keep their own registry and logs")
+
+
+if __name__ == "__main__":
+    test_factory_reuses_one_creator()
+    test_request_state_is_isolated()
+    print("\n✅ ALL CREATOR REUSE TESTS PASSED!")
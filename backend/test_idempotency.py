@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Idempotency Ledger Test
+
+Factory requests that carry an Idempotency-Key run at most once: replays,
+concurrent repeats, conflicting bodies and failed runs.
+"""
+
+import asyncio
+
+from testing_support import scratch_database
+from src.services.idempotency import IdempotencyConflict, IdempotencyLedger
+
+PAYLOAD = {"creation_type": "npc", "prompt": "A nervous innkeeper"}
+
+
+def _ledger():
+    scratch_database("idempotency").close()
+    return IdempotencyLedger(poll_interval=0.01)
+
+
+def _handler(calls, response=None, delay=0.0, error=None):
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return response or {"success": True, "data": {"name": "Bram"}}
+    return handler
+
+
+def test_replay_after_completion():
+    print("🧪 Testing replay of a completed request...")
+
+    ledger, calls = _ledger(), []
+    first = asyncio.run(ledger.run("factory_create", "key-1", PAYLOAD, _handler(calls)))
+    second = asyncio.run(ledger.run("factory_create", "key-1", dict(PAYLOAD), _handler(calls)))
+
+    assert first == ({"success": True, "data": {"name": "Bram"}}, "executed")
+    assert second == ({"success": True, "data": {"name": "Bram"}}, "replayed")
+    assert len(calls) == 1
+    # Keys are scoped per endpoint
+    assert asyncio.run(ledger.run("factory_evolve", "key-1", PAYLOAD, _handler(calls)))[1] == "executed"
+    assert len(calls) == 2
+    print("✅ Repeat returns the stored response without running")
+
+
+def test_concurrent_repeat_attaches():
+    print("🧪 Testing concurrent repeats...")
+
+    ledger, calls = _ledger(), []
+
+    async def both():
+        return await asyncio.gather(
+            ledger.run("factory_create", "key-2", PAYLOAD, _handler(calls, delay=0.05)),
+            ledger.run("factory_create", "key-2", PAYLOAD, _handler(calls, delay=0.05)),
+        )
+
+    outcomes = sorted(outcome for _, outcome in asyncio.run(both()))
+    assert outcomes == ["attached", "executed"]
+    assert len(calls) == 1
+    print("✅ In-flight repeat attaches to the running request")
+
+
+def test_different_body_is_rejected():
+    print("🧪 Testing key reuse with a different body...")
+
+    ledger, calls = _ledger(), []
+    asyncio.run(ledger.run("factory_create", "key-3", PAYLOAD, _handler(calls)))
+    try:
+        asyncio.run(ledger.run("factory_create", "key-3", dict(PAYLOAD, prompt="A dragon"), _handler(calls)))
+    except IdempotencyConflict as e:
+        assert e.status_code == 422
+    else:
+        raise AssertionError("Reusing a key with another body must be rejected")
+    assert len(calls) == 1
+
+    try:
+        asyncio.run(ledger.run("factory_create", "", PAYLOAD, _handler(calls)))
+    except IdempotencyConflict as e:
+        assert e.status_code == 400
+    else:
+        raise AssertionError("An empty key must be rejected")
+    print("✅ Conflicting and empty keys are rejected")
+
+
+def test_failures_are_not_stored():
+    print("🧪 Testing that failed requests can be retried...")
+
+    ledger, calls = _ledger(), []
+    try:
+        asyncio.run(ledger.run("factory_create", "key-4", PAYLOAD, _handler(calls, error=RuntimeError("LLM down"))))
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("The handler's error must propagate")
+    failed = asyncio.run(ledger.run("factory_create", "key-4", PAYLOAD,
+                                    _handler(calls, response={"success": False, "error": "timeout"})))
+    retried = asyncio.run(ledger.run("factory_create", "key-4", PAYLOAD, _handler(calls)))
+
+    assert failed[1] == "executed" and retried[1] == "executed"
+    assert len(calls) == 3
+    assert ledger.get_stats()["failures_not_stored"] == 1
+    print("✅ Errors and unsuccessful responses release the key")
+
+
+if __name__ == "__main__":
+    test_replay_after_completion()
+    test_concurrent_repeat_attaches()
+    test_different_body_is_rejected()
+    test_failures_are_not_stored()
+    print("\n✅ ALL IDEMPOTENCY LEDGER TESTS PASSED!")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+JSON Repair Test
+
+repair_json() on the malformed output LLMs produce: fenced and wrapped JSON,
+comments and trailing commas, truncated responses and salvaged prefixes, plus
+BaseCreator's fallback to a short "fix this JSON" follow-up.
+"""
+
+import asyncio
+
+from testing_support import ScriptedLLMService
+from src.services.creation import BaseCreator
+from src.services.json_repair import json_repair_stats, repair_json
+
+
+def test_fenced_and_wrapped_json():
+    print("🧪 Testing fenced JSON...")
+
+    data, repairs = repair_json('Here is the NPC:\n```json\n{"name": "Bram", "age": 42}\n```\nEnjoy!')
+    assert data == {"name": "Bram", "age": 42} and repairs == []
+
+    data, repairs = repair_json("""{
+        // the innkeeper
+        'name': 'Bram',
+        "friendly": True,
+        "notes": "line one
+line two",
+        "tags": ["nervous", "kind",],
+    }""")
+    assert data == {"name": "Bram", "friendly": True, "notes": "line one\nline two", "tags": ["nervous", "kind"]}
+    assert {"comments", "single_quotes", "python_literals", "unescaped_newline", "trailing_commas"} <= set(repairs)
+    print("✅ Fences, comments, quotes, literals and trailing commas are repaired")
+
+
+def test_truncated_json():
+    print("🧪 Testing truncated JSON...")
+
+    data, repairs = repair_json('{"name": "Bram", "inventory": ["rope", "lantern"')
+    assert data == {"name": "Bram", "inventory": ["rope", "lantern"]}
+    assert repairs == ["truncated"]
+
+    data, repairs = repair_json('{"name": "Bram", "backstory": "Born in a storm')
+    assert data == {"name": "Bram", "backstory": "Born in a storm"}
+
+    # A partial value cannot be closed, so the last complete member is kept
+    data, repairs = repair_json('{"name": "Bram", "spells": [{"name": "Light"}, {"name": "Sleep", "lev')
+    assert data["name"] == "Bram" and {"name": "Light"} in data["spells"]
+    assert "salvaged_prefix" in repairs
+
+    # container= picks the expected top-level type
+    data, _ = repair_json('[1, 2] then {"a": 1}', "{")
+    assert data == {"a": 1}
+    for hopeless in ("", "   ", "no json here at all"):
+        try:
+            repair_json(hopeless)
+        except ValueError:
+            continue
+        raise AssertionError(f"Should not parse: {hopeless!r}")
+    print("✅ Truncated responses are closed or cut back to the last complete member")
+
+
+def test_followup_fix_instead_of_regeneration():
+    print("🧪 Testing the fix-this-JSON follow-up...")
+
+    json_repair_stats.reset()
+    service = ScriptedLLMService(['{"name": "Bram", "race": "Halfling"}'])
+    creator = BaseCreator(llm_service=service)
+    data, repairs = asyncio.run(creator._parse_llm_json("name: Bram, race: Halfling", "npc"))
+    assert data == {"name": "Bram", "race": "Halfling"}
+    assert repairs == ["llm_followup"]
+    # The follow-up carries the broken text, not the original generation prompt
+    prompt, kwargs = service.calls[0]
+    assert "name: Bram, race: Halfling" in prompt and kwargs["stage"] == "json_fix"
+
+    asyncio.run(creator._parse_llm_json('{"name": "Bram",}', "npc"))
+    stats = json_repair_stats.get_stats()
+    assert (stats["repaired_locally"], stats["repaired_by_llm"], stats["failed"]) == (1, 1, 0)
+    assert stats["retry_avoidance_rate"] == 1.0
+    print("✅ Unrepairable output gets a short fix request and is counted")
+
+
+if __name__ == "__main__":
+    test_fenced_and_wrapped_json()
+    test_truncated_json()
+    test_followup_fix_instead_of_regeneration()
+    print("\n✅ ALL JSON REPAIR TESTS PASSED!")
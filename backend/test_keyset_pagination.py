@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Keyset Pagination Test
+
+Cursor pagination over (created_at, id): cursor encoding, rejected cursors,
+page walks across created_at ties, and preparing legacy tables.
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect
+
+from testing_support import memory_database
+from src.models.database_models import CustomContent
+from src.services.keyset_pagination import (
+    decode_cursor, encode_cursor, ensure_keyset_keys, keyset_query, split_page
+)
+
+
+def _session():
+    engine, Session = memory_database()
+    return engine, Session()
+
+
+def test_cursor_round_trip():
+    print("🧪 Testing cursor encoding...")
+
+    created_at = datetime(2024, 2, 29, 23, 59, 59, 123456)
+    row_id = uuid.uuid4()
+    cursor = encode_cursor(created_at, row_id)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert decode_cursor(cursor) == (created_at, str(row_id))
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, "42")
+    print("✅ Cursors are URL-safe and keep microseconds and ids")
+
+
+def test_invalid_cursors_are_rejected():
+    print("🧪 Testing invalid cursors...")
+
+    def token(payload) -> str:
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+    for cursor in ("", "not-a-cursor", "!!!!", token([1, 2]),
+                   token({"v": 2, "t": "2024-01-01T00:00:00", "i": "x"}),
+                   token({"v": 1, "t": "yesterday", "i": "x"}),
+                   token({"v": 1, "i": "x"})):
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            continue
+        raise AssertionError(f"Cursor should be rejected: {cursor!r}")
+    print("✅ Malformed and foreign cursors raise ValueError")
+
+
+def test_page_walk_with_ties():
+    print("🧪 Testing page walks...")
+
+    engine, session = _session()
+    start = datetime(2024, 1, 1)
+    # Groups of five rows share a created_at, so ids break the ties
+    for i in range(23):
+        session.add(CustomContent(id=f"item-{(i * 7) % 23:02d}", name=f"Item {i}", content_type="item",
+                                  content_data={}, created_at=start + timedelta(seconds=i // 5)))
+    session.commit()
+    expected = [row.id for row in session.query(CustomContent).order_by(CustomContent.created_at, CustomContent.id)]
+
+    for limit in (1, 4, 5, 22, 23, 50):
+        seen, cursor = [], None
+        while True:
+            query = keyset_query(session.query(CustomContent), CustomContent, cursor)
+            rows, cursor = split_page(query.limit(limit + 1).all(), limit, lambda c: (c.created_at, c.id))
+            assert len(rows) <= limit
+            seen.extend(row.id for row in rows)
+            if cursor is None:
+                break
+        assert seen == expected, limit
+
+    # Rows added behind the cursor do not shift the next page
+    query = keyset_query(session.query(CustomContent), CustomContent)
+    first, cursor = split_page(query.limit(6).all(), 5, lambda c: (c.created_at, c.id))
+    session.add(CustomContent(id="item-00a", name="Late", content_type="item", content_data={}, created_at=start))
+    session.commit()
+    query = keyset_query(session.query(CustomContent), CustomContent, cursor)
+    second, _ = split_page(query.limit(6).all(), 5, lambda c: (c.created_at, c.id))
+    assert [row.id for row in second] == expected[5:10]
+    session.close()
+    print("✅ Every row appears exactly once, in (created_at, id) order")
+
+
+def test_ensure_keyset_keys():
+    print("🧪 Testing legacy table upkeep...")
+
+    engine, session = _session()
+    table = CustomContent.__table__
+    (index,) = [index for index in table.indexes if index.name == "ix_custom_content_type_created_id"]
+    index.drop(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(table.insert(), [
+            {"id": "legacy", "name": "Legacy", "content_type": "item", "content_data": {}, "created_at": None},
+        ])
+
+    ensure_keyset_keys(engine, [table])
+    assert index.name in {ix["name"] for ix in inspect(engine).get_indexes(table.name)}
+    legacy = session.get(CustomContent, "legacy")
+    assert legacy.created_at is not None
+    # Running it again is harmless
+    ensure_keyset_keys(engine, [table])
+    session.close()
+    print("✅ Missing indexes are created and NULL created_at values filled")
+
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_invalid_cursors_are_rejected()
+    test_page_walk_with_ties()
+    test_ensure_keyset_keys()
+    print("\n✅ ALL KEYSET PAGINATION TESTS PASSED!")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+List Projection Test
+
+Summary projections for the list endpoints: fields= selection, queries that
+read only the selected columns, projected character equipment, cursor pages
+and the endpoints' unchanged default response shape.
+"""
+
+from datetime import datetime, timedelta
+
+from testing_support import memory_database, scratch_database
+from src.models.database_models import Character, CharacterDB, CustomContent
+from src.services.list_projections import LIST_PROJECTIONS
+
+
+def _session(npcs: int = 7):
+    engine, Session = memory_database()
+    session = Session()
+    start = datetime(2024, 1, 1)
+    for i in range(npcs):
+        session.add(CustomContent(
+            id=f"npc-{i:02d}", name=f"NPC {i}", content_type="npc", description=f"Villager {i}",
+            content_data={"roleplay": {"personality": "Gruff " * 200}}, created_at=start + timedelta(minutes=i),
+        ))
+    session.commit()
+    return session
+
+
+def test_field_resolution():
+    print("🧪 Testing fields= resolution...")
+
+    projection = LIST_PROJECTIONS["characters"]
+    assert projection.resolve_fields(None) == list(projection.summary)
+    assert projection.resolve_fields("spells, equipment") == list(projection.summary) + ["equipment", "spells"]
+    assert projection.resolve_fields("*") == list(projection.available)
+    try:
+        projection.resolve_fields("name,password_hash")
+    except ValueError as e:
+        assert "password_hash" in str(e)
+    else:
+        raise AssertionError("Unknown fields must be rejected")
+    print("✅ Summary fields by default, optional ones on request")
+
+
+def test_queries_select_only_requested_columns():
+    print("🧪 Testing projection queries...")
+
+    session = _session()
+    characters = LIST_PROJECTIONS["characters"]
+    statement = str(characters.query(session, characters.resolve_fields(None)).statement)
+    assert "backstory" in statement
+    assert not any(column in statement for column in ("equipment", "features", "spells", "skills", "notes"))
+
+    projection = LIST_PROJECTIONS["npcs"]
+    query = projection.query(session, projection.resolve_fields(None)).filter(CustomContent.content_type == "npc")
+    rows = projection.rows(query.order_by(CustomContent.created_at).limit(2))
+    assert [(row["id"], row["name"], row["description"]) for row in rows] == [
+        ("npc-00", "NPC 0", "Villager 0"), ("npc-01", "NPC 1", "Villager 1"),
+    ]
+    assert rows[0]["content_data"]["roleplay"]["personality"].startswith("Gruff")
+    # Rows are plain dicts, not ORM objects in the identity map
+    assert len(session.identity_map) == 0
+
+    detailed = projection.rows(projection.query(session, projection.resolve_fields("created_at")).limit(1))
+    assert detailed[0]["created_at"] == "2024-01-01T00:00:00"
+    session.close()
+    print("✅ Only the default columns are read unless more are requested")
+
+
+def test_character_equipment_is_rebuilt():
+    print("🧪 Testing projected character equipment...")
+
+    session = _session(npcs=0)
+    for name in ("Tester", "Other"):
+        session.add(Character(id=name.lower(), name=name, species="Elf", equipment={"gold": 5}))
+    session.commit()
+    CharacterDB.add_inventory_item(session, "tester", {"name": "Wand", "requires_attunement": True})
+    CharacterDB.add_attuned_item(session, "tester", "Wand")
+    CharacterDB.equip_item(session, "tester", "Wand", "main_hand")
+
+    projection = LIST_PROJECTIONS["characters"]
+    query = projection.query(session, projection.resolve_fields("equipment"))
+    rows, _ = projection.page(query, 10)
+    by_id = {row["id"]: row["equipment"] for row in rows}
+    assert by_id["other"] == {"gold": 5}
+    assert by_id["tester"] == session.get(Character, "tester").equipment_with_inventory()
+    assert by_id["tester"]["attuned_items"] == ["Wand"] and by_id["tester"]["equipped_items"] == {"main_hand": "Wand"}
+    session.close()
+    print("✅ fields=equipment returns the inventory, attunements and slots")
+
+
+def test_cursor_pages():
+    print("🧪 Testing projection pages...")
+
+    session = _session()
+    projection = LIST_PROJECTIONS["npcs"]
+    query = projection.query(session, projection.resolve_fields(None))
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = projection.page(query, 3, cursor=cursor)
+        assert all(set(row) == {"id", "name", "description", "content_data"} for row in rows)
+        seen.extend(row["id"] for row in rows)
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 3
+    assert seen == [f"npc-{i:02d}" for i in range(7)]
+    session.close()
+    print("✅ Pages walk every row once, without the keyset columns")
+
+
+def test_endpoints_keep_default_shape():
+    print("🧪 Testing list endpoint responses...")
+
+    session = scratch_database("list_projections_app")
+    session.add(Character(id="bard", name="Bard", species="Half-Elf", background="Entertainer", level=3,
+                          character_classes={"Bard": 3}, backstory="Sang for a dragon once.",
+                          spells={"known": ["Vicious Mockery"]}, is_active=True))
+    session.add(CustomContent(id="npc-innkeeper", name="Innkeeper", content_type="npc", description="Friendly",
+                              content_data={"role": "innkeeper"}))
+    session.commit()
+    session.close()
+    from fastapi.testclient import TestClient
+    from app import app
+
+    client = TestClient(app)
+    (character,) = client.get("/api/v2/characters").json()
+    assert set(character) == {"id", "name", "species", "background", "level", "character_classes",
+                              "backstory", "created_at", "user_modified"}
+    assert character["backstory"] == "Sang for a dragon once."
+    (with_spells,) = client.get("/api/v2/characters", params={"fields": "spells"}).json()
+    assert with_spells["spells"] == {"known": ["Vicious Mockery"]}
+    (npc,) = client.get("/api/v2/npcs").json()
+    assert npc == {"id": "npc-innkeeper", "name": "Innkeeper", "description": "Friendly",
+                   "content_data": {"role": "innkeeper"}}
+    assert client.get("/api/v2/npcs", params={"fields": "password"}).status_code == 400
+    print("✅ Lists return the fields they always did, plus any requested")
+
+
+if __name__ == "__main__":
+    test_field_resolution()
+    test_queries_select_only_requested_columns()
+    test_character_equipment_is_rebuilt()
+    test_cursor_pages()
+    test_endpoints_keep_default_shape()
+    print("\n✅ ALL LIST PROJECTION TESTS PASSED!")
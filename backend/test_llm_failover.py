@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+LLM Failover Test
+
+CompositeLLMService against scripted providers: failover on 5xx and 429,
+client errors raised as-is, hedged requests, and circuit breakers whose
+half-open trial slot is only held by a request actually sent.
+"""
+
+import asyncio
+
+from testing_support import ScriptedLLMService
+from src.services.llm_service import CircuitBreakerConfig, CompositeLLMService, provider_health
+
+
+def _composite(name: str, primary: ScriptedLLMService, backup: ScriptedLLMService, **kwargs):
+    # Provider health is shared by every composite, so each test uses its own names
+    kwargs.setdefault("default_hedge_delay", 5.0)
+    return CompositeLLMService([(f"{name}-primary", primary), (f"{name}-backup", backup)], **kwargs)
+
+
+def test_failover_on_server_errors():
+    print("🧪 Testing failover on 5xx and 429...")
+
+    for status, error in ((503, "503 Service Unavailable"), (429, "Error code: 429 - rate limit reached")):
+        name = f"failover-{status}"
+        primary, backup = ScriptedLLMService([Exception(error)]), ScriptedLLMService(["from backup"])
+        composite = _composite(name, primary, backup)
+        assert asyncio.run(composite.generate_content("Describe a tavern")) == "from backup"
+        assert len(primary.calls) == len(backup.calls) == 1
+        assert provider_health[f"{name}-primary"].counts["failures"] == 1
+        assert provider_health[f"{name}-backup"].counts["successes"] == 1
+    print("✅ Server errors and rate limits move on to the next provider")
+
+
+def test_client_errors_are_raised():
+    print("🧪 Testing client errors...")
+
+    primary, backup = ScriptedLLMService([Exception("400 Bad Request: invalid prompt")]), ScriptedLLMService()
+    composite = _composite("client-error", primary, backup)
+    try:
+        asyncio.run(composite.generate_content("Describe a tavern"))
+    except Exception as e:
+        assert "400" in str(e)
+    else:
+        raise AssertionError("A rejected request must not fail over")
+    assert backup.calls == []
+    # The provider answered; the request was at fault
+    assert provider_health["client-error-primary"].counts["failures"] == 0
+    print("✅ 4xx errors are raised without trying another provider")
+
+
+def test_hedged_request_wins():
+    print("🧪 Testing hedged requests...")
+
+    primary, backup = ScriptedLLMService([(1.0, "slow")]), ScriptedLLMService([(0.01, "fast")])
+    composite = _composite("hedge", primary, backup, default_hedge_delay=0.05, min_hedge_delay=0.01)
+    assert asyncio.run(composite.generate_content("Describe a tavern")) == "fast"
+    assert primary.cancelled == 1
+    stats = provider_health["hedge-backup"].counts
+    assert (stats["hedges"], stats["hedge_wins"]) == (1, 1)
+    # A lost hedge race is not held against the slow provider
+    assert provider_health["hedge-primary"].counts["failures"] == 0
+    print("✅ The hedge answers first and the slow request is cancelled")
+
+
+def test_open_circuit_is_skipped():
+    print("🧪 Testing open circuits...")
+
+    primary, backup = ScriptedLLMService([Exception("502 Bad Gateway")]), ScriptedLLMService()
+    composite = _composite("circuit", primary, backup,
+                           breaker=CircuitBreakerConfig(failure_threshold=1, reset_timeout=60.0))
+    for _ in range(3):
+        assert asyncio.run(composite.generate_content("Describe a tavern")) == "ok"
+    assert provider_health["circuit-primary"].state == "open"
+    assert len(primary.calls) == 1 and len(backup.calls) == 3
+    print("✅ A provider with an open circuit gets no requests")
+
+
+def test_half_open_slot_is_not_leaked():
+    print("🧪 Testing half-open trial slots...")
+
+    # The backup is half-open but the primary answers; the backup's slot stays free
+    primary, backup = ScriptedLLMService(["primary"]), ScriptedLLMService(["backup"])
+    composite = _composite("trial-unused", primary, backup)
+    provider_health["trial-unused-backup"].state = "half_open"
+    assert asyncio.run(composite.generate_content("Describe a tavern")) == "primary"
+    assert backup.calls == []
+    assert provider_health["trial-unused-backup"].available()
+
+    # A half-open hedge that loses the race gives its slot back
+    primary, backup = ScriptedLLMService([(0.1, "primary")]), ScriptedLLMService([(1.0, "backup")])
+    composite = _composite("trial-hedged", primary, backup, default_hedge_delay=0.02, min_hedge_delay=0.01)
+    health = provider_health["trial-hedged-backup"]
+    health.state = "half_open"
+    assert asyncio.run(composite.generate_content("Describe a tavern")) == "primary"
+    assert backup.cancelled == 1
+    assert health.state == "half_open" and health.available()
+    print("✅ Only a request actually sent holds a provider's trial slot")
+
+
+if __name__ == "__main__":
+    test_failover_on_server_errors()
+    test_client_errors_are_raised()
+    test_hedged_request_wins()
+    test_open_circuit_is_skipped()
+    test_half_open_slot_is_not_leaked()
+    print("\n✅ ALL LLM FAILOVER TESTS PASSED!")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Ollama Context Test
+
+Against a local stand-in for the Ollama API: keep_alive on every request,
+model preloading, context carried between the calls of one llm_session (and
+dropped when it would overflow num_ctx), and the prompt-eval savings report.
+"""
+
+import asyncio
+
+from testing_support import FakeOllamaServer
+from src.services.llm_service import (
+    OllamaContextStore, OllamaLLMService, create_llm_service, llm_session, ollama_context_store,
+    preload_ollama_models
+)
+
+
+def _long_context(payload):
+    """Each response adds 20 context tokens."""
+    return 200, {"response": "ok", "context": list(payload.get("context", [])) + list(range(20))}
+
+
+def test_keep_alive_and_preload():
+    print("🧪 Testing keep_alive and preloading...")
+
+    with FakeOllamaServer() as server:
+        service = OllamaLLMService(model="fake-model", base_url=server.base_url, keep_alive="2h")
+        asyncio.run(service.generate_content("Hello"))
+        assert server.requests[-1]["keep_alive"] == "2h"
+
+        # Every Ollama model behind the wrappers is loaded once, without a prompt
+        wrapped = create_llm_service("ollama", model="fake-model", base_url=server.base_url, stage_routing=None)
+        assert asyncio.run(preload_ollama_models(wrapped)) == {"fake-model": True}
+        preload = server.requests[-1]
+        assert preload == {"model": "fake-model", "keep_alive": wrapped.keep_alive}
+    assert "fake-model" in ollama_context_store.get_stats()["preloaded_models"]
+
+    unreachable = OllamaLLMService(model="fake-model", base_url="http://127.0.0.1:9", timeout=2)
+    assert asyncio.run(unreachable.preload()) is False
+    print("✅ Requests keep the model resident and preloading loads it ahead of time")
+
+
+def test_session_context_reuse():
+    print("🧪 Testing session context reuse...")
+
+    with FakeOllamaServer() as server:
+        service = OllamaLLMService(model="fake-model", base_url=server.base_url, num_ctx=8192)
+
+        async def scenario():
+            with llm_session() as session:
+                await service.generate_content("Stage one", max_tokens=100)
+                await service.generate_content("Stage two", max_tokens=100)
+                # session=None opts a call out of the chain
+                await service.generate_content("Shared theme logic", max_tokens=100, session=None)
+                await service.generate_content("Stage three", max_tokens=100)
+                assert ollama_context_store.get(server.base_url, "fake-model", session) is not None
+            assert ollama_context_store.get(server.base_url, "fake-model", session) is None
+            await service.generate_content("No session", max_tokens=100)
+
+        asyncio.run(scenario())
+        one, two, shared, three, outside = server.requests
+    assert "context" not in one and one["options"]["num_ctx"] == 8192
+    # The stand-in appends the request number to the context it was sent
+    assert two["context"] == [1] and three["context"] == [1, 2]
+    assert "context" not in shared and "num_ctx" not in shared["options"]
+    assert "context" not in outside
+    print("✅ Calls in a session continue the previous context; others start fresh")
+
+
+def test_full_context_starts_fresh():
+    print("🧪 Testing context overflow...")
+
+    with FakeOllamaServer(_long_context) as server:
+        service = OllamaLLMService(model="fake-model", base_url=server.base_url, num_ctx=4096)
+
+        async def scenario():
+            with llm_session():
+                await service.generate_content("Stage one", max_tokens=100)
+                await service.generate_content("Stage two", max_tokens=100)
+                # Context plus the prompt and max_tokens would not fit num_ctx
+                await service.generate_content("Stage three", max_tokens=4090)
+
+        asyncio.run(scenario())
+    one, two, three = server.requests
+    assert len(two["context"]) == 20 and "context" not in three
+    print("✅ A context that would overflow num_ctx is dropped")
+
+
+def test_savings_report():
+    print("🧪 Testing the savings report...")
+
+    store = OllamaContextStore()
+    cold = {"prompt_eval_count": 100, "prompt_eval_duration": 200_000_000, "load_duration": 3_000_000_000}
+    warm = {"prompt_eval_count": 20, "prompt_eval_duration": 40_000_000, "load_duration": 5_000_000}
+    store.record("session-1", cold, 0)
+    store.record("session-1", warm, 100)
+    store.end_session("session-1")
+    stats = store.get_stats()
+    assert (stats["calls"], stats["reused_calls"], stats["cold_loads"], stats["sessions"]) == (2, 1, 1, 1)
+    assert stats["prompt_eval_ms_per_token"] == 2.0
+    assert stats["estimated_prompt_eval_ms_saved"] == 200.0 == stats["estimated_ms_saved_per_session"]
+    print("✅ Reused context tokens are priced at the measured prompt-eval rate")
+
+
+if __name__ == "__main__":
+    test_keep_alive_and_preload()
+    test_session_context_reuse()
+    test_full_context_starts_fresh()
+    test_savings_report()
+    print("\n✅ ALL OLLAMA CONTEXT TESTS PASSED!")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Retry Budget Test
+
+One RetryPolicy per request, shared by the provider and BaseCreator layers:
+nested scopes, budget exhaustion across layers, errors that are never retried,
+and the per-route metrics the request middleware records.
+"""
+
+import asyncio
+
+from testing_support import ScriptedLLMService, scratch_database
+from src.services.creation import BaseCreator, CreationConfig
+from src.services.llm_service import RetryPolicy, get_retry_policy, retry_scope
+
+
+class _RetryingProvider(ScriptedLLMService):
+    """Retries on its own through the request's policy, like the real providers."""
+
+    async def generate_content(self, prompt: str, **kwargs) -> str:
+        policy = get_retry_policy()
+        for _ in range(3):
+            try:
+                return await super().generate_content(prompt, **kwargs)
+            except Exception as e:
+                if not await policy.retry(e, "provider"):
+                    raise
+        raise Exception("provider retries exhausted")
+
+
+def _policy(budget: int) -> RetryPolicy:
+    return RetryPolicy(budget=budget, base_delay=0.0, max_delay=0.0)
+
+
+async def _generate(provider: ScriptedLLMService, policy: RetryPolicy):
+    creator = BaseCreator(llm_service=provider, config=CreationConfig(max_retries=3))
+    with retry_scope(policy):
+        return await creator._generate_with_llm("Create a tavern keeper", "npc")
+
+
+def test_nested_scopes_share_one_policy():
+    print("🧪 Testing nested retry scopes...")
+
+    outer = _policy(3)
+    with retry_scope(outer) as policy:
+        assert policy is outer
+        with retry_scope() as inner:
+            assert inner is outer and get_retry_policy() is outer
+    # Outside any request each call gets a fresh policy
+    assert get_retry_policy() is not outer
+    print("✅ Inner scopes reuse the request's policy")
+
+
+def test_budget_is_shared_across_layers():
+    print("🧪 Testing retry budget exhaustion...")
+
+    provider, policy = _RetryingProvider([Exception("503 Service Unavailable")]), _policy(2)
+    try:
+        asyncio.run(_generate(provider, policy))
+    except Exception as e:
+        assert "503" in str(e)
+    else:
+        raise AssertionError("The request should fail once the budget is spent")
+    # Three attempts per layer would be nine upstream calls; the budget allows three
+    assert len(provider.calls) == 3
+    assert policy.get_trace()["retries"] == 2
+    assert [attempt["layer"] for attempt in policy.attempts] == ["provider", "provider"]
+
+    provider, policy = _RetryingProvider([Exception("502 Bad Gateway"), '{"name": "Bram"}']), _policy(2)
+    assert asyncio.run(_generate(provider, policy)) == {"name": "Bram"}
+    assert policy.retries == 1
+    print("✅ Provider and creator retries draw on one budget")
+
+
+def test_client_errors_are_not_retried():
+    print("🧪 Testing non-retryable errors...")
+
+    provider, policy = _RetryingProvider([Exception("401 Unauthorized")]), _policy(5)
+    try:
+        asyncio.run(_generate(provider, policy))
+    except Exception as e:
+        assert "401" in str(e)
+    else:
+        raise AssertionError("Client errors must be raised")
+    assert len(provider.calls) == 1 and policy.retries == 0
+    print("✅ Client errors are raised on the first attempt")
+
+
+def test_metrics_keyed_by_route():
+    print("🧪 Testing request metrics keys...")
+
+    scratch_database("retry_budget_app").close()
+    from fastapi.testclient import TestClient
+    from app import app, performance_metrics
+
+    client = TestClient(app)
+    for path in ("/api/v2/characters/first", "/api/v2/characters/second", "/no/such/route"):
+        response = client.get(path)
+        assert response.headers["X-LLM-Retries"] == "0"
+    endpoints = performance_metrics["endpoint_metrics"]
+    assert endpoints["GET /api/v2/characters/{character_id}"]["requests"] == 2
+    assert endpoints["GET unmatched"]["requests"] == 1
+    assert not any("first" in endpoint or "second" in endpoint for endpoint in endpoints)
+    print("✅ Metrics are kept per route template, not per URL")
+
+
+if __name__ == "__main__":
+    test_nested_scopes_share_one_policy()
+    test_budget_is_shared_across_layers()
+    test_client_errors_are_not_retried()
+    test_metrics_keyed_by_route()
+    print("\n✅ ALL RETRY BUDGET TESTS PASSED!")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Test
+
+SingleFlightLLMService: identical concurrent requests share one upstream call,
+high-temperature and per-session requests do not, and a cancelled caller
+leaves the shared call running for everyone else.
+"""
+
+import asyncio
+
+from testing_support import ScriptedLLMService
+from src.services.llm_service import (
+    CoalescingConfig, SingleFlightLLMService, _in_flight, coalescing_stats, llm_session
+)
+
+
+def _wrapped(*steps):
+    service = ScriptedLLMService(steps or [(0.05, "shared answer")])
+    return SingleFlightLLMService(service, CoalescingConfig()), service
+
+
+def test_identical_requests_share_one_call():
+    print("🧪 Testing coalescing...")
+
+    single_flight, service = _wrapped()
+    before = coalescing_stats.get_stats()
+
+    async def scenario():
+        prompts = ["Describe  the tavern", "Describe the tavern", "Describe the\ntavern"]
+        return await asyncio.gather(*(single_flight.generate_content(p, temperature=0.1) for p in prompts))
+
+    assert asyncio.run(scenario()) == ["shared answer"] * 3
+    assert len(service.calls) == 1
+    after = coalescing_stats.get_stats()
+    assert (after["upstream"] - before["upstream"], after["coalesced"] - before["coalesced"]) == (1, 2)
+    # Nothing is cached once the call finishes
+    assert _in_flight == {}
+    asyncio.run(single_flight.generate_content("Describe the tavern", temperature=0.1))
+    assert len(service.calls) == 2
+    print("✅ Whitespace-equivalent prompts in flight together share one call")
+
+
+def test_requests_that_must_not_share():
+    print("🧪 Testing requests kept apart...")
+
+    single_flight, service = _wrapped()
+
+    async def scenario():
+        await asyncio.gather(
+            single_flight.generate_content("A name", temperature=0.9),
+            single_flight.generate_content("A name", temperature=0.9),
+            single_flight.generate_content("A name", temperature=0.1, max_tokens=50),
+            single_flight.generate_content("A name", temperature=0.1, max_tokens=60),
+        )
+        assert len(service.calls) == 4
+        # coalesce=True overrides the temperature rule
+        await asyncio.gather(*(single_flight.generate_content("A name", temperature=0.9, coalesce=True)
+                               for _ in range(3)))
+        assert len(service.calls) == 5
+
+    asyncio.run(scenario())
+    assert all("coalesce" not in kwargs for _, kwargs in service.calls)
+    print("✅ High-temperature and differently parameterised requests are not shared")
+
+
+def test_sessions():
+    print("🧪 Testing session scoping...")
+
+    single_flight, service = _wrapped()
+
+    async def in_session(**kwargs):
+        with llm_session():
+            return await single_flight.generate_content("Stage one", temperature=0.0, **kwargs)
+
+    async def scenario():
+        await asyncio.gather(in_session(), in_session())
+        assert len(service.calls) == 2
+        # session=None opts a request out of its session so it can be shared
+        await asyncio.gather(in_session(session=None), in_session(session=None))
+        assert len(service.calls) == 3
+
+    asyncio.run(scenario())
+    print("✅ Calls in different sessions stay apart unless session=None")
+
+
+def test_cancelled_caller():
+    print("🧪 Testing cancellation...")
+
+    single_flight, service = _wrapped((0.1, "survives"))
+
+    async def scenario():
+        first = asyncio.ensure_future(single_flight.generate_content("Slow prompt", temperature=0.0))
+        second = asyncio.ensure_future(single_flight.generate_content("Slow prompt", temperature=0.0))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        assert await second == "survives"
+        assert first.cancelled()
+
+    asyncio.run(scenario())
+    assert len(service.calls) == 1 and service.cancelled == 0
+    print("✅ One caller's cancellation does not cancel the shared call")
+
+
+if __name__ == "__main__":
+    test_identical_requests_share_one_call()
+    test_requests_that_must_not_share()
+    test_sessions()
+    test_cancelled_caller()
+    print("\n✅ ALL SINGLE-FLIGHT TESTS PASSED!")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Speculative Creation Test
+
+Fast response mode: an LLM answer inside the SLO is returned as usual, a slow
+one is replaced by the deterministic template and finishes as a background
+upgrade, and the upgrade registry's failure, eviction and stats reporting.
+"""
+
+import asyncio
+import json
+
+from testing_support import ScriptedLLMService
+from src.core.enums import CreationOptions
+from src.services.creation_factory import CreationFactory
+from src.services.speculative_creation import SpeculativeUpgradeRegistry, race_against_template
+
+MONSTER = json.dumps({
+    "name": "Cave Lurker", "type": "monstrosity", "challenge_rating": 2, "hit_points": 40, "armor_class": 13,
+    "abilities": {"strength": 16, "dexterity": 12, "constitution": 14,
+                  "intelligence": 3, "wisdom": 12, "charisma": 5}
+})
+
+
+async def _llm_result(delay: float, result=None, error: Exception = None):
+    await asyncio.sleep(delay)
+    if error:
+        raise error
+    return dict(result or {"name": "From LLM"})
+
+
+def test_llm_within_slo():
+    print("🧪 Testing an LLM answer within the SLO...")
+
+    registry = SpeculativeUpgradeRegistry()
+    result = asyncio.run(race_against_template(_llm_result(0.0), {"name": "Template"}, 1.0, "npc", registry))
+    assert result["name"] == "From LLM"
+    assert result["generation"] == {"source": "llm", "status": "complete"}
+    stats = registry.get_stats()
+    assert (stats["llm_within_slo"], stats["template_served"], stats["tracked"]) == (1, 0, 0)
+    print("✅ A fast LLM answer is returned and nothing is tracked")
+
+
+def test_template_then_upgrade():
+    print("🧪 Testing template and background upgrade...")
+
+    registry = SpeculativeUpgradeRegistry()
+
+    async def scenario():
+        result = await race_against_template(_llm_result(0.05), {"name": "Template"}, 0.01, "npc", registry)
+        upgrade_id = result["generation"]["upgrade_id"]
+        assert result["name"] == "Template" and result["generation"]["status"] == "pending"
+        assert registry.get(upgrade_id)["status"] == "pending"
+        await asyncio.sleep(0.1)
+        return registry.get(upgrade_id)
+
+    upgrade = asyncio.run(scenario())
+    assert upgrade["status"] == "ready" and upgrade["data"]["name"] == "From LLM"
+    stats = registry.get_stats()
+    assert (stats["template_served"], stats["upgrades_ready"], stats["pending"], stats["template_rate"]) == (1, 1, 0, 1.0)
+    assert registry.get("unknown-id") is None
+    print("✅ A slow LLM answer arrives later as the upgrade")
+
+
+def test_failures():
+    print("🧪 Testing failed generations...")
+
+    registry = SpeculativeUpgradeRegistry()
+
+    async def scenario():
+        # Failing inside the SLO: the template is served with no upgrade to wait for
+        failed = await race_against_template(_llm_result(0.0, error=ValueError("bad JSON")),
+                                             {"name": "Template"}, 1.0, "monster", registry)
+        assert failed["generation"]["status"] == "failed" and failed["generation"]["upgrade_id"] is None
+        # Failing after the SLO: the upgrade reports the error
+        late = await race_against_template(_llm_result(0.03, error=ValueError("bad JSON")),
+                                           {"name": "Template"}, 0.01, "monster", registry)
+        await asyncio.sleep(0.05)
+        return registry.get(late["generation"]["upgrade_id"])
+
+    upgrade = asyncio.run(scenario())
+    assert upgrade["status"] == "failed" and upgrade["error"] == "bad JSON"
+    assert registry.get_stats()["upgrades_failed"] == 1
+    print("✅ LLM failures leave the template in place and are reported")
+
+
+def test_eviction_cancels_pending():
+    print("🧪 Testing eviction...")
+
+    registry = SpeculativeUpgradeRegistry(max_entries=2)
+
+    async def scenario():
+        results = [await race_against_template(_llm_result(1.0), {"name": f"Template {i}"}, 0.0, "npc", registry)
+                   for i in range(3)]
+        ids = [result["generation"]["upgrade_id"] for result in results]
+        await asyncio.sleep(0)
+        assert registry.get(ids[0]) is None
+        assert [registry.get(upgrade_id)["status"] for upgrade_id in ids[1:]] == ["pending", "pending"]
+        for upgrade_id in ids[1:]:
+            registry._upgrades[upgrade_id]["task"].cancel()
+
+    asyncio.run(scenario())
+    stats = registry.get_stats()
+    assert (stats["upgrades_evicted"], stats["tracked"]) == (1, 2)
+    print("✅ The oldest pending upgrade is evicted and cancelled")
+
+
+def test_factory_fast_mode():
+    print("🧪 Testing factory fast mode...")
+
+    slow = ScriptedLLMService([(0.2, MONSTER)])
+    factory = CreationFactory(llm_service=slow)
+
+    async def scenario():
+        template = await factory.create_from_scratch(
+            CreationOptions.MONSTER, "a cave lurker", challenge_rating=2, response_mode="fast", slo_seconds=0.01
+        )
+        assert template["generation"]["source"] == "template" and template["challenge_rating"] == 2
+        # The background LLM call still counts as factory work while it runs
+        assert factory.active_requests == 1
+        await asyncio.sleep(0.3)
+        assert factory.active_requests == 0
+
+        fast = ScriptedLLMService([MONSTER])
+        result = await CreationFactory(llm_service=fast).create_from_scratch(
+            CreationOptions.MONSTER, "a cave lurker", challenge_rating=2, response_mode="fast", slo_seconds=1.0
+        )
+        assert result["name"] == "Cave Lurker" and result["generation"]["source"] == "llm"
+
+    asyncio.run(scenario())
+    print("✅ Fast mode answers within the SLO with the LLM result or the template")
+
+
+if __name__ == "__main__":
+    test_llm_within_slo()
+    test_template_then_upgrade()
+    test_failures()
+    test_eviction_cancels_pending()
+    test_factory_fast_mode()
+    print("\n✅ ALL SPECULATIVE CREATION TESTS PASSED!")
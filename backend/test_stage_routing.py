@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Stage Routing Test
+
+StageRoutedLLMService: stages sent to their configured model tier, the
+fallback to the default service when a routed call fails or its provider is
+unavailable, and the per-stage latency and cost report.
+"""
+
+import asyncio
+
+from testing_support import ScriptedLLMService
+from src.services.llm_service import (
+    OllamaLLMService, StageRoutedLLMService, StageRoutingConfig, _stage_services, estimate_cost, stage_stats
+)
+
+
+def _config(**stages) -> StageRoutingConfig:
+    return StageRoutingConfig(enabled=True, tiers={"small": "scripted:gpt-4.1-nano", "large": ""}, stages=stages)
+
+
+def test_route_for():
+    print("🧪 Testing stage routes...")
+
+    config = _config(backstory="small", character="large")
+    assert config.route_for("backstory") == "scripted:gpt-4.1-nano"
+    # The large tier and unlisted stages use the default service
+    assert config.route_for("character") is None and config.route_for("chapter_hooks") is None
+    config.enabled = False
+    assert config.route_for("backstory") is None
+    print("✅ Stages map to tiers only while routing is enabled")
+
+
+def test_stages_go_to_their_tier():
+    print("🧪 Testing routed calls...")
+
+    small = ScriptedLLMService(["a short backstory"], model="gpt-4.1-nano")
+    default = ScriptedLLMService(["a full character"], model="gpt-4o")
+    # Routed services are shared by spec; seed the tier with a scripted one
+    _stage_services["scripted:gpt-4.1-nano"] = small
+    routed = StageRoutedLLMService(default, _config(routing_test_backstory="small"))
+
+    async def scenario():
+        assert await routed.generate_content("Backstory", stage="routing_test_backstory") == "a short backstory"
+        assert await routed.generate_content("Character", stage="routing_test_character") == "a full character"
+        assert await routed.generate_content("Untagged") == "a full character"
+
+    asyncio.run(scenario())
+    assert len(small.calls) == 1 and len(default.calls) == 2
+    assert all("stage" not in kwargs for _, kwargs in small.calls + default.calls)
+    assert routed.model == "gpt-4o"
+
+    stats = stage_stats.get_stats()
+    backstory = stats["routing_test_backstory"]["scripted:gpt-4.1-nano"]
+    assert backstory["calls"] == 1 and 0 < backstory["cost_usd"] < backstory["default_cost_usd"]
+    assert stats["routing_test_character"]["default:gpt-4o"]["calls"] == 1
+    print("✅ Tagged stages use their tier and report cost against the default")
+
+
+def test_fallback_to_default():
+    print("🧪 Testing fallback...")
+
+    _stage_services["scripted:gpt-4.1-nano"] = ScriptedLLMService([Exception("Connection refused")])
+    default = ScriptedLLMService(["from default"], model="gpt-4o")
+    routed = StageRoutedLLMService(default, _config(routing_test_fallback="small"))
+    assert asyncio.run(routed.generate_content("Hooks", stage="routing_test_fallback")) == "from default"
+    del _stage_services["scripted:gpt-4.1-nano"]
+    routes = stage_stats.get_stats()["routing_test_fallback"]
+    assert routes["scripted:gpt-4.1-nano"]["failures"] == 1
+    assert routes["default:gpt-4o"]["fallbacks"] == 1
+
+    # A tier whose provider cannot be created is served by the default service
+    config = _config(routing_test_unavailable="small")
+    config.tiers["small"] = "no-such-provider:tiny"
+    routed = StageRoutedLLMService(default, config)
+    assert asyncio.run(routed.generate_content("Hooks", stage="routing_test_unavailable")) == "from default"
+    assert _stage_services["no-such-provider:tiny"] is None
+    print("✅ A failed or unavailable tier costs latency, not the request")
+
+
+def test_estimate_cost():
+    print("🧪 Testing cost estimates...")
+
+    assert estimate_cost(ScriptedLLMService(model="gpt-4.1-mini-2025-04-14"), 1_000_000, 0) == 0.40
+    assert estimate_cost(ScriptedLLMService(model="gpt-4.1-2025-04-14"), 0, 1_000_000) == 8.00
+    assert estimate_cost(ScriptedLLMService(model="mystery-model"), 100, 100) is None
+    assert estimate_cost(OllamaLLMService(model="llama3.2:3b"), 10_000, 10_000) == 0.0
+    # Wrappers are looked through to the provider underneath
+    wrapped = StageRoutedLLMService(ScriptedLLMService(model="gpt-4o"), StageRoutingConfig())
+    assert estimate_cost(wrapped, 1_000_000, 0) == 2.50
+    print("✅ Costs use the longest matching model price; local models are free")
+
+
+if __name__ == "__main__":
+    test_route_for()
+    test_stages_go_to_their_tier()
+    test_fallback_to_default()
+    test_estimate_cost()
+    print("\n✅ ALL STAGE ROUTING TESTS PASSED!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Structured Output Test
+
+Schema-constrained generation: the OpenAI response_format and Ollama format
+each provider sends, creators asking for a schema or plain JSON mode, the
+unconstrained fallback when a provider refuses a schema, and required-field
+checks on what comes back.
+"""
+
+import asyncio
+
+from testing_support import FakeOllamaServer, ScriptedLLMService
+from src.services.creation import BaseCreator
+from src.services.llm_schemas import (
+    NPC_SCHEMA, check_required_fields, generate_structured, get_content_schema, structured_output_stats
+)
+from src.services.llm_service import OllamaLLMService, _openai_response_format
+
+
+def test_provider_request_formats():
+    print("🧪 Testing provider structured-output parameters...")
+
+    assert _openai_response_format({"json_schema": NPC_SCHEMA, "schema_name": "npc"}) == {
+        "type": "json_schema", "json_schema": {"name": "npc", "schema": NPC_SCHEMA}
+    }
+    assert _openai_response_format({"json_mode": True}) == {"type": "json_object"}
+    assert _openai_response_format({"temperature": 0.2}) is None
+
+    with FakeOllamaServer() as server:
+        service = OllamaLLMService(model="fake-model", base_url=server.base_url)
+        asyncio.run(service.generate_content("An NPC", json_schema=NPC_SCHEMA))
+        asyncio.run(service.generate_content("A backstory", json_mode=True))
+        asyncio.run(service.generate_content("Free text"))
+    assert [request.get("format") for request in server.requests] == [NPC_SCHEMA, "json", None]
+    print("✅ Schemas and JSON mode map to each provider's native parameter")
+
+
+def test_creator_requests():
+    print("🧪 Testing creator requests...")
+
+    service = ScriptedLLMService(['{"name": "Bram"}'])
+    creator = BaseCreator(llm_service=service)
+    asyncio.run(creator._request_llm_json("Create an NPC", "npc"))
+    asyncio.run(creator._request_llm_json("Write a backstory", "backstory"))
+    (_, npc_kwargs), (_, backstory_kwargs) = service.calls
+    assert npc_kwargs["json_schema"] == get_content_schema("npc") and npc_kwargs["stage"] == "npc"
+    assert backstory_kwargs.get("json_mode") is True and "json_schema" not in backstory_kwargs
+    print("✅ Known content types are schema-constrained, others use JSON mode")
+
+
+def test_schema_rejection_falls_back():
+    print("🧪 Testing schema rejection...")
+
+    rejected = Exception("400 Invalid parameter: 'response_format' of type 'json_schema' is not supported")
+    service = ScriptedLLMService([rejected, '{"name": "Bram"}'])
+    before = structured_output_stats.get_stats().get("monster", {}).get("schema_rejected", 0)
+    assert asyncio.run(BaseCreator(llm_service=service)._request_llm_json("A monster", "monster")) == '{"name": "Bram"}'
+    assert "json_schema" in service.calls[0][1] and "json_schema" not in service.calls[1][1]
+    assert structured_output_stats.get_stats()["monster"]["schema_rejected"] == before + 1
+
+    # Any other error is the caller's to handle
+    service = ScriptedLLMService([Exception("500 Internal Server Error")])
+    try:
+        asyncio.run(BaseCreator(llm_service=service)._request_llm_json("A monster", "monster"))
+    except Exception as e:
+        assert "500" in str(e)
+    else:
+        raise AssertionError("Only schema rejections fall back")
+    assert len(service.calls) == 1
+    print("✅ A refused schema is retried unconstrained, once")
+
+
+def test_required_fields_are_checked():
+    print("🧪 Testing required-field checks...")
+
+    required = NPC_SCHEMA["required"]
+    assert check_required_fields({field: "x" for field in required}, NPC_SCHEMA) == []
+    assert check_required_fields({}, NPC_SCHEMA) == list(required)
+    assert check_required_fields(["not", "an", "object"], NPC_SCHEMA) == list(required)
+    assert check_required_fields({}, None) == []
+
+    service = ScriptedLLMService(['```json\n{"name": "Bram"}\n```'])
+    before = structured_output_stats.get_stats().get("npc", {}).get("missing_fields", 0)
+    data = asyncio.run(generate_structured(service, "An NPC", "npc"))
+    # Incomplete data is still returned for the validators to fill in
+    assert data == {"name": "Bram"}
+    assert structured_output_stats.get_stats()["npc"]["missing_fields"] == before + 1
+    print("✅ Missing required fields are counted without dropping the response")
+
+
+if __name__ == "__main__":
+    test_provider_request_formats()
+    test_creator_requests()
+    test_schema_rejection_falls_back()
+    test_required_fields_are_checked()
+    print("\n✅ ALL STRUCTURED OUTPUT TESTS PASSED!")
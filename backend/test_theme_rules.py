@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Theme Rule Cache Test
+
+Compiled theme rules: normalised and length-capped theme keys, keyword
+fallbacks on a miss, one background compile per theme, the caps on background
+compiles, and rules persisted for the next process.
+"""
+
+import asyncio
+
+from testing_support import ScriptedLLMService, scratch_database
+from src.models.database_models import ThemeRule
+from src.services.creation import CharacterCreator
+from src.services.theme_rules import MAX_THEME_LENGTH, ThemeRuleCache, normalize_theme
+
+LOGIC = '{"keywords": ["gear", "steam"], "schools": ["transmutation"], "types": ["crossbow"], "avoid": []}'
+
+
+def _creator(delay: float = 0.0):
+    service = ScriptedLLMService([(delay, LOGIC)])
+    return CharacterCreator(llm_service=service), service
+
+
+def test_theme_keys():
+    print("🧪 Testing theme keys...")
+
+    assert normalize_theme("  Gothic   HORROR\n") == "gothic horror"
+    long_theme = normalize_theme("A " + "very " * 60 + "long theme")
+    assert len(long_theme) <= MAX_THEME_LENGTH and not long_theme.endswith(" ")
+
+    cache = ThemeRuleCache()
+    rule = cache.get_rule("spell", "Steampunk Gear-Works")
+    assert rule.source == "fallback" and rule.theme == "steampunk gear-works"
+    assert rule.logic["keywords"] == ["steampunk", "gear", "works"]
+    print("✅ Themes are case- and space-insensitive and fit the theme column")
+
+
+def test_one_compile_per_theme():
+    print("🧪 Testing background compiles...")
+
+    creator, service = _creator(delay=0.02)
+    cache = ThemeRuleCache()
+
+    async def scenario():
+        for theme in ("Steampunk", "steampunk ", "STEAMPUNK"):
+            assert cache.get_rule("spell", theme, creator).source == "fallback"
+        assert list(cache._pending) == ["steampunk"]
+        await asyncio.gather(*cache._pending.values())
+        # Startup warming joins or skips the compile instead of repeating it
+        await cache.warm(["SteamPunk"], creator)
+
+    asyncio.run(scenario())
+    assert len(service.calls) == 2  # spell and weapon logic, once each
+    assert cache.get_rule("weapon", "Steampunk").source == "llm"
+    assert cache.get_stats()["background_compiles"] == 1
+    print("✅ Repeated misses share one compile of spell and weapon logic")
+
+
+def test_compile_caps():
+    print("🧪 Testing compile caps...")
+
+    creator, service = _creator(delay=0.02)
+    cache = ThemeRuleCache(max_concurrent=1, max_pending=2, max_background=3)
+
+    async def scenario():
+        for i in range(5):
+            cache.get_rule("spell", f"theme {i}", creator)
+        assert len(cache._pending) == 2
+        await asyncio.gather(*cache._pending.values())
+        for i in range(5, 8):
+            cache.get_rule("spell", f"theme {i}", creator)
+        await asyncio.gather(*cache._pending.values())
+
+    asyncio.run(scenario())
+    stats = cache.get_stats()
+    assert (stats["background_compiles"], stats["compiles_skipped"]) == (3, 5)
+    assert service.peak_active == 1 and len(service.calls) == 6
+    assert cache.get_rule("spell", "theme 7").source == "fallback"
+    print("✅ Concurrent, queued and total background compiles are bounded")
+
+
+def test_rules_are_persisted():
+    print("🧪 Testing persisted rules...")
+
+    session = scratch_database("theme_rules")
+    creator, _ = _creator()
+    theme = "Clockwork " * 20
+    asyncio.run(ThemeRuleCache().compile(theme, creator))
+    rows = session.query(ThemeRule).all()
+    assert sorted(row.kind for row in rows) == ["spell", "weapon"]
+    assert all(row.theme == normalize_theme(theme) and len(row.theme) <= MAX_THEME_LENGTH for row in rows)
+    session.close()
+
+    fresh = ThemeRuleCache()
+    assert fresh.load() == 2
+    assert fresh.get_rule("spell", theme.upper()).source == "llm"
+    print("✅ Compiled rules are stored under the capped key and reload")
+
+
+if __name__ == "__main__":
+    test_theme_keys()
+    test_one_compile_per_theme()
+    test_compile_caps()
+    test_rules_are_persisted()
+    print("\n✅ ALL THEME RULE CACHE TESTS PASSED!")
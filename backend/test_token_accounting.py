@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Token Accounting Test
+
+RateLimiter reservations reconciled against actual usage: refunds of
+over-reserved tokens to the TPM window, overruns, expired reservations, and
+the completion reservation TokenUsageStats learns from past responses.
+"""
+
+import asyncio
+import time
+
+from testing_support import ScriptedLLMService
+from src.services.llm_service import RateLimitConfig, RateLimiter, TokenUsageStats, token_usage_stats
+
+
+def _limiter(tokens_per_minute: int = 5000) -> RateLimiter:
+    return RateLimiter(RateLimitConfig(tokens_per_minute=tokens_per_minute))
+
+
+def test_refund_frees_window():
+    print("🧪 Testing reservation refunds...")
+
+    async def scenario():
+        limiter = _limiter()
+        first = await limiter.reserve(3000)
+        assert first is not None
+        # The window is held by the estimate until it is reconciled
+        assert await limiter.reserve(3000) is None
+        assert await limiter.reconcile(first, 1000) == 2000
+        assert limiter.current_tokens == 1000
+        assert await limiter.reserve(3000) is not None
+        # Reconciling twice changes nothing
+        assert await limiter.reconcile(first, 0) == 0
+        return limiter
+
+    status = asyncio.run(scenario()).get_status()
+    assert (status["tokens_per_minute"], status["tokens_refunded"], status["tokens_overrun"]) == (4000, 2000, 0)
+    print("✅ Unused reserved tokens go back to the TPM window")
+
+
+def test_overruns_and_expired_reservations():
+    print("🧪 Testing overruns and expired reservations...")
+
+    async def scenario():
+        limiter = _limiter()
+        reservation = await limiter.reserve(1000)
+        assert await limiter.reconcile(reservation, 1500) == -500
+        assert limiter.current_tokens == 1500 and limiter.tokens_overrun == 500
+
+        # A reservation already outside the window is only counted, not re-charged
+        limiter = _limiter()
+        old = await limiter.reserve(2000)
+        old.timestamp = time.time() - 61
+        assert await limiter.reconcile(old, 100) == 1900
+        assert limiter.current_tokens == 2000 and limiter.tokens_refunded == 1900
+        limiter._cleanup_old_entries(time.time())
+        assert limiter.current_tokens == 0
+
+    asyncio.run(scenario())
+    print("✅ Overruns are charged and stale reservations leave the window intact")
+
+
+def test_service_reconciliation():
+    print("🧪 Testing provider reconciliation...")
+
+    async def scenario():
+        service = ScriptedLLMService()
+        service.rate_limiter = _limiter()
+        reported = await service.rate_limiter.reserve(1200)
+        await service._reconcile_usage("accounting-test", reported, 180, 200, 300)
+        # Without reported usage the prompt estimate stays charged
+        unreported = await service.rate_limiter.reserve(1200)
+        await service._reconcile_usage("accounting-test", unreported, 180, None, None)
+        return service.rate_limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.current_tokens == 500 + 180
+    stats = token_usage_stats.get_stats()["accounting-test"]
+    assert (stats["requests"], stats["reserved_tokens"], stats["actual_tokens"]) == (1, 1200, 500)
+    assert stats["tokens_refunded"] == 700 and stats["prompt_estimate_ratio"] == 0.9
+    print("✅ Actual usage replaces the estimate and is recorded per provider")
+
+
+def test_completion_reservation_learns():
+    print("🧪 Testing completion reservations...")
+
+    stats = TokenUsageStats()
+    prompt = "Describe the tavern keeper in one sentence."
+    prompt_tokens, reserved = stats.estimate("learning", prompt, 4096)
+    assert prompt_tokens > 0 and reserved == prompt_tokens + 4096
+
+    for _ in range(TokenUsageStats.MIN_SAMPLES):
+        stats.record("learning", prompt_tokens, reserved, prompt_tokens, 200)
+    assert stats.estimate("learning", prompt, 4096)[1] == prompt_tokens + 300
+    # Never more than the request's max_tokens
+    assert stats.estimate("learning", prompt, 250)[1] == prompt_tokens + 250
+    print("✅ Reservations shrink to a margin over recent completions")
+
+
+if __name__ == "__main__":
+    test_refund_frees_window()
+    test_overruns_and_expired_reservations()
+    test_service_reconciliation()
+    test_completion_reservation_learns()
+    print("\n✅ ALL TOKEN ACCOUNTING TESTS PASSED!")
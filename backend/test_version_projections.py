@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Version Projection Test
+
+Metadata-only versioning views: repository ETags, trees paged by commit depth
+without snapshots, and the depth backfill for older commits.
+"""
+
+
+from testing_support import memory_database
+from src.models.database_models import CharacterCommit, CharacterRepositoryManager
+from src.services.version_projections import compute_depths, ensure_commit_depths, repository_etag
+
+
+def _character(level: int):
+    return {"name": "Thorin", "level": level, "backstory": "Exiled king. " * 200}
+
+
+def _repository(main_commits: int = 5, branch_commits: int = 2):
+    """main: initial + main_commits; 'dark-path' branches after level 3 with branch_commits of its own."""
+    engine, Session = memory_database()
+    db = Session()
+    repo = CharacterRepositoryManager.create_repository(db, "Thorin", initial_character_data=_character(1))
+    for level in range(2, main_commits + 2):
+        CharacterRepositoryManager.create_commit(db, repo.id, "main", f"Level {level}", _character(level), level)
+        if level == 3:
+            CharacterRepositoryManager.create_branch(db, repo.id, "dark-path")
+    for level in range(4, branch_commits + 4):
+        CharacterRepositoryManager.create_commit(db, repo.id, "dark-path", f"Dark {level}", _character(level), level)
+    return engine, db, repo
+
+
+def test_repository_etag():
+    print("🧪 Testing repository ETags...")
+
+    engine, db, repo = _repository()
+    etag = repository_etag(db, repo.id, "tree")
+    assert etag.startswith('"') and etag.endswith('"')
+    assert repository_etag(db, repo.id, "tree") == etag
+    assert repository_etag(db, repo.id, "timeline") != etag
+    assert repository_etag(db, "no-such-repository") is None
+
+    CharacterRepositoryManager.create_commit(db, repo.id, "dark-path", "Dark 6", _character(6), 6)
+    after_commit = repository_etag(db, repo.id, "tree")
+    assert after_commit != etag
+
+    head = db.query(CharacterCommit.commit_hash).filter(CharacterCommit.commit_message == "Level 6").scalar()
+    CharacterRepositoryManager.create_tag(db, repo.id, "v6", head)
+    assert repository_etag(db, repo.id, "tree") != after_commit
+    db.close()
+    print("✅ ETags are stable, per view, and change with commits and tags")
+
+
+def test_tree_pages_by_depth():
+    print("🧪 Testing depth-paged trees...")
+
+    engine, db, repo = _repository()
+    tree = CharacterRepositoryManager.get_repository_tree(db, repo.id)
+    assert tree["repository"]["commit_count"] == 8
+    assert sorted(b["commit_count"] for b in tree["branches"]) == [2, 6]
+    assert all("character_data" not in commit for commit in tree["commits"])
+    # Depths are generations: main reaches 5, the branch off level 3 (depth 2) reaches 4
+    assert sorted(commit["depth"] for commit in tree["commits"]) == [0, 1, 2, 3, 3, 4, 4, 5]
+
+    pages, before_depth = [], None
+    while True:
+        page = CharacterRepositoryManager.get_repository_tree(db, repo.id, depth_limit=2, before_depth=before_depth)
+        pages.append([commit["depth"] for commit in page["commits"]])
+        before_depth = page["page"]["next_before_depth"]
+        if before_depth is None:
+            break
+    assert pages == [[5, 4, 4], [3, 3, 2], [1, 0]]
+
+    with_snapshots = CharacterRepositoryManager.get_repository_tree(db, repo.id, include_snapshots=True, depth_limit=1)
+    assert [commit["character_data"]["level"] for commit in with_snapshots["commits"]] == [6]
+    db.close()
+    print("✅ Pages hold whole generations, newest first, without snapshots")
+
+
+def test_depth_backfill():
+    print("🧪 Testing the depth backfill...")
+
+    engine, db, repo = _repository()
+    expected = dict(db.query(CharacterCommit.commit_hash, CharacterCommit.depth).all())
+    rows = db.query(CharacterCommit.commit_hash, CharacterCommit.parent_commit_hash,
+                    CharacterCommit.merge_parent_hash).all()
+    assert compute_depths(rows) == expected
+
+    db.query(CharacterCommit).update({CharacterCommit.depth: None})
+    db.commit()
+    assert ensure_commit_depths(engine) == len(expected)
+    db.expire_all()
+    assert dict(db.query(CharacterCommit.commit_hash, CharacterCommit.depth).all()) == expected
+    assert ensure_commit_depths(engine) == 0
+    db.close()
+    print("✅ Legacy commits get the depth create_commit() would have set")
+
+
+if __name__ == "__main__":
+    test_repository_etag()
+    test_tree_pages_by_depth()
+    test_depth_backfill()
+    print("\n✅ ALL VERSION PROJECTION TESTS PASSED!")
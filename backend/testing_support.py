@@ -0,0 +1,140 @@
+"""
+Shared setup for the backend test scripts.
+
+Importing this module gives the config module the placeholder secrets it
+requires and puts src/ on sys.path, so every test_*.py runs the same under
+pytest and as a plain script. It also provides scratch databases, a scripted
+stand-in for an LLM provider and a local stand-in for the Ollama HTTP API.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+os.environ.setdefault("SECRET_KEY", "test_secret_key")
+os.environ.setdefault("OPENAI_API_KEY", "test_openai_key")
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from src.services.llm_service import LLMService
+
+
+def memory_database():
+    """A fresh in-memory SQLite engine with every table, and a session factory bound to it."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.models.database_models import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine)
+
+
+def scratch_database(name: str):
+    """
+    init_database() on a new SQLite file, for code that opens its own sessions
+    through database_models.SessionLocal. Returns a session on it.
+    """
+    from src.models import database_models
+
+    database_models.init_database(f"sqlite:///{tempfile.mkdtemp()}/{name}.db")
+    return database_models.SessionLocal()
+
+
+class ScriptedLLMService(LLMService):
+    """
+    LLM provider that replays a script instead of calling a model.
+
+    Each step is a response string, an exception to raise, or a
+    (delay_seconds, response_or_exception) pair. The last step repeats once
+    the script runs out. Every call is recorded in calls as (prompt, kwargs),
+    and peak_active is the most calls that were ever in progress at once.
+    """
+
+    def __init__(self, steps: Iterable[Any] = ("ok",), model: str = "scripted-model"):
+        self.steps: List[Any] = list(steps)
+        self.model = model
+        self.calls: List[Tuple[str, Dict[str, Any]]] = []
+        self.cancelled = 0
+        self.active = 0
+        self.peak_active = 0
+
+    async def generate_content(self, prompt: str, **kwargs) -> str:
+        self.calls.append((prompt, kwargs))
+        step = self.steps[min(len(self.calls), len(self.steps)) - 1]
+        delay, outcome = step if isinstance(step, tuple) else (0.0, step)
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    async def test_connection(self) -> bool:
+        return True
+
+    def get_rate_limit_status(self) -> Dict[str, Any]:
+        return {"calls": len(self.calls)}
+
+
+class FakeOllamaServer:
+    """
+    Ollama's /api/generate and /api/tags on a local port, served from a thread.
+
+    reply(payload) returns (status, body) for each generate request; the
+    default echoes a fixed response with a context that grows by one token per
+    call. Request bodies are recorded in requests. Use as a context manager and
+    point OllamaLLMService at base_url.
+    """
+
+    def __init__(self, reply: Callable[[Dict[str, Any]], Tuple[int, Dict[str, Any]]] = None):
+        self.reply = reply or self._default_reply
+        self.requests: List[Dict[str, Any]] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._send(200, {"models": [{"name": "fake-model:latest"}]})
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append(payload)
+                self._send(*server.reply(payload))
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _default_reply(self, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        context = list(payload.get("context", [])) + [len(self.requests)]
+        return 200, {"response": '{"ok": true}', "context": context,
+                     "prompt_eval_count": 10, "eval_count": 5}
+
+    def __enter__(self) -> "FakeOllamaServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -77,10 +77,11 @@ This FastAPI app provides a comprehensive API for D&D campaign creation, managem
 All endpoints, models, and features are designed for campaign-level operations, not character creation.
 """
 
+import asyncio
 import time
 import uuid
-from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, Query, Path, Depends
+from typing import List, Dict, Any, Optional, Union
+from fastapi import FastAPI, HTTPException, Query, Path, Depends, Request, Response
 from pydantic import BaseModel, Field
 import logging
 from sqlalchemy.orm import Session
@@ -102,11 +103,47 @@ from src.services.backend_integration import (
 app = FastAPI(title="D&D Campaign Creation API", version="2.0")
 logger = logging.getLogger("campaign_api")
 
+@app.middleware("http")
+async def trace_llm_retries(request: Request, call_next):
+    """Give each request one LLM retry budget and report its retries in the response."""
+    from src.services.llm_service import retry_scope, RetryPolicy
+    with retry_scope(RetryPolicy.from_env()) as retry_policy:
+        response = await call_next(request)
+    trace = retry_policy.get_trace()
+    response.headers["X-LLM-Retries"] = str(trace["retries"])
+    if trace["retries"]:
+        logger.info(f"{request.method} {request.url.path} LLM retries: {trace['attempts']}")
+    return response
+
 # Initialize database on startup
 @app.on_event("startup")
 def startup_event():
     init_database("sqlite:///campaigns.db")
 
+@app.on_event("startup")
+async def compress_existing_rows():
+    """Rewrite chapter content stored before it was compressed, in small batches in the background."""
+    from src.core.config import settings
+    from src.models import database_models
+    from src.models.compressed_json import compress_all_existing_rows
+    if settings.compression_backfill_on_startup:
+        app.state.compression_backfill = asyncio.create_task(asyncio.to_thread(
+            compress_all_existing_rows, database_models.engine, database_models.Base.metadata,
+            batch_size=settings.compression_backfill_batch_size
+        ))
+
+@app.on_event("startup")
+async def preload_llm_models():
+    """Load local Ollama models in the background so the first generation doesn't cold-load them."""
+    from src.services.llm_service import create_llm_service, preload_ollama_models
+    app.state.ollama_preload = asyncio.create_task(preload_ollama_models(create_llm_service()))
+
+@app.on_event("shutdown")
+def stop_simulation_pool():
+    """Stop the encounter simulator's worker processes, if a large simulation started them."""
+    from src.services.encounter_simulator import shutdown_process_pool
+    shutdown_process_pool()
+
 # =========================
 # ENUMS & CONSTANTS (use database enums)
 # =========================
@@ -143,6 +180,11 @@ class CampaignResponse(BaseModel):
     updated_at: str
     validation_warnings: Optional[List[str]] = None
 
+class CampaignPage(BaseModel):
+    """Cursor-paginated campaign list."""
+    items: List[CampaignResponse]
+    next_cursor: Optional[str] = None
+
 class ChapterCreateRequest(BaseModel):
     campaign_id: str
     title: str
@@ -240,6 +282,24 @@ class ChapterContentGenerationRequest(BaseModel):
 async def health_check():
     return {"status": "ok", "message": "Campaign API is running"}
 
+@app.get("/api/v2/metrics", tags=["system"])
+async def get_metrics():
+    """LLM prompt and token metrics for performance monitoring."""
+    from src.services.prompt_serializer import prompt_compaction_stats
+    from src.services.llm_service import (
+        token_usage_stats, coalescing_stats, get_provider_health_stats, get_stage_routing_stats,
+        ollama_context_store, retry_stats
+    )
+    return {
+        "prompt_compaction": prompt_compaction_stats.get_stats(),
+        "token_usage": token_usage_stats.get_stats(),
+        "llm_coalescing": coalescing_stats.get_stats(),
+        "llm_providers": get_provider_health_stats(),
+        "stage_routing": get_stage_routing_stats(),
+        "ollama": ollama_context_store.get_stats(),
+        "llm_retries": retry_stats.get_stats()
+    }
+
 # =========================
 # CAMPAIGN CRUD ENDPOINTS
 # =========================
@@ -258,10 +318,26 @@ async def create_campaign(request: CampaignCreateRequest, db=Depends(get_db)):
         updated_at=db_campaign.updated_at.isoformat() if db_campaign.updated_at else None
     )
 
-@app.get("/api/v2/campaigns", response_model=List[CampaignResponse], tags=["campaigns"])
-async def list_campaigns(db=Depends(get_db)):
-    campaigns = CampaignDB.list_campaigns(db)
-    return [CampaignResponse(
+@app.get("/api/v2/campaigns", response_model=Union[List[CampaignResponse], CampaignPage], tags=["campaigns"])
+async def list_campaigns(
+    response: Response,
+    db=Depends(get_db),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of campaigns to return"),
+    offset: int = Query(0, ge=0, description="Number of campaigns to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from next_cursor; pass empty for the first page of a cursor walk")
+):
+    """
+    List campaigns in creation order. With cursor= (empty for the first page)
+    the response is {"items": [...], "next_cursor": ...}; without it the bare
+    list is returned, with the next page's cursor in the X-Next-Cursor header.
+    """
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+    try:
+        campaigns, next_cursor = CampaignDB.list_campaigns_page(db, limit=limit, cursor=cursor, offset=offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    items = [CampaignResponse(
         id=c.id,
         title=c.title,
         description=c.description,
@@ -271,6 +347,11 @@ async def list_campaigns(db=Depends(get_db)):
         created_at=c.created_at.isoformat() if c.created_at else None,
         updated_at=c.updated_at.isoformat() if c.updated_at else None
     ) for c in campaigns]
+    if cursor is not None:
+        return CampaignPage(items=items, next_cursor=next_cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @app.get("/api/v2/campaigns/{campaign_id}", response_model=CampaignResponse, tags=["campaigns"])
 async def get_campaign(campaign_id: str, db=Depends(get_db)):
@@ -2025,3 +2106,65 @@ async def transfer_item_to_character(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to transfer item: {str(e)}")
+
+# =========================
+# ENCOUNTER SIMULATION ENDPOINTS
+# =========================
+
+class EncounterSimulationRequest(BaseModel):
+    party: List[Dict[str, Any]] = Field(default=[], description="Party members as character data or explicit combat profiles")
+    party_character_ids: List[str] = Field(default=[], description="Backend character IDs to add to the party")
+    enemies: List[Dict[str, Any]] = Field(..., description="Creature stat blocks (hit_points, armor_class, abilities, actions)")
+    trials: int = Field(10000, ge=1, le=200000, description="Number of simulated fights")
+    max_rounds: int = Field(20, ge=1, le=100, description="Rounds before a fight is counted as unresolved")
+    seed: Optional[int] = Field(None, description="Random seed for reproducible results")
+    processes: int = Field(1, ge=1, le=16, description="Worker processes for large simulations")
+    focus_fire: bool = Field(True, description="Combatants concentrate attacks on one target")
+
+@app.post("/api/v2/campaigns/{campaign_id}/encounters/simulate", tags=["encounters"])
+async def simulate_campaign_encounter(
+    campaign_id: str,
+    request: EncounterSimulationRequest,
+    db: Session = Depends(get_db),
+    backend_service: BackendIntegrationService = Depends(get_backend_service)
+):
+    """
+    Estimate encounter difficulty with a Monte Carlo combat simulation.
+    Returns win rate, rounds-to-kill and resource-drain distributions for the party.
+    """
+    campaign = CampaignDB.get_campaign(db, campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    
+    from src.services.encounter_simulator import simulate_encounter
+    
+    party = list(request.party)
+    for character_id in request.party_character_ids:
+        character_data = await backend_service.get_character(character_id)
+        if not character_data:
+            raise HTTPException(status_code=404, detail=f"Character {character_id} not found in backend service")
+        party.append(character_data)
+    
+    if not party:
+        raise HTTPException(status_code=400, detail="Encounter simulation requires at least one party member")
+    
+    try:
+        import asyncio
+        result = await asyncio.to_thread(
+            simulate_encounter,
+            party,
+            request.enemies,
+            trials=request.trials,
+            max_rounds=request.max_rounds,
+            seed=request.seed,
+            processes=request.processes,
+            focus_fire=request.focus_fire
+        )
+        return {
+            "campaign_id": campaign_id,
+            "simulation": result
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Encounter simulation failed: {str(e)}")
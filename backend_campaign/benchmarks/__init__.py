@@ -0,0 +1,8 @@
+"""
+Benchmarks for the campaign services.
+
+Each module times a service in src/ against the access pattern it replaced,
+on a scratch database (in-memory SQLite unless a database URL is given), and
+prints the results as JSON. Run them from the backend_campaign directory:
+    python -m benchmarks.chapter_graph --chapters 50 --branches 20
+"""
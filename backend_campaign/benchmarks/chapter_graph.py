@@ -0,0 +1,133 @@
+"""
+Benchmark of chapter graph queries (src/services/chapter_graph.py).
+
+Builds a campaign with a main line of skeleton chapters and branches forked
+along it, some merged back, then times history, branch log and merge base for
+every branch: the old walk (one query per ancestor) against the recursive CTEs.
+
+Usage (50-chapter main line with 20 branches, in-memory SQLite unless a database URL is given):
+    cd backend_campaign && python -m benchmarks.chapter_graph --chapters 50 --branches 20
+"""
+
+import argparse
+import json
+from typing import Any, Dict, Optional
+
+from src.services.chapter_graph import ancestor_versions, branch_log, merge_base
+
+
+def benchmark(chapters: int = 50, branches: int = 20, database_url: str = "sqlite://",
+              branch_commits: int = 5, repeats: int = 5) -> Dict[str, Any]:
+    """
+    Build a campaign with a main line of skeleton chapters and branches forked
+    along it, then time history, branch log and merge base for every branch:
+    the old walk (one query per ancestor) against the recursive CTEs.
+    """
+    import time
+    import uuid
+    from collections import deque
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from src.models.database_models import Base, Campaign, ChapterVersion
+    from src.services.chapter_version_manager import ChapterGitOperations, ChapterVersionManager
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    queries = {"count": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_queries(conn, cursor, statement, parameters, context, executemany):
+        queries["count"] += 1
+
+    campaign = Campaign(id=str(uuid.uuid4()), title="Benchmark Campaign")
+    session.add(campaign)
+    session.commit()
+    manager = ChapterVersionManager(session)
+    skeleton = manager.create_skeleton_commits(campaign.id, [
+        {"title": f"Chapter {i + 1}", "summary": "An outline of the chapter. " * 10, "chapter_order": i}
+        for i in range(chapters)
+    ])
+    branch_names = []
+    for b in range(branches):
+        name = f"branch_{b}"
+        fork = skeleton[(b * chapters) // branches]
+        manager.create_branch(campaign.id, name, fork.hash)
+        for c in range(branch_commits):
+            manager.commit_chapter(campaign.id, {"title": f"{name} chapter {c + 1}", "chapter_order": c},
+                                   branch_name=name, commit_message=f"Write {name} chapter {c + 1}")
+        branch_names.append(name)
+    # Merged storylines make the graph a DAG rather than a tree
+    git_ops = ChapterGitOperations(manager)
+    for name in branch_names[::5]:
+        git_ops.merge_branches(campaign.id, name, "main")
+    heads = {name: manager._get_current_branch_head(campaign.id, name)[0] for name in ["main"] + branch_names}
+
+    # The old access pattern: one lookup per ancestor
+    timestamps: Dict[str, Any] = {}
+
+    def legacy_distances(version_hash: str) -> Dict[str, int]:
+        distances: Dict[str, int] = {}
+        pending = deque([(version_hash, 0)])
+        while pending:
+            current, distance = pending.popleft()
+            if current in distances:
+                continue
+            distances[current] = distance
+            version = session.query(ChapterVersion).filter(
+                ChapterVersion.campaign_id == campaign.id, ChapterVersion.version_hash == current
+            ).first()
+            if version:
+                timestamps[current] = version.commit_timestamp
+                pending.extend((parent, distance + 1) for parent in version.parent_hashes or [])
+        return distances
+
+    def legacy_merge_base(hash_a: str, hash_b: str) -> Optional[str]:
+        from_a, from_b = legacy_distances(hash_a), legacy_distances(hash_b)
+        common = [h for h in from_a if h in from_b]
+        return min(common, key=lambda h: (from_a[h] + from_b[h], -timestamps[h].timestamp())) if common else None
+
+    cases = {
+        "history": (lambda: [legacy_distances(head) for head in heads.values()],
+                    lambda: [ancestor_versions(session, campaign.id, [head]) for head in heads.values()]),
+        "branch_log": (lambda: [legacy_distances(manager._get_current_branch_head(campaign.id, name)[0])
+                                for name in heads],
+                       lambda: [branch_log(session, campaign.id, name) for name in heads]),
+        "merge_base": (lambda: [legacy_merge_base(heads["main"], heads[name]) for name in branch_names],
+                       lambda: [merge_base(session, campaign.id, heads["main"], heads[name]) for name in branch_names]),
+    }
+    results: Dict[str, Any] = {"chapters": chapters, "branches": branches, "database": engine.dialect.name,
+                               "versions": session.query(ChapterVersion).filter(
+                                   ChapterVersion.campaign_id == campaign.id).count()}
+    for label, (legacy, cte) in cases.items():
+        results[label] = {}
+        for variant, run in (("per_ancestor", legacy), ("recursive_cte", cte)):
+            session.expire_all()
+            queries["count"] = 0
+            start = time.perf_counter()
+            for _ in range(repeats):
+                run()
+            results[label][variant] = {"ms": round((time.perf_counter() - start) * 1000 / repeats, 2),
+                                       "queries": queries["count"] // repeats}
+        if label == "merge_base":
+            results[label]["same_result"] = legacy() == cte()
+        else:
+            results[label]["same_result"] = [sorted(d) for d in legacy()] == [
+                sorted(v.version_hash for v in versions) for versions in cte()
+            ]
+
+    event.remove(engine, "before_cursor_execute", _count_queries)
+    session.delete(session.get(Campaign, campaign.id))
+    session.commit()
+    session.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chapter graph queries")
+    parser.add_argument("--chapters", type=int, default=50)
+    parser.add_argument("--branches", type=int, default=20)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.chapters, args.branches, args.database_url, repeats=args.repeats), indent=2))
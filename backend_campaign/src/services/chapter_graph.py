@@ -0,0 +1,167 @@
+"""
+Chapter version graph queries: ancestry, branch log and merge base.
+
+ChapterVersionManager persists chapter versions in chapter_versions and story
+branches in campaign_branches. The graph lives in chapter_version_parents, one
+row per (version, parent) edge mirroring ChapterVersion.parent_hashes and kept
+in step by listeners on ChapterVersion. Walking it used to take one query per
+ancestor (get_chapter_history() recursed in Python through
+_get_commit_by_hash()); every walk is now a single recursive CTE:
+
+    WITH RECURSIVE ancestry(version_hash) AS (
+        SELECT version_hash FROM chapter_versions
+         WHERE campaign_id = :campaign AND version_hash IN (:start)
+        UNION
+        SELECT e.parent_hash FROM chapter_version_parents e
+          JOIN ancestry a ON e.version_hash = a.version_hash
+    )
+    SELECT chapter_versions.* FROM chapter_versions JOIN ancestry USING (version_hash)
+
+UNION (not UNION ALL) visits each version once however many merge paths lead
+to it. The edge primary key (version_hash, parent_hash) serves each step.
+
+QUERIES:
+- ancestor_versions(): a version and all its ancestors (git log <hash>)
+- branch_log(): ancestry of a branch head, anchored on campaign_branches
+  through the (campaign_id, name) index
+- merge_base(): the common ancestor of two versions closest to both, from
+  two distance-tracking CTEs joined on version_hash
+
+Benchmark (50-chapter main line with 20 branches, SQLite unless a database
+URL is given):
+    cd backend_campaign && python -m benchmarks.chapter_graph --chapters 50 --branches 20
+
+Usage:
+    history = ancestor_versions(db, campaign_id, [chapter_hash])
+    base = merge_base(db, campaign_id, main_head, branch_head)
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, exists, func, inspect, literal, select
+
+logger = logging.getLogger(__name__)
+
+
+def _parent_rows(version) -> List[Dict[str, Any]]:
+    parents = dict.fromkeys(list(version.parent_hashes or []) + list(version.merge_parent_hashes or []))
+    return [{"version_hash": version.version_hash, "parent_hash": parent_hash, "position": position}
+            for position, parent_hash in enumerate(parents) if parent_hash]
+
+
+def sync_version_parents(connection, version) -> None:
+    """Write the parent edges of a newly inserted chapter version."""
+    from src.models.database_models import ChapterVersionParent
+    rows = _parent_rows(version)
+    if rows:
+        connection.execute(ChapterVersionParent.__table__.insert(), rows)
+
+
+def remove_version_parents(connection, version) -> None:
+    """Drop the parent edges of a chapter version that is being deleted."""
+    from src.models.database_models import ChapterVersionParent
+    edges = ChapterVersionParent.__table__
+    connection.execute(delete(edges).where(edges.c.version_hash == version.version_hash))
+
+
+def ancestry_cte(campaign_id: str, start_hashes, with_distance: bool = False, name: str = "ancestry"):
+    """
+    Recursive CTE of the given versions and all their ancestors. start_hashes
+    is a list of hashes or a select of them. with_distance adds the number of
+    edges from the start (one row per distinct distance).
+    """
+    from src.models.database_models import ChapterVersion, ChapterVersionParent
+    versions = ChapterVersion.__table__
+    edges = ChapterVersionParent.__table__
+    if not hasattr(start_hashes, "subquery"):
+        start_hashes = list(start_hashes)
+
+    anchor_columns = [versions.c.version_hash]
+    if with_distance:
+        anchor_columns.append(literal(0).label("distance"))
+    ancestry = select(*anchor_columns).where(
+        versions.c.campaign_id == campaign_id, versions.c.version_hash.in_(start_hashes)
+    ).cte(name, recursive=True)
+
+    step_columns = [edges.c.parent_hash]
+    if with_distance:
+        step_columns.append(ancestry.c.distance + 1)
+    return ancestry.union(
+        select(*step_columns).select_from(edges.join(ancestry, edges.c.version_hash == ancestry.c.version_hash))
+    )
+
+
+def ancestor_versions(db, campaign_id: str, version_hashes: Iterable[str]) -> List[Any]:
+    """The given versions and all their ancestors, oldest first."""
+    from src.models.database_models import ChapterVersion
+    ancestry = ancestry_cte(campaign_id, version_hashes)
+    return db.query(ChapterVersion).join(ancestry, ChapterVersion.version_hash == ancestry.c.version_hash).filter(
+        ChapterVersion.campaign_id == campaign_id
+    ).order_by(ChapterVersion.commit_timestamp, ChapterVersion.id).all()
+
+
+def branch_log(db, campaign_id: str, branch_name: str) -> List[Any]:
+    """Every version reachable from a branch head, oldest first."""
+    from src.models.database_models import CampaignBranch
+    head = select(CampaignBranch.head_commit).where(
+        CampaignBranch.campaign_id == campaign_id, CampaignBranch.name == branch_name
+    )
+    return ancestor_versions(db, campaign_id, head)
+
+
+def merge_base(db, campaign_id: str, hash_a: str, hash_b: str) -> Optional[str]:
+    """
+    Best common ancestor of two versions: the one with the fewest edges to
+    both (the newest on ties), or None when their histories never meet.
+    """
+    from src.models.database_models import ChapterVersion
+    from_a = ancestry_cte(campaign_id, [hash_a], with_distance=True, name="ancestry_a")
+    from_b = ancestry_cte(campaign_id, [hash_b], with_distance=True, name="ancestry_b")
+    versions = ChapterVersion.__table__
+    return db.execute(
+        select(from_a.c.version_hash)
+        .join(from_b, from_b.c.version_hash == from_a.c.version_hash)
+        .join(versions, versions.c.version_hash == from_a.c.version_hash)
+        .where(versions.c.campaign_id == campaign_id)
+        .group_by(from_a.c.version_hash, versions.c.commit_timestamp)
+        .order_by(func.min(from_a.c.distance) + func.min(from_b.c.distance), versions.c.commit_timestamp.desc())
+        .limit(1)
+    ).scalar()
+
+
+def ensure_chapter_graph(engine) -> int:
+    """
+    Create the graph indexes declared on existing tables (create_all() skips
+    them) and write parent edges for versions stored without any. Returns
+    the number of edges written.
+    """
+    from src.models.database_models import CampaignBranch, ChapterVersion, ChapterVersionParent
+
+    versions = ChapterVersion.__table__
+    edges = ChapterVersionParent.__table__
+    try:
+        inspector = inspect(engine)
+        for table in (versions, CampaignBranch.__table__):
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=engine)
+                    logger.info(f"Created index {index.name}")
+
+        written = 0
+        with engine.begin() as connection:
+            missing = connection.execute(
+                select(versions.c.version_hash, versions.c.parent_hashes, versions.c.merge_parent_hashes)
+                .where(~exists().where(edges.c.version_hash == versions.c.version_hash))
+            ).all()
+            rows = [row for version in missing for row in _parent_rows(version)]
+            if rows:
+                connection.execute(edges.insert(), rows)
+                written = len(rows)
+        if written:
+            logger.info(f"Wrote {written} chapter version parent edges")
+        return written
+    except Exception as e:
+        logger.warning(f"Could not prepare the chapter version graph: {e}")
+        return 0
@@ -60,6 +60,7 @@ from src.services.generators import (
 
 # LLM and database services
 from src.services.llm_service import LLMService
+from src.services.prompt_serializer import compact_context
 from src.core.config import Settings
 
 logger = logging.getLogger(__name__)
@@ -2049,23 +2050,26 @@ Highlight what changes were made and why."""
         return outlines
     
     def _build_campaign_context(self, existing_data: Dict[str, Any]) -> str:
-        """Build context string from existing campaign data for refinement."""
-        title = existing_data.get('title', 'Campaign')
-        description = existing_data.get('description', '')
-        plot_summary = existing_data.get('plot_summary', '')
-        
-        context = f"TITLE: {title}\n"
-        if description:
-            context += f"DESCRIPTION: {description}\n"
-        if plot_summary:
-            context += f"PLOT: {plot_summary}\n"
-        
-        # Add chapter information if available
+        """Build compact, token-budgeted context from existing campaign data for refinement."""
         chapters = existing_data.get('chapters', [])
-        if chapters:
-            context += f"CHAPTERS: {len(chapters)} chapters planned\n"
-        
-        return context
+        sections = {
+            "campaign": {
+                key: existing_data.get(key)
+                for key in ('title', 'description', 'plot_summary', 'themes', 'setting',
+                            'tone', 'main_antagonist', 'party_level', 'party_size')
+            },
+            "npcs": existing_data.get('key_npcs', []),
+            "locations": existing_data.get('major_locations', []),
+            "chapters": [
+                {key: chapter.get(key) for key in ('title', 'summary')} if isinstance(chapter, dict) else chapter
+                for chapter in chapters
+            ]
+        }
+        return compact_context(
+            sections,
+            flow="campaign_refinement",
+            budgets={"campaign": 600, "npcs": 300, "locations": 200, "chapters": 300}
+        )
     
     def _apply_refinements(self, existing_data: Dict[str, Any], 
                           refinements: Dict[str, Any], 
@@ -0,0 +1,566 @@
+"""
+Monte Carlo Encounter Simulator
+
+Estimates combat difficulty by running thousands of vectorised fights between a
+party and a group of creatures, instead of relying on CR-table heuristics.
+
+SIMULATION RULES (mirrors the character/creature models in /backend):
+- Damage is applied to temporary hit points first, then to hit points, and hit
+  points never drop below 0 (CharacterState.take_damage)
+- A combatant at 0 hit points is out of the fight (unconscious / dead)
+- Attack bonus defaults to proficiency bonus + the better of STR/DEX modifier,
+  with proficiency following CharacterStats (2 + (level - 1) // 4)
+- Creature stat blocks are read in the shape produced by
+  validate_and_enhance_creature (hit_points, armor_class, abilities,
+  proficiency_bonus, actions with "attack_bonus" and "damage")
+- A natural 20 always hits and doubles the damage dice; a natural 1 always misses
+- Limited resources (spell slots, per-day abilities) are spent first, one per
+  round, using their own damage expression
+
+Each trial is one fight. Every combatant attribute is a NumPy array over trials,
+so a round costs a handful of array operations per combatant regardless of the
+trial count. Large runs can optionally be split across a shared, bounded
+process pool; smaller ones always run in the calling thread.
+"""
+
+import logging
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.core_models import EncounterDifficulty
+
+logger = logging.getLogger(__name__)
+
+# Damage expressions look like "2d6+3", "1d8 - 1", "7 (2d6)" or "12"
+DICE_PATTERN = re.compile(r"(\d+)\s*d\s*(\d+)\s*(?:([+-])\s*(\d+))?", re.IGNORECASE)
+
+DEFAULT_TRIALS = 10000
+DEFAULT_MAX_ROUNDS = 20
+MAX_TRIALS = 200000
+# Runs below this many trials finish faster in-thread than a pool can start them
+PROCESS_POOL_MIN_TRIALS = 50000
+MAX_POOL_WORKERS = min(4, os.cpu_count() or 1)
+
+# ============================================================================
+# COMBATANT DEFINITIONS
+# ============================================================================
+
+@dataclass
+class DamageRoll:
+    """Parsed damage expression: dice_count d dice_size + bonus."""
+    dice_count: int = 1
+    dice_size: int = 6
+    bonus: int = 0
+
+    @property
+    def average(self) -> float:
+        return self.dice_count * (self.dice_size + 1) / 2 + self.bonus
+
+
+@dataclass
+class Combatant:
+    """Flattened combat profile for a single character or creature."""
+    name: str
+    hit_points: int
+    armor_class: int
+    attack_bonus: int
+    damage: DamageRoll = field(default_factory=DamageRoll)
+    attacks_per_round: int = 1
+    temporary_hit_points: int = 0
+    initiative_bonus: int = 0
+    resource_uses: int = 0
+    resource_attack_bonus: Optional[int] = None
+    resource_damage: Optional[DamageRoll] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def parse_damage(value: Any, default: Optional[DamageRoll] = None) -> DamageRoll:
+    """Parse a damage expression into a DamageRoll."""
+    default = default or DamageRoll()
+    if value is None:
+        return default
+    if isinstance(value, DamageRoll):
+        return value
+    if isinstance(value, dict):
+        return DamageRoll(
+            dice_count=int(value.get("dice_count", default.dice_count)),
+            dice_size=int(value.get("dice_size", default.dice_size)),
+            bonus=int(value.get("bonus", default.bonus))
+        )
+    if isinstance(value, (int, float)):
+        # Flat damage is modelled as 0 dice plus a fixed bonus
+        return DamageRoll(dice_count=0, dice_size=1, bonus=int(value))
+
+    match = DICE_PATTERN.search(str(value))
+    if match:
+        count, size, sign, bonus = match.groups()
+        bonus_value = int(bonus) if bonus else 0
+        if sign == "-":
+            bonus_value = -bonus_value
+        return DamageRoll(dice_count=int(count), dice_size=max(1, int(size)), bonus=bonus_value)
+
+    flat = re.search(r"\d+", str(value))
+    if flat:
+        return DamageRoll(dice_count=0, dice_size=1, bonus=int(flat.group()))
+
+    logger.warning(f"Could not parse damage expression '{value}', using default")
+    return default
+
+
+def _ability_modifier(score: Any) -> int:
+    try:
+        return (int(score) - 10) // 2
+    except (TypeError, ValueError):
+        return 0
+
+
+def _parse_bonus(value: Any, default: int) -> int:
+    if value is None:
+        return default
+    try:
+        return int(str(value).replace("+", "").strip())
+    except ValueError:
+        return default
+
+
+def _slot_count(value: Any) -> int:
+    """
+    Uses left in one spell-slot entry. Accepts a count, {"max": 4, "used": 1},
+    {"remaining": 3} or a list of any of these; anything else counts as none.
+    """
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, (int, float)):
+        return max(0, int(value))
+    if isinstance(value, str):
+        return int(value.strip()) if value.strip().isdigit() else 0
+    if isinstance(value, dict):
+        if "remaining" in value:
+            return _slot_count(value["remaining"])
+        total = next((value[key] for key in ("max", "total", "slots") if key in value), 0)
+        return max(0, _slot_count(total) - _slot_count(value.get("used", value.get("expended", 0))))
+    if isinstance(value, (list, tuple)):
+        return sum(_slot_count(entry) for entry in value)
+    return 0
+
+
+def _proficiency_for_level(level: int) -> int:
+    """Proficiency bonus by total level, as in CharacterStats.proficiency_bonus."""
+    return 2 + ((max(1, level) - 1) // 4)
+
+
+def _read_abilities(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Read ability scores from either a nested block or flat columns."""
+    for key in ("abilities", "ability_scores"):
+        if isinstance(data.get(key), dict):
+            return data[key]
+    return {
+        ability: data.get(ability, 10)
+        for ability in ("strength", "dexterity", "constitution",
+                        "intelligence", "wisdom", "charisma")
+    }
+
+
+def combatant_from_character(character_data: Dict[str, Any]) -> Combatant:
+    """
+    Build a combat profile from backend character data.
+
+    Accepts the Character.to_dict() shape from the backend as well as
+    CharacterSheet summaries (nested ability_scores, current_hit_points).
+    """
+    abilities = _read_abilities(character_data)
+    str_mod = _ability_modifier(abilities.get("strength", 10))
+    dex_mod = _ability_modifier(abilities.get("dexterity", 10))
+    best_mod = max(str_mod, dex_mod)
+
+    classes = character_data.get("character_classes") or character_data.get("classes") or {}
+    level = character_data.get("level") or (sum(classes.values()) if isinstance(classes, dict) else 1) or 1
+    proficiency = character_data.get("proficiency_bonus") or _proficiency_for_level(int(level))
+
+    hit_points = (character_data.get("current_hit_points")
+                  or character_data.get("hit_points")
+                  or character_data.get("max_hit_points")
+                  or 1)
+
+    damage = parse_damage(
+        character_data.get("damage"),
+        default=DamageRoll(dice_count=1, dice_size=8, bonus=best_mod)
+    )
+
+    # Extra Attack at level 5 for martial classes
+    attacks = character_data.get("attacks_per_round")
+    if attacks is None:
+        martial = {"fighter", "barbarian", "paladin", "ranger", "monk"}
+        class_names = {str(name).lower() for name in classes} if isinstance(classes, dict) else set()
+        attacks = 2 if int(level) >= 5 and class_names & martial else 1
+
+    # Spell slots act as limited high-damage resources
+    slots = character_data.get("spell_slots_remaining") or {}
+    if not slots and isinstance(character_data.get("spells"), dict):
+        slots = character_data["spells"].get("spell_slots", {}) or {}
+    if "resource_uses" in character_data:
+        resource_uses = _slot_count(character_data["resource_uses"])
+    else:
+        resource_uses = _slot_count(list(slots.values()) if isinstance(slots, dict) else slots)
+    resource_damage = None
+    if resource_uses:
+        spell_level = max(1, (int(level) + 1) // 2)
+        resource_damage = parse_damage(
+            character_data.get("resource_damage"),
+            default=DamageRoll(dice_count=min(9, spell_level + 1), dice_size=8, bonus=0)
+        )
+
+    return Combatant(
+        name=character_data.get("name", "Character"),
+        hit_points=int(hit_points),
+        armor_class=int(character_data.get("armor_class", 10)),
+        attack_bonus=_parse_bonus(character_data.get("attack_bonus"), proficiency + best_mod),
+        damage=damage,
+        attacks_per_round=int(attacks),
+        temporary_hit_points=int(character_data.get("temporary_hit_points", 0) or 0),
+        initiative_bonus=dex_mod,
+        resource_uses=resource_uses,
+        resource_attack_bonus=_parse_bonus(character_data.get("resource_attack_bonus"), proficiency + best_mod),
+        resource_damage=resource_damage
+    )
+
+
+def combatant_from_creature(creature_data: Dict[str, Any]) -> Combatant:
+    """
+    Build a combat profile from a creature stat block.
+
+    Reads the fields guaranteed by validate_and_enhance_creature and the first
+    action that carries an attack bonus. Multiattack is honoured through an
+    explicit "attacks_per_round" or by counting attack actions.
+    """
+    abilities = _read_abilities(creature_data)
+    str_mod = _ability_modifier(abilities.get("strength", 10))
+    dex_mod = _ability_modifier(abilities.get("dexterity", 10))
+    best_mod = max(str_mod, dex_mod)
+    proficiency = int(creature_data.get("proficiency_bonus", 2) or 2)
+
+    attack_actions = [
+        action for action in creature_data.get("actions", []) or []
+        if isinstance(action, dict) and ("attack_bonus" in action or "damage" in action)
+    ]
+    primary = attack_actions[0] if attack_actions else {}
+
+    attacks = creature_data.get("attacks_per_round")
+    if attacks is None:
+        attacks = max(1, len([a for a in attack_actions if "attack_bonus" in a]))
+
+    return Combatant(
+        name=creature_data.get("name", "Creature"),
+        hit_points=max(1, int(creature_data.get("hit_points", 1) or 1)),
+        armor_class=int(creature_data.get("armor_class", 10) or 10),
+        attack_bonus=_parse_bonus(primary.get("attack_bonus"), proficiency + best_mod),
+        damage=parse_damage(primary.get("damage"), default=DamageRoll(dice_count=1, dice_size=6, bonus=best_mod)),
+        attacks_per_round=int(attacks),
+        temporary_hit_points=int(creature_data.get("temporary_hit_points", 0) or 0),
+        initiative_bonus=dex_mod,
+        resource_uses=int(creature_data.get("resource_uses", 0) or 0),
+        resource_attack_bonus=_parse_bonus(creature_data.get("resource_attack_bonus"), proficiency + best_mod),
+        resource_damage=parse_damage(creature_data.get("resource_damage")) if creature_data.get("resource_damage") else None
+    )
+
+
+def build_combatant(data: Dict[str, Any], is_creature: bool) -> Combatant:
+    """Build a combatant from either an explicit profile or a character/creature record."""
+    if isinstance(data, Combatant):
+        return data
+    return combatant_from_creature(data) if is_creature else combatant_from_character(data)
+
+# ============================================================================
+# VECTORISED SIDE STATE
+# ============================================================================
+
+class _Side:
+    """Per-trial state for one side of the fight (arrays shaped trials x combatants)."""
+
+    def __init__(self, combatants: List[Combatant], trials: int):
+        self.combatants = combatants
+        self.hp = np.tile(np.array([c.hit_points for c in combatants], dtype=np.int32), (trials, 1))
+        self.temp_hp = np.tile(np.array([c.temporary_hit_points for c in combatants], dtype=np.int32), (trials, 1))
+        self.ac = np.array([c.armor_class for c in combatants], dtype=np.int32)
+        self.resources = np.tile(np.array([c.resource_uses for c in combatants], dtype=np.int32), (trials, 1))
+        self.start_hp = self.hp.sum(axis=1)
+        self.start_resources = self.resources.sum(axis=1)
+
+    @property
+    def alive(self) -> np.ndarray:
+        return self.hp > 0
+
+    def any_alive(self) -> np.ndarray:
+        return self.alive.any(axis=1)
+
+    def take_damage(self, target: np.ndarray, damage: np.ndarray, mask: np.ndarray) -> None:
+        """Apply damage to the chosen target per trial; temporary HP absorbs first."""
+        rows = np.nonzero(mask)[0]
+        if rows.size == 0:
+            return
+        cols = target[rows]
+        dmg = damage[rows]
+        temp = self.temp_hp[rows, cols]
+        absorbed = np.minimum(dmg, temp)
+        self.temp_hp[rows, cols] = temp - absorbed
+        self.hp[rows, cols] = np.maximum(0, self.hp[rows, cols] - (dmg - absorbed))
+
+
+def _roll_damage(rng: np.random.Generator, roll: DamageRoll, crit: np.ndarray) -> np.ndarray:
+    """Roll a damage expression for every trial, doubling dice on critical hits."""
+    trials = crit.shape[0]
+    if roll.dice_count <= 0:
+        return np.full(trials, max(0, roll.bonus), dtype=np.int32)
+    dice = rng.integers(1, roll.dice_size + 1, size=(trials, roll.dice_count * 2), dtype=np.int32)
+    base = dice[:, :roll.dice_count].sum(axis=1)
+    extra = dice[:, roll.dice_count:].sum(axis=1)
+    return np.maximum(0, base + np.where(crit, extra, 0) + roll.bonus).astype(np.int32)
+
+
+def _choose_targets(defenders: _Side, focus_fire: bool, rng: np.random.Generator) -> np.ndarray:
+    """Pick a living target per trial: the first living one, or a random living one."""
+    alive = defenders.alive
+    if focus_fire:
+        return np.argmax(alive, axis=1)
+    weights = rng.random(alive.shape) * alive
+    return np.argmax(weights, axis=1)
+
+
+def _side_attacks(rng: np.random.Generator, attackers: _Side, defenders: _Side,
+                  acting: np.ndarray, focus_fire: bool) -> None:
+    """Every living attacker makes its attacks against the defending side."""
+    for index, combatant in enumerate(attackers.combatants):
+        can_act = acting & (attackers.hp[:, index] > 0)
+        if not can_act.any():
+            continue
+
+        # Spend one limited resource per round while any remain
+        use_resource = np.zeros_like(can_act)
+        if combatant.resource_damage is not None:
+            use_resource = can_act & (attackers.resources[:, index] > 0)
+            attackers.resources[:, index] -= use_resource.astype(np.int32)
+
+        for attack_number in range(combatant.attacks_per_round):
+            active = can_act & defenders.any_alive()
+            if not active.any():
+                break
+            resource_attack = use_resource & (attack_number == 0)
+
+            targets = _choose_targets(defenders, focus_fire, rng)
+            natural = rng.integers(1, 21, size=active.shape[0], dtype=np.int32)
+            bonus = np.where(resource_attack,
+                             combatant.resource_attack_bonus if combatant.resource_attack_bonus is not None else combatant.attack_bonus,
+                             combatant.attack_bonus)
+            crit = natural == 20
+            hit = active & (natural != 1) & (crit | (natural + bonus >= defenders.ac[targets]))
+
+            damage = _roll_damage(rng, combatant.damage, crit)
+            if combatant.resource_damage is not None and resource_attack.any():
+                damage = np.where(resource_attack, _roll_damage(rng, combatant.resource_damage, crit), damage)
+
+            defenders.take_damage(targets, damage, hit)
+
+# ============================================================================
+# SIMULATION
+# ============================================================================
+
+def _run_batch(party: List[Combatant], enemies: List[Combatant], trials: int,
+               max_rounds: int, seed: Optional[int], focus_fire: bool) -> Dict[str, np.ndarray]:
+    """Run one batch of fights and return the raw per-trial outcomes."""
+    rng = np.random.default_rng(seed)
+    party_side = _Side(party, trials)
+    enemy_side = _Side(enemies, trials)
+
+    # Side initiative: the side whose best roll is higher acts first each round
+    party_init = (rng.integers(1, 21, size=(trials, len(party))) + [c.initiative_bonus for c in party]).max(axis=1)
+    enemy_init = (rng.integers(1, 21, size=(trials, len(enemies))) + [c.initiative_bonus for c in enemies]).max(axis=1)
+    party_first = party_init >= enemy_init
+
+    rounds = np.full(trials, max_rounds, dtype=np.int32)
+    ongoing = np.ones(trials, dtype=bool)
+
+    for round_number in range(1, max_rounds + 1):
+        _side_attacks(rng, party_side, enemy_side, ongoing & party_first, focus_fire)
+        _side_attacks(rng, enemy_side, party_side, ongoing & ~party_first & enemy_side.any_alive(), focus_fire)
+        # Second half of the round for whichever side has not acted yet
+        _side_attacks(rng, enemy_side, party_side, ongoing & party_first & enemy_side.any_alive(), focus_fire)
+        _side_attacks(rng, party_side, enemy_side, ongoing & ~party_first & party_side.any_alive(), focus_fire)
+
+        finished = ongoing & ~(party_side.any_alive() & enemy_side.any_alive())
+        rounds[finished] = round_number
+        ongoing &= ~finished
+        if not ongoing.any():
+            break
+
+    party_alive = party_side.any_alive()
+    enemy_alive = enemy_side.any_alive()
+    return {
+        "party_won": party_alive & ~enemy_alive,
+        "party_lost": ~party_alive,
+        "rounds": rounds,
+        "party_hp_lost": party_side.start_hp - party_side.hp.sum(axis=1),
+        "party_start_hp": party_side.start_hp,
+        "party_resources_spent": party_side.start_resources - party_side.resources.sum(axis=1),
+        "party_start_resources": party_side.start_resources,
+        "party_down": (~party_side.alive).sum(axis=1),
+    }
+
+
+def _run_batch_worker(args: Tuple) -> Dict[str, np.ndarray]:
+    return _run_batch(*args)
+
+
+def _distribution(values: np.ndarray) -> Dict[str, float]:
+    if values.size == 0:
+        return {"mean": 0.0, "p10": 0.0, "p50": 0.0, "p90": 0.0, "min": 0.0, "max": 0.0}
+    p10, p50, p90 = np.percentile(values, [10, 50, 90])
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p10": round(float(p10), 3),
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "min": round(float(values.min()), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def _estimate_difficulty(win_rate: float, hp_drain: float, party_down: float, party_size: int) -> EncounterDifficulty:
+    """Map simulated outcomes onto the encounter difficulty scale."""
+    down_ratio = party_down / max(1, party_size)
+    if win_rate < 0.5:
+        return EncounterDifficulty.LEGENDARY if win_rate < 0.1 else EncounterDifficulty.DEADLY
+    if win_rate < 0.9 or down_ratio >= 0.25 or hp_drain >= 0.6:
+        return EncounterDifficulty.HARD
+    if hp_drain >= 0.3:
+        return EncounterDifficulty.MEDIUM
+    if hp_drain >= 0.1:
+        return EncounterDifficulty.EASY
+    return EncounterDifficulty.TRIVIAL
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """The shared simulation pool, started on first use with at most MAX_POOL_WORKERS workers."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=MAX_POOL_WORKERS)
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the shared simulation pool; the next large run starts a new one."""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def simulate_encounter(party: List[Dict[str, Any]],
+                       enemies: List[Dict[str, Any]],
+                       trials: int = DEFAULT_TRIALS,
+                       max_rounds: int = DEFAULT_MAX_ROUNDS,
+                       seed: Optional[int] = None,
+                       processes: int = 1,
+                       focus_fire: bool = True) -> Dict[str, Any]:
+    """
+    Simulate a party against a group of creatures.
+
+    Args:
+        party: Character records (backend character data) or explicit combat profiles
+        enemies: Creature stat blocks (as produced by validate_and_enhance_creature)
+        trials: Number of independent fights to run
+        max_rounds: Fights still running after this many rounds count as neither win nor loss
+        seed: Random seed for reproducible results
+        processes: Split trials across the shared process pool when greater than 1
+            (capped at MAX_POOL_WORKERS; runs under PROCESS_POOL_MIN_TRIALS stay in-thread)
+        focus_fire: Attack the first living target instead of a random one
+
+    Returns:
+        Win rate, rounds-to-kill and resource-drain distributions plus an
+        estimated difficulty label
+    """
+    if not party or not enemies:
+        raise ValueError("Both party and enemies must contain at least one combatant")
+    trials = max(1, min(int(trials), MAX_TRIALS))
+    max_rounds = max(1, int(max_rounds))
+
+    start_time = time.perf_counter()
+    party_combatants = [build_combatant(c, is_creature=False) for c in party]
+    enemy_combatants = [build_combatant(c, is_creature=True) for c in enemies]
+
+    processes = max(1, min(int(processes or 1), MAX_POOL_WORKERS))
+    if trials < max(PROCESS_POOL_MIN_TRIALS, processes * 1000):
+        processes = 1
+    if processes > 1:
+        chunk = math.ceil(trials / processes)
+        seeds = np.random.SeedSequence(seed).spawn(processes)
+        jobs = [
+            (party_combatants, enemy_combatants, min(chunk, trials - i * chunk),
+             max_rounds, seeds[i], focus_fire)
+            for i in range(processes) if trials - i * chunk > 0
+        ]
+        try:
+            batches = list(_get_process_pool().map(_run_batch_worker, jobs))
+        except Exception as e:
+            logger.warning(f"Process pool simulation failed, running in-process: {e}")
+            # A broken pool stays broken; let the next run start a fresh one
+            shutdown_process_pool()
+            batches = [_run_batch(party_combatants, enemy_combatants, trials, max_rounds, seed, focus_fire)]
+        raw = {key: np.concatenate([b[key] for b in batches]) for key in batches[0]}
+    else:
+        raw = _run_batch(party_combatants, enemy_combatants, trials, max_rounds, seed, focus_fire)
+
+    won = raw["party_won"]
+    lost = raw["party_lost"]
+    hp_drain = raw["party_hp_lost"] / np.maximum(1, raw["party_start_hp"])
+    resource_drain = np.where(raw["party_start_resources"] > 0,
+                              raw["party_resources_spent"] / np.maximum(1, raw["party_start_resources"]),
+                              0.0)
+
+    win_rate = float(won.mean())
+    rounds_histogram = np.bincount(raw["rounds"], minlength=max_rounds + 1)
+
+    result = {
+        "trials": int(won.size),
+        "party_size": len(party_combatants),
+        "enemy_count": len(enemy_combatants),
+        "win_rate": round(win_rate, 4),
+        "loss_rate": round(float(lost.mean()), 4),
+        "timeout_rate": round(float((~won & ~lost).mean()), 4),
+        "rounds": _distribution(raw["rounds"]),
+        "rounds_to_kill": _distribution(raw["rounds"][won]),
+        "rounds_histogram": {str(r): int(n) for r, n in enumerate(rounds_histogram) if n},
+        "resource_drain": {
+            "hit_points": _distribution(hp_drain),
+            "resources": _distribution(resource_drain),
+            "party_members_down": _distribution(raw["party_down"]),
+        },
+        "combatants": {
+            "party": [c.to_dict() for c in party_combatants],
+            "enemies": [c.to_dict() for c in enemy_combatants],
+        },
+        "processes": processes,
+    }
+    result["estimated_difficulty"] = _estimate_difficulty(
+        win_rate,
+        result["resource_drain"]["hit_points"]["mean"],
+        result["resource_drain"]["party_members_down"]["mean"],
+        len(party_combatants)
+    ).value
+    result["elapsed_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+    return result
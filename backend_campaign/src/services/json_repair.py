@@ -0,0 +1,276 @@
+"""
+Tolerant JSON parsing for LLM responses.
+
+LLMs frequently return JSON that is almost valid: a trailing comma, a comment,
+single-quoted strings, a raw newline inside a string, or a response that was cut
+off mid-array when max_tokens ran out. Re-sending the whole prompt for these
+costs a full multi-second generation, so this module repairs what it can locally
+and salvages the longest valid prefix when the tail is unrecoverable.
+
+REPAIRS (single pass, string-aware):
+- Markdown code fences and text around the JSON are stripped
+- // line comments and /* block */ comments are removed
+- Single-quoted strings become double-quoted strings
+- Raw newlines, carriage returns and tabs inside strings are escaped
+- Trailing commas before } and ] are dropped
+- Python literals True / False / None become true / false / null
+- Truncated output is closed: open strings, arrays and objects are terminated,
+  falling back to the last complete member when the tail is a partial value
+
+Usage:
+    data, repairs = repair_json(response)        # raises ValueError if unsalvageable
+    stats = json_repair_stats.get_stats()        # retry-avoidance tracking
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on prefix candidates tried when salvaging a truncated response
+MAX_SALVAGE_ATTEMPTS = 64
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class JSONRepairStats:
+    """Thread-safe counters for how LLM JSON responses were recovered."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = {
+            "clean": 0,              # parsed without any repair
+            "repaired_locally": 0,   # fixed by the tolerant parser
+            "repaired_by_llm": 0,    # fixed by a targeted "fix this JSON" follow-up
+            "failed": 0,             # needed a full regeneration
+        }
+        self.repair_types: Dict[str, int] = {}
+
+    def record(self, outcome: str, repairs: List[str] = None) -> None:
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+            for repair in repairs or []:
+                self.repair_types[repair] = self.repair_types.get(repair, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+            repair_types = dict(self.repair_types)
+        malformed = counts["repaired_locally"] + counts["repaired_by_llm"] + counts["failed"]
+        avoided = counts["repaired_locally"] + counts["repaired_by_llm"]
+        return {
+            **counts,
+            "total": sum(counts.values()),
+            "malformed": malformed,
+            "retries_avoided": avoided,
+            "retry_avoidance_rate": round(avoided / malformed, 4) if malformed else 0.0,
+            "repair_types": repair_types,
+        }
+
+
+json_repair_stats = JSONRepairStats()
+
+
+def _strip_wrapping(text: str, container: Optional[str] = None) -> str:
+    """Remove markdown fences and any prose before the first JSON container."""
+    text = text.replace("```json", "").replace("```JSON", "").replace("```", "").strip()
+    openers = container or "{["
+    starts = [i for i in (text.find(c) for c in openers) if i != -1]
+    if not starts:
+        raise ValueError("No JSON found in response")
+    return text[min(starts):]
+
+
+def _normalize(text: str, repairs: List[str]) -> Tuple[str, List[str], List[Tuple[int, List[str]]], bool]:
+    """
+    Rewrite text into strict JSON syntax in a single pass.
+
+    Returns the rewritten text, the bracket stack at end of input, the safe cut
+    points (output length + bracket stack after each complete container member),
+    and whether input ended inside a string.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cut_points: List[Tuple[int, List[str]]] = []
+    i = 0
+    length = len(text)
+    in_string = False
+    quote = '"'
+
+    def note(repair: str) -> None:
+        if repair not in repairs:
+            repairs.append(repair)
+
+    while i < length:
+        ch = text[i]
+
+        if in_string:
+            if ch == "\\" and i + 1 < length:
+                nxt = text[i + 1]
+                if quote == "'" and nxt == "'":
+                    out.append("'")
+                else:
+                    out.append(ch + nxt)
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                in_string = False
+            elif ch == '"':
+                # Double quote inside a single-quoted string
+                out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+                note("unescaped_newline")
+            elif ch == "\r":
+                out.append("\\r")
+                note("unescaped_newline")
+            elif ch == "\t":
+                out.append("\\t")
+                note("unescaped_newline")
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch == '"' or ch == "'":
+            in_string = True
+            quote = ch
+            if ch == "'":
+                note("single_quotes")
+            out.append('"')
+            i += 1
+            continue
+
+        # Comments outside strings
+        if ch == "/" and i + 1 < length and text[i + 1] in "/*":
+            note("comments")
+            if text[i + 1] == "/":
+                end = text.find("\n", i)
+                i = length if end == -1 else end
+            else:
+                end = text.find("*/", i + 2)
+                i = length if end == -1 else end + 2
+            continue
+
+        if ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+            i += 1
+            continue
+
+        if ch in "}]":
+            # Drop trailing comma before a closing bracket
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+                note("trailing_commas")
+            if stack and _CLOSERS[stack[-1]] == ch:
+                stack.pop()
+                out.append(ch)
+                if not stack:
+                    # Anything after the top-level value is discarded
+                    return "".join(out), stack, cut_points, False
+                cut_points.append((len(out), list(stack)))
+            else:
+                note("mismatched_brackets")
+            i += 1
+            continue
+
+        if ch == ",":
+            cut_points.append((len(out), list(stack)))
+            out.append(ch)
+            i += 1
+            continue
+
+        if ch.isalpha():
+            j = i
+            while j < length and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            if word in _LITERALS:
+                out.append(_LITERALS[word])
+                note("python_literals")
+            else:
+                out.append(word)
+            i = j
+            continue
+
+        out.append(ch)
+        i += 1
+
+    return "".join(out), stack, cut_points, in_string
+
+
+def _close(prefix: str, stack: List[str]) -> str:
+    """Close any open containers, dropping a dangling comma or colon first."""
+    trimmed = prefix.rstrip()
+    while trimmed and trimmed[-1] in ",:":
+        trimmed = trimmed[:-1].rstrip()
+    return trimmed + "".join(_CLOSERS[c] for c in reversed(stack))
+
+
+def repair_json(response: str, container: Optional[str] = None) -> Tuple[Any, List[str]]:
+    """
+    Parse an LLM response as JSON, repairing common malformations.
+
+    Args:
+        response: Raw LLM output
+        container: "{" or "[" to only accept that top-level type; by default
+            whichever container appears first is used
+
+    Returns:
+        (parsed_data, repairs) where repairs lists what had to be fixed; an empty
+        list means the JSON parsed cleanly after stripping surrounding text.
+
+    Raises:
+        ValueError: if nothing valid could be salvaged
+    """
+    if not response or not response.strip():
+        raise ValueError("Empty response")
+
+    text = _strip_wrapping(response, container)
+    try:
+        return json.loads(text), []
+    except json.JSONDecodeError:
+        pass
+
+    repairs: List[str] = []
+    normalized, stack, cut_points, in_string = _normalize(text, repairs)
+
+    candidate = normalized + ('"' if in_string else "")
+    if stack or in_string:
+        candidate = _close(candidate, stack)
+        repairs.append("truncated")
+    try:
+        return json.loads(candidate), repairs
+    except json.JSONDecodeError:
+        pass
+
+    # Salvage the longest prefix that ends on a complete member
+    for cut, cut_stack in reversed(cut_points[-MAX_SALVAGE_ATTEMPTS:]):
+        try:
+            data = json.loads(_close(normalized[:cut], cut_stack))
+            repairs.append("salvaged_prefix")
+            return data, repairs
+        except json.JSONDecodeError:
+            continue
+
+    raise ValueError("Could not repair JSON response")
+
+
+def build_fix_json_prompt(broken_json: str) -> str:
+    """Prompt for a cheap follow-up asking the model to fix its own JSON."""
+    return (
+        "The following JSON is malformed. Fix the syntax only - do not add, remove "
+        "or rewrite any content. Return ONLY the corrected JSON.\n\n"
+        f"{broken_json}"
+    )
@@ -0,0 +1,307 @@
+"""
+JSON schemas for schema-constrained LLM generation.
+
+Each provider turns these into its native structured-output mode (OpenAI
+response_format, Ollama format, Anthropic forced tool use). The schemas mirror
+the JSON shapes the creation prompts already ask for, and are deliberately
+permissive beyond the required fields so the prompts stay the source of truth
+for detail.
+
+Usage:
+    schema = get_content_schema("monster")
+    data = await generate_structured(llm_service, prompt, "monster")
+    stats = structured_output_stats.get_stats()   # per-content-type parse failures
+"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.services.json_repair import repair_json
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# SCHEMA BUILDING BLOCKS
+# ============================================================================
+
+_STRING = {"type": "string"}
+_INTEGER = {"type": "integer"}
+_NUMBER = {"type": "number"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+
+ABILITY_SCORES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        ability: {"type": "integer", "minimum": 1, "maximum": 30}
+        for ability in ("strength", "dexterity", "constitution",
+                        "intelligence", "wisdom", "charisma")
+    },
+    "required": ["strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma"]
+}
+
+_NAMED_ENTRY = {
+    "type": "object",
+    "properties": {"name": _STRING, "description": _STRING},
+    "required": ["name"]
+}
+
+# ============================================================================
+# CONTENT SCHEMAS
+# ============================================================================
+
+CHARACTER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": _STRING,
+        "species": _STRING,
+        "level": {"type": "integer", "minimum": 1, "maximum": 20},
+        "classes": {"type": "object", "additionalProperties": _INTEGER},
+        "background": _STRING,
+        "alignment": {"type": "array", "items": _STRING},
+        "ability_scores": ABILITY_SCORES_SCHEMA,
+        "skill_proficiencies": {"type": "object"},
+        "personality_traits": _STRING_LIST,
+        "ideals": _STRING_LIST,
+        "bonds": _STRING_LIST,
+        "flaws": _STRING_LIST,
+        "armor": _STRING,
+        "weapons": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"name": _STRING, "damage": _STRING, "properties": _STRING_LIST},
+                "required": ["name"]
+            }
+        },
+        "equipment": {"type": "object"},
+        "spells_known": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"name": _STRING, "level": _INTEGER, "school": _STRING, "description": _STRING},
+                "required": ["name"]
+            }
+        },
+        "backstory": _STRING
+    },
+    "required": ["name", "species", "level", "classes", "ability_scores"]
+}
+
+NPC_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": _STRING,
+        "species": _STRING,
+        "role": _STRING,
+        "alignment": _STRING,
+        "challenge_rating": _NUMBER,
+        "level": _INTEGER,
+        "abilities": ABILITY_SCORES_SCHEMA,
+        "hit_points": _INTEGER,
+        "armor_class": _INTEGER,
+        "speed": _INTEGER,
+        "skills": _STRING_LIST,
+        "languages": _STRING_LIST,
+        "equipment": {
+            "type": "object",
+            "properties": {"weapons": _STRING_LIST, "armor": _STRING_LIST, "items": _STRING_LIST}
+        },
+        "spells": _STRING_LIST,
+        "personality": {
+            "type": "object",
+            "properties": {"trait": _STRING, "ideal": _STRING, "bond": _STRING, "flaw": _STRING}
+        },
+        "background": _STRING,
+        "description": _STRING,
+        "profession": _STRING,
+        "location": _STRING
+    },
+    "required": ["name", "species", "role", "abilities", "hit_points", "armor_class"]
+}
+
+MONSTER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": _STRING,
+        "type": _STRING,
+        "size": _STRING,
+        "alignment": _STRING,
+        "challenge_rating": _NUMBER,
+        "abilities": ABILITY_SCORES_SCHEMA,
+        "hit_points": _INTEGER,
+        "armor_class": _INTEGER,
+        "speed": _INTEGER,
+        "skills": _STRING_LIST,
+        "damage_resistances": _STRING_LIST,
+        "damage_immunities": _STRING_LIST,
+        "condition_immunities": _STRING_LIST,
+        "senses": _STRING_LIST,
+        "languages": _STRING_LIST,
+        "special_abilities": {"type": "array", "items": _NAMED_ENTRY},
+        "actions": {"type": "array", "items": _NAMED_ENTRY},
+        "description": _STRING
+    },
+    "required": ["name", "type", "challenge_rating", "abilities", "hit_points", "armor_class"]
+}
+
+ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": _STRING,
+        "item_type": _STRING,
+        "item_subtype": _STRING,
+        "rarity": _STRING,
+        "description": _STRING,
+        "properties": _STRING_LIST,
+        "damage": _STRING,
+        "armor_class": _INTEGER,
+        "requires_attunement": {"type": "boolean"},
+        "value_gp": _NUMBER,
+        "weight_lbs": _NUMBER
+    },
+    "required": ["name", "item_type", "description"]
+}
+
+CHAPTER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": _STRING,
+        "summary": _STRING,
+        "content": _STRING,
+        "scenes": {"type": "array", "items": _NAMED_ENTRY},
+        "npcs": {"type": "array", "items": _NAMED_ENTRY},
+        "encounters": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": _STRING,
+                    "type": _STRING,
+                    "difficulty": _STRING,
+                    "description": _STRING,
+                    "creatures": {"type": "array", "items": {"type": "object"}}
+                },
+                "required": ["name", "type"]
+            }
+        },
+        "locations": {"type": "array", "items": _NAMED_ENTRY},
+        "items": {"type": "array", "items": _NAMED_ENTRY},
+        "hooks": _STRING_LIST
+    },
+    "required": ["title", "summary", "content"]
+}
+
+CONTENT_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "character": CHARACTER_SCHEMA,
+    "npc": NPC_SCHEMA,
+    "monster": MONSTER_SCHEMA,
+    "item": ITEM_SCHEMA,
+    "chapter": CHAPTER_SCHEMA,
+}
+
+
+def get_content_schema(content_type: str) -> Optional[Dict[str, Any]]:
+    """Return the JSON schema for a content type, or None if it has no fixed shape."""
+    return CONTENT_SCHEMAS.get((content_type or "").lower())
+
+
+def check_required_fields(data: Any, schema: Optional[Dict[str, Any]]) -> List[str]:
+    """Return the top-level required fields missing from data (post-validation)."""
+    if not schema:
+        return []
+    if not isinstance(data, dict):
+        return list(schema.get("required", []))
+    return [field for field in schema.get("required", []) if field not in data]
+
+
+# Parameter names that only appear in a provider's error when it refused the
+# structured-output part of the request
+SCHEMA_REJECTION_MARKERS = (
+    "response_format",                        # OpenAI-compatible: json_schema / json_object unsupported or invalid
+    "json_schema",
+    "input_schema",                           # Anthropic: tool input schema invalid
+    "tool_choice",                            # Anthropic: forced tool use unsupported
+    "struct field generaterequest.format",    # Ollama versions that only accept format: "json"
+)
+
+
+def is_schema_rejection(error: Exception) -> bool:
+    """Whether a provider error is a refusal of the structured-output request itself."""
+    message = str(error).lower()
+    return any(marker in message for marker in SCHEMA_REJECTION_MARKERS)
+
+
+# ============================================================================
+# PARSE-FAILURE TRACKING
+# ============================================================================
+
+class StructuredOutputStats:
+    """Thread-safe per-content-type counters for structured generation outcomes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_content_type: Dict[str, Dict[str, int]] = {}
+
+    def record(self, content_type: str, outcome: str) -> None:
+        """Record an outcome: "valid", "repaired", "missing_fields", "parse_error" or "schema_rejected"."""
+        with self._lock:
+            counts = self.by_content_type.setdefault(content_type, {
+                "requests": 0, "valid": 0, "repaired": 0, "missing_fields": 0,
+                "parse_error": 0, "schema_rejected": 0
+            })
+            if outcome != "schema_rejected":
+                counts["requests"] += 1
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {k: dict(v) for k, v in self.by_content_type.items()}
+        for counts in snapshot.values():
+            requests = counts["requests"]
+            counts["parse_failure_rate"] = round(counts["parse_error"] / requests, 4) if requests else 0.0
+            counts["invalid_rate"] = round(
+                (counts["parse_error"] + counts["missing_fields"]) / requests, 4
+            ) if requests else 0.0
+        return snapshot
+
+
+structured_output_stats = StructuredOutputStats()
+
+
+async def generate_structured(llm_service, prompt: str, content_type: str,
+                              schema: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+    """
+    Generate a JSON object using the provider's native structured-output mode.
+
+    Falls back to unconstrained generation if the provider rejects the schema,
+    then parses with the tolerant JSON parser and checks required fields.
+    Missing required fields are logged and counted but the data is returned so
+    downstream validators can fill defaults.
+
+    Raises:
+        ValueError: if the response could not be parsed as a JSON object
+    """
+    schema = schema or get_content_schema(content_type)
+    try:
+        response = await llm_service.generate_content(prompt, json_schema=schema, **kwargs)
+    except Exception as e:
+        if not schema or not is_schema_rejection(e):
+            raise
+        logger.warning(f"Structured output request for {content_type} failed ({e}), retrying unconstrained")
+        structured_output_stats.record(content_type, "schema_rejected")
+        response = await llm_service.generate_content(prompt, **kwargs)
+
+    try:
+        data, repairs = repair_json(response, "{")
+    except ValueError:
+        structured_output_stats.record(content_type, "parse_error")
+        raise
+
+    missing = check_required_fields(data, schema)
+    if missing:
+        logger.warning(f"Structured {content_type} output missing required fields: {missing}")
+        structured_output_stats.record(content_type, "missing_fields")
+    else:
+        structured_output_stats.record(content_type, "repaired" if repairs else "valid")
+    return data
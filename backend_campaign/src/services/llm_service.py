@@ -12,11 +12,21 @@ import json
 import logging
 import os
 import asyncio
+import hashlib
+import math
+import random
+import re
+import threading
 import time
-from typing import Dict, Any, Optional
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from collections import deque
+from collections import OrderedDict, deque
+
+from src.services.prompt_serializer import count_tokens
 
 # Note: These imports will need to be installed
 # pip install httpx openai anthropic python-dotenv
@@ -46,6 +56,15 @@ class RateLimitConfig:
     max_delay: float = 60.0           # Maximum delay between retries
 
 
+@dataclass
+class TokenReservation:
+    """Tokens held against the TPM window for one request until it is reconciled."""
+    timestamp: float
+    tokens: int          # currently charged to the window
+    reserved: int        # originally reserved
+    reconciled: bool = False
+
+
 class RateLimiter:
     """
     Rate limiter implementing OpenAI cookbook recommendations.
@@ -65,6 +84,10 @@ class RateLimiter:
         self.tpm_tokens = deque()
         self.current_tokens = 0
         
+        # Reconciliation totals (reserved minus actual usage)
+        self.tokens_refunded = 0
+        self.tokens_overrun = 0
+        
         # Lock for thread safety
         self._lock = asyncio.Lock()
     
@@ -78,6 +101,16 @@ class RateLimiter:
         Returns:
             True if request can proceed, False if rate limited
         """
+        return await self.reserve(estimated_tokens) is not None
+    
+    async def reserve(self, estimated_tokens: int = 1000) -> Optional[TokenReservation]:
+        """
+        Acquire permission to make a request, returning the token reservation
+        so it can be reconciled against actual usage afterwards.
+        
+        Returns:
+            The reservation, or None if rate limited
+        """
         async with self._lock:
             now = time.time()
             
@@ -86,15 +119,41 @@ class RateLimiter:
             
             # Check if we can make the request
             if not self._can_make_request(now, estimated_tokens):
-                return False
+                return None
             
             # Record the request
+            reservation = TokenReservation(now, estimated_tokens, estimated_tokens)
             self.rpm_requests.append(now)
             self.rpd_requests.append(now)
-            self.tpm_tokens.append((now, estimated_tokens))
+            self.tpm_tokens.append(reservation)
             self.current_tokens += estimated_tokens
             
-            return True
+            return reservation
+    
+    async def reconcile(self, reservation: TokenReservation, actual_tokens: int) -> int:
+        """
+        Replace a reservation's estimate with actual usage, refunding unused
+        capacity to the TPM window (or charging an overrun).
+        
+        Returns:
+            Tokens refunded (negative for an overrun)
+        """
+        async with self._lock:
+            if reservation.reconciled:
+                return 0
+            reservation.reconciled = True
+            delta = reservation.tokens - max(0, actual_tokens)
+            
+            # Entries already outside the window no longer count against it
+            if reservation.timestamp >= time.time() - 60:
+                reservation.tokens -= delta
+                self.current_tokens -= delta
+            
+            if delta > 0:
+                self.tokens_refunded += delta
+            else:
+                self.tokens_overrun -= delta
+            return delta
     
     def _cleanup_old_entries(self, now: float):
         """Remove old entries outside the rate limit windows."""
@@ -109,9 +168,8 @@ class RateLimiter:
             self.rpd_requests.popleft()
         
         # Clean token entries older than 1 minute
-        while self.tpm_tokens and self.tpm_tokens[0][0] < minute_ago:
-            _, tokens = self.tpm_tokens.popleft()
-            self.current_tokens -= tokens
+        while self.tpm_tokens and self.tpm_tokens[0].timestamp < minute_ago:
+            self.current_tokens -= self.tpm_tokens.popleft().tokens
     
     def _can_make_request(self, now: float, estimated_tokens: int) -> bool:
         """Check if request can be made within rate limits."""
@@ -154,23 +212,125 @@ class RateLimiter:
             "rpm_limit": self.config.requests_per_minute,
             "rpd_limit": self.config.requests_per_day,
             "tpm_limit": self.config.tokens_per_minute,
+            "tokens_refunded": self.tokens_refunded,
+            "tokens_overrun": self.tokens_overrun,
             "wait_time": self.get_wait_time()
         }
 
 
+# ============================================================================
+# TOKEN ACCOUNTING
+# ============================================================================
+
+class TokenUsageStats:
+    """
+    Per-provider estimated vs actual token usage.
+    
+    Also supplies the completion reservation: until enough responses have been
+    seen the full max_tokens is reserved, afterwards a margin over the recent
+    average completion length (capped at max_tokens). Any shortfall is charged
+    when the request is reconciled, so the TPM window stays accurate either way.
+    """
+    
+    MIN_SAMPLES = 5
+    COMPLETION_MARGIN = 1.5
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.providers: Dict[str, Dict[str, Any]] = {}
+    
+    def _provider(self, provider: str) -> Dict[str, Any]:
+        return self.providers.setdefault(provider, {
+            "requests": 0,
+            "estimated_prompt_tokens": 0,
+            "reserved_tokens": 0,
+            "actual_prompt_tokens": 0,
+            "actual_completion_tokens": 0,
+            "recent_completions": deque(maxlen=100)
+        })
+    
+    def estimate(self, provider: str, prompt: str, max_tokens: int) -> tuple:
+        """Return (prompt_tokens, tokens_to_reserve) for a request."""
+        prompt_tokens = count_tokens(prompt)
+        with self._lock:
+            recent = list(self._provider(provider)["recent_completions"])
+        completion_tokens = max_tokens
+        if len(recent) >= self.MIN_SAMPLES:
+            expected = math.ceil(sum(recent) / len(recent) * self.COMPLETION_MARGIN)
+            completion_tokens = min(max_tokens, expected)
+        return prompt_tokens, prompt_tokens + completion_tokens
+    
+    def record(self, provider: str, estimated_prompt: int, reserved: int,
+               prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            stats = self._provider(provider)
+            stats["requests"] += 1
+            stats["estimated_prompt_tokens"] += estimated_prompt
+            stats["reserved_tokens"] += reserved
+            stats["actual_prompt_tokens"] += prompt_tokens
+            stats["actual_completion_tokens"] += completion_tokens
+            stats["recent_completions"].append(completion_tokens)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {
+                name: {k: v for k, v in stats.items() if k != "recent_completions"}
+                for name, stats in self.providers.items()
+            }
+        for stats in snapshot.values():
+            actual = stats["actual_prompt_tokens"] + stats["actual_completion_tokens"]
+            stats["actual_tokens"] = actual
+            stats["prompt_estimate_ratio"] = round(
+                stats["estimated_prompt_tokens"] / stats["actual_prompt_tokens"], 3
+            ) if stats["actual_prompt_tokens"] else None
+            # Providers without a rate limiter (Ollama) reserve nothing
+            reserved = stats["reserved_tokens"]
+            stats["reservation_ratio"] = round(reserved / actual, 3) if actual and reserved else None
+            stats["tokens_refunded"] = reserved - actual if reserved else 0
+        return snapshot
+
+
+token_usage_stats = TokenUsageStats()
+
+
 # ============================================================================
 # LLM SERVICE INTERFACES
 # ============================================================================
 
 
+def _openai_response_format(kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Build an OpenAI-compatible response_format from json_schema / json_mode kwargs."""
+    schema = kwargs.get("json_schema")
+    if schema:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": kwargs.get("schema_name", "dnd_content"), "schema": schema}
+        }
+    if kwargs.get("json_mode"):
+        return {"type": "json_object"}
+    return None
+
+
 class LLMService(ABC):
     """Abstract base class for LLM services with rate limiting."""
     
     @abstractmethod
     async def generate_content(self, prompt: str, **kwargs) -> str:
-        """Generate content using the LLM."""
+        """
+        Generate content using the LLM.
+        
+        Structured output kwargs (honoured by every provider's native mode):
+            json_schema: JSON schema the response must conform to
+            json_mode: Request syntactically valid JSON without a schema
+        """
         pass
     
+    async def generate_json(self, prompt: str, content_type: str = "content",
+                            schema: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """Generate a schema-constrained JSON object for a content type (character, npc, monster, item, chapter)."""
+        from src.services.llm_schemas import generate_structured
+        return await generate_structured(self, prompt, content_type, schema=schema, **kwargs)
+    
     @abstractmethod
     async def test_connection(self) -> bool:
         """Test if the LLM service is available."""
@@ -180,6 +340,21 @@ class LLMService(ABC):
     def get_rate_limit_status(self) -> Dict[str, Any]:
         """Get current rate limit status."""
         pass
+    
+    async def _reconcile_usage(self, provider: str, reservation: Optional[TokenReservation],
+                               prompt_estimate: int, prompt_tokens: Optional[int],
+                               completion_tokens: Optional[int]):
+        """Refund unused reservation to the rate limiter and record actual-vs-estimated usage."""
+        if reservation is None:
+            return
+        if prompt_tokens is None and completion_tokens is None:
+            # Provider did not report usage; keep the prompt estimate, release the rest
+            await self.rate_limiter.reconcile(reservation, prompt_estimate)
+            return
+        prompt_tokens, completion_tokens = prompt_tokens or 0, completion_tokens or 0
+        await self.rate_limiter.reconcile(reservation, prompt_tokens + completion_tokens)
+        token_usage_stats.record(provider, prompt_estimate, reservation.reserved,
+                                 prompt_tokens, completion_tokens)
 
 
 class OpenAILLMService(LLMService):
@@ -223,15 +398,24 @@ class OpenAILLMService(LLMService):
     
     async def generate_content(self, prompt: str, **kwargs) -> str:
         """Generate content using OpenAI API with rate limiting."""
-        # Estimate token usage (rough approximation: 1 token ≈ 4 characters)
+        # Estimate token usage with the tokenizer; reconciled against actual usage below
         max_tokens = kwargs.get("max_tokens", 4096)
-        estimated_tokens = (len(prompt) + max_tokens) // 4
+        system_prompt = "You are a D&D assistant. Respond ONLY with valid JSON. No explanations, no markdown, no extra text. Just JSON."
+        prompt_estimate, estimated_tokens = token_usage_stats.estimate(
+            "openai", system_prompt + prompt, max_tokens
+        )
+        response_format = _openai_response_format(kwargs)
         
-        # Attempt with exponential backoff
-        for attempt in range(self.rate_limit_config.max_retries):
+        # Attempt with the request's retry policy
+        retry_policy = get_retry_policy()
+        attempt = 0
+        while attempt < self.rate_limit_config.max_retries:
+            attempt += 1
+            reservation = None
             try:
                 # Check rate limits
-                if not await self.rate_limiter.acquire(estimated_tokens):
+                reservation = await self.rate_limiter.reserve(estimated_tokens)
+                if not reservation:
                     wait_time = self.rate_limiter.get_wait_time()
                     if wait_time > 0:
                         logger.info(f"Rate limited. Waiting {wait_time:.1f} seconds...")
@@ -241,18 +425,25 @@ class OpenAILLMService(LLMService):
                         raise Exception("Daily rate limit exceeded")
                 
                 # Make the request
+                request_args = {}
+                if response_format:
+                    request_args["response_format"] = response_format
                 response = await self.client.chat.completions.create(
                     model=self.model,
                     messages=[
-                        {
-                            "role": "system", 
-                            "content": "You are a D&D assistant. Respond ONLY with valid JSON. No explanations, no markdown, no extra text. Just JSON."
-                        },
+                        {"role": "system", "content": system_prompt},
                         {"role": "user", "content": prompt}
                     ],
                     temperature=kwargs.get("temperature", 0.7),
                     max_tokens=max_tokens,
-                    timeout=self.timeout
+                    timeout=self.timeout,
+                    **request_args
+                )
+                
+                usage = getattr(response, "usage", None)
+                await self._reconcile_usage(
+                    "openai", reservation, prompt_estimate,
+                    getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
                 )
                 
                 content = response.choices[0].message.content
@@ -264,28 +455,23 @@ class OpenAILLMService(LLMService):
                 return content
                 
             except Exception as e:
-                if "rate_limit" in str(e).lower() or "429" in str(e):
-                    # Rate limit error - apply exponential backoff
-                    delay = min(
-                        self.rate_limit_config.base_delay * (2 ** attempt),
-                        self.rate_limit_config.max_delay
-                    )
-                    logger.warning(f"Rate limit hit. Retrying in {delay} seconds... (attempt {attempt + 1})")
-                    await asyncio.sleep(delay)
+                # Failed requests keep only their prompt estimate against the window
+                await self._reconcile_usage(None, reservation, prompt_estimate, None, None)
+                
+                # Model does not support json_schema - degrade to plain JSON mode
+                if response_format and response_format["type"] == "json_schema" and "response_format" in str(e):
+                    logger.warning(f"Model '{self.model}' rejected json_schema output, using json_object mode")
+                    response_format = {"type": "json_object"}
+                    # The downgraded request is a retry of this attempt, not a new one
+                    attempt -= 1
                     continue
                 
-                # Other errors
-                if attempt == self.rate_limit_config.max_retries - 1:
-                    logger.error(f"OpenAI generation failed after {attempt + 1} attempts: {e}")
+                # Retries draw on the request's shared budget with decorrelated jitter;
+                # client errors (bad request, auth) are raised straight away
+                if (attempt == self.rate_limit_config.max_retries
+                        or not await retry_policy.retry(e, "openai")):
+                    logger.error(f"OpenAI generation failed after {attempt} attempts: {e}")
                     raise Exception(f"LLM generation failed: {e}")
-                
-                # Retry with exponential backoff
-                delay = min(
-                    self.rate_limit_config.base_delay * (2 ** attempt),
-                    self.rate_limit_config.max_delay
-                )
-                logger.warning(f"Request failed. Retrying in {delay} seconds... (attempt {attempt + 1})")
-                await asyncio.sleep(delay)
         
         raise Exception("Max retries exceeded")
     
@@ -340,14 +526,19 @@ class AnthropicLLMService(LLMService):
     async def generate_content(self, prompt: str, **kwargs) -> str:
         """Generate content using Anthropic API with rate limiting."""
         
-        # Estimate token usage
-        estimated_tokens = (len(prompt) + kwargs.get("max_tokens", 1024)) // 4
+        # Estimate token usage with the tokenizer; reconciled against actual usage below
+        prompt_estimate, estimated_tokens = token_usage_stats.estimate(
+            "anthropic", prompt, kwargs.get("max_tokens", 1024)
+        )
         
-        # Attempt with exponential backoff
+        # Attempt with the request's retry policy
+        retry_policy = get_retry_policy()
         for attempt in range(self.rate_limit_config.max_retries):
+            reservation = None
             try:
                 # Check rate limits
-                if not await self.rate_limiter.acquire(estimated_tokens):
+                reservation = await self.rate_limiter.reserve(estimated_tokens)
+                if not reservation:
                     wait_time = self.rate_limiter.get_wait_time()
                     if wait_time > 0:
                         logger.info(f"Rate limited. Waiting {wait_time:.1f} seconds...")
@@ -356,16 +547,38 @@ class AnthropicLLMService(LLMService):
                     else:
                         raise Exception("Daily rate limit exceeded")
                 
+                # Structured output uses a forced tool call whose input is the JSON object
+                request_args = {}
+                schema = kwargs.get("json_schema")
+                if schema:
+                    request_args["tools"] = [{
+                        "name": "emit_json",
+                        "description": "Return the requested D&D content as a JSON object.",
+                        "input_schema": schema
+                    }]
+                    request_args["tool_choice"] = {"type": "tool", "name": "emit_json"}
+                
                 # Make the request
                 response = await self.client.messages.create(
                     model=self.model,
                     messages=[{"role": "user", "content": prompt}],
                     max_tokens=kwargs.get("max_tokens", 1024),
                     temperature=kwargs.get("temperature", 0.7),
-                    timeout=self.timeout
+                    timeout=self.timeout,
+                    **request_args
                 )
                 
-                content = response.content[0].text
+                usage = getattr(response, "usage", None)
+                await self._reconcile_usage(
+                    "anthropic", reservation, prompt_estimate,
+                    getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None)
+                )
+                
+                tool_blocks = [block for block in response.content if getattr(block, "type", "") == "tool_use"]
+                if tool_blocks:
+                    content = json.dumps(tool_blocks[0].input)
+                else:
+                    content = response.content[0].text
                 if not content or not content.strip():
                     raise Exception("Empty response from Anthropic")
                 
@@ -374,28 +587,15 @@ class AnthropicLLMService(LLMService):
                 return content
                 
             except Exception as e:
-                if "rate_limit" in str(e).lower() or "429" in str(e):
-                    # Rate limit error - apply exponential backoff
-                    delay = min(
-                        self.rate_limit_config.base_delay * (2 ** attempt),
-                        self.rate_limit_config.max_delay
-                    )
-                    logger.warning(f"Rate limit hit. Retrying in {delay} seconds... (attempt {attempt + 1})")
-                    await asyncio.sleep(delay)
-                    continue
+                # Failed requests keep only their prompt estimate against the window
+                await self._reconcile_usage(None, reservation, prompt_estimate, None, None)
                 
-                # Other errors
-                if attempt == self.rate_limit_config.max_retries - 1:
+                # Retries draw on the request's shared budget with decorrelated jitter;
+                # client errors (bad request, auth) are raised straight away
+                if (attempt == self.rate_limit_config.max_retries - 1
+                        or not await retry_policy.retry(e, "anthropic")):
                     logger.error(f"Anthropic generation failed after {attempt + 1} attempts: {e}")
                     raise Exception(f"LLM generation failed: {e}")
-                
-                # Retry with exponential backoff
-                delay = min(
-                    self.rate_limit_config.base_delay * (2 ** attempt),
-                    self.rate_limit_config.max_delay
-                )
-                logger.warning(f"Request failed. Retrying in {delay} seconds... (attempt {attempt + 1})")
-                await asyncio.sleep(delay)
         
         raise Exception("Max retries exceeded")
     
@@ -447,14 +647,20 @@ class HTTPLLMService(LLMService):
     async def generate_content(self, prompt: str, **kwargs) -> str:
         """Generate content using custom HTTP endpoint with rate limiting."""
         
-        # Estimate token usage
-        estimated_tokens = (len(prompt) + kwargs.get("max_tokens", 1024)) // 4
+        # Estimate token usage with the tokenizer; reconciled against actual usage below
+        system_prompt = "You are a D&D assistant. Respond ONLY with valid JSON."
+        prompt_estimate, estimated_tokens = token_usage_stats.estimate(
+            "http", system_prompt + prompt, kwargs.get("max_tokens", 1024)
+        )
         
-        # Attempt with exponential backoff
+        # Attempt with the request's retry policy
+        retry_policy = get_retry_policy()
         for attempt in range(self.rate_limit_config.max_retries):
+            reservation = None
             try:
                 # Check rate limits
-                if not await self.rate_limiter.acquire(estimated_tokens):
+                reservation = await self.rate_limiter.reserve(estimated_tokens)
+                if not reservation:
                     wait_time = self.rate_limiter.get_wait_time()
                     if wait_time > 0:
                         logger.info(f"Rate limited. Waiting {wait_time:.1f} seconds...")
@@ -467,15 +673,15 @@ class HTTPLLMService(LLMService):
                 payload = {
                     "model": self.model,
                     "messages": [
-                        {
-                            "role": "system", 
-                            "content": "You are a D&D assistant. Respond ONLY with valid JSON."
-                        },
+                        {"role": "system", "content": system_prompt},
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": kwargs.get("temperature", 0.7),
                     "max_tokens": kwargs.get("max_tokens", 1024)
                 }
+                response_format = _openai_response_format(kwargs)
+                if response_format:
+                    payload["response_format"] = response_format
                 
                 response = await self.client.post(
                     f"{self.base_url}/chat/completions",
@@ -484,6 +690,11 @@ class HTTPLLMService(LLMService):
                 response.raise_for_status()
                 
                 data = response.json()
+                usage = data.get("usage") or {}
+                await self._reconcile_usage(
+                    "http", reservation, prompt_estimate,
+                    usage.get("prompt_tokens"), usage.get("completion_tokens")
+                )
                 content = data["choices"][0]["message"]["content"]
                 
                 if not content or not content.strip():
@@ -494,28 +705,15 @@ class HTTPLLMService(LLMService):
                 return content
                 
             except Exception as e:
-                if "rate_limit" in str(e).lower() or "429" in str(e):
-                    # Rate limit error - apply exponential backoff
-                    delay = min(
-                        self.rate_limit_config.base_delay * (2 ** attempt),
-                        self.rate_limit_config.max_delay
-                    )
-                    logger.warning(f"Rate limit hit. Retrying in {delay} seconds... (attempt {attempt + 1})")
-                    await asyncio.sleep(delay)
-                    continue
+                # Failed requests keep only their prompt estimate against the window
+                await self._reconcile_usage(None, reservation, prompt_estimate, None, None)
                 
-                # Other errors
-                if attempt == self.rate_limit_config.max_retries - 1:
+                # Retries draw on the request's shared budget with decorrelated jitter;
+                # client errors (bad request, auth) are raised straight away
+                if (attempt == self.rate_limit_config.max_retries - 1
+                        or not await retry_policy.retry(e, "http")):
                     logger.error(f"HTTP LLM service generation failed after {attempt + 1} attempts: {e}")
                     raise Exception(f"LLM generation failed: {e}")
-                
-                # Retry with exponential backoff
-                delay = min(
-                    self.rate_limit_config.base_delay * (2 ** attempt),
-                    self.rate_limit_config.max_delay
-                )
-                logger.warning(f"Request failed. Retrying in {delay} seconds... (attempt {attempt + 1})")
-                await asyncio.sleep(delay)
         
         raise Exception("Max retries exceeded")
     
@@ -539,15 +737,137 @@ class HTTPLLMService(LLMService):
         await self.client.aclose()
 
 
+# ============================================================================
+# OLLAMA MODEL RESIDENCY AND CONTEXT REUSE
+# ============================================================================
+
+# Session of the creation currently running in this task (one character, say).
+# Ollama requests made inside a session continue from the previous call's
+# returned context, so the shared prefix is not re-evaluated.
+current_llm_session: ContextVar[Optional[str]] = ContextVar("current_llm_session", default=None)
+
+
+class OllamaContextStore:
+    """
+    Ollama context tokens per (server, model, session), with prompt-eval accounting.
+    
+    Contexts are model-specific, so stages routed to different models keep
+    separate chains. Time saved is estimated as the reused context tokens times
+    the measured prompt-eval time per token.
+    """
+    
+    MAX_CONTEXTS = 256
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contexts: "OrderedDict[Tuple[str, str, str], List[int]]" = OrderedDict()
+        self._sessions: Dict[str, Dict[str, int]] = {}
+        self.totals = {
+            "sessions": 0, "calls": 0, "reused_calls": 0, "reused_context_tokens": 0,
+            "prompt_eval_tokens": 0, "prompt_eval_ms": 0.0, "cold_loads": 0, "load_ms": 0.0
+        }
+        self.preloaded: Dict[str, float] = {}
+    
+    def get(self, base_url: str, model: str, session: str) -> Optional[List[int]]:
+        with self._lock:
+            return self._contexts.get((base_url, model, session))
+    
+    def put(self, base_url: str, model: str, session: str, context: List[int]) -> None:
+        with self._lock:
+            key = (base_url, model, session)
+            self._contexts[key] = context
+            self._contexts.move_to_end(key)
+            while len(self._contexts) > self.MAX_CONTEXTS:
+                self._contexts.popitem(last=False)
+    
+    def record(self, session: Optional[str], result: Dict[str, Any], reused_tokens: int) -> None:
+        """Record one generate response's prompt-eval and load timings (durations are ns)."""
+        prompt_eval_ms = result.get("prompt_eval_duration", 0) / 1e6
+        load_ms = result.get("load_duration", 0) / 1e6
+        with self._lock:
+            self.totals["calls"] += 1
+            self.totals["prompt_eval_tokens"] += result.get("prompt_eval_count", 0)
+            self.totals["prompt_eval_ms"] += prompt_eval_ms
+            if load_ms > 1000:
+                # The model had been evicted and was loaded for this request
+                self.totals["cold_loads"] += 1
+                self.totals["load_ms"] += load_ms
+            if reused_tokens:
+                self.totals["reused_calls"] += 1
+                self.totals["reused_context_tokens"] += reused_tokens
+            if session:
+                stats = self._sessions.setdefault(session, {"calls": 0, "reused_context_tokens": 0})
+                stats["calls"] += 1
+                stats["reused_context_tokens"] += reused_tokens
+    
+    def record_preload(self, model: str, seconds: float) -> None:
+        with self._lock:
+            self.preloaded[model] = round(seconds, 3)
+    
+    def end_session(self, session: str) -> None:
+        """Drop a session's contexts once its creation is done."""
+        with self._lock:
+            for key in [key for key in self._contexts if key[2] == session]:
+                del self._contexts[key]
+            if self._sessions.pop(session, None) is not None:
+                self.totals["sessions"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.totals)
+            stats["active_contexts"] = len(self._contexts)
+            stats["preloaded_models"] = dict(self.preloaded)
+        ms_per_token = stats["prompt_eval_ms"] / stats["prompt_eval_tokens"] if stats["prompt_eval_tokens"] else 0.0
+        saved_ms = stats["reused_context_tokens"] * ms_per_token
+        stats["prompt_eval_ms_per_token"] = round(ms_per_token, 4)
+        stats["estimated_prompt_eval_ms_saved"] = round(saved_ms, 1)
+        stats["estimated_ms_saved_per_session"] = round(saved_ms / stats["sessions"], 1) if stats["sessions"] else 0.0
+        stats["prompt_eval_ms"] = round(stats["prompt_eval_ms"], 1)
+        stats["load_ms"] = round(stats["load_ms"], 1)
+        return stats
+
+
+ollama_context_store = OllamaContextStore()
+
+
+@contextmanager
+def llm_session(session_id: Optional[str] = None):
+    """
+    Scope related LLM calls (the stages of one creation) to a shared session.
+    
+    Usage:
+        with llm_session():
+            base = await creator._generate_character_data(...)
+            backstory = await creator._generate_enhanced_backstory(...)
+    """
+    session_id = session_id or uuid.uuid4().hex
+    token = current_llm_session.set(session_id)
+    try:
+        yield session_id
+    finally:
+        current_llm_session.reset(token)
+        ollama_context_store.end_session(session_id)
+
+
 class OllamaLLMService(LLMService):
-    """Ollama local LLM service - ideal for testing without API costs."""
+    """
+    Ollama local LLM service - ideal for testing without API costs.
+    
+    Models are kept resident for keep_alive after each request (preload()
+    loads one ahead of the first request). Inside an llm_session, each call
+    continues from the previous call's context so the shared prefix of a
+    creation's stages is evaluated once; pass session=None to opt out.
+    """
     
-    def __init__(self, model: str = "llama3:latest", base_url: str = "http://localhost:11434", 
-                 timeout: int = 600):
+    def __init__(self, model: str = "llama3:latest", base_url: str = "http://localhost:11434",
+                 timeout: int = 600, keep_alive: Optional[str] = None, num_ctx: Optional[int] = None):
         self.model = model
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
-        
+        self.keep_alive = keep_alive or os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+        # Session calls carry previous stages in their context, so need a larger window
+        self.num_ctx = num_ctx or int(os.environ.get("OLLAMA_NUM_CTX", "8192"))
+    
         # Ollama is local, so no strict rate limiting needed
         # But we'll implement the interface for consistency
         self.request_count = 0
@@ -577,9 +897,21 @@ class OllamaLLMService(LLMService):
             "model": self.model,
             "prompt": prompt,
             "stream": False,  # Get complete response
+            "keep_alive": self.keep_alive,
             "options": {}
         }
         
+        # Continue the session's context so earlier stages are not re-evaluated
+        session = kwargs["session"] if "session" in kwargs else current_llm_session.get()
+        context = ollama_context_store.get(self.base_url, self.model, session) if session else None
+        if session:
+            payload["options"]["num_ctx"] = self.num_ctx
+            if context and len(context) + count_tokens(prompt) + kwargs.get("max_tokens", 4096) > self.num_ctx:
+                logger.debug(f"Ollama session {session[:8]} context full, starting fresh")
+                context = None
+            if context:
+                payload["context"] = context
+        
         # Add any additional parameters
         payload["options"]["num_predict"] = kwargs.get("max_tokens", 4096)
         if "temperature" in kwargs:
@@ -587,6 +919,12 @@ class OllamaLLMService(LLMService):
         if "top_p" in kwargs:
             payload["options"]["top_p"] = kwargs["top_p"]
         
+        # Native structured output: a JSON schema, or plain "json" mode
+        if kwargs.get("json_schema"):
+            payload["format"] = kwargs["json_schema"]
+        elif kwargs.get("json_mode"):
+            payload["format"] = "json"
+        
         try:
             async with httpx.AsyncClient(timeout=self.timeout) as client:
                 logger.info(f"Sending request to Ollama: {self.base_url}/api/generate")
@@ -600,6 +938,14 @@ class OllamaLLMService(LLMService):
                 if response.status_code == 200:
                     result = response.json()
                     generated_text = result.get("response", "")
+                    if "prompt_eval_count" in result or "eval_count" in result:
+                        token_usage_stats.record(
+                            "ollama", count_tokens(prompt), 0,
+                            result.get("prompt_eval_count", 0), result.get("eval_count", 0)
+                        )
+                    ollama_context_store.record(session, result, len(context) if context else 0)
+                    if session and result.get("context"):
+                        ollama_context_store.put(self.base_url, self.model, session, result["context"])
                     
                     logger.info(f"Ollama generated {len(generated_text)} characters")
                     return generated_text
@@ -617,6 +963,29 @@ class OllamaLLMService(LLMService):
             logger.error(error_msg)
             raise Exception(error_msg)
     
+    async def preload(self) -> bool:
+        """Load the model into memory ahead of the first request and keep it resident."""
+        import httpx
+        
+        start = time.time()
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                # A generate request without a prompt only loads the model
+                response = await client.post(
+                    f"{self.base_url}/api/generate",
+                    json={"model": self.model, "keep_alive": self.keep_alive}
+                )
+            if response.status_code != 200:
+                logger.warning(f"Ollama preload of '{self.model}' failed: {response.status_code} - {response.text}")
+                return False
+        except Exception as e:
+            logger.warning(f"Ollama preload of '{self.model}' failed: {e}")
+            return False
+        elapsed = time.time() - start
+        ollama_context_store.record_preload(self.model, elapsed)
+        logger.info(f"Preloaded Ollama model '{self.model}' in {elapsed:.1f}s (keep_alive={self.keep_alive})")
+        return True
+    
     async def test_connection(self) -> bool:
         """Test if Ollama is available and the model is accessible."""
         import httpx
@@ -663,13 +1032,845 @@ class OllamaLLMService(LLMService):
         }
 
 
-def create_llm_service(provider: str = "openai", **kwargs) -> LLMService:
+# ============================================================================
+# MULTI-PROVIDER FAILOVER AND HEDGING
+# ============================================================================
+
+_STATUS_CODE = re.compile(r"\b([45]\d\d)\b")
+
+
+def classify_llm_error(error: BaseException) -> str:
+    """
+    Classify an LLM error: "parse", "rate_limit", "server", "timeout", "client" or "unknown".
+    
+    Providers raise generic exceptions, so this works from the message.
+    """
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    message = str(error).lower()
+    # Before status codes: JSON errors quote character offsets ("column 500")
+    if isinstance(error, json.JSONDecodeError) or ("json" in message and "pars" in message):
+        return "parse"
+    if "rate_limit" in message or "rate limit" in message or "429" in message:
+        return "rate_limit"
+    if "timed out" in message or "timeout" in message:
+        return "timeout"
+    match = _STATUS_CODE.search(message)
+    if match:
+        return "server" if match.group(1).startswith("5") else "client"
+    return "unknown"
+
+
+@dataclass
+class CircuitBreakerConfig:
+    """When a provider is taken out of rotation and when it is retried."""
+    failure_threshold: int = 5    # consecutive failures before opening
+    reset_timeout: float = 30.0   # seconds open before a half-open trial request
+
+
+class ProviderHealth:
+    """
+    Rolling latency, success rate and circuit state for one upstream provider.
+    
+    States: closed (normal), open (skipped until reset_timeout elapses) and
+    half_open (one trial request; success closes, failure re-opens).
+    """
+    
+    WINDOW = 100
+    
+    def __init__(self, name: str, breaker: Optional[CircuitBreakerConfig] = None):
+        self.name = name
+        self.breaker = breaker or CircuitBreakerConfig()
+        self.latencies = deque(maxlen=self.WINDOW)
+        self.outcomes = deque(maxlen=self.WINDOW)
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.counts = {"requests": 0, "successes": 0, "failures": 0, "hedges": 0, "hedge_wins": 0}
+    
+    def p95(self, default: float) -> float:
+        """Rolling p95 latency, or default until enough samples exist."""
+        if len(self.latencies) < 10:
+            return default
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    
+    @property
+    def score(self) -> float:
+        """Health score in [0, 1]: recent success rate, zero while the circuit is open."""
+        if self.state == "open":
+            return 0.0
+        if not self.outcomes:
+            return 1.0
+        return sum(self.outcomes) / len(self.outcomes)
+    
+    def available(self) -> bool:
+        """Whether a request may be sent now. Does not claim the half-open trial slot."""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.time() - self.opened_at >= self.breaker.reset_timeout:
+            self.state = "half_open"
+            self.trial_in_flight = False
+        return self.state == "half_open" and not self.trial_in_flight
+    
+    def claim(self) -> bool:
+        """Take the right to send a request now, including the half-open trial slot."""
+        if not self.available():
+            return False
+        if self.state == "half_open":
+            self.trial_in_flight = True
+        return True
+    
+    def release(self) -> None:
+        """Give back a claimed trial slot without recording an outcome."""
+        self.trial_in_flight = False
+    
+    def record_success(self, latency: float) -> None:
+        self.counts["requests"] += 1
+        self.counts["successes"] += 1
+        self.latencies.append(latency)
+        self.outcomes.append(1)
+        self.consecutive_failures = 0
+        if self.state != "closed":
+            logger.info(f"LLM provider {self.name} recovered, closing circuit")
+        self.state = "closed"
+        self.trial_in_flight = False
+    
+    def record_failure(self) -> None:
+        self.counts["requests"] += 1
+        self.counts["failures"] += 1
+        self.outcomes.append(0)
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.breaker.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"LLM provider {self.name} circuit opened after {self.consecutive_failures} failures")
+            self.state = "open"
+            self.opened_at = time.time()
+        self.trial_in_flight = False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            "state": self.state,
+            "score": round(self.score, 3),
+            "p95_latency": round(self.p95(0.0), 3),
+            "consecutive_failures": self.consecutive_failures
+        }
+
+
+# Health is tracked per upstream (provider + model), shared by every composite instance
+provider_health: Dict[str, ProviderHealth] = {}
+
+
+def get_provider_health_stats() -> Dict[str, Any]:
+    """Health, circuit state and hedging counts for every provider seen so far."""
+    return {name: health.get_stats() for name, health in provider_health.items()}
+
+
+class CompositeLLMService(LLMService):
+    """
+    Ordered set of LLM providers with hedged requests and failover.
+    
+    - The first available provider gets the request. If it has not answered
+      within its rolling p95 latency, a hedged duplicate goes to the next
+      provider and the first valid response wins; the rest are cancelled.
+    - 5xx, 429, timeouts and connection errors fail over to the next provider
+      immediately (members built by create_composite_service() do not retry
+      on their own). Other 4xx errors are raised, since the request itself is bad.
+    - Providers whose circuit is open are skipped; if every circuit is open the
+      providers are tried in order anyway rather than failing outright.
+    """
+    
+    def __init__(self, providers: List[Tuple[str, LLMService]],
+                 hedge: bool = True,
+                 default_hedge_delay: float = 15.0,
+                 min_hedge_delay: float = 1.0,
+                 attempt_timeout: float = 120.0,
+                 breaker: Optional[CircuitBreakerConfig] = None):
+        if not providers:
+            raise ValueError("CompositeLLMService needs at least one provider")
+        self.providers = providers
+        self.hedge = hedge
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.attempt_timeout = attempt_timeout
+        for name, _ in providers:
+            provider_health.setdefault(name, ProviderHealth(name, breaker))
+        # Expose the primary provider's model like a single-provider service
+        self.model = getattr(providers[0][1], "model", None)
+    
+    def _candidates(self) -> Tuple[List[Tuple[str, LLMService]], bool]:
+        """
+        Providers to try in order, and whether they are forced (every circuit open).
+        
+        Only checks availability; a half-open provider's trial slot is claimed
+        when a request is actually launched to it.
+        """
+        candidates = [(name, service) for name, service in self.providers if provider_health[name].available()]
+        if candidates:
+            return candidates, False
+        return list(self.providers), True
+    
+    async def _call(self, name: str, service: LLMService, prompt: str, kwargs: Dict[str, Any],
+                    trial: bool = False) -> str:
+        """
+        One provider attempt with timeout, recorded against the provider's health.
+        
+        trial marks the attempt that holds the provider's half-open slot; a
+        rejected request gives the slot back without judging the provider.
+        """
+        health = provider_health[name]
+        start = time.time()
+        try:
+            content = await asyncio.wait_for(service.generate_content(prompt, **kwargs), self.attempt_timeout)
+            if not content or not content.strip():
+                raise Exception(f"Empty response from {name}")
+        except Exception as e:
+            if classify_llm_error(e) == "client":
+                # The request was rejected, the provider itself is healthy
+                if trial:
+                    health.release()
+            else:
+                health.record_failure()
+            raise
+        health.record_success(time.time() - start)
+        return content
+    
+    async def generate_content(self, prompt: str, **kwargs) -> str:
+        """Generate content from the first provider to return a valid response."""
+        queue, forced = self._candidates()
+        running: Dict[asyncio.Task, str] = {}
+        hedges = set()
+        last_error: Optional[BaseException] = None
+        
+        def launch(hedged: bool = False) -> bool:
+            """Start the next queued provider that can still be claimed; False if none can."""
+            while queue:
+                name, service = queue.pop(0)
+                health = provider_health[name]
+                # Another request may have taken a half-open trial slot since _candidates()
+                if not health.claim() and not forced:
+                    continue
+                trial = health.state == "half_open" and not forced
+                task = asyncio.ensure_future(self._call(name, service, prompt, kwargs, trial))
+                if trial:
+                    # Lost a hedge race, possibly before starting; not the provider's fault
+                    task.add_done_callback(lambda t, health=health: t.cancelled() and health.release())
+                running[task] = name
+                if hedged:
+                    hedges.add(task)
+                    health.counts["hedges"] += 1
+                    logger.info(f"Hedging LLM request to {name}")
+                return True
+            return False
+        
+        if not launch():
+            queue, forced = list(self.providers), True
+            launch()
+        try:
+            while running:
+                newest = list(running.values())[-1]
+                hedge_delay = None
+                if self.hedge and queue:
+                    hedge_delay = max(self.min_hedge_delay,
+                                      provider_health[newest].p95(self.default_hedge_delay))
+                done, _ = await asyncio.wait(running, timeout=hedge_delay,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch(hedged=True)
+                    continue
+                
+                for task in done:
+                    name = running.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if task in hedges:
+                            provider_health[name].counts["hedge_wins"] += 1
+                        return task.result()
+                    last_error = error
+                    kind = classify_llm_error(error)
+                    if kind == "client":
+                        raise error
+                    logger.warning(f"LLM provider {name} failed ({kind}): {error}")
+                    if queue and not running:
+                        launch()
+            raise Exception(f"All LLM providers failed: {last_error}")
+        finally:
+            for task in running:
+                task.cancel()
+    
+    async def test_connection(self) -> bool:
+        """True if any provider is reachable."""
+        for _, service in self.providers:
+            if await service.test_connection():
+                return True
+        return False
+    
+    def get_rate_limit_status(self) -> Dict[str, Any]:
+        return {
+            name: {**service.get_rate_limit_status(), "health": provider_health[name].get_stats()}
+            for name, service in self.providers
+        }
+
+
+# ============================================================================
+# RETRY POLICY
+# ============================================================================
+
+# Error kinds worth another attempt; "client" (bad request, auth) never is
+RETRYABLE_ERRORS = {"parse", "rate_limit", "server", "timeout", "unknown"}
+
+
+class RetryStats:
+    """Retries per layer and error kind across requests, plus refused retries."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "retries": 0, "not_retryable": 0, "budget_exhausted": 0}
+        self.by_layer: Dict[str, Dict[str, int]] = {}
+    
+    def record(self, outcome: str, layer: Optional[str] = None, kind: Optional[str] = None) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+            if layer and outcome == "retries":
+                kinds = self.by_layer.setdefault(layer, {})
+                kinds[kind] = kinds.get(kind, 0) + 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counts)
+            stats["by_layer"] = {layer: dict(kinds) for layer, kinds in self.by_layer.items()}
+        stats["retries_per_request"] = round(stats["retries"] / stats["requests"], 3) if stats["requests"] else 0.0
+        return stats
+
+
+retry_stats = RetryStats()
+
+
+@dataclass
+class RetryPolicy:
+    """
+    One retry budget shared by every layer handling a request.
+    
+    Providers, BaseCreator._generate_with_llm and the campaign generators each
+    used to retry on their own, so one bad prompt could cost 9+ upstream calls.
+    Now every layer asks the request's policy: non-retryable errors are raised
+    at once, retries stop when the budget is spent, and waits use decorrelated
+    jitter (parse errors are retried without waiting).
+    """
+    budget: int = 3            # retries per request, across all layers
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    retries: int = 0
+    attempts: List[Dict[str, Any]] = field(default_factory=list)
+    last_delay: float = 0.0
+    
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Read LLM_RETRY_BUDGET / LLM_RETRY_BASE_DELAY / LLM_RETRY_MAX_DELAY."""
+        return cls(
+            budget=int(os.environ.get("LLM_RETRY_BUDGET", 3)),
+            base_delay=float(os.environ.get("LLM_RETRY_BASE_DELAY", 1.0)),
+            max_delay=float(os.environ.get("LLM_RETRY_MAX_DELAY", 30.0))
+        )
+    
+    def next_delay(self) -> float:
+        """Decorrelated jitter: uniform between the base and three times the previous delay."""
+        upper = max(self.base_delay, self.last_delay * 3)
+        self.last_delay = min(self.max_delay, random.uniform(self.base_delay, upper))
+        return self.last_delay
+    
+    async def retry(self, error: BaseException, layer: str) -> bool:
+        """
+        Whether the caller should retry after error; waits the backoff first.
+        
+        Args:
+            error: The exception the attempt failed with
+            layer: Who is retrying ("openai", "creator", ...), for the trace
+        """
+        kind = classify_llm_error(error)
+        if kind not in RETRYABLE_ERRORS:
+            retry_stats.record("not_retryable")
+            return False
+        if self.retries >= self.budget:
+            retry_stats.record("budget_exhausted")
+            logger.warning(f"Retry budget ({self.budget}) spent, not retrying {layer} {kind} error")
+            return False
+        self.retries += 1
+        delay = 0.0 if kind == "parse" else self.next_delay()
+        self.attempts.append({"layer": layer, "kind": kind, "delay": round(delay, 2)})
+        retry_stats.record("retries", layer, kind)
+        logger.warning(f"{layer} {kind} error, retry {self.retries}/{self.budget} in {delay:.1f}s: {error}")
+        if delay:
+            await asyncio.sleep(delay)
+        return True
+    
+    def get_trace(self) -> Dict[str, Any]:
+        return {"retries": self.retries, "budget": self.budget, "attempts": list(self.attempts)}
+
+
+current_retry_policy: ContextVar[Optional[RetryPolicy]] = ContextVar("current_retry_policy", default=None)
+
+
+def get_retry_policy() -> RetryPolicy:
+    """The current request's retry policy, or a fresh one for a call outside any request."""
+    return current_retry_policy.get() or RetryPolicy.from_env()
+
+
+@contextmanager
+def retry_scope(policy: Optional[RetryPolicy] = None):
+    """
+    Bind one retry policy to everything called in scope (one API request, say).
+    
+    Nested scopes reuse the outer policy, so a pipeline layer opening its own
+    scope inside a request still shares the request's budget.
+    """
+    current = current_retry_policy.get()
+    if current is not None and policy is None:
+        yield current
+        return
+    policy = policy or RetryPolicy.from_env()
+    token = current_retry_policy.set(policy)
+    retry_stats.record("requests")
+    try:
+        yield policy
+    finally:
+        current_retry_policy.reset(token)
+
+
+# ============================================================================
+# SINGLE-FLIGHT REQUEST COALESCING
+# ============================================================================
+
+@dataclass
+class CoalescingConfig:
+    """
+    Which requests may share an upstream call with an identical in-flight request.
+    
+    Only near-deterministic requests are coalesced by default, since duplicates
+    at high temperature are usually meant to differ. Callers can force either
+    way per request with coalesce=True / coalesce=False.
+    """
+    enabled: bool = True
+    max_temperature: float = 0.3      # coalesce when temperature <= this
+    default_temperature: float = 0.7  # providers' temperature when none is passed
+    
+    @classmethod
+    def from_env(cls) -> "CoalescingConfig":
+        """Read LLM_COALESCE_ENABLED / LLM_COALESCE_MAX_TEMPERATURE."""
+        config = cls()
+        if os.environ.get("LLM_COALESCE_ENABLED"):
+            config.enabled = os.environ["LLM_COALESCE_ENABLED"].lower() in ("1", "true", "yes")
+        if os.environ.get("LLM_COALESCE_MAX_TEMPERATURE"):
+            config.max_temperature = float(os.environ["LLM_COALESCE_MAX_TEMPERATURE"])
+        return config
+
+
+class CoalescingStats:
+    """Counts of upstream calls made versus requests served by a shared call."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"upstream": 0, "coalesced": 0, "bypassed": 0}
+    
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        eligible = counts["upstream"] + counts["coalesced"]
+        counts["coalesce_rate"] = round(counts["coalesced"] / eligible, 4) if eligible else 0.0
+        return counts
+
+
+coalescing_stats = CoalescingStats()
+
+# In-flight upstream calls shared by every service instance (services are often
+# created per request), keyed by provider, model and normalised request
+_in_flight: Dict[str, "asyncio.Task"] = {}
+
+
+class SingleFlightLLMService(LLMService):
+    """
+    Wraps an LLM service so concurrent identical requests share one upstream call.
+    
+    Requests are keyed by provider, model, whitespace-normalised prompt, all
+    generation kwargs and the effective llm_session, so calls made inside
+    different sessions (each with its own Ollama context and accounting) never
+    share a response; pass session=None to share across sessions. Every caller
+    awaits the shared call through a shield, so one caller being cancelled does
+    not cancel it for the others. Other attributes (model, rate_limiter, ...)
+    are delegated to the wrapped service.
+    """
+    
+    def __init__(self, service: LLMService, config: Optional[CoalescingConfig] = None):
+        self.service = service
+        self.config = config or CoalescingConfig()
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.service, name)
+    
+    def _should_coalesce(self, kwargs: Dict[str, Any]) -> bool:
+        explicit = kwargs.get("coalesce")
+        if explicit is not None:
+            return bool(explicit)
+        if not self.config.enabled:
+            return False
+        temperature = kwargs.get("temperature")
+        if temperature is None:
+            temperature = self.config.default_temperature
+        return temperature <= self.config.max_temperature
+    
+    def _request_key(self, prompt: str, kwargs: Dict[str, Any]) -> str:
+        session = kwargs["session"] if "session" in kwargs else current_llm_session.get()
+        request = [
+            type(self.service).__name__,
+            getattr(self.service, "model", None),
+            " ".join(prompt.split()),
+            {key: value for key, value in kwargs.items() if key != "session"},
+            session
+        ]
+        return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode()).hexdigest()
+    
+    async def generate_content(self, prompt: str, **kwargs) -> str:
+        """Generate content, joining an identical in-flight request when in scope."""
+        coalesce = self._should_coalesce(kwargs)
+        kwargs.pop("coalesce", None)
+        if not coalesce:
+            coalescing_stats.record("bypassed")
+            return await self.service.generate_content(prompt, **kwargs)
+        
+        key = self._request_key(prompt, kwargs)
+        task = _in_flight.get(key)
+        if task is not None:
+            coalescing_stats.record("coalesced")
+            logger.debug(f"Coalesced duplicate LLM request {key[:12]}")
+        else:
+            coalescing_stats.record("upstream")
+            task = asyncio.ensure_future(self.service.generate_content(prompt, **kwargs))
+            _in_flight[key] = task
+            task.add_done_callback(lambda _: _in_flight.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def test_connection(self) -> bool:
+        return await self.service.test_connection()
+    
+    def get_rate_limit_status(self) -> Dict[str, Any]:
+        return self.service.get_rate_limit_status()
+
+
+# ============================================================================
+# STAGE-AWARE MODEL ROUTING
+# ============================================================================
+
+# USD per 1M (input, output) tokens, matched by longest model-name prefix
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "claude-3-haiku": (0.25, 1.25),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-sonnet": (3.00, 15.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-opus": (15.00, 75.00),
+}
+
+
+def _unwrap_service(service: LLMService) -> LLMService:
+    """The provider behind coalescing/routing wrappers (composites report their primary)."""
+    while hasattr(service, "__dict__") and "service" in vars(service):
+        service = vars(service)["service"]
+    if isinstance(service, CompositeLLMService):
+        return _unwrap_service(service.providers[0][1])
+    return service
+
+
+def estimate_cost(service: LLMService, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Estimated USD cost of a call, 0 for local models, None for unknown models."""
+    provider = _unwrap_service(service)
+    if isinstance(provider, OllamaLLMService):
+        return 0.0
+    model = getattr(provider, "model", None) or ""
+    matches = [prefix for prefix in MODEL_PRICING if model.startswith(prefix)]
+    if not matches:
+        return None
+    input_price, output_price = MODEL_PRICING[max(matches, key=len)]
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+@dataclass
+class StageRoutingConfig:
+    """
+    Which provider and model tier serves each pipeline stage.
+    
+    tiers maps a tier name to a "provider:model" spec (e.g. "ollama:llama3.2:3b");
+    an empty spec means the default service. stages maps a stage name to a tier.
+    Stages without a tier, and every stage while disabled, use the default
+    service but are still timed, so the report compares before and after.
+    """
+    enabled: bool = False
+    tiers: Dict[str, str] = field(default_factory=dict)
+    stages: Dict[str, str] = field(default_factory=dict)
+    
+    @classmethod
+    def from_settings(cls, settings=None) -> "StageRoutingConfig":
+        """Read llm_stage_routing_enabled / llm_small_model / llm_large_model / llm_stage_tiers."""
+        if settings is None:
+            try:
+                from src.core.config import settings
+            except Exception as e:  # settings fail validation outside the app (scripts, tests)
+                logger.debug(f"Stage routing disabled, settings unavailable: {e}")
+                return cls()
+        return cls(
+            enabled=getattr(settings, "llm_stage_routing_enabled", False),
+            tiers={
+                "small": getattr(settings, "llm_small_model", ""),
+                "large": getattr(settings, "llm_large_model", ""),
+            },
+            stages=getattr(settings, "llm_stage_tiers_map", {})
+        )
+    
+    def route_for(self, stage: str) -> Optional[str]:
+        """The "provider:model" spec for a stage, or None for the default service."""
+        if not self.enabled:
+            return None
+        return self.tiers.get(self.stages.get(stage, "")) or None
+
+
+class StageStats:
+    """Per-stage, per-route call latency, token estimates and cost."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    
+    def record(self, stage: str, route: str, latency: float, prompt_tokens: int = 0,
+               completion_tokens: int = 0, cost: Optional[float] = None,
+               default_cost: Optional[float] = None, outcome: str = "success") -> None:
+        """Record a call; outcome is "success", "failure" or "fallback" (served by the default)."""
+        with self._lock:
+            stats = self.stages.setdefault(stage, {}).setdefault(route, {
+                "calls": 0, "failures": 0, "fallbacks": 0, "total_latency": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+                "default_cost_usd": 0.0, "latencies": deque(maxlen=100)
+            })
+            stats["calls"] += 1
+            if outcome == "failure":
+                stats["failures"] += 1
+                return
+            if outcome == "fallback":
+                stats["fallbacks"] += 1
+            stats["total_latency"] += latency
+            stats["latencies"].append(latency)
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            if cost is not None:
+                stats["cost_usd"] += cost
+            if default_cost is not None:
+                stats["default_cost_usd"] += default_cost
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {
+                stage: {route: dict(stats, latencies=sorted(stats["latencies"])) for route, stats in routes.items()}
+                for stage, routes in self.stages.items()
+            }
+        for routes in snapshot.values():
+            for stats in routes.values():
+                latencies = stats.pop("latencies")
+                served = stats["calls"] - stats["failures"]
+                stats["avg_latency"] = round(stats["total_latency"] / served, 3) if served else 0.0
+                stats["p95_latency"] = round(
+                    latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3
+                ) if latencies else 0.0
+                stats["total_latency"] = round(stats["total_latency"], 3)
+                stats["cost_usd"] = round(stats["cost_usd"], 6)
+                # What the same tokens would have cost on the default service
+                stats["default_cost_usd"] = round(stats["default_cost_usd"], 6)
+        return snapshot
+
+
+stage_stats = StageStats()
+
+# Routed services shared by every wrapper instance, keyed by "provider:model" spec
+_stage_services: Dict[str, Optional[LLMService]] = {}
+
+
+class StageRoutedLLMService(LLMService):
+    """
+    Sends each pipeline stage to the provider and model tier configured for it.
+    
+    Callers tag requests with stage="..." (backstory, chapter_hooks,
+    thematic_spells, ...); untagged requests go straight to the default service.
+    A routed call that fails is retried once on the default service, so a small
+    local model being down costs latency rather than the request. Other
+    attributes are delegated to the default service.
+    """
+    
+    def __init__(self, service: LLMService, config: Optional[StageRoutingConfig] = None):
+        self.service = service
+        self.config = config or StageRoutingConfig()
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.service, name)
+    
+    def _default_route(self) -> str:
+        return f"default:{getattr(self.service, 'model', None)}"
+    
+    def _service_for(self, stage: str) -> Tuple[str, LLMService]:
+        """(route label, service) for a stage."""
+        spec = self.config.route_for(stage)
+        if not spec:
+            return self._default_route(), self.service
+        if spec not in _stage_services:
+            provider, _, model = spec.partition(":")
+            try:
+                model_kwargs = {"model": model} if model else {}
+                _stage_services[spec] = create_llm_service(provider, stage_routing=None, **model_kwargs)
+            except (ValueError, ImportError) as e:
+                logger.warning(f"Stage route '{spec}' unavailable, using default service: {e}")
+                _stage_services[spec] = None
+        service = _stage_services[spec]
+        if service is None:
+            return self._default_route(), self.service
+        return spec, service
+    
+    async def _timed(self, stage: str, route: str, service: LLMService, prompt: str,
+                     kwargs: Dict[str, Any], outcome: str = "success") -> str:
+        start = time.time()
+        try:
+            content = await service.generate_content(prompt, **kwargs)
+        except Exception:
+            stage_stats.record(stage, route, time.time() - start, outcome="failure")
+            raise
+        prompt_tokens, completion_tokens = count_tokens(prompt), count_tokens(content or "")
+        stage_stats.record(
+            stage, route, time.time() - start, prompt_tokens, completion_tokens,
+            cost=estimate_cost(service, prompt_tokens, completion_tokens),
+            default_cost=estimate_cost(self.service, prompt_tokens, completion_tokens),
+            outcome=outcome
+        )
+        return content
+    
+    async def generate_content(self, prompt: str, **kwargs) -> str:
+        """Generate content on the service routed for kwargs["stage"]."""
+        stage = kwargs.pop("stage", None)
+        if stage is None:
+            return await self.service.generate_content(prompt, **kwargs)
+    
+        route, service = self._service_for(stage)
+        if service is self.service:
+            return await self._timed(stage, route, service, prompt, kwargs)
+        try:
+            return await self._timed(stage, route, service, prompt, kwargs)
+        except Exception as e:
+            logger.warning(f"Stage {stage} failed on {route} ({e}), falling back to default service")
+            return await self._timed(stage, self._default_route(), self.service, prompt, kwargs, outcome="fallback")
+    
+    async def test_connection(self) -> bool:
+        return await self.service.test_connection()
+    
+    def get_rate_limit_status(self) -> Dict[str, Any]:
+        return self.service.get_rate_limit_status()
+
+
+def get_stage_routing_stats() -> Dict[str, Any]:
+    """Per-stage latency and cost by route, with the configured stage routes."""
+    config = StageRoutingConfig.from_settings()
+    return {
+        "enabled": config.enabled,
+        "routes": {stage: config.route_for(stage) or "default" for stage in config.stages},
+        "stages": stage_stats.get_stats()
+    }
+
+
+def _ollama_services(service: LLMService) -> List[OllamaLLMService]:
+    """Every Ollama service behind a (possibly wrapped, composite or stage-routed) service."""
+    found = []
+    if isinstance(service, StageRoutedLLMService):
+        for stage in service.config.stages:
+            found.extend(_ollama_services(service._service_for(stage)[1]))
+    if isinstance(service, CompositeLLMService):
+        for _, provider in service.providers:
+            found.extend(_ollama_services(provider))
+    elif "service" in vars(service):
+        found.extend(_ollama_services(vars(service)["service"]))
+    elif isinstance(service, OllamaLLMService):
+        found.append(service)
+    return found
+
+
+async def preload_ollama_models(service: LLMService) -> Dict[str, bool]:
+    """
+    Load every Ollama model a service can route to, so the first request does
+    not pay the 10-40s cold load. Returns {model: loaded}.
+    """
+    unique = {}
+    for ollama in _ollama_services(service):
+        unique.setdefault((ollama.base_url, ollama.model), ollama)
+    results = {}
+    for (_, model), ollama in unique.items():
+        results[model] = await ollama.preload()
+    return results
+
+
+def _create_provider(provider: str, **kwargs) -> LLMService:
+    if provider == "ollama":
+        return OllamaLLMService(**kwargs)
+    elif provider == "openai":
+        return OpenAILLMService(**kwargs)
+    elif provider == "anthropic":
+        return AnthropicLLMService(**kwargs)
+    elif provider == "http":
+        return HTTPLLMService(**kwargs)
+    raise ValueError(f"Unsupported LLM provider: {provider}. Supported: 'ollama', 'openai', 'anthropic', 'http'")
+
+
+def create_composite_service(providers: List[str], provider_kwargs: Optional[Dict[str, Dict[str, Any]]] = None,
+                             **composite_kwargs) -> CompositeLLMService:
+    """
+    Build a CompositeLLMService from provider names in priority order.
+    
+    Providers that cannot be configured (e.g. missing API key) are skipped.
+    Members make a single attempt per call (unless a rate_limit_config is
+    passed for them), so a 429/5xx fails over at once instead of first
+    waiting out the member's own retry backoff.
+    """
+    provider_kwargs = provider_kwargs or {}
+    services = []
+    for provider in providers:
+        member_kwargs = dict(provider_kwargs.get(provider, {}))
+        if provider != "ollama":
+            member_kwargs.setdefault("rate_limit_config", RateLimitConfig(max_retries=1))
+        try:
+            service = _create_provider(provider, **member_kwargs)
+        except (ValueError, ImportError) as e:
+            logger.warning(f"Skipping LLM provider '{provider}': {e}")
+            continue
+        services.append((f"{provider}:{getattr(service, 'model', 'default')}", service))
+    return CompositeLLMService(services, **composite_kwargs)
+
+
+def create_llm_service(provider: Optional[str] = None, **kwargs) -> LLMService:
     """
     Factory function to create LLM service instances with automatic .env loading.
     
     Args:
-        provider: LLM provider ("ollama", "openai", "anthropic", "http")
-                 Default: "openai" with gpt-4.1-nano-2025-04-14 model
+        provider: LLM provider ("ollama", "openai", "anthropic", "http"), or a
+                 comma-separated priority list (e.g. "openai,anthropic,ollama")
+                 for hedged, failover-capable composite service.
+                 Default: LLM_PROVIDERS environment variable, else "openai"
+                 with gpt-4.1-nano-2025-04-14 model
+        coalescing: CoalescingConfig for single-flight coalescing of identical
+                 in-flight requests (default from environment); None disables it
+        stage_routing: StageRoutingConfig routing pipeline stages to model
+                 tiers (default from Settings); None disables it
         **kwargs: Provider-specific configuration
     
     Returns:
@@ -687,17 +1888,25 @@ def create_llm_service(provider: str = "openai", **kwargs) -> LLMService:
         
         # Explicit API key (example format only):
         llm_service = create_llm_service("openai", api_key="sk-your-key-here")
+        
+        # OpenAI with Anthropic and local Ollama as hedge/failover targets:
+        llm_service = create_llm_service("openai,anthropic,ollama")
     """
-    if provider.lower() == "ollama":
-        return OllamaLLMService(**kwargs)
-    elif provider.lower() == "openai":
-        return OpenAILLMService(**kwargs)
-    elif provider.lower() == "anthropic":
-        return AnthropicLLMService(**kwargs)
-    elif provider.lower() == "http":
-        return HTTPLLMService(**kwargs)
+    coalescing = kwargs.pop("coalescing", CoalescingConfig.from_env())
+    stage_routing = kwargs.pop("stage_routing", StageRoutingConfig.from_settings())
+    provider = (provider or os.environ.get("LLM_PROVIDERS") or "openai").lower()
+    
+    if "," in provider:
+        providers = [name.strip() for name in provider.split(",") if name.strip()]
+        service = create_composite_service(providers, **kwargs)
     else:
-        raise ValueError(f"Unsupported LLM provider: {provider}. Supported: 'ollama', 'openai', 'anthropic', 'http'")
+        service = _create_provider(provider.strip(), **kwargs)
+    
+    if coalescing is not None:
+        service = SingleFlightLLMService(service, coalescing)
+    if stage_routing is not None:
+        service = StageRoutedLLMService(service, stage_routing)
+    return service
 
 
 def create_ollama_service(
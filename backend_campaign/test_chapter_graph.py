@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Chapter Graph Test
+
+Recursive CTE walks of the chapter version graph (ancestry, branch log, merge
+base) over history built by ChapterVersionManager, including a merged storyline.
+"""
+
+import os
+import sys
+import uuid
+from pathlib import Path
+os.environ.setdefault("SECRET_KEY", "test_secret_key")
+os.environ.setdefault("OPENAI_API_KEY", "test_openai_key")
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database_models import Base, Campaign, ChapterVersionParent
+from src.services.chapter_graph import ancestor_versions, branch_log, ensure_chapter_graph, merge_base
+from src.services.chapter_version_manager import ChapterGitOperations, ChapterVersionManager
+
+
+def _campaign(session, title="The Lost Mine"):
+    campaign = Campaign(id=str(uuid.uuid4()), title=title)
+    session.add(campaign)
+    session.commit()
+    return campaign.id
+
+
+def _history():
+    """
+    main:     s1 - s2 - s3 - s4 - m1 (merge of s4 and r2)
+    rescue:             s2 - r1 - r2
+    betrayal:                s3 - b1
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    campaign_id = _campaign(session)
+    manager = ChapterVersionManager(session)
+
+    s1, s2, s3, s4 = (commit.hash for commit in manager.create_skeleton_commits(campaign_id, [
+        {"title": f"Chapter {i + 1}", "chapter_order": i} for i in range(4)
+    ]))
+    manager.create_branch(campaign_id, "rescue", s2)
+    r1 = manager.commit_chapter(campaign_id, {"title": "The Rescue"}, branch_name="rescue").hash
+    r2 = manager.commit_chapter(campaign_id, {"title": "The Escape"}, branch_name="rescue").hash
+    manager.create_branch(campaign_id, "betrayal", s3)
+    b1 = manager.commit_chapter(campaign_id, {"title": "The Betrayal"}, branch_name="betrayal").hash
+    m1 = ChapterGitOperations(manager).merge_branches(campaign_id, "rescue", "main").hash
+    hashes = {"s1": s1, "s2": s2, "s3": s3, "s4": s4, "r1": r1, "r2": r2, "b1": b1, "m1": m1}
+    return engine, session, manager, campaign_id, hashes
+
+
+def _names(hashes, versions):
+    by_hash = {value: name for name, value in hashes.items()}
+    return sorted(by_hash[version.version_hash] for version in versions)
+
+
+def test_ancestry_and_branch_log():
+    print("🧪 Testing ancestry walks...")
+
+    engine, session, manager, campaign_id, h = _history()
+    assert _names(h, ancestor_versions(session, campaign_id, [h["r2"]])) == ["r1", "r2", "s1", "s2"]
+    # The merge reaches both parents' histories, each version once
+    assert _names(h, ancestor_versions(session, campaign_id, [h["m1"]])) == \
+        ["m1", "r1", "r2", "s1", "s2", "s3", "s4"]
+    assert _names(h, ancestor_versions(session, campaign_id, [h["r1"], h["b1"]])) == \
+        ["b1", "r1", "s1", "s2", "s3"]
+
+    assert _names(h, branch_log(session, campaign_id, "betrayal")) == ["b1", "s1", "s2", "s3"]
+    assert _names(h, branch_log(session, campaign_id, "main")) == ["m1", "r1", "r2", "s1", "s2", "s3", "s4"]
+    assert branch_log(session, campaign_id, "no-such-branch") == []
+
+    history = manager.get_chapter_history(campaign_id, h["s4"])
+    assert [commit.hash for commit in history] == [h["s1"], h["s2"], h["s3"], h["s4"]]
+    session.close()
+    print("✅ History, branch logs and multi-start walks follow every parent")
+
+
+def test_merge_base():
+    print("🧪 Testing merge bases...")
+
+    engine, session, manager, campaign_id, h = _history()
+
+    def base(a, b):
+        result = merge_base(session, campaign_id, h[a], h[b])
+        assert merge_base(session, campaign_id, h[b], h[a]) == result
+        return next(name for name, value in h.items() if value == result)
+
+    assert base("s4", "r2") == "s2"
+    assert base("b1", "r2") == "s2"
+    assert base("s4", "b1") == "s3"
+    # After the merge, the rescue head is part of main's history
+    assert base("m1", "r2") == "r2"
+    assert base("m1", "r1") == "r1"
+    # s3 is two edges from m1 and one from b1; s2 is further from both
+    assert base("m1", "b1") == "s3"
+    assert base("s1", "m1") == "s1"
+    assert base("b1", "b1") == "b1"
+
+    # Merging again is a no-op: the source head is already the merge base
+    assert ChapterGitOperations(manager).merge_branches(campaign_id, "rescue", "main").hash == h["m1"]
+
+    # Histories that never meet, and versions of another campaign, have no base
+    other = _campaign(session, "Another Campaign")
+    (lone,) = ChapterVersionManager(session).create_skeleton_commits(other, [{"title": "Elsewhere"}])
+    assert merge_base(session, campaign_id, h["m1"], lone.hash) is None
+    assert merge_base(session, other, h["s1"], lone.hash) is None
+    session.close()
+    print("✅ Merge bases are the nearest common ancestors, across merges")
+
+
+def test_edge_backfill():
+    print("🧪 Testing the parent edge backfill...")
+
+    engine, session, manager, campaign_id, h = _history()
+    edges = session.query(ChapterVersionParent).count()
+    # s2, s3, s4, r1, r2, b1 have one parent; the merge has two
+    assert edges == 8
+
+    session.query(ChapterVersionParent).delete()
+    session.commit()
+    assert merge_base(session, campaign_id, h["s4"], h["r2"]) is None
+
+    assert ensure_chapter_graph(engine) == edges
+    assert merge_base(session, campaign_id, h["s4"], h["r2"]) == h["s2"]
+    assert ensure_chapter_graph(engine) == 0
+    session.close()
+    print("✅ Versions stored without edges get them on startup")
+
+
+if __name__ == "__main__":
+    test_ancestry_and_branch_log()
+    test_merge_base()
+    test_edge_backfill()
+    print("\n✅ ALL CHAPTER GRAPH TESTS PASSED!")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Encounter Simulator Test
+
+Combatant parsing, outcomes, speed and worker-pool use of the Monte Carlo
+encounter simulator, without the API or a real LLM.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+os.environ.setdefault("SECRET_KEY", "test_secret_key")
+os.environ.setdefault("OPENAI_API_KEY", "test_openai_key")
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from src.services import encounter_simulator
+from src.services.encounter_simulator import (
+    simulate_encounter, parse_damage, combatant_from_character, combatant_from_creature
+)
+
+def _party(size=4):
+    fighter = {
+        "name": "Fighter", "level": 5, "character_classes": {"fighter": 5},
+        "strength": 16, "dexterity": 12, "armor_class": 17, "hit_points": 44
+    }
+    wizard = {
+        "name": "Wizard", "level": 5, "character_classes": {"wizard": 5},
+        "dexterity": 14, "armor_class": 12, "hit_points": 27,
+        "spell_slots_remaining": {1: 4, 2: 3, 3: 2}
+    }
+    return [dict(fighter) for _ in range(size - 1)] + [wizard]
+
+def _orcs(count=6):
+    return [{
+        "name": "Orc", "type": "humanoid", "challenge_rating": 0.5,
+        "hit_points": 15, "armor_class": 13, "proficiency_bonus": 2,
+        "abilities": {"strength": 16, "dexterity": 12, "constitution": 16,
+                      "intelligence": 7, "wisdom": 11, "charisma": 10},
+        "actions": [{"name": "Greataxe", "attack_bonus": "+5", "damage": "1d12+3"}]
+    } for _ in range(count)]
+
+def test_combatant_parsing():
+    """Test damage expressions and stat block conversion."""
+    print("🧪 Testing combatant parsing...")
+
+    roll = parse_damage("7 (2d6 - 1)")
+    assert (roll.dice_count, roll.dice_size, roll.bonus) == (2, 6, -1)
+    assert parse_damage(12).bonus == 12
+
+    fighter = combatant_from_character(_party()[0])
+    assert fighter.attack_bonus == 6  # proficiency 3 + STR 3
+    assert fighter.attacks_per_round == 2
+
+    orc = combatant_from_creature(_orcs(1)[0])
+    assert orc.attack_bonus == 5
+    assert orc.damage.dice_size == 12
+    print("✅ Combatant parsing working")
+
+def test_simulation_outcomes():
+    """Test that outcomes are consistent and respond to encounter strength."""
+    print("🧪 Testing simulation outcomes...")
+
+    easy = simulate_encounter(_party(), _orcs(2), trials=2000, seed=7)
+    hard = simulate_encounter(_party(), _orcs(12), trials=2000, seed=7)
+
+    for result in (easy, hard):
+        total = result["win_rate"] + result["loss_rate"] + result["timeout_rate"]
+        assert abs(total - 1.0) < 1e-3
+        assert 0.0 <= result["resource_drain"]["hit_points"]["mean"] <= 1.0
+
+    assert easy["win_rate"] > hard["win_rate"]
+    assert easy["resource_drain"]["hit_points"]["mean"] < hard["resource_drain"]["hit_points"]["mean"]
+    assert easy["rounds_to_kill"]["mean"] < hard["rounds_to_kill"]["mean"] or hard["win_rate"] == 0
+
+    repeat = simulate_encounter(_party(), _orcs(2), trials=2000, seed=7)
+    assert repeat["win_rate"] == easy["win_rate"]
+    print(f"✅ Simulation outcomes working (easy {easy['estimated_difficulty']}, hard {hard['estimated_difficulty']})")
+
+def test_spell_slot_shapes():
+    """Test that every stored spell-slot shape counts as remaining uses."""
+    print("🧪 Testing spell slot shapes...")
+
+    wizard = _party()[-1]
+    shapes = [
+        ({1: 4, 2: 3, 3: 2}, 9),
+        ({"1": {"max": 4, "used": 1}, "2": {"max": 3, "used": 3}}, 3),
+        ({"1": {"remaining": 2}, "2": "1"}, 3),
+        ([{"level": 1, "max": 4, "used": 2}, {"level": 2, "total": 2}], 4),
+        ([4, 3], 7),
+        ({"1": None, "2": "lots", "3": -1}, 0),
+    ]
+    for slots, uses in shapes:
+        combatant = combatant_from_character(dict(wizard, spell_slots_remaining=slots))
+        assert combatant.resource_uses == uses, (slots, combatant.resource_uses)
+    nested = dict(wizard, spell_slots_remaining=None, spells={"spell_slots": {"1": {"max": 2, "used": 0}}})
+    assert combatant_from_character(nested).resource_uses == 2
+    print("✅ Spell slot counts, max/used records and lists all parse")
+
+def test_process_pool_use():
+    """Test that small runs stay in-thread and large ones share one bounded pool."""
+    print("🧪 Testing worker pool use...")
+
+    small = simulate_encounter(_party(), _orcs(4), trials=5000, seed=3, processes=8)
+    assert small["processes"] == 1
+    assert encounter_simulator._process_pool is None
+
+    trials, workers = encounter_simulator.PROCESS_POOL_MIN_TRIALS, encounter_simulator.MAX_POOL_WORKERS
+    # Two workers whatever this machine's CPU count, so the pool path always runs
+    encounter_simulator.MAX_POOL_WORKERS = 2
+    try:
+        first = simulate_encounter(_party(), _orcs(4), trials=trials, seed=3, processes=16)
+        pool = encounter_simulator._process_pool
+        second = simulate_encounter(_party(), _orcs(4), trials=trials, seed=3, processes=16)
+        assert first["processes"] == second["processes"] == 2
+        assert first["trials"] == second["trials"] == trials
+        assert first["win_rate"] == second["win_rate"]
+        assert encounter_simulator._process_pool is pool is not None
+    finally:
+        encounter_simulator.shutdown_process_pool()
+        encounter_simulator.MAX_POOL_WORKERS = workers
+    assert encounter_simulator._process_pool is None
+    print("✅ Large runs reuse one pool capped at MAX_POOL_WORKERS")
+
+def test_simulation_performance():
+    """A 4v6 encounter at 10k trials should finish well under a second."""
+    print("🧪 Testing simulation performance...")
+
+    start = time.perf_counter()
+    result = simulate_encounter(_party(4), _orcs(6), trials=10000, seed=1)
+    elapsed = time.perf_counter() - start
+
+    assert result["trials"] == 10000
+    assert elapsed < 1.0, f"Simulation took {elapsed:.2f}s"
+    print(f"✅ 4v6 x 10k trials in {elapsed * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    test_combatant_parsing()
+    test_simulation_outcomes()
+    test_spell_slot_shapes()
+    test_process_pool_use()
+    test_simulation_performance()
+    print("\n✅ ALL ENCOUNTER SIMULATOR TESTS PASSED!")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Prompt Serializer Test
+
+Tests compact, token-budgeted prompt serialisation without requiring full API
+setup or real secret keys (placeholders are set below for the config import).
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+os.environ.setdefault("SECRET_KEY", "test_secret_key")
+os.environ.setdefault("OPENAI_API_KEY", "test_openai_key")
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from src.services.prompt_serializer import (
+    compact_context, compact_value, count_tokens, prompt_compaction_stats
+)
+
+def _character():
+    return {
+        "id": "c0ffee", "created_at": "2024-01-01T00:00:00", "name": "Thorin",
+        "species": "Dwarf", "level": 5, "character_classes": {"Fighter": 5},
+        "abilities": {"strength": 16, "dexterity": 12, "constitution": 15,
+                      "intelligence": 10, "wisdom": 13, "charisma": 8},
+        "proficiency_bonus": 3, "skills": {}, "spells_known": [], "notes": None,
+        "backstory": "Exiled from the mountain halls. " * 200,
+        "equipment": {"weapons": ["Battleaxe", "Handaxe"], "armor": ["Chain mail"]}
+    }
+
+def test_compaction_rules():
+    """Empty, derived and bookkeeping fields are dropped and keys abbreviated."""
+    print("🧪 Testing compaction rules...")
+
+    compacted = compact_value(_character())
+    assert "id" not in compacted and "created_at" not in compacted
+    assert "proficiency_bonus" not in compacted
+    assert "skills" not in compacted and "notes" not in compacted
+    assert compacted["abil"]["STR"] == 16
+    assert compacted["classes"] == {"Fighter": 5}
+    print("✅ Compaction rules working")
+
+def test_section_budgets():
+    """Each section is fitted to its budget and reductions are reported per flow."""
+    print("🧪 Testing section budgets...")
+
+    character = _character()
+    context = compact_context({"character": character}, flow="test_flow",
+                              budgets={"character": 200}, baseline=str(character))
+    assert count_tokens(context) <= 210  # budget plus the section label
+    assert "Thorin" in context and "Battleaxe" in context
+    json.loads(context.split(": ", 1)[1])
+
+    stats = prompt_compaction_stats.get_stats()["flows"]["test_flow"]
+    assert stats["calls"] == 1
+    assert stats["reduction_rate"] > 0.5
+    print(f"✅ Section budgets working ({stats['original_tokens']} -> {stats['compact_tokens']} tokens)")
+
+if __name__ == "__main__":
+    test_compaction_rules()
+    test_section_budgets()
+    print("\n✅ ALL PROMPT SERIALIZER TESTS PASSED!")
@@ -5,10 +5,11 @@ This FastAPI app provides a comprehensive API for D&D campaign creation, managem
 All endpoints, models, and features are designed for campaign-level operations, not character creation.
 """
 
+import asyncio
 import time
 import uuid
-from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, Query, Path, Depends
+from typing import List, Dict, Any, Optional, Union
+from fastapi import FastAPI, HTTPException, Query, Path, Depends, Response
 from pydantic import BaseModel, Field
 import logging
 from sqlalchemy.orm import Session
@@ -35,6 +36,18 @@ logger = logging.getLogger("campaign_api")
 def startup_event():
     init_database("sqlite:///campaigns.db")
 
+@app.on_event("startup")
+async def compress_existing_rows():
+    """Rewrite chapter content stored before it was compressed, in small batches in the background."""
+    from src.core.config import settings
+    from src.models import database_models
+    from src.models.compressed_json import compress_all_existing_rows
+    if settings.compression_backfill_on_startup:
+        app.state.compression_backfill = asyncio.create_task(asyncio.to_thread(
+            compress_all_existing_rows, database_models.engine, database_models.Base.metadata,
+            batch_size=settings.compression_backfill_batch_size
+        ))
+
 # =========================
 # ENUMS & CONSTANTS (use database enums)
 # =========================
@@ -71,6 +84,11 @@ class CampaignResponse(BaseModel):
     updated_at: str
     validation_warnings: Optional[List[str]] = None
 
+class CampaignPage(BaseModel):
+    """Cursor-paginated campaign list."""
+    items: List[CampaignResponse]
+    next_cursor: Optional[str] = None
+
 class ChapterCreateRequest(BaseModel):
     campaign_id: str
     title: str
@@ -186,10 +204,26 @@ async def create_campaign(request: CampaignCreateRequest, db=Depends(get_db)):
         updated_at=db_campaign.updated_at.isoformat() if db_campaign.updated_at else None
     )
 
-@app.get("/api/v2/campaigns", response_model=List[CampaignResponse], tags=["campaigns"])
-async def list_campaigns(db=Depends(get_db)):
-    campaigns = CampaignDB.list_campaigns(db)
-    return [CampaignResponse(
+@app.get("/api/v2/campaigns", response_model=Union[List[CampaignResponse], CampaignPage], tags=["campaigns"])
+async def list_campaigns(
+    response: Response,
+    db=Depends(get_db),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of campaigns to return"),
+    offset: int = Query(0, ge=0, description="Number of campaigns to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor from next_cursor; pass empty for the first page of a cursor walk")
+):
+    """
+    List campaigns in creation order. With cursor= (empty for the first page)
+    the response is {"items": [...], "next_cursor": ...}; without it the bare
+    list is returned, with the next page's cursor in the X-Next-Cursor header.
+    """
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+    try:
+        campaigns, next_cursor = CampaignDB.list_campaigns_page(db, limit=limit, cursor=cursor, offset=offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    items = [CampaignResponse(
         id=c.id,
         title=c.title,
         description=c.description,
@@ -199,6 +233,11 @@ async def list_campaigns(db=Depends(get_db)):
         created_at=c.created_at.isoformat() if c.created_at else None,
         updated_at=c.updated_at.isoformat() if c.updated_at else None
     ) for c in campaigns]
+    if cursor is not None:
+        return CampaignPage(items=items, next_cursor=next_cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @app.get("/api/v2/campaigns/{campaign_id}", response_model=CampaignResponse, tags=["campaigns"])
 async def get_campaign(campaign_id: str, db=Depends(get_db)):
@@ -38,6 +38,10 @@ class Settings(BaseSettings):
             return self.database_url
         return f"sqlite:///{self.sqlite_path}"
     
+    # Compress rows written before the compressed JSON columns, in the background after startup
+    compression_backfill_on_startup: bool = True
+    compression_backfill_batch_size: int = 200
+    
     # External LLM Service Configuration
     llm_provider: str = "openai"  # "openai", "anthropic", "cohere", etc.
     openai_api_key: Optional[str] = None
@@ -50,6 +54,25 @@ class Settings(BaseSettings):
     llm_max_retries: int = 3
     llm_temperature: float = 0.7
     
+    # Stage-aware model routing - each pipeline stage goes to a provider and model tier.
+    # Tiers are "provider:model" specs; an empty spec uses the default service above.
+    # Cheap structured stages run on a small local model, narrative stages on the large one.
+    # Off by default: enable (LLM_STAGE_ROUTING_ENABLED=true) where the small-tier provider runs.
+    llm_stage_routing_enabled: bool = False
+    llm_small_model: str = "ollama:llama3.2:3b"
+    llm_large_model: str = ""
+    llm_stage_tiers: str = (
+        "thematic_spells=small,theme_spell_logic=small,theme_weapon_logic=small,"
+        "npc_roleplay=small,chapter_hooks=small,json_fix=small,"
+        "backstory=large,campaign_skeleton=large,chapter_narrative=large"
+    )
+    
+    @property
+    def llm_stage_tiers_map(self) -> dict[str, str]:
+        """Parse stage -> tier rules from comma-separated stage=tier pairs."""
+        pairs = (item.split("=", 1) for item in self.llm_stage_tiers.split(",") if "=" in item)
+        return {stage.strip(): tier.strip() for stage, tier in pairs}
+    
     # Security Configuration - MUST be provided via environment variables
     secret_key: Optional[str] = None  # Must be set via SECRET_KEY environment variable
     access_token_expire_minutes: int = 30
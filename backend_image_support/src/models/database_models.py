@@ -63,8 +63,24 @@ class CampaignDB:
 
     @staticmethod
     def list_campaigns(db: Session, limit: int = 100, offset: int = 0):
+        campaigns, _ = CampaignDB.list_campaigns_page(db, limit=limit, offset=offset)
+        return campaigns
+
+    @staticmethod
+    def list_campaigns_page(db: Session, limit: int = 100, cursor: Optional[str] = None, offset: int = 0):
+        """
+        Campaigns in (created_at, id) order, starting after cursor, and the
+        cursor for the next page (None on the last page).
+
+        Raises:
+            ValueError: for an invalid cursor
+        """
         from . import database_models as dm
-        return db.query(dm.Campaign).offset(offset).limit(limit).all()
+        from src.services.keyset_pagination import keyset_query, split_page
+        query = keyset_query(db.query(dm.Campaign), dm.Campaign, cursor)
+        if offset:
+            query = query.offset(offset)
+        return split_page(query.limit(limit + 1).all(), limit, lambda c: (c.created_at, c.id))
 
     # ----------- CHAPTER CRUD -----------
     @staticmethod
@@ -158,12 +174,13 @@ from typing import Dict, Any, Optional, List
 import hashlib
 import uuid
 import logging
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, JSON, ForeignKey, create_engine
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, JSON, ForeignKey, Index, create_engine, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.types import TypeDecorator, CHAR
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, Session, sessionmaker
 from sqlalchemy.orm.attributes import flag_modified
+from src.models.compressed_json import CompressedJSON
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -1186,6 +1203,8 @@ class PlotForkTypeEnum(str, enum.Enum):
 
 class Campaign(Base):
     __tablename__ = "campaigns"
+    # Keyset pagination of the campaign list
+    __table_args__ = (Index("ix_campaigns_created_id", "created_at", "id"),)
     id = Column(String(36), primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     title = Column(String(200), nullable=False)
     description = Column(Text)
@@ -1282,6 +1301,8 @@ class ChapterVersion(Base):
     with full lineage tracking and branching support.
     """
     __tablename__ = "chapter_versions"
+    # Branch listings and is_head lookups
+    __table_args__ = (Index("ix_chapter_versions_campaign_branch", "campaign_id", "branch_name"),)
     
     # Core identification
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -1296,7 +1317,7 @@ class ChapterVersion(Base):
     # Content fields
     title = Column(String(200), nullable=False)
     summary = Column(Text)
-    content = Column(JSON)  # Full chapter content as JSON
+    content = Column(CompressedJSON(family="chapter_content"))  # Full chapter content as JSON
     chapter_order = Column(Integer, default=0)  # Order within campaign
     
     # Commit metadata
@@ -1327,6 +1348,30 @@ class ChapterVersion(Base):
     play_session = relationship("PlaySession", back_populates="chapter_versions")
     choices = relationship("ChapterChoice", back_populates="chapter_version")
 
+class ChapterVersionParent(Base):
+    """
+    One row per (version, parent) edge of the chapter version graph, mirroring
+    ChapterVersion.parent_hashes so ancestry can be walked with a recursive
+    CTE (services/chapter_graph.py). Maintained by the listeners below.
+    """
+    __tablename__ = "chapter_version_parents"
+    
+    version_hash = Column(String(12), ForeignKey("chapter_versions.version_hash", ondelete="CASCADE"), primary_key=True)
+    parent_hash = Column(String(12), primary_key=True)
+    position = Column(Integer, default=0)  # 0 for the first parent, 1+ for merged parents
+
+
+@event.listens_for(ChapterVersion, "after_insert")
+def _insert_version_parents(mapper, connection, target):
+    from src.services.chapter_graph import sync_version_parents
+    sync_version_parents(connection, target)
+
+
+@event.listens_for(ChapterVersion, "before_delete")
+def _delete_version_parents(mapper, connection, target):
+    from src.services.chapter_graph import remove_version_parents
+    remove_version_parents(connection, target)
+
 class CampaignBranch(Base):
     """
     Story branches within a campaign (like git branches).
@@ -1334,6 +1379,8 @@ class CampaignBranch(Base):
     Tracks different storyline paths and alternate endings.
     """
     __tablename__ = "campaign_branches"
+    # Branch lookups by name
+    __table_args__ = (Index("ix_campaign_branches_campaign_name", "campaign_id", "name"),)
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     campaign_id = Column(String(36), ForeignKey("campaigns.id"), nullable=False, index=True)
@@ -2209,6 +2256,18 @@ def init_database(database_url: str):
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     Base.metadata.create_all(bind=engine)
     
+    # Compression dictionaries, and a binary type for compressed columns where needed (Postgres)
+    from src.models.compressed_json import prepare_compressed_columns
+    prepare_compressed_columns(engine, Base.metadata)
+    
+    # (created_at, id) index for cursor pagination of the campaign list
+    from src.services.keyset_pagination import ensure_keyset_keys
+    ensure_keyset_keys(engine, [Campaign.__table__])
+    
+    # Chapter graph indexes and parent edges for versions written before they existed
+    from src.services.chapter_graph import ensure_chapter_graph
+    ensure_chapter_graph(engine)
+    
     # Add content relationships
     add_campaign_content_relationships()
 
@@ -2229,7 +2288,7 @@ __all__ = [
     'Campaign', 'Chapter', 'PlotFork', 'CampaignDB',
     
     # Git-like versioning models
-    'ChapterVersion', 'CampaignBranch', 'ChapterChoice', 'PlaySession', 'ChapterMerge',
+    'ChapterVersion', 'ChapterVersionParent', 'CampaignBranch', 'ChapterChoice', 'PlaySession', 'ChapterMerge',
     'ChapterVersionDB',
     
     # Campaign content models
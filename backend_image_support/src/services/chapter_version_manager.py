@@ -7,18 +7,28 @@ Implements a version control system for D&D campaign chapters similar to git:
 - Full lineage tracking and merging capabilities
 - Visual git-like structure for campaign flow
 - Skeleton chapters are the initial "commit" structure
+
+Versions persist in chapter_versions and branches in campaign_branches
+(models/database_models.py); history, branch logs and merge bases are single
+recursive-CTE queries (services/chapter_graph.py).
 """
 
 import hashlib
 import json
+import logging
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from enum import Enum
 from dataclasses import dataclass, asdict
 
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, JSON, Boolean, Integer
-from sqlalchemy.orm import relationship, Session
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session
+
+from src.models.database_models import (
+    ChapterVersion, CampaignBranch, ChapterChoice, ChapterMerge, BranchTypeEnum
+)
+from src.services.chapter_graph import ancestor_versions, branch_log, merge_base
+
+logger = logging.getLogger(__name__)
 
 # ============================================================================
 # GIT-LIKE CHAPTER VERSION ENUMS
@@ -94,54 +104,6 @@ class ChapterCommit:
     player_choices: Optional[Dict[str, Any]] = None
     dm_notes: Optional[str] = None
 
-# ============================================================================
-# ENHANCED DATABASE MODELS FOR CHAPTER VERSIONING
-# ============================================================================
-
-# Note: These would extend the existing database_models.py
-
-class ChapterVersion:
-    """Extended Chapter model with git-like versioning."""
-    
-    # Additional fields for versioning (to be added to existing Chapter model)
-    version_hash = Column(String(12), unique=True, nullable=False, index=True)
-    parent_hashes = Column(JSON, default=list)  # List of parent version hashes
-    branch_name = Column(String(100), default="main", nullable=False)
-    version_type = Column(String(20), default=ChapterVersionType.DRAFT.value)
-    commit_message = Column(Text)
-    author = Column(String(100), default="system")
-    player_choices = Column(JSON, default=dict)  # Choices that led to this version
-    dm_notes = Column(Text)
-    is_head = Column(Boolean, default=True)  # Is this the latest version in its branch?
-    play_session_id = Column(String(36), nullable=True)  # Session when this was played
-
-class CampaignBranch:
-    """Story branches within a campaign."""
-    
-    # Additional model for tracking branches (new table)
-    id = Column(String(36), primary_key=True)
-    campaign_id = Column(String(36), ForeignKey("campaigns.id"), nullable=False)
-    name = Column(String(100), nullable=False)
-    branch_type = Column(String(20), default=BranchType.MAIN.value)
-    head_commit = Column(String(12), nullable=False)  # Latest chapter version hash
-    description = Column(Text)
-    parent_branch = Column(String(100), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    is_active = Column(Boolean, default=True)
-
-class ChapterChoice:
-    """Player choices that create new branches."""
-    
-    # New model for tracking player decisions (new table)
-    id = Column(String(36), primary_key=True)
-    campaign_id = Column(String(36), ForeignKey("campaigns.id"), nullable=False)
-    chapter_hash = Column(String(12), nullable=False)
-    choice_description = Column(Text, nullable=False)
-    consequences = Column(JSON, default=dict)
-    players_involved = Column(JSON, default=list)
-    session_date = Column(DateTime, default=datetime.utcnow)
-    resulted_in_branch = Column(String(100), nullable=True)
-
 # ============================================================================
 # CHAPTER VERSION MANAGEMENT SERVICE
 # ============================================================================
@@ -209,6 +171,7 @@ class ChapterVersionManager:
         
         # Update branch head
         self._update_branch_head(campaign_id, branch_name, version_hash)
+        self.db.commit()
         
         return commit
     
@@ -285,6 +248,7 @@ class ChapterVersionManager:
         
         # Save branch to database
         self._save_branch(campaign_id, branch)
+        self.db.commit()
         
         return branch
     
@@ -333,6 +297,7 @@ class ChapterVersionManager:
         
         # Record the player choice
         self._record_player_choice(campaign_id, current_chapter_hash, player_choice, branch_name)
+        self.db.commit()
         
         return branch, commit
     
@@ -351,22 +316,7 @@ class ChapterVersionManager:
         Returns:
             List of commits in chronological order
         """
-        history = []
-        visited = set()
-        
-        def trace_parents(hash_val: str):
-            if hash_val in visited:
-                return
-            visited.add(hash_val)
-            
-            commit = self._get_commit_by_hash(campaign_id, hash_val)
-            if commit:
-                history.append(commit)
-                for parent_hash in commit.parent_hashes:
-                    trace_parents(parent_hash)
-        
-        trace_parents(chapter_hash)
-        return sorted(history, key=lambda c: c.timestamp)
+        return [self._to_commit(version) for version in ancestor_versions(self.db, campaign_id, [chapter_hash])]
     
     def get_campaign_branches(self, campaign_id: str) -> List[ChapterBranch]:
         """Get all story branches in a campaign."""
@@ -376,6 +326,10 @@ class ChapterVersionManager:
         """Get all commits in a specific branch."""
         return self._get_commits_by_branch(campaign_id, branch_name)
     
+    def find_merge_base(self, campaign_id: str, hash_a: str, hash_b: str) -> Optional[str]:
+        """Get the best common ancestor of two chapter versions (like git merge-base)."""
+        return merge_base(self.db, campaign_id, hash_a, hash_b)
+    
     # ========================================================================
     # VISUAL GIT STRUCTURE GENERATION
     # ========================================================================
@@ -388,15 +342,12 @@ class ChapterVersionManager:
             Graph data suitable for visualization (nodes, edges, branches)
         """
         branches = self.get_campaign_branches(campaign_id)
-        all_commits = []
-        
-        # Collect all commits from all branches
-        for branch in branches:
-            commits = self.get_branch_commits(campaign_id, branch.name)
-            all_commits.extend(commits)
         
-        # Remove duplicates (commits can appear in multiple branches)
-        unique_commits = {commit.hash: commit for commit in all_commits}
+        # Every version of the campaign in one query (commits can appear in multiple branches)
+        versions = self.db.query(ChapterVersion).filter(
+            ChapterVersion.campaign_id == campaign_id
+        ).order_by(ChapterVersion.commit_timestamp).all()
+        unique_commits = {version.version_hash: self._to_commit(version) for version in versions}
         
         # Build graph structure
         nodes = []
@@ -481,44 +432,168 @@ class ChapterVersionManager:
     
     def _get_current_branch_head(self, campaign_id: str, branch_name: str) -> List[str]:
         """Get the current head commit hash for a branch."""
-        # Implementation would query database
-        return []
+        branch = self._get_branch_row(campaign_id, branch_name)
+        return [branch.head_commit] if branch else []
+    
+    def _get_branch_row(self, campaign_id: str, branch_name: str) -> Optional[CampaignBranch]:
+        """Get the CampaignBranch row for a branch name."""
+        return self.db.query(CampaignBranch).filter(
+            CampaignBranch.campaign_id == campaign_id,
+            CampaignBranch.name == branch_name
+        ).first()
     
     def _save_chapter_version(self, campaign_id: str, commit: ChapterCommit):
         """Save chapter version to database."""
-        # Implementation would use existing Chapter model + new version fields
-        pass
+        content = commit.content or {}
+        
+        # The new version becomes the only head of its branch
+        self.db.query(ChapterVersion).filter(
+            ChapterVersion.campaign_id == campaign_id,
+            ChapterVersion.branch_name == commit.branch_name,
+            ChapterVersion.is_head == True
+        ).update({ChapterVersion.is_head: False}, synchronize_session=False)
+        
+        self.db.add(ChapterVersion(
+            campaign_id=campaign_id,
+            version_hash=commit.hash,
+            parent_hashes=list(commit.parent_hashes),
+            branch_name=commit.branch_name,
+            version_type=commit.version_type.value,
+            title=str(content.get("title") or "Untitled")[:200],
+            summary=content.get("summary"),
+            content=content,
+            chapter_order=content.get("chapter_order", 0),
+            commit_message=commit.message,
+            author=commit.author,
+            commit_timestamp=commit.timestamp,
+            player_choices=commit.player_choices or {},
+            dm_notes=commit.dm_notes,
+            is_head=True,
+            merge_parent_hashes=list(commit.parent_hashes[1:])
+        ))
+        self.db.flush()
     
     def _update_branch_head(self, campaign_id: str, branch_name: str, new_hash: str):
         """Update the head commit for a branch."""
-        # Implementation would update CampaignBranch table
-        pass
+        branch = self._get_branch_row(campaign_id, branch_name)
+        if branch is None:
+            # First commit on a branch that was never created explicitly (e.g. main)
+            branch_type = BranchTypeEnum.MAIN if branch_name == "main" else BranchTypeEnum.ALTERNATE
+            self.db.add(CampaignBranch(
+                campaign_id=campaign_id,
+                name=branch_name,
+                branch_type=branch_type.value,
+                head_commit=new_hash
+            ))
+        else:
+            branch.head_commit = new_hash
+        self.db.flush()
     
     def _save_branch(self, campaign_id: str, branch: ChapterBranch):
         """Save branch information to database."""
-        # Implementation would save to CampaignBranch table
-        pass
+        if self._get_branch_row(campaign_id, branch.name) is not None:
+            raise ValueError(f"Branch '{branch.name}' already exists")
+        
+        self.db.add(CampaignBranch(
+            campaign_id=campaign_id,
+            name=branch.name,
+            branch_type=branch.branch_type.value,
+            description=branch.description,
+            head_commit=branch.head_commit,
+            parent_branch=branch.parent_branch,
+            created_at=branch.created_at
+        ))
+        self.db.flush()
     
     def _record_player_choice(self, campaign_id: str, chapter_hash: str, 
                              choice: Dict[str, Any], resulting_branch: str):
         """Record a player choice that created a branch."""
-        # Implementation would save to ChapterChoice table
-        pass
+        version = self.db.query(ChapterVersion).filter(
+            ChapterVersion.campaign_id == campaign_id,
+            ChapterVersion.version_hash == chapter_hash
+        ).first()
+        if version is None:
+            logger.warning(f"Not recording player choice: chapter {chapter_hash} not found")
+            return
+        
+        self.db.add(ChapterChoice(
+            campaign_id=campaign_id,
+            chapter_version_id=version.id,
+            choice_description=choice.get("description") or choice.get("summary") or "Player choice",
+            choice_context=choice.get("context") or {},
+            options_presented=choice.get("options") or [],
+            choice_made=choice,
+            players_involved=choice.get("players") or [],
+            immediate_consequences=choice.get("consequences") or {},
+            resulted_in_branch=resulting_branch
+        ))
+        self.db.flush()
+    
+    def _record_merge(self, campaign_id: str, source_branch: str, target_branch: str,
+                      merge_commit: ChapterCommit, merge_strategy: str, merge_base_hash: Optional[str]):
+        """Record a branch merge and mark the source branch as merged."""
+        self.db.add(ChapterMerge(
+            campaign_id=campaign_id,
+            source_branch=source_branch,
+            target_branch=target_branch,
+            merge_commit_hash=merge_commit.hash,
+            merge_strategy=merge_strategy,
+            merge_message=merge_commit.message,
+            merged_by=merge_commit.author,
+            merge_notes=f"Merge base: {merge_base_hash}" if merge_base_hash else "No common ancestor"
+        ))
+        source = self._get_branch_row(campaign_id, source_branch)
+        if source is not None:
+            source.is_merged = True
+            source.merged_into_branch = target_branch
+            source.merge_timestamp = merge_commit.timestamp
+        self.db.flush()
     
     def _get_commit_by_hash(self, campaign_id: str, commit_hash: str) -> Optional[ChapterCommit]:
         """Get a commit by its hash."""
-        # Implementation would query database
-        return None
+        version = self.db.query(ChapterVersion).filter(
+            ChapterVersion.campaign_id == campaign_id,
+            ChapterVersion.version_hash == commit_hash
+        ).first()
+        return self._to_commit(version) if version else None
     
     def _get_all_branches(self, campaign_id: str) -> List[ChapterBranch]:
         """Get all branches for a campaign."""
-        # Implementation would query CampaignBranch table
-        return []
+        branches = self.db.query(CampaignBranch).filter(
+            CampaignBranch.campaign_id == campaign_id,
+            CampaignBranch.is_active == True
+        ).order_by(CampaignBranch.created_at).all()
+        return [
+            ChapterBranch(
+                name=branch.name,
+                branch_type=BranchType(branch.branch_type),
+                head_commit=branch.head_commit,
+                description=branch.description or "",
+                created_at=branch.created_at,
+                parent_branch=branch.parent_branch
+            )
+            for branch in branches
+        ]
     
     def _get_commits_by_branch(self, campaign_id: str, branch_name: str) -> List[ChapterCommit]:
         """Get all commits in a specific branch."""
-        # Implementation would query Chapter table filtered by branch
-        return []
+        return [self._to_commit(version) for version in branch_log(self.db, campaign_id, branch_name)]
+    
+    @staticmethod
+    def _to_commit(version: ChapterVersion) -> ChapterCommit:
+        """Convert a ChapterVersion row to a ChapterCommit."""
+        return ChapterCommit(
+            hash=version.version_hash,
+            parent_hashes=list(version.parent_hashes or []),
+            content=version.content or {},
+            message=version.commit_message or "",
+            author=version.author,
+            timestamp=version.commit_timestamp,
+            branch_name=version.branch_name,
+            version_type=ChapterVersionType(version.version_type),
+            player_choices=version.player_choices,
+            dm_notes=version.dm_notes
+        )
 
 # ============================================================================
 # CHAPTER VERSION UTILITIES
@@ -537,9 +612,38 @@ class ChapterGitOperations:
     def merge_branches(self, campaign_id: str, 
                       source_branch: str, target_branch: str,
                       merge_strategy: str = "manual") -> ChapterCommit:
-        """Merge two story branches together."""
-        # Implementation would handle merging logic
-        pass
+        """
+        Merge two story branches together.
+        
+        Creates a merge commit on the target branch with the source head's
+        content (the DM revises it afterwards); returns the target head
+        unchanged when the source is already part of its history.
+        """
+        source_head = self.vm._get_current_branch_head(campaign_id, source_branch)
+        target_head = self.vm._get_current_branch_head(campaign_id, target_branch)
+        if not source_head or not target_head:
+            raise ValueError(f"Cannot merge '{source_branch}' into '{target_branch}': branch not found")
+        
+        base = self.vm.find_merge_base(campaign_id, target_head[0], source_head[0])
+        if base == source_head[0]:
+            return self.vm._get_commit_by_hash(campaign_id, target_head[0])
+        
+        source_commit = self.vm._get_commit_by_hash(campaign_id, source_head[0])
+        commit = ChapterCommit(
+            hash=ChapterHash.generate(source_commit.content, target_head + source_head, "system"),
+            parent_hashes=target_head + source_head,
+            content=source_commit.content,
+            message=f"Merge branch '{source_branch}' into {target_branch}",
+            author="system",
+            timestamp=datetime.utcnow(),
+            branch_name=target_branch,
+            version_type=ChapterVersionType.MERGE
+        )
+        self.vm._save_chapter_version(campaign_id, commit)
+        self.vm._update_branch_head(campaign_id, target_branch, commit.hash)
+        self.vm._record_merge(campaign_id, source_branch, target_branch, commit, merge_strategy, base)
+        self.vm.db.commit()
+        return commit
     
     def cherry_pick_chapter(self, campaign_id: str,
                            source_hash: str, target_branch: str) -> ChapterCommit:
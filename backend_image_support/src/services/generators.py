@@ -14,7 +14,7 @@ from datetime import datetime
 from enum import Enum
 
 from src.core.config import Settings
-from src.services.llm_service import LLMService
+from src.services.llm_service import LLMService, retry_scope
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -119,31 +119,45 @@ class BaseCampaignGenerator:
         self.max_retries = 3
     
     async def _generate_with_fallback(self, prompt: str, fallback_func, max_tokens: int = 800, 
-                                    temperature: float = 0.8) -> Dict[str, Any]:
-        """Generate content with LLM and provide fallback if needed."""
+                                    temperature: float = 0.8, coalesce: Optional[bool] = None,
+                                    stage: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Generate content with LLM and provide fallback if needed.
+        coalesce=True lets identical concurrent prompts share one LLM call even
+        above the service's coalescing temperature. stage names the pipeline
+        stage so the service can route it to its configured model tier.
+        """
+        extra_args = {"coalesce": coalesce} if coalesce is not None else {}
+        if stage:
+            extra_args["stage"] = stage
         
-        for attempt in range(self.max_retries):
-            try:
-                logger.info(f"Attempting LLM generation (attempt {attempt + 1})")
-                response = await self.llm_service.generate_content(
-                    prompt, 
-                    max_tokens=max_tokens, 
-                    temperature=temperature
-                )
-                
-                if response and len(response.strip()) > 10:
-                    return {"content": response.strip(), "source": "llm", "attempt": attempt + 1}
-                else:
-                    logger.warning(f"Empty or insufficient LLM response on attempt {attempt + 1}")
+        # Retries here and in the provider share one budget per request
+        with retry_scope() as retry_policy:
+            for attempt in range(self.max_retries):
+                try:
+                    logger.info(f"Attempting LLM generation (attempt {attempt + 1})")
+                    response = await self.llm_service.generate_content(
+                        prompt, 
+                        max_tokens=max_tokens, 
+                        temperature=temperature,
+                        **extra_args
+                    )
                     
-            except Exception as e:
-                logger.warning(f"LLM generation failed on attempt {attempt + 1}: {e}")
-                if attempt == self.max_retries - 1:
-                    logger.info("Using fallback generation")
-                    return {"content": fallback_func(), "source": "fallback", "attempt": attempt + 1}
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                    if response and len(response.strip()) > 10:
+                        return {"content": response.strip(), "source": "llm", "attempt": attempt + 1,
+                                "retries": retry_policy.retries}
+                    else:
+                        logger.warning(f"Empty or insufficient LLM response on attempt {attempt + 1}")
+                        
+                except Exception as e:
+                    logger.warning(f"LLM generation failed on attempt {attempt + 1}: {e}")
+                    if attempt == self.max_retries - 1 or not await retry_policy.retry(e, "campaign_generator"):
+                        logger.info("Using fallback generation")
+                        return {"content": fallback_func(), "source": "fallback", "attempt": attempt + 1,
+                                "retries": retry_policy.retries}
         
-        return {"content": fallback_func(), "source": "fallback", "attempt": self.max_retries}
+            return {"content": fallback_func(), "source": "fallback", "attempt": self.max_retries,
+                    "retries": retry_policy.retries}
     
     def _clean_json_response(self, response: str) -> str:
         """Clean and extract JSON from LLM response."""
@@ -202,7 +216,7 @@ class CampaignGenerator(BaseCampaignGenerator):
         
         fallback_func = lambda: self._get_fallback_campaign(concept, genre, complexity, session_count, themes)
         
-        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=1200, temperature=0.8)
+        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=1200, temperature=0.8, stage="campaign_concept")
         
         # Parse and structure the campaign data
         if result["source"] == "llm":
@@ -402,7 +416,7 @@ class CampaignSkeletonGenerator(BaseCampaignGenerator):
             campaign_title, campaign_description, themes, session_count
         )
         
-        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=1500, temperature=0.75)
+        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=1500, temperature=0.75, stage="campaign_skeleton")
         
         if result["source"] == "llm":
             parsed_skeleton = self._parse_json_safely(result["content"])
@@ -797,7 +811,7 @@ Focus on creating immersive scenes and meaningful story progression.
         
         fallback_func = lambda: self._get_fallback_narrative(chapter_title, chapter_summary, themes)
         
-        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=1200, temperature=0.8)
+        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=1200, temperature=0.8, stage="chapter_narrative")
         
         return result
     
@@ -863,7 +877,7 @@ Return as a structured list of NPCs with all details.
         
         fallback_func = lambda: self._get_fallback_npcs(chapter_title)
         
-        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=800, temperature=0.9)
+        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=800, temperature=0.9, stage="chapter_npcs")
         result["generation_method"] = "llm_only"
         
         return result
@@ -902,7 +916,7 @@ Create engaging encounters that advance the story and utilize the chapter themes
         
         fallback_func = lambda: self._get_fallback_encounters(chapter_title, chapter_theme)
         
-        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=600, temperature=0.8)
+        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=600, temperature=0.8, stage="chapter_encounters")
         
         return result
     
@@ -929,7 +943,7 @@ Create immersive locations that support the chapter's story and themes.
         
         fallback_func = lambda: self._get_fallback_locations(chapter_title)
         
-        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=600, temperature=0.8)
+        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=600, temperature=0.8, stage="chapter_locations")
         
         return result
     
@@ -960,7 +974,7 @@ Ensure items are thematically appropriate and balanced for the campaign.
         
         fallback_func = lambda: self._get_fallback_items(chapter_title)
         
-        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=500, temperature=0.8)
+        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=500, temperature=0.8, stage="chapter_items")
         
         return result
     
@@ -985,7 +999,9 @@ Each hook should be intriguing and leave players wanting to know more.
         
         fallback_func = lambda: self._get_fallback_hooks(chapter_title)
         
-        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=400, temperature=0.8)
+        # Batch generation often requests hooks for the same chapter concurrently
+        result = await self._generate_with_fallback(prompt, fallback_func, max_tokens=400, temperature=0.8,
+                                                    coalesce=True, stage="chapter_hooks")
         
         return result
     